@@ -4,8 +4,9 @@ Market Cap API - Endpoints for retrieving market cap data
 """
 
 import os
+import json
 import asyncio
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from datetime import datetime
 import logging
@@ -24,7 +25,7 @@ logger = logging.getLogger(__name__)
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from lib.mc_calculator import calculate_market_cap, MarketCapResult
+from lib.mc_calculator import calculate_market_cap, iter_market_caps, MarketCapResult
 from lib.mc_cache import get_cache
 from lib.mc_precache_service import get_precache_service
 
@@ -43,6 +44,21 @@ def decimal_to_float(obj):
     return obj
 
 
+def batch_result_payload(mint: str, slot: Optional[int], result: MarketCapResult) -> Dict[str, Any]:
+    """Serialize one batch market cap result"""
+    return {
+        "token_mint": mint,
+        "market_cap": decimal_to_float(result.value) if result.value else None,
+        "confidence": result.confidence,
+        "source": result.source,
+        "supply": decimal_to_float(result.supply) if result.supply else None,
+        "price": decimal_to_float(result.price) if result.price else None,
+        "timestamp": result.timestamp,
+        "slot": slot,
+        "cached": result.source and result.source.startswith("cache_") if result.source else False
+    }
+
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
@@ -122,6 +138,11 @@ async def get_batch_market_caps():
     """
     Get market caps for multiple tokens
     
+    Duplicate tokens are resolved once, cache hits are read in one batch and
+    misses are looked up concurrently. With "stream": true (or
+    Accept: application/x-ndjson) each result is sent as an NDJSON line as
+    soon as it resolves, in completion order.
+    
     Request body:
     {
         "tokens": [
@@ -131,7 +152,8 @@ async def get_batch_market_caps():
                 "timestamp": 1234567890  // optional
             }
         ],
-        "use_cache": true  // optional, default true
+        "use_cache": true,  // optional, default true
+        "stream": false  // optional, default false
     }
     """
     try:
@@ -141,66 +163,64 @@ async def get_batch_market_caps():
         
         tokens = data['tokens']
         use_cache = data.get('use_cache', True)
+        stream = data.get('stream', False) or request.accept_mimetypes.best == 'application/x-ndjson'
         
         # Limit batch size
         if len(tokens) > 50:
             return jsonify({"error": "Maximum 50 tokens per batch"}), 400
         
-        # Track requests
-        precache_service = get_precache_service()
-        
-        # Process tokens in parallel
-        tasks = []
+        requests = []
         for token_data in tokens:
             if isinstance(token_data, str):
                 # Simple format: just mint address
-                mint = token_data
-                slot = None
-                timestamp = None
+                mint, slot, timestamp = token_data, None, None
             else:
                 # Complex format: object with mint, slot, timestamp
                 mint = token_data.get('mint')
                 slot = token_data.get('slot')
                 timestamp = token_data.get('timestamp')
             
-            if not mint:
-                continue
-            
-            # Track request
+            if mint:
+                requests.append((mint, slot, timestamp))
+        
+        precache_service = get_precache_service()
+        
+        def track(mint: str, result: MarketCapResult):
             if precache_service:
-                precache_service.track_request(mint, cache_hit=False)
+                cache_hit = bool(result.source and result.source.startswith("cache_"))
+                precache_service.track_request(mint, cache_hit=cache_hit)
+        
+        if stream:
+            def generate():
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                results = iter_market_caps(requests, use_cache=use_cache)
+                try:
+                    while True:
+                        try:
+                            (mint, slot, _), result = loop.run_until_complete(results.__anext__())
+                        except StopAsyncIteration:
+                            break
+                        track(mint, result)
+                        yield json.dumps(batch_result_payload(mint, slot, result)) + "\n"
+                finally:
+                    loop.run_until_complete(results.aclose())
+                    loop.close()
             
-            # Create task
-            task = calculate_market_cap(
-                token_mint=mint,
-                slot=slot,
-                timestamp=timestamp,
-                use_cache=use_cache
+            return Response(
+                generate(),
+                mimetype="application/x-ndjson",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
             )
-            tasks.append((mint, slot, timestamp, task))
         
-        # Wait for all calculations
-        results = []
-        for mint, slot, timestamp, task in tasks:
-            try:
-                result = await task
-                results.append({
-                    "token_mint": mint,
-                    "market_cap": decimal_to_float(result.value) if result.value else None,
-                    "confidence": result.confidence,
-                    "source": result.source,
-                    "supply": decimal_to_float(result.supply) if result.supply else None,
-                    "price": decimal_to_float(result.price) if result.price else None,
-                    "timestamp": result.timestamp,
-                    "slot": slot,
-                    "cached": result.source and result.source.startswith("cache_") if result.source else False
-                })
-            except Exception as e:
-                logger.error(f"Error calculating MC for {mint}: {e}")
-                results.append({
-                    "token_mint": mint,
-                    "error": str(e)
-                })
+        resolved = {}
+        async for req, result in iter_market_caps(requests, use_cache=use_cache):
+            track(req[0], result)
+            resolved[req] = result
+        
+        # Respond in request order, duplicates included
+        results = [batch_result_payload(mint, slot, resolved[(mint, slot, timestamp)])
+                   for mint, slot, timestamp in requests]
         
         return jsonify({
             "results": results,
@@ -10,7 +10,6 @@ import sys
 import os
 from typing import Optional, AsyncGenerator
 import time
-import json
 import uuid
 import logging
 from datetime import datetime
@@ -21,6 +20,7 @@ from src.lib.blockchain_fetcher_v3 import BlockchainFetcherV3
 from src.lib.blockchain_fetcher_v3_stream import BlockchainFetcherV3Stream
 from src.lib.progress_tracker import get_progress_tracker
 from src.lib.progress_protocol import EventBuilder, ProgressData, ErrorData
+from src.lib.sse_replay import get_replay_registry, last_event_id_from
 
 # Set up logging
 logging.basicConfig(
@@ -233,24 +233,26 @@ def stream_wallet_endpoint(wallet_address: str):
         
         logger.info(f"Starting SSE stream {stream_id} for wallet: {wallet_address}")
         
-        # Create streaming generator
+        # The generator runs off the request thread, so read the request now
+        client_ip = request.remote_addr
+        api_key = getattr(request, 'api_key', None)
+        
+        # Create streaming generator: yields SSE event strings, or lists of
+        # trades that the transport writes as batched frames of trade events
         async def stream_wallet_analysis():
             # Track stream in production
             if IS_PRODUCTION:
                 stream_monitor.start_stream(
                     stream_id=stream_id,
                     wallet=wallet_address,
-                    client_ip=request.remote_addr,
-                    api_key=getattr(request, 'api_key', None)
+                    client_ip=client_ip,
+                    api_key=api_key
                 )
             
             try:
                 # Send initial connected event
-                connected_event = EventBuilder.connected({
-                    'stream_id': stream_id,
-                    'wallet': wallet_address,
-                    'timestamp': int(time.time())
-                })
+                connected_event = EventBuilder.connected(wallet_address)
+                connected_event.data['stream_id'] = stream_id
                 yield connected_event.to_sse_format()
                 
                 # Use streaming fetcher
@@ -266,26 +268,23 @@ def stream_wallet_endpoint(wallet_address: str):
                                 message=data["message"],
                                 percentage=data["percentage"],
                                 step=data.get("step", "processing"),
-                                trades_found=data.get("trades_count", trades_yielded)
+                                details={"trades_found": data.get("trades_count", trades_yielded)}
                             )
                             yield EventBuilder.progress(progress_data).to_sse_format()
                             
                         elif event_type == "trades":
-                            # Yield individual trade events
-                            for trade in data["trades"]:
-                                yield f"event: trade\ndata: {json.dumps(trade)}\n\n"
-                                trades_yielded += 1
+                            # One trade event per trade, framed into size/time bounded writes
+                            yield data["trades"]
+                            trades_yielded += len(data["trades"])
                                 
                             # Record batch in monitoring
                             if IS_PRODUCTION:
                                 stream_monitor.record_trades(stream_id, len(data["trades"]))
                         
                         elif event_type == "complete":
-                            complete_event = EventBuilder.complete({
-                                'trades_found': data["summary"]["total_trades"],
-                                'duration': data["total_time"],
-                                'summary': data["summary"]
-                            })
+                            complete_event = EventBuilder.complete(
+                                data["summary"], data.get("metrics", {}), data["total_time"]
+                            )
                             yield complete_event.to_sse_format()
                             break
                             
@@ -296,10 +295,6 @@ def stream_wallet_endpoint(wallet_address: str):
                             )
                             yield EventBuilder.error(error_data).to_sse_format()
                             break
-                        
-                        # Send heartbeat periodically
-                        if time.time() - start_time > 30:
-                            yield EventBuilder.heartbeat().to_sse_format()
                             
             except Exception as e:
                 logger.error(f"Stream {stream_id} error: {e}", exc_info=True)
@@ -322,24 +317,17 @@ def stream_wallet_endpoint(wallet_address: str):
         else:
             stream_generator = stream_wallet_analysis
         
-        # Run async generator
-        def generate():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                gen = stream_generator()
-                while True:
-                    try:
-                        event = loop.run_until_complete(gen.__anext__())
-                        yield event
-                    except StopAsyncIteration:
-                        break
-            finally:
-                loop.close()
+        # One computation per wallet: reconnects (Last-Event-ID) and concurrent
+        # requests attach to it and replay only the frames they are missing
+        stream, frames = get_replay_registry().subscribe(
+            f"wallet-stream:{wallet_address}", stream_generator, last_event_id_from(request), stream_id
+        )
+        stream_id = stream.stream_id
         
-        # Create SSE response
+        # Create SSE response; frames are batched, heartbeats sent when idle,
+        # and the producer waits when a connected client falls behind
         response = Response(
-            generate(),
+            frames,
             mimetype="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
@@ -12,7 +12,7 @@ from flask_cors import CORS
 import asyncio
 import sys
 import os
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable
 import time
 import json
 import logging
@@ -29,13 +29,20 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
 
 # Core imports
 from src.lib.blockchain_fetcher_v3_fast import BlockchainFetcherV3Fast
-from src.lib.progress_tracker import get_progress_tracker
+from src.lib.http_session import http_session_scope
 from src.lib.wallet_summary_aggregator import WalletSummaryAggregator
 
 # P6 imports
 from src.lib.position_builder import PositionBuilder
+from src.lib.trade_table import TradeTable
 from src.lib.unrealized_pnl_calculator import UnrealizedPnLCalculator
 from src.lib.position_cache_v2 import get_position_cache_v2
+from src.lib.rate_scheduler import Priority
+from src.lib.single_flight import single_flight
+from src.lib.sse_replay import get_replay_registry, last_event_id_from
+from src.lib.sse_transport import format_event, get_heartbeat_sec
+from src.lib.job_engine import get_job_engine
+from src.lib.warming_scheduler import get_warming_scheduler
 from src.lib.position_models import Position, PositionPnL, PositionSnapshot, CostBasisMethod
 from src.config.feature_flags import positions_enabled, should_calculate_unrealized_pnl, get_cost_basis_method
 
@@ -96,6 +103,12 @@ def handle_exception(e):
 API_KEY_HEADER = os.getenv('API_KEY_HEADER', 'X-Api-Key')
 API_KEY_PREFIX = os.getenv('API_KEY_PREFIX', 'wd_')
 API_KEY_LENGTH = 35  # wd_ + 32 chars
+DEFAULT_BASE_URL = "https://walletdoctor.app"  # Links built outside a request
+
+
+async def _in_http_session_scope(coro):
+    async with http_session_scope():
+        return await coro
 
 
 def run_async(coro):
@@ -103,8 +116,10 @@ def run_async(coro):
     Safely run async code in Flask/gunicorn environment
     
     This handles event loop issues that can occur with asyncio.run()
-    in production environments.
+    in production environments. The loop only lives for this call, so the
+    pooled HTTP session is pinned for the coroutine and closed with it.
     """
+    coro = _in_http_session_scope(coro)
     try:
         # Try to get the running loop
         loop = asyncio.get_running_loop()
@@ -143,6 +158,50 @@ def run_async(coro):
         return asyncio.run(coro)
 
 
+def trades_input(trade_table: Optional[TradeTable], trades: List[Dict[str, Any]]):
+    """Prefer the fetcher's columnar trades for PositionBuilder and aggregators, else the dicts"""
+    return trade_table if isinstance(trade_table, TradeTable) else trades
+
+
+def validate_api_key(api_key: Optional[str], remote_addr: Optional[str] = None) -> Optional[Dict[str, str]]:
+    """Return the 401 error body for a missing/malformed API key, None if it is accepted"""
+    # Check if API key is provided
+    if not api_key:
+        logger.warning(f"Missing API key from {remote_addr}")
+        return {
+            "error": "API key required",
+            "message": f"Please provide API key via {API_KEY_HEADER} header"
+        }
+    
+    # Validate API key format
+    if not api_key.startswith(API_KEY_PREFIX) or len(api_key) != API_KEY_LENGTH:
+        logger.warning(f"Invalid API key format from {remote_addr}: {api_key[:10]}...")
+        return {
+            "error": "Invalid API key",
+            "message": "API key must be in format wd_<32-chars>"
+        }
+    
+    # In production, validate against database
+    # For now, accept any properly formatted key
+    logger.info(f"Authenticated request from {remote_addr} with key {api_key[:10]}...")
+    return None
+
+
+async def fetch_wallet_trades_coalesced(
+    wallet_address: str,
+    skip_pricing: bool = False,
+    progress_callback: Optional[Callable[[str], None]] = None,
+) -> tuple[Dict[str, Any], Optional[TradeTable]]:
+    """Fetch a wallet once for every concurrent caller with the same options (this and other workers)"""
+    async def fetch():
+        # Only the caller that runs the fetch gets its progress messages
+        async with BlockchainFetcherV3Fast(progress_callback=progress_callback, skip_pricing=skip_pricing) as fetcher:
+            result = await fetcher.fetch_wallet_trades(wallet_address)
+            return result, fetcher.trade_table
+    
+    return await single_flight(f"v3fast:{wallet_address}:skip_pricing={skip_pricing}", fetch)
+
+
 def simple_auth_required(f):
     """Simple API key authentication decorator"""
     @wraps(f)
@@ -150,25 +209,9 @@ def simple_auth_required(f):
         # Get API key from header
         api_key = request.headers.get(API_KEY_HEADER)
         
-        # Check if API key is provided
-        if not api_key:
-            logger.warning(f"Missing API key from {request.remote_addr}")
-            return jsonify({
-                "error": "API key required",
-                "message": f"Please provide API key via {API_KEY_HEADER} header"
-            }), 401
-        
-        # Validate API key format
-        if not api_key.startswith(API_KEY_PREFIX) or len(api_key) != API_KEY_LENGTH:
-            logger.warning(f"Invalid API key format from {request.remote_addr}: {api_key[:10]}...")
-            return jsonify({
-                "error": "Invalid API key",
-                "message": "API key must be in format wd_<32-chars>"
-            }), 401
-        
-        # In production, validate against database
-        # For now, accept any properly formatted key
-        logger.info(f"Authenticated request from {request.remote_addr} with key {api_key[:10]}...")
+        auth_error = validate_api_key(api_key, request.remote_addr)
+        if auth_error:
+            return jsonify(auth_error), 401
         
         # Store API key in request context
         g.api_key = api_key
@@ -232,7 +275,7 @@ def format_gpt_schema_v1_1(snapshot: PositionSnapshot, base_url: Optional[str] =
         try:
             base_url = request.host_url.rstrip('/')
         except RuntimeError:
-            base_url = "https://walletdoctor.app"
+            base_url = DEFAULT_BASE_URL
     
     # Check if SOL pricing is being used
     from src.config.feature_flags import should_use_sol_spot_pricing
@@ -262,7 +305,16 @@ def format_gpt_schema_v1_1(snapshot: PositionSnapshot, base_url: Optional[str] =
     }
 
 
-async def get_positions_with_staleness(wallet_address: str, skip_pricing: bool = False) -> tuple[Optional[PositionSnapshot], bool, int]:
+def _cache_off_loop(coro):
+    """Await a PositionCacheV2 call in a worker thread - its Redis client blocks the loop"""
+    return asyncio.to_thread(asyncio.run, coro)
+
+
+async def get_positions_with_staleness(
+    wallet_address: str,
+    skip_pricing: bool = False,
+    progress_callback: Optional[Callable[[str], None]] = None,
+) -> tuple[Optional[PositionSnapshot], bool, int]:
     """
     Get positions with staleness info - MINIMAL PHASE STAMPS
     
@@ -280,7 +332,7 @@ async def get_positions_with_staleness(wallet_address: str, skip_pricing: bool =
     
     # Check cache (unless we're skipping pricing, then always fetch fresh)
     if not skip_pricing:
-        cached_result = await cache.get_portfolio_snapshot(wallet_address)
+        cached_result = await _cache_off_loop(cache.get_portfolio_snapshot(wallet_address))
         
         if cached_result:
             snapshot, is_stale = cached_result
@@ -291,8 +343,7 @@ async def get_positions_with_staleness(wallet_address: str, skip_pricing: bool =
     
     # No cached data, need to fetch
     try:
-        async with BlockchainFetcherV3Fast(skip_pricing=skip_pricing) as fetcher:
-            result = await fetcher.fetch_wallet_trades(wallet_address)
+        result, trade_table = await fetch_wallet_trades_coalesced(wallet_address, skip_pricing, progress_callback)
         
         log("helius_signatures_fetched")
         log("transactions_fetched")
@@ -312,7 +363,7 @@ async def get_positions_with_staleness(wallet_address: str, skip_pricing: bool =
     # Calculate positions
     method = CostBasisMethod(get_cost_basis_method())
     builder = PositionBuilder(method)
-    positions = builder.build_positions_from_trades(trades, wallet_address)
+    positions = builder.build_positions_from_trades(trades_input(trade_table, trades), wallet_address)
     app.logger.info("[CHECK] positions_raw=%d", len(positions))
     
     # hard-flush so the lines always hit the log
@@ -342,7 +393,7 @@ async def get_positions_with_staleness(wallet_address: str, skip_pricing: bool =
         app.logger.info("[CHECK] positions_after_filter=%d", len(snapshot.positions))
         
         # Cache it
-        await cache.set_portfolio_snapshot(snapshot)
+        await _cache_off_loop(cache.set_portfolio_snapshot(snapshot))
         
         log("response_sent")
         return snapshot, False, 0  # Fresh data
@@ -448,6 +499,9 @@ def export_positions_for_gpt(wallet_address: str):
         # Get positions with staleness info
         phase_start = time.time()
         logger.info(f"[PHASE-{request_id}] Starting position fetch...")
+        if not skip_pricing:
+            cache_hit = get_position_cache_v2().snapshot_progress(wallet_address) is not None
+            get_warming_scheduler().record_request(wallet_address, "positions", cache_hit=cache_hit)
         try:
             snapshot, is_stale, age_seconds = run_async(
                 get_positions_with_staleness(wallet_address, skip_pricing=skip_pricing)
@@ -531,7 +585,8 @@ def warm_cache(wallet_address: str):
     POST /v4/positions/warm-cache/{wallet}
     
     This endpoint triggers a background cache population for the wallet,
-    allowing subsequent GPT export calls to return instantly.
+    allowing subsequent GPT export calls to return instantly. Popular wallets
+    are kept warm automatically (see warming_scheduler); this warms one now.
     
     Returns immediately with a status indicating warming has started.
     """
@@ -562,89 +617,14 @@ def warm_cache(wallet_address: str):
                     "message": "Cache is already warm"
                 })
         
-        # Start warming in background
-        # For now, do it synchronously but return quickly
-        # In production, this would be a background task
-        
-        # Create a simple progress token for tracking
-        tracker = get_progress_tracker()
-        progress_token = tracker.create_progress()
-        
-        # Initialize progress
-        tracker.update_progress(
-            progress_token,
-            status="warming",
-            trades_found=0
-        )
-        
-        # Run the warming process
-        async def warm_cache_task():
-            try:
-                logger.info(f"Starting cache warm for {wallet_address}")
-                start_time = time.time()
-                
-                # Fetch trades
-                async with BlockchainFetcherV3Fast(skip_pricing=False) as fetcher:
-                    result = await fetcher.fetch_wallet_trades(wallet_address)
-                
-                trades = result.get("trades", [])
-                logger.info(f"Fetched {len(trades)} trades in {time.time() - start_time:.1f}s")
-                
-                # Calculate positions
-                method = CostBasisMethod(get_cost_basis_method())
-                builder = PositionBuilder(method)
-                positions = builder.build_positions_from_trades(trades, wallet_address)
-                
-                # Calculate unrealized P&L
-                if positions and should_calculate_unrealized_pnl():
-                    calculator = UnrealizedPnLCalculator()
-                    
-                    # Pass transactions and trades for Helius price extraction
-                    if os.getenv('PRICE_HELIUS_ONLY', '').lower() == 'true':
-                        calculator.trades = trades
-                        calculator.transactions = result.get("transactions", [])
-                        logger.info(f"[PRICE] Helius-only mode (warm cache): {len(calculator.transactions)} transactions")
-                    
-                    position_pnls = await calculator.create_position_pnl_list(positions)
-                    
-                    # Create snapshot
-                    snapshot = PositionSnapshot.from_positions(wallet_address, position_pnls)
-                    
-                    # Cache it
-                    await cache.set_portfolio_snapshot(snapshot)
-                    
-                    duration = time.time() - start_time
-                    logger.info(f"Cache warmed for {wallet_address} in {duration:.1f}s")
-                    
-                    # Update progress
-                    tracker.update_progress(
-                        progress_token,
-                        status="complete",
-                        trades_found=len(trades)
-                    )
-                else:
-                    tracker.update_progress(
-                        progress_token,
-                        status="complete"
-                    )
-                    
-            except Exception as e:
-                logger.error(f"Error warming cache: {e}")
-                tracker.update_progress(
-                    progress_token,
-                    status="error",
-                    error=str(e)
-                )
-        
-        # Run the warming synchronously for now
-        # In production, this should use a proper task queue like Celery
-        run_async(warm_cache_task())
+        # Rebuild in the background at warming priority; the request returns at once
+        scheduler = get_warming_scheduler()
+        scheduler.warm_now(wallet_address, ["positions"])
         
         return jsonify({
-            "status": "cache_warmed",
-            "progress_token": progress_token,
-            "message": "Cache warming completed"
-        })
+            "status": "warming_scheduled",
+            "message": "Cache warming started in the background"
+        }), 202
         
     except Exception as e:
         logger.error(f"Error in cache warming: {e}")
@@ -716,6 +696,7 @@ def diagnostics():
             "features": features,
             "redis_ping": redis_status,
             "cache_entries": cache_entries,
+            "warming": get_warming_scheduler().get_stats(),
             "python_version": sys.version,
             "process_id": os.getpid(),
             "response_time_ms": duration_ms
@@ -760,6 +741,9 @@ def home():
             "/v4/positions/export-gpt/{wallet}": "GET - Export positions in GPT schema v1.1",
             "/v4/trades/export-gpt/{wallet}": "GET - Export signatures and trades for GPT integration",
             "/v4/analytics/summary/{wallet}": "GET - Pre-computed analytics summary (v0.8.0)",
+            "/v4/jobs": 'POST - Start a background analysis (body: {"wallet": "address", "kind": "positions" | "summary"})',
+            "/v4/jobs/{job_id}": "GET - Job status, progress and result",
+            "/v4/jobs/{job_id}/stream": "GET - SSE stream of job progress until the result is ready",
             "/health": "GET - Health check",
             "/": "GET - This info"
         },
@@ -786,16 +770,19 @@ def export_positions_stream(wallet_address: str):
     
     Headers:
     - X-Api-Key: API key for authentication
+    - Last-Event-ID: resume after this event (or ?lastEventId=)
     
     Returns: SSE stream with events:
     - progress: Updates on fetching progress
     - data: Partial position data as available
     - complete: Final summary when done
+    
+    One export runs per wallet; reconnects and concurrent requests replay it.
     """
     from flask import Response
     import json
     
-    def generate():
+    async def generate():
         """Generate SSE events"""
         try:
             # Send initial connection event
@@ -803,7 +790,7 @@ def export_positions_stream(wallet_address: str):
             
             # Check cache first
             cache = get_position_cache_v2()
-            cached_result = run_async(cache.get_portfolio_snapshot(wallet_address))
+            cached_result = await cache.get_portfolio_snapshot(wallet_address)
             
             if cached_result:
                 snapshot, is_stale = cached_result
@@ -811,6 +798,7 @@ def export_positions_stream(wallet_address: str):
                 
                 # If data is fresh, send it immediately
                 if age_seconds < 300:  # 5 minutes
+                    get_warming_scheduler().record_request(wallet_address, "positions", cache_hit=True)
                     yield f"event: cache_hit\ndata: {json.dumps({'age_seconds': age_seconds})}\n\n"
                     
                     # Send the full response
@@ -819,17 +807,14 @@ def export_positions_stream(wallet_address: str):
                     return
             
             # Need to fetch fresh data - stream progress
+            get_warming_scheduler().record_request(wallet_address, "positions", cache_hit=False)
             yield f"event: cache_miss\ndata: {json.dumps({'message': 'Fetching fresh data'})}\n\n"
             
             # Fetch trades (without streaming progress for now)
             start_time = time.time()
             yield f"event: fetching\ndata: {json.dumps({'message': 'Fetching blockchain data...'})}\n\n"
             
-            async def fetch_data():
-                async with BlockchainFetcherV3Fast(skip_pricing=False) as fetcher:
-                    return await fetcher.fetch_wallet_trades(wallet_address)
-            
-            result = run_async(fetch_data())
+            result, trade_table = await fetch_wallet_trades_coalesced(wallet_address, skip_pricing=False)
             trades = result.get("trades", [])
             
             fetch_duration = time.time() - start_time
@@ -838,7 +823,7 @@ def export_positions_stream(wallet_address: str):
             # Build positions
             method = CostBasisMethod(get_cost_basis_method())
             builder = PositionBuilder(method)
-            positions = builder.build_positions_from_trades(trades, wallet_address)
+            positions = builder.build_positions_from_trades(trades_input(trade_table, trades), wallet_address)
             
             yield f"event: positions_built\ndata: {json.dumps({'count': len(positions)})}\n\n"
             
@@ -852,7 +837,7 @@ def export_positions_stream(wallet_address: str):
                 
                 for i in range(0, len(positions), batch_size):
                     batch = positions[i:i+batch_size]
-                    batch_pnls = run_async(calculator.create_position_pnl_list(batch))
+                    batch_pnls = await calculator.create_position_pnl_list(batch)
                     position_pnls.extend(batch_pnls)
                     
                     # Send batch update
@@ -860,7 +845,7 @@ def export_positions_stream(wallet_address: str):
                 
                 # Create and cache snapshot
                 snapshot = PositionSnapshot.from_positions(wallet_address, position_pnls)
-                run_async(cache.set_portfolio_snapshot(snapshot))
+                await cache.set_portfolio_snapshot(snapshot)
                 
                 # Send complete response
                 response_data = format_gpt_schema_v1_1(snapshot)
@@ -880,18 +865,97 @@ def export_positions_stream(wallet_address: str):
             logger.error(f"Error in SSE stream: {e}")
             yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
     
+    stream, frames = get_replay_registry().subscribe(
+        f"gpt-export:{wallet_address}", generate, last_event_id_from(request)
+    )
+    
     # Return SSE response
     return Response(
-        generate(),
+        frames,
         mimetype="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
             "X-Accel-Buffering": "no",
-            "Connection": "keep-alive"
+            "Connection": "keep-alive",
+            "X-Stream-ID": stream.stream_id
         }
     )
 
 
+async def fetch_trades_for_export(wallet_address: str, limit: int) -> Dict[str, Any]:
+    """Fetch the newest `limit` trades for the export - pages stop once enough swaps are parsed"""
+    async def fetch():
+        async with BlockchainFetcherV3Fast(skip_pricing=False) as fetcher:
+            return await fetcher.fetch_recent_trades(wallet_address, limit)
+    
+    return await single_flight(f"v3fast-recent:{wallet_address}:limit={limit}", fetch)
+
+
+def limit_trades_export(result: Dict[str, Any], limit: int) -> tuple[List[str], List[Dict[str, Any]]]:
+    """Extract signatures and trades from a fetch result, truncated to limit"""
+    signatures = result.get("signatures", [])
+    trades = result.get("trades", [])
+    
+    # Ensure trades is a list
+    if not isinstance(trades, list):
+        trades = []
+    
+    if limit and len(trades) > limit:
+        logger.info(f"Applying limit: {len(trades)} trades -> {limit} trades")
+        trades = trades[:limit]
+        # Update signatures to match limited trades  
+        if signatures and len(signatures) > limit:
+            signatures = signatures[:limit]
+    
+    return signatures, trades
+
+
+def should_enrich_trades_export(schema_version: str) -> bool:
+    """Enrichment runs when the flag is on and the schema carries USD values"""
+    from src.config.feature_flags import price_enrich_trades
+    return price_enrich_trades() and schema_version in ("v0.7.1-trades-value", "v0.7.2-compact")
+
+
+def build_trades_export_response(
+    wallet_address: str,
+    signatures: List[str],
+    trades: List[Dict[str, Any]],
+    schema_version: str,
+    limit: Optional[int] = None,
+    history_complete: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """Standard or compressed trades export body
+
+    limit and history_complete describe the window: when history_complete is
+    false, older trades exist and sells whose buys are older have pnl_usd null.
+    """
+    from src.config.feature_flags import trades_compact
+    
+    window = {"limit": limit, "history_complete": bool(history_complete)}
+    
+    # Apply compression if flag is enabled or schema requests it
+    if trades_compact() or schema_version == "v0.7.2-compact":
+        logger.info(f"Applying trade compression for {len(trades)} trades")
+        from src.lib.trade_compressor import TradeCompressor
+        
+        compressor = TradeCompressor()
+        response = compressor.compress_trades(trades, wallet_address, schema_version="v0.7.2-compact")
+        response.update(window)
+        
+        # Log response size
+        response_size = len(json.dumps(response))
+        logger.info(f"Compressed response size: {response_size:,} bytes ({response_size/1024:.1f} KB)")
+        return response
+    
+    return {
+        "wallet": wallet_address,
+        "signatures": signatures,
+        "trades": trades,
+        "schema_version": schema_version,
+        **window,
+    }
+
+
 @app.route("/v4/trades/export-gpt/<wallet_address>", methods=["GET"])
 @simple_auth_required  
 def export_trades(wallet_address: str):
@@ -904,7 +968,8 @@ def export_trades(wallet_address: str):
     - schema_version: Response format version (default: v0.7.0)
       - v0.7.0: Original format (price/value_usd always null)
       - v0.7.1-trades-value: Enriched with price_sol, price_usd, value_usd, pnl_usd
-    - limit: Maximum number of trades to return (default: 100, max: 500)
+    - limit: Maximum number of trades to return (default: 100, max: 500); the
+      newest trades are fetched and the walk stops once enough are found
     
     Returns just signatures and trades without positions or pricing complexity.
     
@@ -913,7 +978,9 @@ def export_trades(wallet_address: str):
         "wallet": "wallet_address",
         "signatures": ["sig1", "sig2", ...],
         "trades": [{"trade": "data"}, ...],
-        "schema_version": "v0.7.0"
+        "schema_version": "v0.7.0",
+        "limit": 100,
+        "history_complete": false  # true when the wallet has no older trades
     }
     """
     try:
@@ -937,32 +1004,13 @@ def export_trades(wallet_address: str):
         logger.info(f"Exporting trades for wallet: {wallet_address}, schema: {schema_version}, limit: {limit}")
         
         # Fetch trades without position calculation
-        async def fetch_trades_only():
-            async with BlockchainFetcherV3Fast(skip_pricing=False) as fetcher:
-                result = await fetcher.fetch_wallet_trades(wallet_address)
-            return result
-        
-        result = run_async(fetch_trades_only())
-        
-        # Extract signatures and trades
-        signatures = result.get("signatures", [])
-        trades = result.get("trades", [])
-        
-        # Ensure trades is a list
-        if not isinstance(trades, list):
-            trades = []
+        result = run_async(fetch_trades_for_export(wallet_address, limit))
         
         # Apply limit parameter BEFORE enrichment for performance optimization
-        if limit and len(trades) > limit:
-            logger.info(f"Applying limit: {len(trades)} trades -> {limit} trades")
-            trades = trades[:limit]
-            # Update signatures to match limited trades  
-            if signatures and len(signatures) > limit:
-                signatures = signatures[:limit]
+        signatures, trades = limit_trades_export(result, limit)
         
         # Apply enrichment if feature flag is enabled and schema supports it
-        from src.config.feature_flags import price_enrich_trades, trades_compact
-        if price_enrich_trades() and (schema_version == "v0.7.1-trades-value" or schema_version == "v0.7.2-compact"):
+        if should_enrich_trades_export(schema_version):
             logger.info(f"Applying trade enrichment for {len(trades)} trades")
             from src.lib.trade_enricher import TradeEnricher
             
@@ -971,31 +1019,9 @@ def export_trades(wallet_address: str):
             enriched_trades = run_async(enricher.enrich_trades(trades))
             trades = enriched_trades
         
-        # Apply compression if flag is enabled or schema requests it
-        if trades_compact() or schema_version == "v0.7.2-compact":
-            logger.info(f"Applying trade compression for {len(trades)} trades")
-            from src.lib.trade_compressor import TradeCompressor
-            
-            # Run compression
-            compressor = TradeCompressor()
-            response = compressor.compress_trades(trades, wallet_address, schema_version="v0.7.2-compact")
-            
-            # Log response size
-            import json
-            response_size = len(json.dumps(response))
-            logger.info(f"Compressed response size: {response_size:,} bytes ({response_size/1024:.1f} KB)")
-            
-            return jsonify(response)
-        
-        # Create standard response
-        response = {
-            "wallet": wallet_address,
-            "signatures": signatures,
-            "trades": trades,
-            "schema_version": schema_version
-        }
-        
-        return jsonify(response)
+        return jsonify(build_trades_export_response(
+            wallet_address, signatures, trades, schema_version, limit, result.get("history_complete")
+        ))
         
     except Exception as e:
         logger.error(f"Error exporting trades for {wallet_address}: {e}")
@@ -1005,6 +1031,83 @@ def export_trades(wallet_address: str):
         }), 500
 
 
+def summary_cache_key(wallet_address: str, include_windows: bool) -> str:
+    return f"summary:{wallet_address}:w={include_windows}"
+
+
+def get_cached_summary(cache_key: str) -> Optional[Dict[str, Any]]:
+    """Cached analytics summary from Redis, None on miss or Redis error"""
+    try:
+        import redis
+        r = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"), decode_responses=True)
+        cached_data = r.get(cache_key)
+        if cached_data:
+            return json.loads(cached_data)
+    except Exception as e:
+        logger.warning(f"Redis cache error (will compute fresh): {e}")
+    return None
+
+
+SUMMARY_CACHE_TTL = 900
+
+
+def cache_summary(cache_key: str, summary: Dict[str, Any], ttl: int = SUMMARY_CACHE_TTL):
+    """Cache an analytics summary in Redis (15 minutes by default)"""
+    try:
+        import redis
+        r = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"), decode_responses=True)
+        r.setex(cache_key, ttl, json.dumps(summary))
+        logger.info(f"Cached analytics summary {cache_key} (TTL: {ttl}s)")
+    except Exception as e:
+        logger.warning(f"Failed to cache analytics summary: {e}")
+
+
+def summary_cache_progress(wallet_address: str) -> Optional[float]:
+    """Age of the cached default summary as a fraction of its TTL, None if not cached"""
+    import redis
+    r = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"), decode_responses=True)
+    remaining = r.ttl(summary_cache_key(wallet_address, True))
+    if remaining < 0:  # Missing, or no expiry
+        return None
+    return (SUMMARY_CACHE_TTL - remaining) / SUMMARY_CACHE_TTL
+
+
+async def fetch_and_aggregate_summary(wallet_address: str, include_windows: bool = True) -> Dict[str, Any]:
+    """Fetch all trades and aggregate them into the v0.8.0 analytics summary"""
+    fetch_start = time.time()
+    result, trade_table = await fetch_wallet_trades_coalesced(wallet_address, skip_pricing=True)
+    
+    trades = result.get("trades", [])
+    logger.info(f"Fetched {len(trades)} trades in {time.time() - fetch_start:.2f}s")
+    
+    # Apply enrichment if enabled (reuse existing enriched data)
+    enrich_start = time.time()
+    from src.config.feature_flags import price_enrich_trades
+    if price_enrich_trades():
+        from src.lib.trade_enricher import TradeEnricher
+        enricher = TradeEnricher()
+        trades = await enricher.enrich_trades(trades)
+        logger.info(f"Enriched {len(trades)} trades in {time.time() - enrich_start:.2f}s")
+        trade_table = None  # Enriched values only exist on the dicts
+    
+    # Aggregate using our new aggregator
+    aggregate_start = time.time()
+    aggregator = WalletSummaryAggregator()
+    summary = aggregator.aggregate_wallet_summary(
+        trades_input(trade_table, trades), 
+        include_windows=include_windows,
+        max_tokens=10
+    )
+    logger.info(f"Aggregated summary in {time.time() - aggregate_start:.2f}s")
+    
+    # Add metadata
+    summary['wallet'] = wallet_address
+    summary['schema_version'] = 'v0.8.0-aggregated'
+    summary['generated_at'] = datetime.now(timezone.utc).isoformat()
+    
+    return summary
+
+
 @app.route("/v4/analytics/summary/<wallet_address>", methods=["GET"])
 @simple_auth_required
 def get_analytics_summary(wallet_address: str):
@@ -1056,79 +1159,25 @@ def get_analytics_summary(wallet_address: str):
         logger.info(f"Analytics summary request for wallet: {wallet_address}, window: {include_windows}, force_refresh: {force_refresh}")
         
         # Check Redis cache first
-        import redis
-        import json
-        
-        # Build cache key with parameters
-        cache_key = f"summary:{wallet_address}:w={include_windows}"
-        cached_summary = None
+        cache_key = summary_cache_key(wallet_address, include_windows)
         
         if not force_refresh:
-            try:
-                redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-                r = redis.from_url(redis_url, decode_responses=True)
-                
-                cached_data = r.get(cache_key)
-                if cached_data:
-                    cached_summary = json.loads(cached_data)
-                    logger.info(f"Cache hit for analytics summary: {wallet_address}")
-                    return jsonify(cached_summary)
-            except Exception as e:
-                logger.warning(f"Redis cache error (will compute fresh): {e}")
+            cached_summary = get_cached_summary(cache_key)
+            if include_windows:
+                # Only the default (windowed) summary is kept warm
+                get_warming_scheduler().record_request(wallet_address, "summary", cache_hit=cached_summary is not None)
+            if cached_summary:
+                logger.info(f"Cache hit for analytics summary: {wallet_address}")
+                return jsonify(cached_summary)
         
         # No cache or force refresh - compute fresh
         start_time = time.time()
         
-        # Fetch trades with timing
-        fetch_start = time.time()
-        async def fetch_and_aggregate():
-            # Fetch trades with enrichment
-            async with BlockchainFetcherV3Fast(skip_pricing=True) as fetcher:
-                result = await fetcher.fetch_wallet_trades(wallet_address)
-            
-            trades = result.get("trades", [])
-            logger.info(f"Fetched {len(trades)} trades in {time.time() - fetch_start:.2f}s")
-            
-            # Apply enrichment if enabled (reuse existing enriched data)
-            enrich_start = time.time()
-            from src.config.feature_flags import price_enrich_trades
-            if price_enrich_trades():
-                from src.lib.trade_enricher import TradeEnricher
-                enricher = TradeEnricher()
-                trades = await enricher.enrich_trades(trades)
-                logger.info(f"Enriched {len(trades)} trades in {time.time() - enrich_start:.2f}s")
-            
-            # Aggregate using our new aggregator
-            aggregate_start = time.time()
-            aggregator = WalletSummaryAggregator()
-            summary = aggregator.aggregate_wallet_summary(
-                trades, 
-                include_windows=include_windows,
-                max_tokens=10
-            )
-            logger.info(f"Aggregated summary in {time.time() - aggregate_start:.2f}s")
-            
-            # Add metadata
-            summary['wallet'] = wallet_address
-            summary['schema_version'] = 'v0.8.0-aggregated'
-            summary['generated_at'] = datetime.now(timezone.utc).isoformat()
-            
-            return summary
-        
         # Run aggregation
-        summary = run_async(fetch_and_aggregate())
+        summary = run_async(fetch_and_aggregate_summary(wallet_address, include_windows))
         
         # Cache the result
-        try:
-            redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-            r = redis.from_url(redis_url, decode_responses=True)
-            
-            # Cache for 15 minutes (900 seconds)
-            cache_ttl = 900
-            r.setex(cache_key, cache_ttl, json.dumps(summary))
-            logger.info(f"Cached analytics summary for {wallet_address} (TTL: {cache_ttl}s)")
-        except Exception as e:
-            logger.warning(f"Failed to cache analytics summary: {e}")
+        cache_summary(cache_key, summary)
         
         # Log performance
         duration = time.time() - start_time
@@ -1151,6 +1200,200 @@ def get_analytics_summary(wallet_address: str):
         }), 500
 
 
+async def run_positions_job(job, report) -> Dict[str, Any]:
+    """Job handler: positions export in GPT schema v1.1"""
+    # Checked again here: the flag may be turned off while the job is queued
+    if not positions_enabled():
+        raise RuntimeError("Position tracking is not enabled")
+    report({"stage": "fetching_trades"})
+    snapshot, is_stale, age_seconds = await get_positions_with_staleness(
+        job.wallet, progress_callback=lambda message: report({"message": message})
+    )
+    report({"stage": "formatting", "positions": len(snapshot.positions)})
+    # Host-independent, so every host shares the job; job_result() sets the links
+    return format_gpt_schema_v1_1(snapshot, DEFAULT_BASE_URL)
+
+
+async def run_summary_job(job, report) -> Dict[str, Any]:
+    """Job handler: analytics summary, also written to the summary cache"""
+    include_windows = job.params.get("include_windows", True)
+    report({"stage": "fetching_trades"})
+    summary = await fetch_and_aggregate_summary(job.wallet, include_windows)
+    cache_summary(summary_cache_key(job.wallet, include_windows), summary)
+    return summary
+
+
+async def warm_positions(wallet_address: str):
+    """Warming refresh: rebuild the cached positions snapshot"""
+    await asyncio.wrap_future(
+        get_position_cache_v2().refresh_wallet(wallet_address, priority=Priority.WARMING)
+    )
+
+
+async def warm_summary(wallet_address: str):
+    """Warming refresh: rebuild the cached default analytics summary"""
+    summary = await fetch_and_aggregate_summary(wallet_address, include_windows=True)
+    cache_summary(summary_cache_key(wallet_address, True), summary)
+
+
+warming_scheduler = get_warming_scheduler()
+warming_scheduler.register("positions", lambda wallet: get_position_cache_v2().snapshot_progress(wallet), warm_positions)
+warming_scheduler.register("summary", summary_cache_progress, warm_summary)
+
+job_engine = get_job_engine()
+job_engine.register("positions", run_positions_job)
+job_engine.register("summary", run_summary_job)
+
+
+def job_result(job, base_url: str) -> Any:
+    """Job result with its links pointing at the host serving it"""
+    result = job.result
+    if job.kind == "positions" and isinstance(result, dict) and "price_sources" in result:
+        result = {**result, "price_sources": {**result["price_sources"], "primary": f"{base_url}/v4/prices"}}
+    return result
+
+
+def job_response(job, status_code: int):
+    """Job JSON with links for polling and streaming"""
+    body = job.to_dict()
+    if "result" in body:
+        body["result"] = job_result(job, request.host_url.rstrip('/'))
+    body["poll_url"] = f"/v4/jobs/{job.job_id}"
+    body["stream_url"] = f"/v4/jobs/{job.job_id}/stream"
+    response = make_response(jsonify(body), status_code)
+    response.headers["Location"] = body["poll_url"]
+    return response
+
+
+@app.route("/v4/jobs", methods=["POST"])
+@simple_auth_required
+def submit_job():
+    """
+    Start a background wallet analysis
+    
+    POST /v4/jobs
+    
+    Request body:
+    {
+        "wallet": "wallet_address",
+        "kind": "positions",  # or "summary"
+        "window": true,  # summary only: include 7d/30d windows
+        "force_refresh": false  # ignore a cached result
+    }
+    
+    Returns 202 with the job (200 if a cached result is reused). A job that is
+    already queued or running for the same wallet is returned, not duplicated.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        wallet_address = data.get("wallet")
+        kind = data.get("kind", "positions")
+        
+        if not wallet_address or len(wallet_address) < 32:
+            return jsonify({
+                "error": "Invalid wallet address",
+                "message": "Wallet address must be at least 32 characters"
+            }), 400
+        
+        if kind == "positions":
+            if not positions_enabled():
+                return jsonify({
+                    "error": "Feature disabled",
+                    "message": "Position tracking is not enabled"
+                }), 501
+            params = {}
+        elif kind == "summary":
+            if os.getenv('AGG_SUMMARY', 'false').lower() != 'true':
+                return jsonify({
+                    "error": "Analytics summary endpoint is disabled",
+                    "message": "Set AGG_SUMMARY=true to enable"
+                }), 404
+            params = {"include_windows": bool(data.get("window", True))}
+        else:
+            return jsonify({"error": "Invalid job kind", "message": "kind must be 'positions' or 'summary'"}), 400
+        
+        job, created = job_engine.submit(kind, wallet_address, params, force_refresh=bool(data.get("force_refresh")))
+        logger.info(f"Job {job.job_id} ({kind} {wallet_address}) {'queued' if created else 'reused, ' + job.status}")
+        
+        return job_response(job, 200 if job.status == "complete" else 202)
+        
+    except Exception as e:
+        logger.error(f"Error submitting job: {e}")
+        return jsonify({
+            "error": "Internal server error",
+            "message": str(e)
+        }), 500
+
+
+@app.route("/v4/jobs/<job_id>", methods=["GET"])
+@simple_auth_required
+def get_job(job_id: str):
+    """
+    Get job status, progress and (once complete) its result
+    
+    GET /v4/jobs/{job_id}
+    """
+    job = job_engine.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found or expired"}), 404
+    return job_response(job, 200)
+
+
+@app.route("/v4/jobs/<job_id>/stream", methods=["GET"])
+@simple_auth_required
+def stream_job(job_id: str):
+    """
+    Stream job progress using Server-Sent Events
+    
+    GET /v4/jobs/{job_id}/stream
+    
+    Returns: SSE stream with events:
+    - progress: job status and progress whenever it changes
+    - complete: the job result
+    - error: why the job failed
+    """
+    job = job_engine.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found or expired"}), 404
+    # The generator runs outside the request context
+    base_url = request.host_url.rstrip('/')
+    
+    def generate():
+        # The job may run in another worker, so follow it through the store
+        current = job
+        last_update = None
+        last_write = time.monotonic()
+        while True:
+            if current.updated_at != last_update:
+                last_update = current.updated_at
+                last_write = time.monotonic()
+                yield format_event("progress", json.dumps(current.to_dict(include_result=False)))
+            if current.status == "complete":
+                yield format_event("complete", json.dumps(job_result(current, base_url), default=str))
+                return
+            if current.status == "error":
+                yield format_event("error", json.dumps({"error": current.error, "job_id": job_id}))
+                return
+            if time.monotonic() - last_write >= get_heartbeat_sec():
+                last_write = time.monotonic()
+                yield format_event("heartbeat", json.dumps({"timestamp": int(time.time())}))
+            time.sleep(0.5)
+            current = job_engine.get(job_id)
+            if current is None:
+                yield format_event("error", json.dumps({"error": "Job expired", "job_id": job_id}))
+                return
+    
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "Connection": "keep-alive"
+        }
+    )
+
+
 if __name__ == "__main__":
     # For development
     app.run(host="0.0.0.0", port=8081, debug=False) 
\ No newline at end of file
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+WalletDoctor API V4 - ASGI serving path for the GPT export routes
+
+Serves /v4/positions/export-gpt, /v4/trades/export-gpt and /v4/analytics/summary
+on one long-lived event loop. Handlers await the shared coroutines from
+wallet_analytics_api_v4_gpt directly instead of going through run_async(). The
+pooled HTTP session (src.lib.http_session) is pinned at lifespan startup and
+closed at shutdown, so upstream connections, DNS and TLS survive across requests.
+
+The Flask app in wallet_analytics_api_v4_gpt stays the compatibility layer for
+every other route. Run with an ASGI server, e.g.:
+
+    gunicorn src.api.wallet_analytics_asgi:app -k uvicorn.workers.UvicornWorker
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+import traceback
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from src.api.wallet_analytics_api_v4_gpt import (
+    API_KEY_HEADER,
+    WORKER_ID,
+    build_trades_export_response,
+    cache_summary,
+    env_checksum,
+    fetch_and_aggregate_summary,
+    fetch_trades_for_export,
+    format_gpt_schema_v1_1,
+    get_cached_summary,
+    get_positions_with_staleness,
+    limit_trades_export,
+    should_enrich_trades_export,
+    summary_cache_key,
+    validate_api_key,
+)
+from src.config.feature_flags import positions_enabled
+from src.lib.http_session import get_http_session_pool
+
+logger = logging.getLogger(__name__)
+
+class Request:
+    """The bits of an ASGI http scope the handlers need"""
+
+    __slots__ = ("method", "path", "args", "headers", "remote_addr", "base_url")
+
+    def __init__(self, scope: Dict[str, Any]):
+        self.method = scope.get("method", "GET")
+        self.path = scope.get("path", "/")
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+        self.args = {key: values[-1] for key, values in query.items()}
+        self.headers = {
+            name.decode("latin-1").lower(): value.decode("latin-1")
+            for name, value in scope.get("headers", [])
+        }
+        client = scope.get("client")
+        self.remote_addr = client[0] if client else None
+        host = self.headers.get("host") or "walletdoctor.app"
+        self.base_url = f"{scope.get('scheme', 'https')}://{host}"
+
+
+Response = Tuple[int, Dict[str, Any], Dict[str, str]]
+
+
+def _json_error(status: int, error: str, message: str) -> Response:
+    return status, {"error": error, "message": message}, {}
+
+
+def _invalid_wallet(wallet_address: str) -> Optional[Response]:
+    if not wallet_address or len(wallet_address) < 32:
+        return _json_error(400, "Invalid wallet address", "Wallet address must be at least 32 characters")
+    return None
+
+
+async def export_positions(request: Request, wallet_address: str) -> Response:
+    """GET /v4/positions/export-gpt/{wallet} - same contract as the Flask route"""
+    request_id = str(uuid.uuid4())[:8]
+    start_time = time.time()
+    logger.info(f"[REQUEST-{request_id}] Worker {WORKER_ID} (asgi) handling export-gpt for {wallet_address[:8]}...")
+    logger.info(f"[REQUEST-{request_id}] Env check: PRICE_HELIUS_ONLY={os.getenv('PRICE_HELIUS_ONLY')}, checksum={env_checksum}")
+
+    error = _invalid_wallet(wallet_address)
+    if error:
+        return error
+
+    schema_version = request.args.get("schema_version", "1.1")
+    if schema_version != "1.1":
+        return _json_error(400, "Unsupported schema version",
+                           f"Schema version {schema_version} not supported. Use 1.1")
+
+    if not positions_enabled():
+        return _json_error(501, "Feature disabled", "Position tracking is not enabled")
+
+    skip_pricing = any(
+        request.args.get(flag, "").lower() == "true"
+        for flag in ("skip_pricing", "beta_mode", "skip_birdeye")
+    )
+
+    try:
+        snapshot, is_stale, age_seconds = await get_positions_with_staleness(
+            wallet_address, skip_pricing=skip_pricing
+        )
+        if not snapshot:
+            duration_ms = (time.time() - start_time) * 1000
+            status, body, _ = _json_error(404, "Wallet not found",
+                                          f"No trading data found for wallet {wallet_address}")
+            return status, body, {"X-Response-Time-Ms": f"{duration_ms:.2f}"}
+
+        response_data = format_gpt_schema_v1_1(snapshot, base_url=request.base_url)
+        if is_stale:
+            response_data["stale"] = True
+            response_data["age_seconds"] = age_seconds
+
+        duration_ms = (time.time() - start_time) * 1000
+        logger.info(
+            f"GPT export completed: wallet={wallet_address[:8]}..., "
+            f"positions={len(snapshot.positions)}, stale={is_stale}, duration_ms={duration_ms:.2f}"
+        )
+        return 200, response_data, {
+            "X-Worker-ID": WORKER_ID,
+            "X-Phase-Total-MS": f"{duration_ms:.0f}",
+            "X-Price-Mode": "helius-only",
+        }
+
+    except Exception as e:
+        duration_ms = (time.time() - start_time) * 1000
+        logger.error(f"[FATAL-{request_id}] Request failed wallet={wallet_address} after {duration_ms:.0f}ms: {e}")
+        logger.exception(f"[FATAL-{request_id}] Full traceback:")
+        return 500, {
+            "error": "Internal server error",
+            "message": "Failed to export position data",
+            "request_id": request_id,
+            "worker_id": WORKER_ID,
+        }, {
+            "X-Response-Time-Ms": f"{duration_ms:.2f}",
+            "X-Request-Id": request_id,
+            "X-Worker-Id": WORKER_ID,
+        }
+
+
+async def export_trades(request: Request, wallet_address: str) -> Response:
+    """GET /v4/trades/export-gpt/{wallet} - same contract as the Flask route"""
+    error = _invalid_wallet(wallet_address)
+    if error:
+        return error
+
+    schema_version = request.args.get("schema_version", "v0.7.0")
+    try:
+        limit = min(max(int(request.args.get("limit", "100")), 1), 500)
+    except ValueError:
+        limit = 100
+
+    logger.info(f"Exporting trades for wallet: {wallet_address}, schema: {schema_version}, limit: {limit}")
+
+    try:
+        result = await fetch_trades_for_export(wallet_address, limit)
+        signatures, trades = limit_trades_export(result, limit)
+
+        if should_enrich_trades_export(schema_version):
+            logger.info(f"Applying trade enrichment for {len(trades)} trades")
+            from src.lib.trade_enricher import TradeEnricher
+            trades = await TradeEnricher().enrich_trades(trades)
+
+        return 200, build_trades_export_response(
+            wallet_address, signatures, trades, schema_version, limit, result.get("history_complete")
+        ), {}
+
+    except Exception as e:
+        logger.error(f"Error exporting trades for {wallet_address}: {e}")
+        return _json_error(500, "Internal server error", str(e))
+
+
+async def analytics_summary(request: Request, wallet_address: str) -> Response:
+    """GET /v4/analytics/summary/{wallet} - same contract as the Flask route"""
+    if os.getenv("AGG_SUMMARY", "false").lower() != "true":
+        return _json_error(404, "Analytics summary endpoint is disabled", "Set AGG_SUMMARY=true to enable")
+
+    error = _invalid_wallet(wallet_address)
+    if error:
+        return error
+
+    include_windows = request.args.get("window", "true").lower() != "false"
+    force_refresh = request.args.get("force_refresh", "false").lower() == "true"
+    logger.info(f"Analytics summary request for wallet: {wallet_address}, window: {include_windows}, force_refresh: {force_refresh}")
+
+    try:
+        # Redis client is blocking; keep it off the event loop
+        cache_key = summary_cache_key(wallet_address, include_windows)
+        if not force_refresh:
+            cached_summary = await asyncio.to_thread(get_cached_summary, cache_key)
+            if cached_summary:
+                logger.info(f"Cache hit for analytics summary: {wallet_address}")
+                return 200, cached_summary, {}
+
+        start_time = time.time()
+        summary = await fetch_and_aggregate_summary(wallet_address, include_windows)
+        await asyncio.to_thread(cache_summary, cache_key, summary)
+
+        duration = time.time() - start_time
+        payload_size = len(json.dumps(summary))
+        logger.info(f"Analytics summary generated in {duration:.2f}s for {wallet_address}, size: {payload_size} bytes")
+        return 200, summary, {
+            "X-Response-Time-Ms": f"{duration * 1000:.0f}",
+            "X-Payload-Size-Bytes": str(payload_size),
+        }
+
+    except Exception as e:
+        logger.error(f"Error generating analytics summary for {wallet_address}: {e}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return _json_error(500, "Internal server error", str(e))
+
+
+Handler = Callable[[Request, str], Awaitable[Response]]
+
+ROUTES: List[Tuple[re.Pattern, Handler]] = [
+    (re.compile(r"^/v4/positions/export-gpt/([^/]+)$"), export_positions),
+    (re.compile(r"^/v4/trades/export-gpt/([^/]+)$"), export_trades),
+    (re.compile(r"^/v4/analytics/summary/([^/]+)$"), analytics_summary),
+]
+
+
+async def dispatch(request: Request) -> Response:
+    for pattern, handler in ROUTES:
+        match = pattern.match(request.path)
+        if not match:
+            continue
+        if request.method != "GET":
+            return _json_error(405, "Method not allowed", f"{request.method} not allowed on {request.path}")
+        auth_error = validate_api_key(request.headers.get(API_KEY_HEADER.lower()), request.remote_addr)
+        if auth_error:
+            return 401, auth_error, {}
+        return await handler(request, match.group(1))
+    return _json_error(404, "Not found", f"No route for {request.path}")
+
+
+async def _send_json(send, status: int, body: Dict[str, Any], headers: Dict[str, str]):
+    payload = json.dumps(body).encode()
+    raw_headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(payload)).encode()),
+        (b"access-control-allow-origin", b"*"),
+    ]
+    raw_headers.extend((name.lower().encode(), value.encode()) for name, value in headers.items())
+    await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": payload})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await get_http_session_pool().start()
+            logger.info(f"[BOOT] ASGI worker {WORKER_ID} ready")
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await get_http_session_pool().close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    request = Request(scope)
+    try:
+        status, body, headers = await dispatch(request)
+    except Exception as e:
+        logger.exception(f"Unhandled exception on {request.path}: {e}")
+        status, body, headers = _json_error(500, "Internal server error", str(e))
+    await _send_json(send, status, body, headers)
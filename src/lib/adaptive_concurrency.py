@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Adaptive Concurrency - AIMD controller for in-flight upstream requests
+Replaces fixed semaphores and batch-wide 429 sleeps: every completed request
+feeds back into the concurrency limit.
+
+- Success at normal latency: additive increase (+1 slot per limit's worth of successes)
+- 429 / 5xx / transport error: multiplicative decrease, at most once per latency window
+- Retry-After: only the endpoint that received it waits; other endpoints keep going
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque, defaultdict
+from dataclasses import dataclass
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Controller defaults
+DEFAULT_BACKOFF_RATIO = 0.5  # Multiplicative decrease on 429/5xx
+DEFAULT_LATENCY_TOLERANCE = 2.0  # Hold (no increase) above baseline * tolerance
+BASELINE_DRIFT = 0.01  # How quickly the latency baseline drifts up toward slower samples
+DEFAULT_RETRY_AFTER = 1.0  # Used when a 429 carries no Retry-After header
+
+
+def parse_retry_after(value: Optional[str], default: float = DEFAULT_RETRY_AFTER) -> float:
+    """Parse a Retry-After header given in seconds"""
+    if value is None:
+        return default
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass
+class RequestOutcome:
+    """Result of one request, filled in by the caller and fed back to the controller"""
+
+    status: Optional[int] = None
+    retry_after: Optional[float] = None
+
+    def record(self, resp):
+        """Capture status and Retry-After from an aiohttp response"""
+        self.status = resp.status
+        if resp.status == 429:
+            self.retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+
+    @property
+    def rate_limited(self) -> bool:
+        return self.status == 429
+
+    @property
+    def server_error(self) -> bool:
+        return self.status is not None and self.status >= 500
+
+
+class AdaptiveConcurrencyLimiter:
+    """Additive-increase/multiplicative-decrease limit on in-flight requests"""
+
+    def __init__(
+        self,
+        initial_limit: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 50,
+        backoff_ratio: float = DEFAULT_BACKOFF_RATIO,
+        latency_tolerance: float = DEFAULT_LATENCY_TOLERANCE,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self._retry_until: Dict[str, float] = {}  # endpoint -> monotonic deadline
+        self._baseline_latency: Optional[float] = None
+        self._last_decrease = 0.0
+
+        self.metrics = {
+            "completed": 0,
+            "rate_limited": 0,
+            "server_errors": 0,
+            "errors": 0,
+            "increases": 0,
+            "decreases": 0,
+            "peak_in_flight": 0,
+            "retry_after_waits": 0,
+            "retry_after_seconds": 0.0,
+            "by_endpoint": defaultdict(lambda: {"completed": 0, "rate_limited": 0}),
+        }
+
+    @property
+    def current_limit(self) -> int:
+        """Whole number of requests allowed in flight"""
+        return max(self.min_limit, int(self.limit))
+
+    async def acquire(self, endpoint: str = "default"):
+        """Wait for the endpoint's Retry-After to pass and a free slot"""
+        while True:
+            remaining = self._retry_until.get(endpoint, 0.0) - time.monotonic()
+            if remaining <= 0:
+                break
+            self.metrics["retry_after_waits"] += 1
+            self.metrics["retry_after_seconds"] += remaining
+            await asyncio.sleep(remaining)
+
+        if self.in_flight < self.current_limit and not self._waiters:
+            self._take()
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was handed over just as we were cancelled - pass it on
+                self.in_flight -= 1
+                self._wake()
+            else:
+                self._waiters.remove(future)
+            raise
+
+    def _take(self):
+        self.in_flight += 1
+        self.metrics["peak_in_flight"] = max(self.metrics["peak_in_flight"], self.in_flight)
+
+    def _wake(self):
+        """Hand free slots to queued waiters in arrival order"""
+        while self._waiters and self.in_flight < self.current_limit:
+            future = self._waiters.popleft()
+            if not future.done():
+                self._take()
+                future.set_result(None)
+
+    def release(self, endpoint: str, latency: float, outcome: Optional[RequestOutcome] = None, error: bool = False):
+        """Return a slot and adjust the limit from how the request went"""
+        self.in_flight -= 1
+        outcome = outcome or RequestOutcome()
+        self.metrics["completed"] += 1
+        self.metrics["by_endpoint"][endpoint]["completed"] += 1
+
+        if outcome.rate_limited:
+            self.metrics["rate_limited"] += 1
+            self.metrics["by_endpoint"][endpoint]["rate_limited"] += 1
+            self.defer(endpoint, outcome.retry_after if outcome.retry_after is not None else DEFAULT_RETRY_AFTER)
+            self._decrease(latency)
+        elif outcome.server_error or error:
+            self.metrics["server_errors" if outcome.server_error else "errors"] += 1
+            self._decrease(latency)
+        else:
+            self._observe_latency(latency)
+            if latency <= self._baseline_latency * self.latency_tolerance:
+                self._increase()
+
+        self._wake()
+
+    def defer(self, endpoint: str, seconds: float):
+        """Hold new requests to one endpoint until Retry-After has passed"""
+        deadline = time.monotonic() + seconds
+        self._retry_until[endpoint] = max(self._retry_until.get(endpoint, 0.0), deadline)
+
+    def _observe_latency(self, latency: float):
+        # Baseline tracks the fastest recent responses, drifting up slowly so a
+        # permanently slower upstream does not hold the limit down forever
+        if self._baseline_latency is None or latency < self._baseline_latency:
+            self._baseline_latency = latency
+        else:
+            self._baseline_latency += (latency - self._baseline_latency) * BASELINE_DRIFT
+
+    def _increase(self):
+        if self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self.metrics["increases"] += 1
+
+    def _decrease(self, latency: float):
+        # Requests in flight when congestion started all fail together; only
+        # back off once per latency window so a burst does not collapse the limit
+        now = time.monotonic()
+        window = max(latency, self._baseline_latency or 0.0)
+        if now - self._last_decrease < window:
+            return
+        self._last_decrease = now
+        old_limit = self.current_limit
+        self.limit = max(float(self.min_limit), self.limit * self.backoff_ratio)
+        self.metrics["decreases"] += 1
+        logger.info(f"Concurrency limit reduced from {old_limit} to {self.current_limit}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get controller statistics"""
+        return {
+            "limit": self.current_limit,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "baseline_latency_ms": round((self._baseline_latency or 0.0) * 1000, 1),
+            **{k: v for k, v in self.metrics.items() if k != "by_endpoint"},
+            "retry_after_seconds": round(self.metrics["retry_after_seconds"], 2),
+            "by_endpoint": dict(self.metrics["by_endpoint"]),
+        }
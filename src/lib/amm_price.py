@@ -15,6 +15,9 @@ import json
 import base64
 import struct
 
+from src.lib.http_session import get_http_session_pool
+from src.lib.rate_scheduler import get_rate_scheduler
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
@@ -46,21 +49,23 @@ class AMMPriceReader:
     def __init__(self, session: Optional[aiohttp.ClientSession] = None):
         """Initialize with optional session for connection pooling"""
         self.session = session
-        self._owns_session = session is None
+        self._pooled_session = session is None  # Borrow from the shared pool unless given one
+        self.rate_limiter = get_rate_scheduler("helius")
         self.request_count = 0
         self._sol_price_usd: Optional[Decimal] = None
         self._sol_price_timestamp: float = 0
         
     async def __aenter__(self):
         """Async context manager entry"""
-        if self._owns_session:
-            self.session = aiohttp.ClientSession()
+        if self._pooled_session:
+            self.session = await get_http_session_pool().acquire()
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
-        if self._owns_session and self.session:
-            await self.session.close()
+        if self._pooled_session and self.session:
+            await get_http_session_pool().release(self.session)
+            self.session = None
     
     def _get_rpc_url(self) -> str:
         """Get RPC URL with API key"""
@@ -84,6 +89,7 @@ class AMMPriceReader:
         }
         
         try:
+            await self.rate_limiter.acquire()
             self.request_count += 1
             async with self.session.post(
                 url, 
@@ -15,6 +15,9 @@ from datetime import datetime, timedelta
 import time
 import json
 
+from src.lib.http_session import get_http_session_pool
+from src.lib.rate_scheduler import get_rate_scheduler
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
@@ -27,7 +30,6 @@ BIRDEYE_V2_BASE = "https://api.birdeye.so/v2"
 MAX_RETRIES = 3
 RETRY_DELAYS = [1, 2, 5]
 REQUEST_TIMEOUT = 30
-RATE_LIMIT_DELAY = 0.5  # 2 requests per second max
 
 # Special addresses
 USDC_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
@@ -41,21 +43,22 @@ class BirdeyeClient:
     def __init__(self, session: Optional[aiohttp.ClientSession] = None):
         """Initialize with optional session"""
         self.session = session
-        self._owns_session = session is None
+        self._pooled_session = session is None  # Borrow from the shared pool unless given one
         self.api_key = BIRDEYE_API_KEY
-        self._last_request_time = 0
+        self.rate_limiter = get_rate_scheduler("birdeye")
         self.request_count = 0
         
     async def __aenter__(self):
         """Async context manager entry"""
-        if self._owns_session:
-            self.session = aiohttp.ClientSession()
+        if self._pooled_session:
+            self.session = await get_http_session_pool().acquire()
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
-        if self._owns_session and self.session:
-            await self.session.close()
+        if self._pooled_session and self.session:
+            await get_http_session_pool().release(self.session)
+            self.session = None
     
     def _get_headers(self) -> Dict[str, str]:
         """Get request headers with API key"""
@@ -64,13 +67,6 @@ class BirdeyeClient:
             headers["X-API-KEY"] = self.api_key
         return headers
     
-    async def _rate_limit(self):
-        """Enforce rate limiting"""
-        elapsed = time.time() - self._last_request_time
-        if elapsed < RATE_LIMIT_DELAY:
-            await asyncio.sleep(RATE_LIMIT_DELAY - elapsed)
-        self._last_request_time = time.time()
-    
     async def _make_request(
         self,
         endpoint: str,
@@ -85,12 +81,11 @@ class BirdeyeClient:
         base_url = BIRDEYE_V2_BASE if use_v2 else BIRDEYE_BASE_URL
         url = f"{base_url}{endpoint}"
         
-        # Apply rate limiting
-        await self._rate_limit()
-        
         last_error = None
         for attempt, delay in enumerate(RETRY_DELAYS):
             try:
+                # Every attempt draws from the shared Birdeye budget
+                await self.rate_limiter.acquire()
                 self.request_count += 1
                 
                 async with self.session.get(
@@ -103,7 +98,7 @@ class BirdeyeClient:
                         # Rate limited
                         retry_after = int(resp.headers.get("Retry-After", delay))
                         logger.warning(f"Birdeye rate limited, waiting {retry_after}s")
-                        await asyncio.sleep(retry_after)
+                        self.rate_limiter.pause(retry_after)
                         continue
                     
                     if resp.status == 404:
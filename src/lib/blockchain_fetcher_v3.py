@@ -17,11 +17,21 @@ from aiohttp import ClientTimeout
 import logging
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Dict, Any, Optional, Set, Tuple, Callable
+from typing import List, Dict, Any, Optional, Set, Tuple, Callable, Awaitable
 from dataclasses import dataclass, field
 from collections import defaultdict, deque
+from contextlib import asynccontextmanager
 import time
 
+from src.lib.adaptive_concurrency import AdaptiveConcurrencyLimiter, RequestOutcome
+from src.lib.http_session import get_http_session_pool
+from src.lib.lot_ledger import LotLedger
+from src.lib.price_planner import HistoryCall, plan_prices, execute_plan, trade_price_needs, get_price_bucket_sec
+from src.lib.price_store import PriceStore, get_price_store
+from src.lib.rate_scheduler import get_rate_scheduler
+from src.lib.trade_table import TradeTable
+from src.lib.wallet_sync_store import WalletSyncStore, WalletSyncState, trade_to_record, trade_from_record
+
 # Environment variables
 HELIUS_KEY = os.getenv("HELIUS_KEY")
 BIRDEYE_API_KEY = os.getenv("BIRDEYE_API_KEY")
@@ -29,21 +39,31 @@ BIRDEYE_API_KEY = os.getenv("BIRDEYE_API_KEY")
 # Constants
 HELIUS_BASE = "https://api.helius.xyz/v0"
 HELIUS_RPC_BASE = "https://mainnet.helius-rpc.com"  # RPC endpoint for signatures
-HELIUS_RPS = 50  # Updated for paid plan
-BIRDEYE_RPS = 1
 DUST_THRESHOLD = Decimal("0.0000001")  # 10^-7
 SOL_MINT = "So11111111111111111111111111111111111111112"
 SIGNATURE_PAGE_LIMIT = 1000  # RPC supports up to 1000 signatures per page
 TX_BATCH_SIZE = 100  # WAL-317a: Batch size for getParsedTransactionsBatch
+# "sequential" walks before-cursors one page at a time; "slot_partitioned" splits the
+# wallet's slot span into windows fetched concurrently via getTransactionsForAddress
+SIGNATURE_FETCH_MODE = os.getenv("SIGNATURE_FETCH_MODE", "sequential")
+SLOT_WINDOW_MAX_RETRIES = 3
+PAGE_RATE_LIMIT_RETRIES = 3  # Per-page 429 retries in _fetch_pages_parallel
+# Overlap signature paging, transaction batches, parsing, metadata and pricing
+FETCH_PIPELINE_ENABLED = os.getenv("FETCH_PIPELINE", "false").lower() == "true"
+# Trades the pipeline collects before planning their prices; one window is one
+# price plan, so a window covering the whole fetch plans every need at once
+FETCH_PIPELINE_PRICE_WINDOW = int(os.getenv("FETCH_PIPELINE_PRICE_WINDOW", "5000"))
+# Parse and drop raw transactions chunk by chunk instead of holding them all
+FETCH_STREAMING_ENABLED = os.getenv("FETCH_STREAMING", "false").lower() == "true"
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class Trade:
-    """Trade structure - one per transaction signature"""
+    """Trade structure - one per transaction signature (slotted: no per-instance __dict__)"""
 
     signature: str
     slot: int
@@ -56,7 +76,7 @@ class Trade:
     token_out_amount: Decimal
     price_usd: Optional[Decimal]
     value_usd: Optional[Decimal]
-    pnl_usd: Decimal = Decimal("0")
+    pnl_usd: Optional[Decimal] = Decimal("0")  # None when a sell's buys are outside the fetched window
     fees_usd: Decimal = Decimal("0")
     dex: str = "UNKNOWN"
     priced: bool = False
@@ -91,6 +111,7 @@ class Trade:
         result = {
             "timestamp": self.timestamp.isoformat(),
             "signature": self.signature,
+            "slot": self.slot,
             "action": action,
             "token": token,
             "amount": amount,
@@ -139,6 +160,7 @@ class Metrics:
     parser_errors: int = 0
     dust_rows: int = 0
     unpriced_rows: int = 0
+    price_plan: Optional[Dict[str, int]] = None
 
     def log_summary(self, logger_func: Callable[[str], None]):
         """Log metrics summary"""
@@ -158,26 +180,17 @@ class Metrics:
             logger_func(f"Parse rate: {parse_rate:.1f}%")
 
 
-class RateLimiter:
-    def __init__(self, calls_per_second: int):
-        self.calls_per_second = calls_per_second
-        self.min_interval = 1.0 / calls_per_second
-        self.last_call = 0
-
-    async def acquire(self):
-        current = asyncio.get_event_loop().time()
-        elapsed = current - self.last_call
-        if elapsed < self.min_interval:
-            await asyncio.sleep(self.min_interval - elapsed)
-        self.last_call = asyncio.get_event_loop().time()
-
-
 class RateLimitedFetcher:
-    """Semaphore-based rate limiter for concurrent requests"""
+    """Adaptive (AIMD) concurrency limiter for upstream requests"""
     
-    def __init__(self, max_concurrent: int = 10):
+    def __init__(self, max_concurrent: int = 10, provider: str = "helius", min_concurrent: int = 2):
         """Initialize with max concurrent requests (default 10 for Helius)"""
-        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.controller = AdaptiveConcurrencyLimiter(
+            initial_limit=max_concurrent, min_limit=min_concurrent, max_limit=max_concurrent
+        )
+        # Requests also draw from the shared provider budget, so concurrency here
+        # never pushes the process past the provider's requests per second
+        self.scheduler = get_rate_scheduler(provider)
         self.max_concurrent = max_concurrent
         self._active_requests = 0
         self._total_requests = 0
@@ -186,23 +199,39 @@ class RateLimitedFetcher:
         self._request_timestamps: deque = deque(maxlen=1000)  # Keep last 1000 timestamps
         self._window_seconds = 5  # Calculate RPS over 5 second window
     
-    async def __aenter__(self):
-        """Acquire semaphore for request"""
-        await self.semaphore.acquire()
+    @asynccontextmanager
+    async def request(self, endpoint: str = "default"):
+        """
+        Hold one in-flight slot for a request to endpoint
+        Yields a RequestOutcome; call outcome.record(resp) so 429/5xx and
+        Retry-After feed back into the concurrency limit for that endpoint
+        """
+        await self.controller.acquire(endpoint)
+        try:
+            await self.scheduler.acquire()
+        except BaseException:
+            self.controller.release(endpoint, 0.0, error=True)
+            raise
+        
+        outcome = RequestOutcome()
+        error = False
         self._active_requests += 1
         self._total_requests += 1
         # WAL-316: Record request timestamp
         self._request_timestamps.append(time.time())
-        return self
-    
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Release semaphore after request"""
-        self._active_requests -= 1
-        self.semaphore.release()
-        
-        # If we got a 429, track it
-        if exc_type and hasattr(exc_val, 'status') and exc_val.status == 429:
-            self._rate_limit_hits += 1
+        start = time.monotonic()
+        try:
+            yield outcome
+        except Exception as e:
+            if outcome.status is None:
+                outcome.status = getattr(e, "status", None)
+            error = True
+            raise
+        finally:
+            self._active_requests -= 1
+            if outcome.rate_limited:
+                self._rate_limit_hits += 1
+            self.controller.release(endpoint, time.monotonic() - start, outcome, error=error)
     
     @property
     def active_count(self) -> int:
@@ -234,61 +263,114 @@ class RateLimitedFetcher:
         """Get rate limiter statistics"""
         return {
             "max_concurrent": self.max_concurrent,
+            "concurrency_limit": self.controller.current_limit,
             "active_requests": self._active_requests,
             "total_requests": self._total_requests,
             "rate_limit_hits": self._rate_limit_hits,
-            "actual_rps": round(self.calculate_rps(), 2)
+            "actual_rps": round(self.calculate_rps(), 2),
+            "budget": self.scheduler.get_stats(),
+            "controller": self.controller.get_stats(),
         }
 
 
 class PriceCache:
-    """Birdeye price cache keyed by (mint, unix_minute)"""
+    """Birdeye price cache keyed by (mint, unix_minute)
 
-    def __init__(self):
+    Request-local view over the persistent price store: reads fall through to
+    the store and writes are recorded there, so a price fetched once is reused
+    by every later request and worker. Without a store it is in-memory only.
+    Timestamps are floored to `resolution` seconds (a whole number of minutes).
+    """
+
+    def __init__(self, store: Optional[PriceStore] = None, resolution: int = 60):
         self.cache: Dict[Tuple[str, int], Optional[Decimal]] = {}
+        self.store = store
+        self.resolution = resolution
 
     def get_key(self, mint: str, timestamp: datetime) -> Tuple[str, int]:
         """Get cache key for mint and timestamp"""
-        unix_minute = int(timestamp.timestamp() // 60) * 60
+        unix_minute = int(timestamp.timestamp() // self.resolution) * self.resolution
         return (mint, unix_minute)
 
+    def contains(self, mint: str, timestamp: datetime) -> bool:
+        """Whether this minute was already fetched, including recorded misses"""
+        key = self.get_key(mint, timestamp)
+        if key in self.cache:
+            return True
+        if self.store is None:
+            return False
+        known, price = self.store.lookup(*key)
+        if known:
+            self.cache[key] = price
+        return known
+
     def get(self, mint: str, timestamp: datetime) -> Optional[Decimal]:
         """Get cached price"""
-        key = self.get_key(mint, timestamp)
-        return self.cache.get(key)
+        if not self.contains(mint, timestamp):
+            return None
+        return self.cache[self.get_key(mint, timestamp)]
 
     def set(self, mint: str, timestamp: datetime, price: Optional[Decimal]):
         """Cache price"""
-        key = self.get_key(mint, timestamp)
-        self.cache[key] = price
+        self.set_many(timestamp, {mint: price})
+
+    def set_many(self, timestamp: datetime, prices: Dict[str, Optional[Decimal]]):
+        """Cache a batch of prices for one minute in a single store write"""
+        minute = self.get_key("", timestamp)[1]
+        self._record([(mint, minute, price) for mint, price in prices.items()])
+
+    def set_series(self, mint: str, prices: Dict[int, Optional[Decimal]]):
+        """Cache one mint's prices keyed by unix minute in a single store write"""
+        self._record([(mint, minute, price) for minute, price in prices.items()])
+
+    def _record(self, rows: List[Tuple[str, int, Optional[Decimal]]]):
+        for mint, minute, price in rows:
+            self.cache[(mint, minute)] = price
+        if self.store is not None and rows:
+            self.store.put_many(rows)
 
 
 class BlockchainFetcherV3:
     """V3 fetcher with all expert recommendations"""
 
-    def __init__(self, progress_callback: Optional[Callable[[str], None]] = None, skip_pricing: bool = False, parallel_pages: int = 40):
+    def __init__(
+        self,
+        progress_callback: Optional[Callable[[str], None]] = None,
+        skip_pricing: bool = False,
+        parallel_pages: int = 40,
+        sync_store: Optional[WalletSyncStore] = None,
+        signature_fetch_mode: str = SIGNATURE_FETCH_MODE,
+        pipelined: bool = FETCH_PIPELINE_ENABLED,
+        streaming: bool = FETCH_STREAMING_ENABLED,
+    ):
         self.progress_callback = progress_callback or (lambda x: logger.info(x))
-        self.helius_limiter = RateLimiter(HELIUS_RPS)
+        self.helius_limiter = get_rate_scheduler("helius")
         self.helius_rate_limited_fetcher = RateLimitedFetcher(max_concurrent=40)  # Updated for paid plan (50 RPS with buffer)
-        self.birdeye_limiter = RateLimiter(BIRDEYE_RPS)
+        self.birdeye_limiter = get_rate_scheduler("birdeye")
         self.session: Optional[aiohttp.ClientSession] = None
         self.metrics = Metrics()
-        self.price_cache = PriceCache()
+        self.price_cache = PriceCache(get_price_store(), resolution=get_price_bucket_sec())
         self.skip_pricing = skip_pricing
         self.parallel_pages = parallel_pages  # Number of pages to fetch concurrently
-        # WAL-317: Auto-tuning variables
-        self.consecutive_no_429_batches = 0
-        self.min_parallel_pages = 5
-        self.max_parallel_pages = 50
-        self.initial_parallel_pages = parallel_pages  # Store initial value for reporting
+        # Incremental sync: persisted head signature + parsed trades per wallet
+        self.sync_store = sync_store
+        self._head: Optional[Tuple[str, Optional[int]]] = None  # (signature, slot) of newest page entry
+        self._fetch_failures = 0  # Pages/batches dropped after retries - blocks head advance
+        # Open positions kept beside the sync head; a delta fetch applies only its new trades
+        self.positions: Optional[List[Any]] = None
+        self.position_checkpoint = None
+        self.signature_fetch_mode = signature_fetch_mode
+        self.pipelined = pipelined
+        self.streaming = streaming  # Bounded-memory extraction in the phased engine
 
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        self.session = await get_http_session_pool().acquire()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         if self.session:
-            await self.session.close()
+            await get_http_session_pool().release(self.session)
+            self.session = None
 
     def _report_progress(self, message: str):
         """Report progress to callback"""
@@ -303,46 +385,44 @@ class BlockchainFetcherV3:
         start_time = time.time()
         step_times = {}
 
-        # Step 1: Fetch all signatures (using RPC with 1000-sig pages)
-        step_start = time.time()
-        self._report_progress("Step 1: Fetching all signatures...")
-        signatures = await self._fetch_swap_signatures(wallet_address)
-        step_times['fetch_signatures'] = time.time() - step_start
-        self._report_progress(f"✓ Fetched {len(signatures)} signatures in {step_times['fetch_signatures']:.1f}s")
-
-        # Step 1b: Batch fetch full transactions
-        step_start = time.time()
-        self._report_progress("Step 1b: Batch fetching full transactions...")
-        transactions = await self._fetch_transactions_batch(signatures)
-        step_times['fetch_transactions'] = time.time() - step_start
-        self._report_progress(f"✓ Fetched {len(transactions)} SWAP transactions in {step_times['fetch_transactions']:.1f}s")
-
-        # Step 2: Extract trades with deduplication
-        step_start = time.time()
-        self._report_progress("Step 2: Extracting trades...")
-        trades = await self._extract_trades_with_dedup(transactions, wallet_address)
-        step_times['extract_trades'] = time.time() - step_start
-        self._report_progress(f"✓ Extracted {len(trades)} unique trades in {step_times['extract_trades']:.1f}s")
+        # Load incremental sync checkpoint (if a store is configured)
+        sync_state = self.sync_store.load(wallet_address) if self.sync_store else None
+        head_signature = sync_state.head_signature if sync_state else None
+        self._head = None
+        self._fetch_failures = 0
+        if sync_state:
+            self._report_progress(
+                f"Incremental sync: {len(sync_state.trades)} known trades, head {head_signature[:8] if head_signature else None}..."
+            )
 
-        # Step 3: Fetch token metadata
-        step_start = time.time()
-        self._report_progress("Step 3: Fetching token metadata...")
-        await self._fetch_token_metadata(trades)
-        step_times['fetch_metadata'] = time.time() - step_start
-        self._report_progress(f"✓ Fetched metadata in {step_times['fetch_metadata']:.1f}s")
+        if self.pipelined:
+            # Steps 1-5 overlapped: transaction batches, parsing, metadata and pricing
+            # start while later signature pages are still being walked
+            step_start = time.time()
+            self._report_progress("Steps 1-5: Running overlapped fetch pipeline...")
+            signatures, filtered_trades = await self._run_pipeline(wallet_address, head_signature)
+            step_times['pipeline'] = time.time() - step_start
+            self._report_progress(
+                f"✓ Pipeline produced {len(filtered_trades)} trades from {len(signatures)} signatures "
+                f"in {step_times['pipeline']:.1f}s"
+            )
+        else:
+            signatures, filtered_trades = await self._fetch_trades_phased(wallet_address, head_signature, step_times)
 
-        # Step 4: Apply dust filter
-        step_start = time.time()
-        self._report_progress("Step 4: Applying dust filter...")
-        filtered_trades = self._apply_dust_filter(trades)
-        step_times['dust_filter'] = time.time() - step_start
-        self._report_progress(f"✓ After dust filter: {len(filtered_trades)} trades in {step_times['dust_filter']:.1f}s")
+        # Step 4b: Merge trades already parsed in earlier syncs
+        new_trade_count = len(filtered_trades)
+        new_trade_signatures = {t.signature for t in filtered_trades}
+        if sync_state:
+            filtered_trades = self._merge_known_trades(filtered_trades, sync_state)
+            self._report_progress(f"✓ Merged {new_trade_count} new + {len(filtered_trades) - new_trade_count} known trades")
 
-        # Step 5: Fetch prices
+        # Step 5: Fetch prices (known trades keep the prices they were stored with)
         if not self.skip_pricing:
+            # The pipeline has already priced the new trades
+            to_price = filtered_trades[new_trade_count:] if self.pipelined else filtered_trades
             step_start = time.time()
             self._report_progress("Step 5: Fetching prices...")
-            await self._fetch_prices_with_cache(filtered_trades)
+            await self._fetch_prices_with_cache([t for t in to_price if not t.priced])
             step_times['fetch_prices'] = time.time() - step_start
             self._report_progress(f"✓ Fetched prices in {step_times['fetch_prices']:.1f}s")
         else:
@@ -355,6 +435,13 @@ class BlockchainFetcherV3:
         step_times['calculate_pnl'] = time.time() - step_start
         self._report_progress(f"✓ Calculated P&L in {step_times['calculate_pnl']:.1f}s")
 
+        # Step 7: Positions from the stored checkpoint plus this fetch's new trades
+        positions_incremental = False
+        if self.sync_store:
+            step_start = time.time()
+            positions_incremental = self._update_positions(wallet_address, sync_state, final_trades, new_trade_signatures)
+            step_times['positions'] = time.time() - step_start
+
         # Log timing summary
         total_time = time.time() - start_time
         self._report_progress("\n=== TIMING SUMMARY ===")
@@ -372,22 +459,297 @@ class BlockchainFetcherV3:
         self._report_progress(f"Total requests: {rps_stats['total_requests']}")
         self._report_progress(f"Rate limit hits: {rps_stats['rate_limit_hits']}")
         self._report_progress(f"Max concurrent: {rps_stats['max_concurrent']}")
-        # WAL-317: Report auto-tuning results
-        self._report_progress(f"Final parallel_pages: {self.parallel_pages} (started at {self.initial_parallel_pages})")
+        # Report where the adaptive concurrency controller settled
+        self._report_progress(f"Final concurrency limit: {rps_stats['concurrency_limit']} (max {rps_stats['max_concurrent']})")
         
         self._report_progress("===================\n")
 
         # Log metrics
         self.metrics.log_summary(self._report_progress)
 
+        # Persist sync checkpoint for the next delta fetch
+        if self.sync_store:
+            self._save_sync_state(wallet_address, sync_state, signatures, final_trades)
+
         # Create response envelope
-        return self._create_response_envelope(wallet_address, final_trades, total_time)
+        envelope = self._create_response_envelope(wallet_address, final_trades, total_time)
+        if self.sync_store:
+            envelope["sync"] = {
+                "incremental": sync_state is not None,
+                "new_signatures": len(signatures),
+                "new_trades": new_trade_count,
+                "head_signature": self._head[0] if self._head else head_signature,
+                "positions_incremental": positions_incremental,
+            }
+        return envelope
+
+    async def _fetch_trades_phased(
+        self, wallet: str, head_signature: Optional[str], step_times: Dict[str, float]
+    ) -> Tuple[List[str], List[Trade]]:
+        """Steps 1-4 as strict phases: all signatures, all transactions, parse, metadata, dust filter"""
+        # Step 1: Fetch all signatures (using RPC with 1000-sig pages)
+        step_start = time.time()
+        self._report_progress("Step 1: Fetching all signatures...")
+        if self.signature_fetch_mode == "slot_partitioned" and not head_signature:
+            # Cold walk only - incremental deltas are a page or two and stay sequential
+            signatures = await self._fetch_signatures_slot_partitioned(wallet)
+        else:
+            signatures = await self._fetch_swap_signatures(wallet, until_sig=head_signature)
+        step_times['fetch_signatures'] = time.time() - step_start
+        self._report_progress(f"✓ Fetched {len(signatures)} signatures in {step_times['fetch_signatures']:.1f}s")
+
+        if self.streaming:
+            # Steps 1b-4 chunk by chunk: raw transactions never outlive their chunk
+            step_start = time.time()
+            self._report_progress("Steps 1b-4: Streaming transactions into trades...")
+            filtered_trades = await self._fetch_trades_streaming(signatures, wallet)
+            step_times['stream_trades'] = time.time() - step_start
+            self._report_progress(
+                f"✓ Streamed {len(filtered_trades)} trades in {step_times['stream_trades']:.1f}s"
+            )
+            return signatures, filtered_trades
+
+        # Step 1b: Batch fetch full transactions
+        step_start = time.time()
+        self._report_progress("Step 1b: Batch fetching full transactions...")
+        transactions = await self._fetch_transactions_batch(signatures)
+        step_times['fetch_transactions'] = time.time() - step_start
+        self._report_progress(f"✓ Fetched {len(transactions)} SWAP transactions in {step_times['fetch_transactions']:.1f}s")
+
+        # Step 2: Extract trades with deduplication
+        step_start = time.time()
+        self._report_progress("Step 2: Extracting trades...")
+        trades = await self._extract_trades_with_dedup(transactions, wallet)
+        step_times['extract_trades'] = time.time() - step_start
+        self._report_progress(f"✓ Extracted {len(trades)} unique trades in {step_times['extract_trades']:.1f}s")
+
+        # Step 3: Fetch token metadata
+        step_start = time.time()
+        self._report_progress("Step 3: Fetching token metadata...")
+        await self._fetch_token_metadata(trades)
+        step_times['fetch_metadata'] = time.time() - step_start
+        self._report_progress(f"✓ Fetched metadata in {step_times['fetch_metadata']:.1f}s")
+
+        # Step 4: Apply dust filter
+        step_start = time.time()
+        self._report_progress("Step 4: Applying dust filter...")
+        filtered_trades = self._apply_dust_filter(trades)
+        step_times['dust_filter'] = time.time() - step_start
+        self._report_progress(f"✓ After dust filter: {len(filtered_trades)} trades in {step_times['dust_filter']:.1f}s")
+
+        return signatures, filtered_trades
+
+    async def _fetch_trades_streaming(self, signatures: List[str], wallet: str) -> List[Trade]:
+        """
+        Fetch transaction batches one chunk of parallel_pages at a time, parsing and
+        dust-filtering each batch as it lands so raw transactions are dropped immediately.
+        Only the parsed trades (a small fraction of the raw payload) and their mints are
+        kept; pricing, P&L and the envelope need every trade, so those stay in memory
+        """
+        total_batches = (len(signatures) + TX_BATCH_SIZE - 1) // TX_BATCH_SIZE
+        chunk_size = max(1, min(self.parallel_pages, 40))
+        seen: Set[str] = set()
+        mints: Set[str] = set()
+        trades: List[Trade] = []
+
+        for chunk_start in range(0, total_batches, chunk_size):
+            batch_nums = range(chunk_start, min(chunk_start + chunk_size, total_batches))
+            chunk = await asyncio.gather(*[
+                self._fetch_single_batch(
+                    signatures[b * TX_BATCH_SIZE:(b + 1) * TX_BATCH_SIZE], b + 1, total_batches
+                )
+                for b in batch_nums
+            ])
+            for transactions in chunk:
+                parsed = await self._extract_trades_with_dedup(transactions, wallet)
+                # Signatures are unique per batch; dedup again across batches
+                unique = [t for t in parsed if t.signature not in seen]
+                self.metrics.dup_rows += len(parsed) - len(unique)
+                seen.update(t.signature for t in unique)
+                kept = self._apply_dust_filter(unique)
+                mints.update(m for t in kept for m in (t.token_in_mint, t.token_out_mint))
+                trades.extend(kept)
+            del chunk
+            self._report_progress(f"Processed {batch_nums[-1] + 1}/{total_batches} batches ({len(trades)} trades)...")
+
+        metadata_map = await self._fetch_metadata_map(list(mints))
+        for trade in trades:
+            if trade.token_in_mint in metadata_map:
+                trade.token_in_symbol = metadata_map[trade.token_in_mint].get("symbol", trade.token_in_mint[:8])
+            if trade.token_out_mint in metadata_map:
+                trade.token_out_symbol = metadata_map[trade.token_out_mint].get("symbol", trade.token_out_mint[:8])
+        return trades
+
+    async def _run_pipeline(self, wallet: str, head_signature: Optional[str]) -> Tuple[List[str], List[Trade]]:
+        """
+        Overlapped fetch engine built on asyncio queues:
+        signature pages -> 100-sig transaction batches -> parse + dust filter -> metadata -> prices
+        Each stage works on whatever the previous stage has produced so far, so wall time
+        approaches the slowest stage instead of the sum of all stages
+        """
+        num_workers = max(1, min(self.parallel_pages, 40))
+        batch_queue: asyncio.Queue = asyncio.Queue(maxsize=num_workers * 2)  # Backpressure on paging
+        trade_queue: asyncio.Queue = asyncio.Queue()
+        price_queue: asyncio.Queue = asyncio.Queue()
+        batch_count = 0
+
+        async def enqueue_page(page_signatures: List[str]):
+            nonlocal batch_count
+            for i in range(0, len(page_signatures), TX_BATCH_SIZE):
+                batch_count += 1
+                await batch_queue.put((batch_count, page_signatures[i:i + TX_BATCH_SIZE]))
+
+        async def produce_signatures() -> List[str]:
+            try:
+                if self.signature_fetch_mode == "slot_partitioned" and not head_signature:
+                    return await self._fetch_signatures_slot_partitioned(wallet, page_callback=enqueue_page)
+                return await self._fetch_swap_signatures(wallet, until_sig=head_signature, page_callback=enqueue_page)
+            finally:
+                for _ in range(num_workers):
+                    await batch_queue.put(None)
+
+        async def fetch_and_parse():
+            try:
+                while True:
+                    item = await batch_queue.get()
+                    if item is None:
+                        break
+                    batch_num, batch_sigs = item
+                    transactions = await self._fetch_single_batch(batch_sigs, batch_num, 0)
+                    # Raw transactions are dropped here; only compact trades move on
+                    trades = self._apply_dust_filter(await self._extract_trades_with_dedup(transactions, wallet))
+                    if trades:
+                        await trade_queue.put(trades)
+            finally:
+                await trade_queue.put(None)
+
+        async def resolve_metadata():
+            symbols: Dict[str, str] = {}
+            finished_workers = 0
+            try:
+                while finished_workers < num_workers:
+                    trades = await trade_queue.get()
+                    if trades is None:
+                        finished_workers += 1
+                        continue
+                    missing = {m for t in trades for m in (t.token_in_mint, t.token_out_mint)} - symbols.keys()
+                    if missing:
+                        metadata_map = await self._fetch_metadata_map(list(missing))
+                        for mint in missing:
+                            symbols[mint] = metadata_map[mint].get("symbol", mint[:8]) if mint in metadata_map else None
+                    for trade in trades:
+                        if symbols.get(trade.token_in_mint):
+                            trade.token_in_symbol = symbols[trade.token_in_mint]
+                        if symbols.get(trade.token_out_mint):
+                            trade.token_out_symbol = symbols[trade.token_out_mint]
+                    await price_queue.put(trades)
+            finally:
+                await price_queue.put(None)
+
+        async def resolve_prices() -> List[Trade]:
+            # Price in large windows rather than per batch: each plan re-requests
+            # the SOL series for its own buckets, so per-batch plans cost a call each
+            collected: List[Trade] = []
+            priced = 0
+            while True:
+                trades = await price_queue.get()
+                if trades is None:
+                    break
+                collected.extend(trades)
+                if not self.skip_pricing and len(collected) - priced >= FETCH_PIPELINE_PRICE_WINDOW:
+                    await self._fetch_prices_with_cache(collected[priced:])
+                    priced = len(collected)
+            if not self.skip_pricing and len(collected) > priced:
+                await self._fetch_prices_with_cache(collected[priced:])
+            return collected
+
+        tasks = [
+            asyncio.ensure_future(produce_signatures()),
+            *[asyncio.ensure_future(fetch_and_parse()) for _ in range(num_workers)],
+            asyncio.ensure_future(resolve_metadata()),
+            asyncio.ensure_future(resolve_prices()),
+        ]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            # A failed stage would leave its neighbours waiting on a queue forever
+            for task in tasks:
+                task.cancel()
+            raise
+
+        self._report_progress(f"Pipeline processed {batch_count} transaction batches with {num_workers} workers")
+        return results[0], results[-1]
+
+    def _merge_known_trades(self, new_trades: List[Trade], sync_state: WalletSyncState) -> List[Trade]:
+        """Combine freshly parsed trades with trades persisted by earlier syncs"""
+        merged = list(new_trades)
+        seen = {t.signature for t in new_trades}
+        for record in sync_state.trades:
+            if record["signature"] not in seen:
+                merged.append(trade_from_record(record))
+                seen.add(record["signature"])
+        return merged
+
+    def _update_positions(
+        self, wallet: str, sync_state: Optional[WalletSyncState], trades: List[Trade], new_signatures: Set[str]
+    ) -> bool:
+        """
+        Bring self.positions up to date; returns True if only the new trades were applied.
+        A stored checkpoint is resumed when its cost basis method still matches, otherwise
+        (first sync, method change, unusable checkpoint) positions are rebuilt from all trades
+        """
+        # Import here to avoid circular import
+        from src.config.feature_flags import positions_enabled, get_cost_basis_method
+        from src.lib.position_builder import PositionBuilder
+        from src.lib.position_models import CostBasisMethod
+
+        self.positions, self.position_checkpoint = None, None
+        if not positions_enabled():
+            return False
+
+        saved = sync_state.positions if sync_state else None
+        if saved and saved.get("cost_basis_method") == get_cost_basis_method():
+            try:
+                builder = PositionBuilder.from_checkpoint(saved)
+                # trades are oldest first after _calculate_pnl, as apply_trades expects
+                delta = TradeTable.from_trades(t for t in trades if t.signature in new_signatures)
+                self.positions = builder.apply_trades(delta)
+                self.position_checkpoint = builder.checkpoint
+                self._report_progress(f"✓ Applied {len(delta)} new trades to checkpointed positions")
+                return True
+            except ValueError as e:
+                logger.warning(f"Position checkpoint for {wallet} not usable, rebuilding: {e}")
+
+        builder = PositionBuilder(CostBasisMethod(get_cost_basis_method()))
+        self.positions = builder.build_positions_from_trades(TradeTable.from_trades(trades), wallet)
+        self.position_checkpoint = builder.checkpoint
+        self._report_progress(f"✓ Rebuilt positions from {len(trades)} trades")
+        return False
+
+    def _save_sync_state(
+        self, wallet: str, sync_state: Optional[WalletSyncState], signatures: List[str], trades: List[Trade]
+    ):
+        """Advance the wallet head, unless pages or batches were dropped during this fetch"""
+        if self._fetch_failures:
+            # Advancing past a dropped batch would hide those trades from every future delta
+            self._report_progress(f"Sync checkpoint not saved: {self._fetch_failures} fetch failures")
+            return
+
+        state = sync_state or WalletSyncState(wallet=wallet)
+        if self._head:
+            state.head_signature, state.head_slot = self._head
+        state.signature_count += len(signatures)
+        state.trades = [trade_to_record(t) for t in trades]
+        state.positions = self.position_checkpoint.to_dict() if self.position_checkpoint else None
+        if self.sync_store.save(state):
+            self._report_progress(f"Sync checkpoint saved at slot {state.head_slot} ({len(trades)} trades)")
 
     async def _fetch_single_page(
-        self, wallet: str, page_num: int, before_sig: Optional[str] = None
+        self, wallet: str, page_num: int, before_sig: Optional[str] = None, until_sig: Optional[str] = None
     ) -> Tuple[List[str], Optional[str], bool, bool]:
         """
         Fetch a single page of signatures using RPC endpoint
+        until_sig stops the page at an already-synced signature (exclusive)
         Returns: (signatures, next_before_sig, is_empty, hit_rate_limit)
         """
         # Build RPC request
@@ -399,6 +761,8 @@ class BlockchainFetcherV3:
         }
         if before_sig:
             params["before"] = before_sig
+        if until_sig:
+            params["until"] = until_sig
             
         body = {
             "jsonrpc": "2.0",
@@ -411,13 +775,14 @@ class BlockchainFetcherV3:
             if not self.session:
                 raise RuntimeError("Session not initialized")
 
-            # Use semaphore-based rate limiter for concurrent request control
-            async with self.helius_rate_limited_fetcher:
+            # Adaptive concurrency: a 429 holds back only getSignaturesForAddress
+            # until its Retry-After has passed, the caller simply retries
+            async with self.helius_rate_limited_fetcher.request("getSignaturesForAddress") as outcome:
                 async with self.session.post(url, headers=headers, json=body, timeout=ClientTimeout(total=30)) as resp:
+                    outcome.record(resp)
                     if resp.status == 429:
                         # Return flag indicating rate limit hit
-                        retry_after = int(resp.headers.get("Retry-After", "5"))
-                        self._report_progress(f"Page {page_num}: Rate limited (retry after {retry_after}s)")
+                        self._report_progress(f"Page {page_num}: Rate limited (retry after {outcome.retry_after}s)")
                         return [], before_sig, False, True
 
                     resp.raise_for_status()
@@ -427,6 +792,8 @@ class BlockchainFetcherV3:
                     if "result" not in json_data:
                         error_msg = json_data.get("error", {}).get("message", "Unknown RPC error")
                         self._report_progress(f"Page {page_num}: RPC error: {error_msg}")
+                        # The walk stops here - keep the sync head where it was
+                        self._fetch_failures += 1
                         return [], None, True, False
                     
                     result = json_data["result"]
@@ -437,6 +804,10 @@ class BlockchainFetcherV3:
                     # Extract signatures
                     signatures = [item["signature"] for item in result if "signature" in item]
                     
+                    # Newest entry of the first page becomes the next sync head
+                    if before_sig is None and self._head is None:
+                        self._head = (result[0]["signature"], result[0].get("slot"))
+                    
                     # WAL-316: Report actual RPS
                     actual_rps = self.helius_rate_limited_fetcher.calculate_rps()
                     self._report_progress(f"Page {page_num}: {len(signatures)} signatures (Actual RPS: {actual_rps:.1f})")
@@ -448,78 +819,48 @@ class BlockchainFetcherV3:
         except Exception as e:
             logger.error(f"Error fetching page {page_num}: {e}")
             self.metrics.parser_errors += 1
+            self._fetch_failures += 1
             return [], None, True, False
     
     async def _fetch_pages_parallel(
         self, wallet: str, start_page: int, before_sigs: List[Optional[str]], num_pages: int
     ) -> Tuple[List[List[Dict[str, Any]]], List[Optional[str]]]:
         """
-        Fetch multiple pages of transactions in parallel with batch-wide 429 handling
+        Fetch multiple pages of transactions in parallel
+        Each rate-limited page retries on its own once the endpoint's Retry-After
+        has passed; concurrency is adjusted per request by the AIMD controller
         Returns: (list of transaction lists, list of next before_sigs)
         """
-        # Exponential backoff delays for retries
-        backoff_delays = [5, 10, 20]
-        retry_count = 0
-        
-        while retry_count <= len(backoff_delays):
-            tasks = []
-            for i in range(num_pages):
-                page_num = start_page + i
-                before_sig = before_sigs[i] if i < len(before_sigs) else None
-                task = self._fetch_single_page(wallet, page_num, before_sig)
-                tasks.append(task)
-            
-            # Gather all results
-            results = await asyncio.gather(*tasks)
-            
-            # Check if any page hit rate limit
-            any_rate_limited = any(hit_rate_limit for _, _, _, hit_rate_limit in results)
-            
-            # WAL-317: Calculate 429 rate for auto-tuning
-            pages_with_429 = sum(1 for _, _, _, hit_rate_limit in results if hit_rate_limit)
-            rate_429 = pages_with_429 / num_pages if num_pages > 0 else 0
-            
-            if any_rate_limited and retry_count < len(backoff_delays):
-                # Batch hit rate limit - wait and retry entire batch
-                wait_time = backoff_delays[retry_count]
-                self._report_progress(f"Batch hit rate limit, waiting {wait_time}s before retry (attempt {retry_count + 1}/3)...")
-                await asyncio.sleep(wait_time)
-                retry_count += 1
-                continue
-            
-            # WAL-317: Auto-tune parallel_pages based on 429 rate
-            if rate_429 > 0.05:  # More than 5% of pages hit 429
-                old_pages = self.parallel_pages
-                self.parallel_pages = max(int(self.parallel_pages * 0.8), self.min_parallel_pages)
-                self.consecutive_no_429_batches = 0
-                if old_pages != self.parallel_pages:
-                    self._report_progress(f"Auto-tune: High 429 rate ({rate_429:.2%}), reducing parallel_pages from {old_pages} to {self.parallel_pages}")
-            elif rate_429 == 0:  # No 429s in this batch
-                self.consecutive_no_429_batches += 1
-                if self.consecutive_no_429_batches >= 3:
-                    old_pages = self.parallel_pages
-                    self.parallel_pages = min(int(self.parallel_pages * 1.1), self.max_parallel_pages)
-                    if old_pages != self.parallel_pages:
-                        self._report_progress(f"Auto-tune: No 429s for {self.consecutive_no_429_batches} batches, increasing parallel_pages from {old_pages} to {self.parallel_pages}")
-                    self.consecutive_no_429_batches = 0
-            else:
-                self.consecutive_no_429_batches = 0
-            
-            # No rate limit or max retries reached - return results
-            all_transactions = []
-            next_sigs = []
-            
-            for transactions, next_sig, is_empty, hit_rate_limit in results:
-                all_transactions.append(transactions)
-                next_sigs.append(next_sig)
-            
-            return all_transactions, next_sigs
-        
-        # Should never reach here, but return empty results if we do
-        return [[] for _ in range(num_pages)], [None for _ in range(num_pages)]
+        async def fetch_page(i: int):
+            page_num = start_page + i
+            before_sig = before_sigs[i] if i < len(before_sigs) else None
+            for _ in range(PAGE_RATE_LIMIT_RETRIES + 1):
+                result = await self._fetch_single_page(wallet, page_num, before_sig)
+                if not result[3]:
+                    return result
+            return result
+
+        results = await asyncio.gather(*(fetch_page(i) for i in range(num_pages)))
 
-    async def _fetch_swap_signatures(self, wallet: str) -> List[str]:
-        """Fetch all transaction signatures (RPC can't filter by type)"""
+        all_transactions = []
+        next_sigs = []
+        for transactions, next_sig, is_empty, hit_rate_limit in results:
+            all_transactions.append(transactions)
+            next_sigs.append(next_sig)
+
+        return all_transactions, next_sigs
+
+    async def _fetch_swap_signatures(
+        self,
+        wallet: str,
+        until_sig: Optional[str] = None,
+        page_callback: Optional[Callable[[List[str]], Awaitable[None]]] = None,
+    ) -> List[str]:
+        """
+        Fetch all transaction signatures (RPC can't filter by type)
+        With until_sig, only signatures newer than that head are walked
+        page_callback receives each page as soon as it arrives (used by the pipeline)
+        """
         all_signatures = []
         page = 0
         consecutive_empty_pages = 0
@@ -536,20 +877,21 @@ class BlockchainFetcherV3:
                 self._report_progress(f"WARNING: Large wallet with {page} pages")
             
             # Fetch single page of signatures
-            signatures, next_before_sig, is_empty, hit_rate_limit = await self._fetch_single_page(wallet, page, before_sig)
+            signatures, next_before_sig, is_empty, hit_rate_limit = await self._fetch_single_page(
+                wallet, page, before_sig, until_sig
+            )
             
             if hit_rate_limit:
-                # Simple exponential backoff
-                wait_time = min(5 * (2 ** min(page // 10, 3)), 20)
-                self._report_progress(f"Rate limited on page {page}, waiting {wait_time}s...")
-                await asyncio.sleep(wait_time)
-                page -= 1  # Retry same page
+                # Retry same page - the request waits out the endpoint's Retry-After
+                page -= 1
                 continue
             
             if signatures:
                 all_signatures.extend(signatures)
                 consecutive_empty_pages = 0
                 self.metrics.signatures_fetched += len(signatures)
+                if page_callback:
+                    await page_callback(signatures)
             else:
                 consecutive_empty_pages += 1
                 if consecutive_empty_pages > 5:
@@ -570,6 +912,10 @@ class BlockchainFetcherV3:
             actual_rps = self.helius_rate_limited_fetcher.calculate_rps()
             self._report_progress(f"Page {page}: Total {len(all_signatures)} signatures (RPS: {actual_rps:.1f})")
             
+            # Delta walk: a short page means we reached the known head
+            if until_sig and len(signatures) < SIGNATURE_PAGE_LIMIT:
+                break
+            
             # Update before_sig for next page
             if next_before_sig:
                 before_sig = next_before_sig
@@ -588,6 +934,170 @@ class BlockchainFetcherV3:
         
         return all_signatures
 
+    async def _fetch_signatures_slot_partitioned(
+        self, wallet: str, page_callback: Optional[Callable[[List[str]], Awaitable[None]]] = None
+    ) -> List[str]:
+        """
+        Fetch all signatures by splitting the wallet's slot span into independent windows
+        Each window pages on its own, so windows run concurrently under the Helius limiter
+        instead of waiting on the previous page's before-cursor
+        """
+        span = await self._fetch_slot_span(wallet)
+        if span is None:
+            self._report_progress("Slot span unavailable, falling back to sequential signature walk")
+            return await self._fetch_swap_signatures(wallet, page_callback=page_callback)
+        if span == (None, None):
+            self._report_progress("Signature fetch complete: wallet has no transactions")
+            return []
+
+        oldest_slot, newest_slot = span
+        windows = self._partition_slot_range(oldest_slot, newest_slot, self.parallel_pages)
+        self._report_progress(
+            f"Fetching signatures for slots {oldest_slot}-{newest_slot} in {len(windows)} parallel windows..."
+        )
+
+        window_results = await asyncio.gather(
+            *[
+                self._fetch_slot_window(wallet, idx + 1, gte, lt, page_callback)
+                for idx, (gte, lt) in enumerate(windows)
+            ]
+        )
+
+        # Merge and dedup - windows are newest first, so a stable sort keeps in-slot order
+        slots_by_sig: Dict[str, int] = {}
+        for rows in window_results:
+            for signature, slot in rows:
+                if signature not in slots_by_sig:
+                    slots_by_sig[signature] = slot
+        ordered = sorted(slots_by_sig.items(), key=lambda item: item[1] or 0, reverse=True)
+        all_signatures = [signature for signature, _ in ordered]
+
+        if ordered and self._head is None:
+            self._head = ordered[0]
+        self.metrics.signatures_fetched += len(all_signatures)
+
+        actual_rps = self.helius_rate_limited_fetcher.calculate_rps()
+        self._report_progress(
+            f"Signature fetch complete: {len(all_signatures)} total signatures from {len(windows)} slot windows "
+            f"(RPS: {actual_rps:.1f})"
+        )
+        return all_signatures
+
+    async def _fetch_slot_span(self, wallet: str) -> Optional[Tuple[Optional[int], Optional[int]]]:
+        """
+        Find (oldest_slot, newest_slot) for a wallet with one newest-first and one oldest-first probe
+        Returns None if the RPC does not support slot-filtered queries, (None, None) for an empty wallet
+        """
+        (newest_rows, _), (oldest_rows, _) = await asyncio.gather(
+            self._fetch_address_signature_page(wallet, 0, {"sortOrder": "desc", "limit": 1}),
+            self._fetch_address_signature_page(wallet, 0, {"sortOrder": "asc", "limit": 1}),
+        )
+        if newest_rows is None or oldest_rows is None:
+            return None
+        if not newest_rows or not oldest_rows:
+            return (None, None)
+        return (oldest_rows[0][1], newest_rows[0][1])
+
+    @staticmethod
+    def _partition_slot_range(oldest_slot: int, newest_slot: int, num_windows: int) -> List[Tuple[int, int]]:
+        """Split [oldest_slot, newest_slot] into half-open (gte, lt) windows, newest window first"""
+        total = newest_slot - oldest_slot + 1
+        num_windows = max(1, min(num_windows, total))
+        width = -(-total // num_windows)  # Ceiling division
+        windows = []
+        for gte in range(oldest_slot, newest_slot + 1, width):
+            windows.append((gte, min(gte + width, newest_slot + 1)))
+        windows.reverse()
+        return windows
+
+    async def _fetch_slot_window(
+        self,
+        wallet: str,
+        window_num: int,
+        slot_gte: int,
+        slot_lt: int,
+        page_callback: Optional[Callable[[List[str]], Awaitable[None]]] = None,
+    ) -> List[Tuple[str, int]]:
+        """Page through one slot window newest first"""
+        rows_all: List[Tuple[str, int]] = []
+        pagination_token = None
+
+        while True:
+            options: Dict[str, Any] = {
+                "sortOrder": "desc",
+                "limit": SIGNATURE_PAGE_LIMIT,
+                "filters": {"slot": {"gte": slot_gte, "lt": slot_lt}},
+            }
+            if pagination_token:
+                options["paginationToken"] = pagination_token
+
+            rows, pagination_token = await self._fetch_address_signature_page(wallet, window_num, options)
+            if rows is None:
+                # Window truncated - record it so the sync head is not advanced past it
+                self._fetch_failures += 1
+                break
+
+            rows_all.extend(rows)
+            if rows and page_callback:
+                await page_callback([signature for signature, _ in rows])
+            if not rows or not pagination_token:
+                break
+
+        self._report_progress(f"Window {window_num} (slots {slot_gte}-{slot_lt - 1}): {len(rows_all)} signatures")
+        return rows_all
+
+    async def _fetch_address_signature_page(
+        self, wallet: str, request_id: int, options: Dict[str, Any]
+    ) -> Tuple[Optional[List[Tuple[str, int]]], Optional[str]]:
+        """
+        Fetch one page of (signature, slot) rows via Helius getTransactionsForAddress
+        Returns: (rows or None on failure, next pagination token)
+        """
+        url = f"{HELIUS_RPC_BASE}/?api-key={HELIUS_KEY}"
+        headers = {"Content-Type": "application/json"}
+        body = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "method": "getTransactionsForAddress",
+            "params": [wallet, {"transactionDetails": "signatures", **options}]
+        }
+
+        for retry_count in range(SLOT_WINDOW_MAX_RETRIES + 1):
+            try:
+                if not self.session:
+                    raise RuntimeError("Session not initialized")
+
+                async with self.helius_rate_limited_fetcher.request("getTransactionsForAddress") as outcome:
+                    async with self.session.post(url, headers=headers, json=body, timeout=ClientTimeout(total=30)) as resp:
+                        outcome.record(resp)
+                        if resp.status != 429:
+                            resp.raise_for_status()
+                            json_data = await resp.json()
+
+            except Exception as e:
+                logger.error(f"Error fetching slot window page {request_id}: {e}")
+                self.metrics.parser_errors += 1
+                return None, None
+
+            if outcome.rate_limited:
+                # The retry waits out Retry-After for this endpoint only
+                if retry_count < SLOT_WINDOW_MAX_RETRIES:
+                    self._report_progress(f"Window {request_id}: Rate limited, retrying after {outcome.retry_after}s...")
+                    continue
+                logger.error(f"Window {request_id}: Max retries exceeded on 429")
+                return None, None
+
+            if "result" not in json_data:
+                error_msg = json_data.get("error", {}).get("message", "Unknown RPC error")
+                self._report_progress(f"Window {request_id}: RPC error: {error_msg}")
+                return None, None
+
+            result = json_data["result"] or {}
+            rows = [(item["signature"], item.get("slot")) for item in result.get("data", []) if "signature" in item]
+            return rows, result.get("paginationToken")
+
+        return None, None
+
     async def _fetch_transactions_batch(self, signatures: List[str]) -> List[Dict[str, Any]]:
         """
         WAL-317a Part B: Batch fetch full transactions in parallel
@@ -629,9 +1139,10 @@ class BlockchainFetcherV3:
 
     async def _fetch_single_batch(self, batch_sigs: List[str], batch_num: int, total_batches: int) -> List[Dict[str, Any]]:
         """Fetch a single batch of transactions"""
-        # Retry logic for 429s
+        # Retry logic - 429s wait out Retry-After for the endpoint inside the
+        # concurrency controller, errors back off per request
         max_retries = 3
-        backoff_delays = [5, 10, 20]
+        error_delays = [1, 2, 4]
         
         for retry_count in range(max_retries + 1):
             try:
@@ -647,21 +1158,19 @@ class BlockchainFetcherV3:
                 if not self.session:
                     raise RuntimeError("Session not initialized")
                 
-                # Use semaphore-based rate limiter
-                async with self.helius_rate_limited_fetcher:
+                async with self.helius_rate_limited_fetcher.request("transactions") as outcome:
                     async with self.session.post(
                         url, params=params, json=body, timeout=ClientTimeout(total=60)
                     ) as resp:
+                        outcome.record(resp)
                         if resp.status == 429:
                             if retry_count < max_retries:
-                                wait_time = backoff_delays[retry_count]
-                                retry_after = int(resp.headers.get("Retry-After", str(wait_time)))
-                                self._report_progress(f"Batch {batch_num}: Rate limited, waiting {retry_after}s (retry {retry_count + 1}/{max_retries})...")
-                                await asyncio.sleep(retry_after)
+                                self._report_progress(f"Batch {batch_num}: Rate limited, retrying after {outcome.retry_after}s (retry {retry_count + 1}/{max_retries})...")
                                 continue
                             else:
                                 logger.error(f"Batch {batch_num}: Max retries exceeded on 429")
                                 self.metrics.parser_errors += 1
+                                self._fetch_failures += 1
                                 return []
                         
                         resp.raise_for_status()
@@ -680,18 +1189,19 @@ class BlockchainFetcherV3:
                         
                         # Report RPS
                         actual_rps = self.helius_rate_limited_fetcher.calculate_rps()
-                        self._report_progress(f"Batch {batch_num}/{total_batches}: {len(valid_transactions)}/{len(batch_sigs)} valid swaps (RPS: {actual_rps:.1f})")
+                        self._report_progress(f"Batch {batch_num}/{total_batches or '?'}: {len(valid_transactions)}/{len(batch_sigs)} valid swaps (RPS: {actual_rps:.1f})")
                         return valid_transactions
                         
             except Exception as e:
                 logger.error(f"Error fetching transaction batch {batch_num}: {e}")
                 self.metrics.parser_errors += 1
                 if retry_count < max_retries:
-                    wait_time = backoff_delays[retry_count]
+                    wait_time = error_delays[retry_count]
                     self._report_progress(f"Batch {batch_num}: Error, retrying in {wait_time}s...")
                     await asyncio.sleep(wait_time)
                 else:
                     self._report_progress(f"Batch {batch_num}: Failed after {max_retries} retries")
+                    self._fetch_failures += 1
                     return []
         
         return []
@@ -894,10 +1404,21 @@ class BlockchainFetcherV3:
 
         self._report_progress(f"Fetching metadata for {len(unique_mints)} tokens...")
 
-        # Batch requests
-        for batch_start in range(0, len(unique_mints), 100):
-            batch = list(unique_mints)[batch_start : batch_start + 100]
-            await self.helius_limiter.acquire()
+        metadata_map = await self._fetch_metadata_map(list(unique_mints))
+
+        # Update trades
+        for trade in trades:
+            if trade.token_in_mint in metadata_map:
+                trade.token_in_symbol = metadata_map[trade.token_in_mint].get("symbol", trade.token_in_mint[:8])
+            if trade.token_out_mint in metadata_map:
+                trade.token_out_symbol = metadata_map[trade.token_out_mint].get("symbol", trade.token_out_mint[:8])
+
+    async def _fetch_metadata_map(self, mints: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch Helius token metadata for mints in batches of 100, keyed by mint"""
+        metadata_map: Dict[str, Dict[str, Any]] = {}
+
+        for batch_start in range(0, len(mints), 100):
+            batch = mints[batch_start : batch_start + 100]
 
             try:
                 url = f"{HELIUS_BASE}/token-metadata"
@@ -906,118 +1427,78 @@ class BlockchainFetcherV3:
                 if not self.session:
                     raise RuntimeError("Session not initialized")
 
-                # Use semaphore-based rate limiter for token metadata requests
-                async with self.helius_rate_limited_fetcher:
+                async with self.helius_rate_limited_fetcher.request("token-metadata") as outcome:
                     async with self.session.post(
                         url, params=params, json={"mintAccounts": batch}, timeout=ClientTimeout(total=30)
                     ) as resp:
+                        outcome.record(resp)
                         if resp.status == 200:
                             metadata_list = await resp.json()
-
-                            # Create lookup
-                            metadata_map = {m["account"]: m for m in metadata_list if m}
-
-                            # Update trades
-                            for trade in trades:
-                                if trade.token_in_mint in metadata_map:
-                                    trade.token_in_symbol = metadata_map[trade.token_in_mint].get(
-                                        "symbol", trade.token_in_mint[:8]
-                                    )
-                                if trade.token_out_mint in metadata_map:
-                                    trade.token_out_symbol = metadata_map[trade.token_out_mint].get(
-                                        "symbol", trade.token_out_mint[:8]
-                                    )
+                            metadata_map.update({m["account"]: m for m in metadata_list if m})
 
             except Exception as e:
                 logger.error(f"Error fetching token metadata: {e}")
 
+        return metadata_map
+
     async def _fetch_prices_with_cache(self, trades: List[Trade]):
         """Task 5: Fetch prices with caching"""
         self._report_progress("Fetching prices...")
-        
-        # Count unique tokens needing prices
-        unique_tokens = set()
-        for trade in trades:
-            if trade.token_in_mint != SOL_MINT:
-                unique_tokens.add(trade.token_in_mint)
-            if trade.token_out_mint != SOL_MINT:
-                unique_tokens.add(trade.token_out_mint)
-        
-        self._report_progress(f"  - {len(trades)} trades have {len(unique_tokens)} unique tokens")
 
-        # Group by minute for efficient fetching
-        trades_by_minute: Dict[int, List[Trade]] = defaultdict(list)
-        for trade in trades:
-            minute_ts = int(trade.timestamp.timestamp() // 60) * 60
-            trades_by_minute[minute_ts].append(trade)
-        
-        self._report_progress(f"  - Grouped into {len(trades_by_minute)} time buckets")
+        # Plan every uncached (mint, bucket) need at once instead of one call per minute
+        plan = plan_prices(
+            trade_price_needs(trades),
+            lambda mint, bucket: self.price_cache.contains(mint, datetime.fromtimestamp(bucket)),
+            resolution=self.price_cache.resolution,
+        )
+        summary = plan.summary()
+        self.metrics.price_plan = summary
+        self._report_progress(
+            f"  - Price plan: {summary['needs']} needs ({summary['cached']} cached) in "
+            f"{summary['multi_price_calls']} multi_price + {summary['history_calls']} history calls "
+            f"(naive plan: {summary['naive_calls']} calls)"
+        )
 
-        # Track statistics
-        cache_hits = 0
-        cache_misses = 0
-        api_calls = 0
-        tokens_fetched = 0
+        if plan.calls:
+            if BIRDEYE_API_KEY:
+                await execute_plan(plan, self.price_cache, self._fetch_birdeye_prices, self._fetch_birdeye_history)
+            else:
+                self._report_progress("    - WARNING: No BIRDEYE_API_KEY set, skipping price fetch")
 
-        # Process each minute
-        for idx, (minute_ts, minute_trades) in enumerate(trades_by_minute.items()):
-            # Collect unique mints for this minute
-            mints_needed = set()
+        for trade in trades:
+            await self._apply_cached_prices(trade)
 
-            for trade in minute_trades:
-                # Check cache first
-                if trade.token_in_mint != SOL_MINT:
-                    cached_price = self.price_cache.get(trade.token_in_mint, trade.timestamp)
-                    if cached_price is None:
-                        mints_needed.add(trade.token_in_mint)
-                        cache_misses += 1
-                    else:
-                        cache_hits += 1
+        self._report_progress(f"  - Price fetching complete: {plan.calls} API calls, {summary['calls_saved']} saved")
 
-                if trade.token_out_mint != SOL_MINT:
-                    cached_price = self.price_cache.get(trade.token_out_mint, trade.timestamp)
-                    if cached_price is None:
-                        mints_needed.add(trade.token_out_mint)
-                        cache_misses += 1
-                    else:
-                        cache_hits += 1
+    async def _fetch_birdeye_history(self, call: HistoryCall) -> Optional[List[Dict[str, Any]]]:
+        """Fetch one mint's price series from Birdeye; None on failure"""
+        await self.birdeye_limiter.acquire()
+        try:
+            url = "https://public-api.birdeye.so/defi/history_price"
+            headers = {"X-API-KEY": BIRDEYE_API_KEY}
+            params = {
+                "address": call.mint,
+                "address_type": "token",
+                "type": call.interval,
+                "time_from": call.time_from,
+                "time_to": call.time_to,
+            }
 
-            # Fetch missing prices
-            if mints_needed:
-                api_calls += 1
-                tokens_fetched += len(mints_needed)
-                
-                if idx % 10 == 0:  # Log progress every 10 buckets
-                    self._report_progress(
-                        f"  - Progress: {idx+1}/{len(trades_by_minute)} buckets, "
-                        f"{api_calls} API calls, {tokens_fetched} tokens fetched"
-                    )
-                
-                prices = await self._fetch_birdeye_prices(minute_ts, list(mints_needed))
+            if not self.session:
+                raise RuntimeError("Session not initialized")
 
-                # Cache results
-                for mint, price in prices.items():
-                    self.price_cache.set(mint, datetime.fromtimestamp(minute_ts), price)
+            async with self.session.get(url, headers=headers, params=params, timeout=ClientTimeout(total=30)) as resp:
+                if resp.status != 200:
+                    self._report_progress(f"    - ERROR: Birdeye history returned status {resp.status}")
+                    return None
+                data = await resp.json()
+                if not data.get("success"):
+                    return None
+                return (data.get("data") or {}).get("items") or []
 
-            # Apply prices to trades
-            for trade in minute_trades:
-                await self._apply_cached_prices(trade)
-        
-        # Log final statistics
-        self._report_progress(f"  - Price fetching complete:")
-        self._report_progress(f"    - Cache hits: {cache_hits}")
-        self._report_progress(f"    - Cache misses: {cache_misses}")
-        
-        # Calculate cache hit rate, avoid division by zero
-        total_lookups = cache_hits + cache_misses
-        if total_lookups > 0:
-            hit_rate = (cache_hits / total_lookups) * 100
-            self._report_progress(f"    - Cache hit rate: {hit_rate:.1f}%")
-        else:
-            self._report_progress(f"    - Cache hit rate: N/A (no lookups)")
-            
-        self._report_progress(f"    - API calls made: {api_calls}")
-        self._report_progress(f"    - Total tokens fetched: {tokens_fetched}")
+        except Exception as e:
+            logger.error(f"Error fetching Birdeye price history for {call.mint}: {e}")
+            return None
 
     async def _fetch_birdeye_prices(self, timestamp: int, mints: List[str]) -> Dict[str, Optional[Decimal]]:
         """Fetch prices from Birdeye"""
@@ -1094,9 +1575,9 @@ class BlockchainFetcherV3:
                 dt = datetime.fromtimestamp(timestamp)
                 
                 for mint in batch:
-                    cached_price = self.price_cache.get(mint, dt)
-                    if cached_price is not None:
-                        all_prices[mint] = float(cached_price)
+                    if self.price_cache.contains(mint, dt):
+                        cached_price = self.price_cache.get(mint, dt)
+                        all_prices[mint] = float(cached_price) if cached_price is not None else None
                     else:
                         uncached_mints.append(mint)
                 
@@ -1105,8 +1586,8 @@ class BlockchainFetcherV3:
                     prices = await self._fetch_birdeye_prices(timestamp, uncached_mints)
                     
                     # Cache and store results
+                    self.price_cache.set_many(dt, prices)
                     for mint, price in prices.items():
-                        self.price_cache.set(mint, dt, price)
                         all_prices[mint] = float(price) if price is not None else None
         
         return all_prices
@@ -1147,49 +1628,32 @@ class BlockchainFetcherV3:
                 trade.priced = False
                 self.metrics.unpriced_rows += 1
 
-    def _calculate_pnl(self, trades: List[Trade]) -> List[Trade]:
-        """Calculate P&L using FIFO"""
+    def _calculate_pnl(self, trades: List[Trade], partial_history: bool = False) -> List[Trade]:
+        """Calculate P&L using FIFO
+
+        With partial_history (a bounded fetch of recent trades), a sell that is not
+        fully covered by buys in the window gets pnl_usd None rather than being
+        credited its whole proceeds.
+        """
         # Sort by timestamp
         sorted_trades = sorted(trades, key=lambda x: x.timestamp)
 
-        # Track positions by token
-        positions: Dict[str, List[Tuple[Decimal, Decimal]]] = defaultdict(list)  # token -> [(amount, cost_basis)]
+        # Open lots by token
+        ledgers: Dict[str, LotLedger] = defaultdict(LotLedger)
 
         for trade in sorted_trades:
             if trade.token_out_mint == SOL_MINT:
                 # Selling token
-                token = trade.token_in_mint
-                amount_to_sell = trade.token_in_amount
                 proceeds = trade.value_usd or Decimal("0")
-
-                cost_basis = Decimal("0")
-                remaining = amount_to_sell
-
-                # FIFO matching
-                while remaining > 0 and positions[token]:
-                    position_amount, position_cost = positions[token][0]
-
-                    if position_amount <= remaining:
-                        # Use entire position
-                        cost_basis += position_cost
-                        remaining -= position_amount
-                        positions[token].pop(0)
-                    else:
-                        # Use partial position
-                        used_fraction = remaining / position_amount
-                        cost_basis += position_cost * used_fraction
-                        positions[token][0] = (position_amount - remaining, position_cost * (1 - used_fraction))
-                        remaining = 0
-
-                trade.pnl_usd = proceeds - cost_basis if proceeds else Decimal("0")
+                fill = ledgers[trade.token_in_mint].sell(trade.token_in_amount)
+                if partial_history and fill.unmatched > 0:
+                    trade.pnl_usd = None
+                else:
+                    trade.pnl_usd = proceeds - fill.cost_basis_usd if proceeds else Decimal("0")
 
             else:
                 # Buying token
-                token = trade.token_out_mint
-                amount = trade.token_out_amount
-                cost = trade.value_usd or Decimal("0")
-
-                positions[token].append((amount, cost))
+                ledgers[trade.token_out_mint].buy(trade.token_out_amount, trade.value_usd)
                 trade.pnl_usd = Decimal("0")
 
         return sorted_trades
@@ -1197,8 +1661,8 @@ class BlockchainFetcherV3:
     def _create_response_envelope(self, wallet: str, trades: List[Trade], elapsed_time: float, signatures: Optional[List[str]] = None) -> Dict[str, Any]:
         """Task 6: Create response envelope"""
         # Calculate summary stats
-        total_pnl = sum(t.pnl_usd for t in trades)
-        winning_trades = [t for t in trades if t.pnl_usd > 0]
+        total_pnl = sum(t.pnl_usd for t in trades if t.pnl_usd is not None)
+        winning_trades = [t for t in trades if t.pnl_usd is not None and t.pnl_usd > 0]
         win_rate = len(winning_trades) / len(trades) * 100 if trades else 0
 
         # Get slot range
@@ -1227,19 +1691,23 @@ class BlockchainFetcherV3:
             "trades": [trade.to_dict() for trade in trades],
             "signatures": signatures or [],
         }
-        
+        if self.metrics.price_plan is not None:
+            envelope["summary"]["metrics"]["price_plan"] = self.metrics.price_plan
+
         return envelope
 
 
 
 # Convenience function
 def fetch_wallet_trades_v3(
-    wallet_address: str, progress_callback: Optional[Callable[[str], None]] = None
+    wallet_address: str,
+    progress_callback: Optional[Callable[[str], None]] = None,
+    sync_store: Optional[WalletSyncStore] = None,
 ) -> Dict[str, Any]:
     """Synchronous wrapper for async fetch"""
 
     async def _fetch():
-        async with BlockchainFetcherV3(progress_callback) as fetcher:
+        async with BlockchainFetcherV3(progress_callback, sync_store=sync_store) as fetcher:
             return await fetcher.fetch_wallet_trades(wallet_address)
 
     return asyncio.run(_fetch())
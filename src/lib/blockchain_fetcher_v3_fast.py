@@ -17,7 +17,6 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import List, Dict, Any, Optional, Set, Tuple, Callable
 from dataclasses import dataclass
-from collections import defaultdict
 import time
 import json
 
@@ -37,68 +36,31 @@ if not BIRDEYE_API_KEY:
 # Constants
 HELIUS_BASE = "https://api.helius.xyz/v0"
 HELIUS_RPC_BASE = "https://mainnet.helius-rpc.com"
-HELIUS_RPS = 50  # Updated for paid plan
-BIRDEYE_RPS = 1
 DUST_THRESHOLD = Decimal("0.0000001")
 SOL_MINT = "So11111111111111111111111111111111111111112"
 SIGNATURE_PAGE_LIMIT = 1000  # RPC supports up to 1000 signatures per page
 TX_BATCH_SIZE = 100  # Batch size for transaction fetching
+BOUNDED_WAVE_BATCHES = 4  # Transaction batches fetched per step of a bounded (limit) fetch
 
 logger = logging.getLogger(__name__)
 
 # Import base classes from V3
 from .blockchain_fetcher_v3 import (
-    Trade, Metrics, RateLimiter, PriceCache, 
+    Trade, Metrics, PriceCache,
     BlockchainFetcherV3, RateLimitedFetcher
 )
+from .http_session import get_http_session_pool
+from .price_planner import HistoryCall, plan_prices, execute_plan, trade_price_needs, get_price_bucket_sec
+from .price_store import PriceStore, get_price_store
+from .rate_scheduler import get_rate_scheduler
+from .trade_table import TradeTable
 
 
 class FastPriceCache(PriceCache):
-    """Enhanced price cache with batch fetching and persistence"""
-
-    def __init__(self):
-        super().__init__()
-        self.pending_fetches: Dict[int, Set[str]] = defaultdict(set)
-        self._load_cache()
-
-    def _load_cache(self):
-        """Load cache from disk if available"""
-        cache_file = ".price_cache.json"
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, "r") as f:
-                    data = json.load(f)
-                    # Convert back to proper types
-                    for key_str, value in data.items():
-                        mint, unix_minute = key_str.split("_")
-                        self.cache[(mint, int(unix_minute))] = Decimal(str(value)) if value else None
-            except:
-                pass
-
-    def save_cache(self):
-        """Persist cache to disk"""
-        cache_file = ".price_cache.json"
-        data = {}
-        for (mint, unix_minute), price in self.cache.items():
-            key = f"{mint}_{unix_minute}"
-            data[key] = float(price) if price else None
-        with open(cache_file, "w") as f:
-            json.dump(data, f)
-
-    def add_pending(self, mint: str, timestamp: datetime):
-        """Queue a price fetch"""
-        minute_ts = int(timestamp.timestamp() // 60) * 60
-        self.pending_fetches[minute_ts].add(mint)
-
-    def get_pending_batches(self) -> List[Tuple[int, List[str]]]:
-        """Get batches of pending price fetches"""
-        batches = []
-        for minute_ts, mints in self.pending_fetches.items():
-            # Birdeye allows up to 100 mints per call
-            mint_list = list(mints)
-            for i in range(0, len(mint_list), 100):
-                batches.append((minute_ts, mint_list[i : i + 100]))
-        return batches
+    """Price cache over the shared price store at the configured bucket resolution"""
+
+    def __init__(self, store: Optional[PriceStore] = None):
+        super().__init__(store if store is not None else get_price_store(), resolution=get_price_bucket_sec())
 
 
 class BlockchainFetcherV3Fast:
@@ -108,6 +70,7 @@ class BlockchainFetcherV3Fast:
         self,
         progress_callback: Optional[Callable[[str], None]] = None,
         skip_pricing: bool = False,
+        session: Optional[aiohttp.ClientSession] = None,
     ):
         # Check for required keys at runtime
         if not HELIUS_KEY:
@@ -116,25 +79,29 @@ class BlockchainFetcherV3Fast:
             raise ValueError("BIRDEYE_API_KEY environment variable is required for price fetching")
             
         self.progress_callback = progress_callback or (lambda x: logger.info(x))
-        self.helius_limiter = RateLimiter(HELIUS_RPS)
-        self.birdeye_limiter = RateLimiter(BIRDEYE_RPS)
+        self.helius_limiter = get_rate_scheduler("helius")
+        self.birdeye_limiter = get_rate_scheduler("birdeye")
         self.helius_rate_limited_fetcher = RateLimitedFetcher(max_concurrent=40)
-        self.session: Optional[aiohttp.ClientSession] = None
+        # Borrowed from the shared pool unless the caller passes its own
+        self.session: Optional[aiohttp.ClientSession] = session
+        self._pooled_session = session is None
         self.metrics = Metrics()
         self.price_cache = FastPriceCache()
         self.skip_pricing = skip_pricing
+        self._fetch_failures = 0  # Signature pages/transaction batches dropped on error
+        # Columnar copy of the last fetch's trades for PositionBuilder/aggregators
+        self.trade_table: Optional[TradeTable] = None
 
     async def __aenter__(self):
         # Use connection pooling
-        connector = aiohttp.TCPConnector(limit=40, limit_per_host=40)
-        self.session = aiohttp.ClientSession(connector=connector)
+        if self._pooled_session:
+            self.session = await get_http_session_pool().acquire()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
-        # Save price cache
-        self.price_cache.save_cache()
+        if self.session and self._pooled_session:
+            await get_http_session_pool().release(self.session)
+            self.session = None
 
     def _report_progress(self, message: str):
         """Report progress to callback"""
@@ -184,6 +151,7 @@ class BlockchainFetcherV3Fast:
 
         # Step 7: Calculate P&L
         final_trades = self._calculate_pnl(filtered_trades)
+        self.trade_table = TradeTable.from_trades(final_trades)
 
         # Log metrics
         self.metrics.log_summary(self._report_progress)
@@ -198,6 +166,95 @@ class BlockchainFetcherV3Fast:
         
         return response
 
+    async def fetch_recent_trades(self, wallet_address: str, limit: int) -> Dict[str, Any]:
+        """
+        Bounded fetch of the newest `limit` trades
+        
+        Walks signatures newest-first and stops paging once `limit` valid swaps
+        (after dedup and dust filter) are parsed, then prices only those. P&L is
+        matched within the returned window; `history_complete` says whether the
+        walk reached the wallet's first signature.
+        """
+        self._report_progress(f"Starting bounded fetch of {limit} trades for wallet: {wallet_address}")
+        start_time = time.time()
+        self.metrics = Metrics()
+        self._fetch_failures = 0
+        
+        trades: List[Trade] = []
+        seen: Set[str] = set()
+        transactions: List[Dict[str, Any]] = []
+        listed = 0  # Signatures returned by the RPC
+        scanned = 0  # Signatures whose transactions were fetched
+        page = 0
+        before_sig = None
+        reached_end = False
+        wave_size = TX_BATCH_SIZE * BOUNDED_WAVE_BATCHES
+        
+        while len(trades) < limit:
+            page += 1
+            signatures, next_before_sig = await self._fetch_signature_page(wallet_address, before_sig)
+            if not signatures:
+                reached_end = True
+                break
+            listed += len(signatures)
+            
+            # Signatures are newest-first, so every wave is older than the last
+            for i in range(0, len(signatures), wave_size):
+                wave = signatures[i:i + wave_size]
+                scanned += len(wave)
+                wave_txs = await self._fetch_transactions_batch(wave)
+                wave_trades = await self._extract_trades_with_dedup(wave_txs, wallet_address)
+                wave_trades = [t for t in wave_trades if t.signature not in seen]
+                seen.update(t.signature for t in wave_trades)
+                trades.extend(self._apply_dust_filter(wave_trades))
+                transactions.extend(wave_txs)
+                if len(trades) >= limit:
+                    break
+            
+            self._report_progress(f"Page {page}: {scanned} signatures scanned, {len(trades)} trades")
+            if not next_before_sig or len(signatures) < SIGNATURE_PAGE_LIMIT:
+                reached_end = True
+                break
+            before_sig = next_before_sig
+        
+        self.metrics.signatures_fetched = scanned
+        recent = sorted(trades, key=lambda t: t.timestamp, reverse=True)[:limit]
+        # Complete only if no older signatures were left, none were cut by the limit
+        # and no page or batch was dropped on the way (a failed page looks like the end)
+        history_complete = (
+            reached_end and scanned == listed and len(trades) <= limit and not self._fetch_failures
+        )
+        
+        await self._fetch_token_metadata_batch(recent)
+        
+        # Price only the trades we return
+        price_helius_only = os.getenv('PRICE_HELIUS_ONLY', '').lower() == 'true'
+        if not price_helius_only and not self.skip_pricing:
+            await self._fetch_prices_batch(recent)
+        
+        # Buys older than the window are unknown, so unmatched sells get no P&L
+        final_trades = self._calculate_pnl(recent, partial_history=True)
+        self.trade_table = TradeTable.from_trades(final_trades)
+        self.metrics.log_summary(self._report_progress)
+        
+        kept = {t.signature for t in final_trades}
+        # Same order as the trades, so slicing both with [:limit] keeps them aligned
+        response = self._create_response_envelope(
+            wallet_address, final_trades, time.time() - start_time,
+            [t.signature for t in final_trades],
+        )
+        response["limit"] = limit
+        response["history_complete"] = history_complete
+        if price_helius_only:
+            response['transactions'] = [tx for tx in transactions if tx.get("signature") in kept]
+        
+        self._report_progress(
+            f"Bounded fetch: {len(final_trades)} trades from {scanned} signatures in {page} pages"
+        )
+        if self._fetch_failures:
+            self._report_progress(f"Bounded fetch incomplete: {self._fetch_failures} pages/batches failed")
+        return response
+
     async def _fetch_all_signatures(self, wallet: str) -> List[str]:
         """Fetch all transaction signatures using RPC with 1000-sig pages"""
         all_signatures = []
@@ -245,37 +302,41 @@ class BlockchainFetcherV3Fast:
         }
 
         try:
-            async with self.helius_rate_limited_fetcher:
+            async with self.helius_rate_limited_fetcher.request("getSignaturesForAddress") as outcome:
                 async with self.session.post(url, headers=headers, json=body, timeout=ClientTimeout(total=30)) as resp:
+                    outcome.record(resp)
                     # Get raw response text first
                     resp_text = await resp.text()
                     
-                    if resp.status == 429:
-                        retry_after = int(resp.headers.get("Retry-After", "5"))
-                        await asyncio.sleep(retry_after)
-                        return await self._fetch_signature_page(wallet, before_sig)
-
-                    resp.raise_for_status()
+                    if resp.status != 429:
+                        resp.raise_for_status()
                     
-                    # Parse JSON from text we already have
-                    json_data = json.loads(resp_text)
-
-                    if "result" not in json_data:
-                        return [], None
+                        # Parse JSON from text we already have
+                        json_data = json.loads(resp_text)
+
+                        if "result" not in json_data:
+                            error_msg = json_data.get("error", {}).get("message", "Unknown RPC error")
+                            logger.error(f"RPC error fetching signatures: {error_msg}")
+                            self._fetch_failures += 1
+                            return [], None
                     
-                    result = json_data["result"]
-                    if not result:
-                        return [], None
+                        result = json_data["result"]
+                        if not result:
+                            return [], None
                     
-                    # Extract signatures
-                    signatures = [item["signature"] for item in result if "signature" in item]
+                        # Extract signatures
+                        signatures = [item["signature"] for item in result if "signature" in item]
                     
-                    # Get next before signature from last item
-                    next_before = result[-1]["signature"] if result else None
-                    return signatures, next_before
+                        # Get next before signature from last item
+                        next_before = result[-1]["signature"] if result else None
+                        return signatures, next_before
+
+            # Rate limited - the retry waits out Retry-After for this endpoint only
+            return await self._fetch_signature_page(wallet, before_sig)
                     
         except Exception as e:
             logger.error(f"Error fetching signatures: {e}")
+            self._fetch_failures += 1
             return [], None
 
     async def _fetch_transactions_batch(self, signatures: List[str]) -> List[Dict[str, Any]]:
@@ -315,30 +376,31 @@ class BlockchainFetcherV3Fast:
             params = {"api-key": HELIUS_KEY}
             body = {"transactions": batch_sigs}
             
-            async with self.helius_rate_limited_fetcher:
+            async with self.helius_rate_limited_fetcher.request("transactions") as outcome:
                 async with self.session.post(url, params=params, json=body, timeout=ClientTimeout(total=60)) as resp:
-                    if resp.status == 429:
-                        retry_after = int(resp.headers.get("Retry-After", "5"))
-                        await asyncio.sleep(retry_after)
-                        return await self._fetch_single_batch(batch_sigs, batch_num)
-                    
-                    resp.raise_for_status()
-                    batch_data = await resp.json()
+                    outcome.record(resp)
+                    if resp.status != 429:
+                        resp.raise_for_status()
+                        batch_data = await resp.json()
                     
-                    # Filter valid swap transactions
-                    valid_transactions = []
-                    for tx in batch_data:
-                        if tx and isinstance(tx, dict) and "signature" in tx:
-                            # Check if it's a SWAP transaction
-                            if "events" in tx and "swap" in tx.get("events", {}):
-                                valid_transactions.append(tx)
-                            elif "tokenTransfers" in tx and len(tx.get("tokenTransfers", [])) >= 2:
-                                valid_transactions.append(tx)
+                        # Filter valid swap transactions
+                        valid_transactions = []
+                        for tx in batch_data:
+                            if tx and isinstance(tx, dict) and "signature" in tx:
+                                # Check if it's a SWAP transaction
+                                if "events" in tx and "swap" in tx.get("events", {}):
+                                    valid_transactions.append(tx)
+                                elif "tokenTransfers" in tx and len(tx.get("tokenTransfers", [])) >= 2:
+                                    valid_transactions.append(tx)
                     
-                    return valid_transactions
+                        return valid_transactions
+
+            # Rate limited - the retry waits out Retry-After for this endpoint only
+            return await self._fetch_single_batch(batch_sigs, batch_num)
                     
         except Exception as e:
             logger.error(f"Error fetching transaction batch {batch_num}: {e}")
+            self._fetch_failures += 1
             return []
 
     async def _fetch_token_metadata_batch(self, trades: List[Trade]):
@@ -384,10 +446,11 @@ class BlockchainFetcherV3Fast:
             url = f"{HELIUS_BASE}/token-metadata"
             params = {"api-key": HELIUS_KEY}
 
-            async with self.helius_rate_limited_fetcher:
+            async with self.helius_rate_limited_fetcher.request("token-metadata") as outcome:
                 async with self.session.post(
                     url, params=params, json={"mintAccounts": mints}, timeout=ClientTimeout(total=30)
                 ) as resp:
+                    outcome.record(resp)
                     if resp.status == 200:
                         metadata_list = await resp.json()
                         return {m["account"]: m for m in metadata_list if m}
@@ -398,59 +461,37 @@ class BlockchainFetcherV3Fast:
         return {}
 
     async def _fetch_prices_batch(self, trades: List[Trade]):
-        """Fetch prices in optimized batches"""
+        """Fetch prices with the fewest Birdeye calls the planner can find"""
         self._report_progress("Collecting required prices...")
-        
-        # Count unique tokens to price
-        unique_mints = set()
-        cache_hits = 0
-        cache_misses = 0
-
-        # First pass: check cache and queue missing prices
-        for trade in trades:
-            for mint in [trade.token_in_mint, trade.token_out_mint]:
-                if mint == SOL_MINT:
-                    continue
-                unique_mints.add(mint)
-
-                cached = self.price_cache.get(mint, trade.timestamp)
-                if cached is None:
-                    cache_misses += 1
-                    self.price_cache.add_pending(mint, trade.timestamp)
-                else:
-                    cache_hits += 1
-
-        logger.info(f"[RCA] Unique mints: {len(unique_mints)}, Cache hits: {cache_hits}, Cache misses: {cache_misses}")
-
-        # Get batches to fetch
-        batches = self.price_cache.get_pending_batches()
 
-        if batches:
-            self._report_progress(f"Fetching {len(batches)} price batches...")
-            logger.info(f"[RCA] Created {len(batches)} Birdeye batches for {cache_misses} missing prices")
-            
+        plan = plan_prices(
+            trade_price_needs(trades),
+            lambda mint, bucket: self.price_cache.contains(mint, datetime.fromtimestamp(bucket)),
+            resolution=self.price_cache.resolution,
+        )
+        summary = plan.summary()
+        self.metrics.price_plan = summary
+        logger.info(f"[RCA] Price plan: {summary}")
+
+        if plan.calls:
+            self._report_progress(
+                f"Fetching prices in {plan.calls} calls (naive plan: {plan.naive_calls})..."
+            )
             batch_start = time.time()
-            batch_count = 0
-
-            # Fetch in controlled parallelism (respect rate limit)
-            for i in range(0, len(batches), 3):  # 3 parallel at most
-                batch_group = batches[i : i + 3]
-                group_start = time.time()
-                
-                tasks = [self._fetch_birdeye_batch(ts, mints, batch_num=i+j+1) for j, (ts, mints) in enumerate(batch_group)]
-                await asyncio.gather(*tasks, return_exceptions=True)
-                
-                batch_count += len(batch_group)
-                group_elapsed = time.time() - group_start
-                logger.info(f"[RCA] Batch group {i//3 + 1}: {len(batch_group)} batches in {group_elapsed:.2f}s")
-            
-            total_elapsed = time.time() - batch_start
-            logger.info(f"[RCA] All {batch_count} Birdeye batches completed in {total_elapsed:.2f}s")
+            # Controlled parallelism (respect rate limit)
+            await execute_plan(plan, self.price_cache, self._fetch_birdeye_batch, self._fetch_birdeye_history)
+            logger.info(f"[RCA] All {plan.calls} Birdeye calls completed in {time.time() - batch_start:.2f}s")
 
         # Apply cached prices
         for trade in trades:
             await self._apply_cached_prices(trade)
 
+    async def _fetch_birdeye_history(self, call: HistoryCall) -> Optional[List[Dict[str, Any]]]:
+        v3 = BlockchainFetcherV3()
+        v3.session = self.session
+        v3.birdeye_limiter = self.birdeye_limiter
+        return await v3._fetch_birdeye_history(call)
+
     async def _fetch_birdeye_batch(self, timestamp: int, mints: List[str], batch_num: int = 0) -> Dict[str, Optional[Decimal]]:
         """Fetch a batch of prices from Birdeye"""
         start_time = time.time()
@@ -479,17 +520,16 @@ class BlockchainFetcherV3Fast:
                     data = await resp.json()
                     if data.get("success") and data.get("data"):
                         # Cache all results
-                        ts_dt = datetime.fromtimestamp(timestamp)
-                        success_count = 0
+                        prices: Dict[str, Optional[Decimal]] = {}
                         for mint, price_data in data["data"].items():
                             if price_data and "value" in price_data:
-                                price = Decimal(str(price_data["value"]))
-                                self.price_cache.set(mint, ts_dt, price)
-                                success_count += 1
+                                prices[mint] = Decimal(str(price_data["value"]))
                             else:
-                                self.price_cache.set(mint, ts_dt, None)
-                        
+                                prices[mint] = None
+                        success_count = sum(1 for price in prices.values() if price is not None)
+
                         logger.info(f"[RCA] Batch {batch_num}: Priced {success_count}/{len(mints)} tokens")
+                        return prices
                 elif resp.status == 429:
                     retry_after = resp.headers.get("Retry-After", "unknown")
                     logger.warning(f"[RCA] Batch {batch_num}: Rate limited! Retry-After: {retry_after}")
@@ -527,9 +567,9 @@ class BlockchainFetcherV3Fast:
         v3.metrics = self.metrics
         return await v3._apply_cached_prices(trade)
 
-    def _calculate_pnl(self, trades):
+    def _calculate_pnl(self, trades, partial_history=False):
         v3 = BlockchainFetcherV3()
-        return v3._calculate_pnl(trades)
+        return v3._calculate_pnl(trades, partial_history)
 
     def _create_response_envelope(self, wallet, trades, elapsed, signatures=None):
         v3 = BlockchainFetcherV3()
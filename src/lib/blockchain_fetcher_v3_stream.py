@@ -49,6 +49,9 @@ class BlockchainFetcherV3Stream(BlockchainFetcherV3):
         """
         Fetch and yield trades for a wallet in streaming fashion
         
+        Trades are emitted newest first as each signature page's transaction
+        batches are parsed, while later pages are still being fetched.
+        
         Yields:
             Dict with event type and data:
             - {"type": "progress", "data": {"message": str, "percentage": float}}
@@ -78,56 +81,60 @@ class BlockchainFetcherV3Stream(BlockchainFetcherV3):
                 }
             }
             
-            # Step 1: Fetch signatures with progress updates
-            step_start = time.time()
-            signatures = []
-            async for sig_batch in self._fetch_signatures_stream(wallet_address):
-                signatures.extend(sig_batch)
-                self._total_signatures = len(signatures)
-                
-                yield {
-                    "type": STREAM_EVENT_PROGRESS,
-                    "data": {
-                        "message": f"Fetched {len(signatures)} signatures",
-                        "percentage": min(len(signatures) / 10000 * 20, 20),  # Cap at 20% for signatures
-                        "step": "fetching_signatures",
-                        "signatures_count": len(signatures)
-                    }
-                }
-            
-            step_times['fetch_signatures'] = time.time() - step_start
-            
-            # Step 2: Fetch transactions in batches and yield trades
+            # Steps 1+2: page signatures in the background while each page's
+            # transactions are fetched, parsed and emitted newest first
             step_start = time.time()
+            signature_pages: asyncio.Queue = asyncio.Queue()
+            pager = asyncio.create_task(self._page_signatures(wallet_address, signature_pages, step_times))
+            signatures_count = 0
             all_trades = []
             batch_num = 0
             
-            async for tx_batch in self._fetch_transactions_stream(signatures):
-                # Extract trades from this batch of transactions
-                trades = await self._extract_trades_with_dedup(tx_batch, wallet_address)
-                
-                if trades:
-                    all_trades.extend(trades)
+            try:
+                while True:
+                    page_signatures = await signature_pages.get()
+                    if page_signatures is None:
+                        break
+                    signatures_count += len(page_signatures)
+                    self._total_signatures = signatures_count
                     
-                    # Yield trades in configured batch sizes
-                    while len(trades) >= self.batch_size:
-                        batch_to_yield = trades[:self.batch_size]
-                        trades = trades[self.batch_size:]
-                        batch_num += 1
+                    yield {
+                        "type": STREAM_EVENT_PROGRESS,
+                        "data": {
+                            "message": f"Fetched {signatures_count} signatures",
+                            "percentage": min(signatures_count / 10000 * 20, 20),  # Cap at 20% for signatures
+                            "step": "fetching_signatures",
+                            "signatures_count": signatures_count
+                        }
+                    }
+                    
+                    async for tx_batch in self._fetch_transactions_stream(page_signatures):
+                        # Extract trades from this batch of transactions
+                        trades = await self._extract_trades_with_dedup(tx_batch, wallet_address)
+                        if not trades:
+                            continue
                         
-                        # Convert to dict format
-                        trades_dict = [t.to_dict() for t in batch_to_yield]
+                        # Pages and batches arrive newest first; keep that order within a batch
+                        trades.sort(key=lambda t: (t.slot, t.timestamp), reverse=True)
+                        all_trades.extend(trades)
+                        if 'first_trade' not in step_times:
+                            step_times['first_trade'] = time.time() - start_time
                         
-                        yield {
-                            "type": STREAM_EVENT_TRADES,
-                            "data": {
-                                "trades": trades_dict,
-                                "batch_num": batch_num,
-                                "total_yielded": self._yielded_trades + len(batch_to_yield)
+                        # Emit right away, at most batch_size trades per event
+                        for i in range(0, len(trades), self.batch_size):
+                            batch_to_yield = trades[i:i + self.batch_size]
+                            batch_num += 1
+                            
+                            yield {
+                                "type": STREAM_EVENT_TRADES,
+                                "data": {
+                                    "trades": [t.to_dict() for t in batch_to_yield],
+                                    "batch_num": batch_num,
+                                    "total_yielded": self._yielded_trades + len(batch_to_yield)
+                                }
                             }
-                        }
-                        
-                        self._yielded_trades += len(batch_to_yield)
+                            
+                            self._yielded_trades += len(batch_to_yield)
                         
                         # Progress update
                         progress = 20 + (self._yielded_trades / max(self._total_signatures, 1)) * 40
@@ -140,20 +147,12 @@ class BlockchainFetcherV3Stream(BlockchainFetcherV3):
                                 "trades_count": self._yielded_trades
                             }
                         }
-            
-            # Yield any remaining trades
-            if trades:
-                batch_num += 1
-                trades_dict = [t.to_dict() for t in trades]
-                yield {
-                    "type": STREAM_EVENT_TRADES,
-                    "data": {
-                        "trades": trades_dict,
-                        "batch_num": batch_num,
-                        "total_yielded": self._yielded_trades + len(trades)
-                    }
-                }
-                self._yielded_trades += len(trades)
+                
+                # Surface paging errors
+                await pager
+            finally:
+                if not pager.done():
+                    pager.cancel()
             
             step_times['fetch_transactions'] = time.time() - step_start
             
@@ -266,12 +265,21 @@ class BlockchainFetcherV3Stream(BlockchainFetcherV3):
                 "data": {"error": str(e)}
             }
     
+    async def _page_signatures(self, wallet: str, pages: asyncio.Queue, step_times: Dict[str, float]):
+        """Walk signature pages onto a queue; None marks the end"""
+        step_start = time.time()
+        try:
+            async for page_signatures in self._fetch_signatures_stream(wallet):
+                await pages.put(page_signatures)
+        finally:
+            step_times['fetch_signatures'] = time.time() - step_start
+            await pages.put(None)
+    
     async def _fetch_signatures_stream(self, wallet: str) -> AsyncGenerator[List[str], None]:
-        """Fetch signatures and yield them in batches"""
+        """Fetch signatures and yield them page by page, newest first"""
         page = 0
         consecutive_empty_pages = 0
         before_sig = None
-        batch_signatures = []
         
         while True:
             page += 1
@@ -286,21 +294,14 @@ class BlockchainFetcherV3Stream(BlockchainFetcherV3):
             )
             
             if hit_rate_limit:
-                # Simple exponential backoff
-                wait_time = min(5 * (2 ** min(page // 10, 3)), 20)
-                await asyncio.sleep(wait_time)
-                page -= 1  # Retry same page
+                # Retry same page - the request waits out the endpoint's Retry-After
+                page -= 1
                 continue
             
             if signatures:
-                batch_signatures.extend(signatures)
                 consecutive_empty_pages = 0
                 self.metrics.signatures_fetched += len(signatures)
-                
-                # Yield batch when we have enough
-                if len(batch_signatures) >= 1000:
-                    yield batch_signatures
-                    batch_signatures = []
+                yield signatures
             else:
                 consecutive_empty_pages += 1
                 if consecutive_empty_pages > 5:
@@ -312,16 +313,12 @@ class BlockchainFetcherV3Stream(BlockchainFetcherV3):
             else:
                 # No more pages
                 break
-        
-        # Yield any remaining signatures
-        if batch_signatures:
-            yield batch_signatures
     
     async def _fetch_transactions_stream(self, signatures: List[str]) -> AsyncGenerator[List[Dict[str, Any]], None]:
-        """Fetch transactions in batches and yield them"""
+        """Fetch transactions in batches and yield each batch in signature order as soon as it lands"""
         total_batches = (len(signatures) + TX_BATCH_SIZE - 1) // TX_BATCH_SIZE
         
-        # Process in chunks to yield results faster
+        # Up to chunk_size batches are in flight at once
         chunk_size = min(self.parallel_pages, 40)
         
         for batch_idx in range(0, len(signatures), TX_BATCH_SIZE * chunk_size):
@@ -335,19 +332,18 @@ class BlockchainFetcherV3Stream(BlockchainFetcherV3):
                 batch_sigs = chunk_sigs[i:sigs_end]
                 batch_num = (batch_idx + i) // TX_BATCH_SIZE + 1
                 
-                task = self._fetch_single_batch(batch_sigs, batch_num, total_batches)
-                tasks.append(task)
-            
-            # Fetch chunk in parallel
-            chunk_results = await asyncio.gather(*tasks)
-            
-            # Yield all transactions from this chunk
-            chunk_transactions = []
-            for transactions in chunk_results:
-                chunk_transactions.extend(transactions)
+                tasks.append(asyncio.ensure_future(self._fetch_single_batch(batch_sigs, batch_num, total_batches)))
             
-            if chunk_transactions:
-                yield chunk_transactions
+            try:
+                # Fetched in parallel, yielded in order so the newest trades go out first
+                for task in tasks:
+                    transactions = await task
+                    if transactions:
+                        yield transactions
+            finally:
+                for task in tasks:
+                    if not task.done():
+                        task.cancel()
     
     def _calculate_summary(self, wallet: str, trades: List[Trade], elapsed_time: float) -> Dict[str, Any]:
         """Calculate summary statistics"""
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Byte Budget Cache - Size-aware in-memory cache tier with a group index
+The in-memory fallbacks of the position and market cap caches used to bound
+themselves by entry count, although one whale snapshot can be hundreds of KB
+while a market cap entry is under 200 bytes. This cache is bounded by an
+estimate of the RAM its entries hold, so capacity can be set in bytes.
+
+Eviction is GDSF (Greedy-Dual-Size-Frequency): each entry has priority
+    H = L + frequency / size
+and the lowest H is evicted first, L being raised to the evicted priority.
+Small, frequently read entries stay; large, rarely read ones go first, and the
+inflating L ages out entries that were popular once. Ties go to the oldest
+write, so equally sized, equally used entries evict in LRU order.
+
+An optional group function maps keys to a group (e.g. the wallet), so a whole
+group can be dropped in O(k) for k keys instead of scanning the cache.
+"""
+
+import sys
+import time
+import heapq
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+# Per-entry bookkeeping beyond key and value: entry list, dict slot, heap tuple
+ENTRY_OVERHEAD_BYTES = 240
+
+
+def estimate_size(key: str, value: Any) -> int:
+    """Approximate bytes held by one entry"""
+    return sys.getsizeof(key) + sys.getsizeof(value) + ENTRY_OVERHEAD_BYTES
+
+
+class ByteBudgetCache:
+    """GDSF cache bounded by bytes (and optionally entry count) with TTL per entry"""
+
+    def __init__(
+        self,
+        max_bytes: int,
+        max_size: Optional[int] = None,
+        group_of: Optional[Callable[[str], Optional[str]]] = None,
+    ):
+        # key -> [value, expiry, created_at, size, frequency, priority, seq]
+        self.cache: Dict[str, List[Any]] = {}
+        self.max_bytes = max_bytes
+        self.max_size = max_size
+        self.group_of = group_of
+        self.groups: Dict[str, Set[str]] = {}
+        self.bytes = 0
+        self.evictions = 0
+        self._heap: List[Tuple[float, int, str]] = []
+        self._inflation = 0.0  # GDSF "L"
+        self._seq = 0
+        self._lock = threading.RLock()
+        self.metrics = {"hits": 0, "misses": 0, "expirations": 0, "evicted_bytes": 0, "rejected": 0}
+
+    def get_entry(self, key: str, now: Optional[float] = None) -> Optional[Tuple[Any, float]]:
+        """Get value with its age in seconds"""
+        current_time = now or time.time()
+        with self._lock:
+            entry = self.cache.get(key)
+            if entry is None:
+                self.metrics["misses"] += 1
+                return None
+            value, expiry, created_at = entry[0], entry[1], entry[2]
+
+            # Check if expired
+            if current_time > expiry:
+                self._remove(key)
+                self.metrics["expirations"] += 1
+                self.metrics["misses"] += 1
+                return None
+
+            self.metrics["hits"] += 1
+            entry[4] += 1
+            self._push(key, entry)
+        return (value, current_time - created_at)
+
+    def age(self, key: str, now: Optional[float] = None) -> Optional[float]:
+        """Age in seconds of a live entry, without counting a read"""
+        current_time = now or time.time()
+        with self._lock:
+            entry = self.cache.get(key)
+            if entry is None or current_time > entry[1]:
+                return None
+            return current_time - entry[2]
+
+    def set(self, key: str, value: Any, ttl_seconds: int, now: Optional[float] = None):
+        """Set value with TTL, then evict until back within budget"""
+        current_time = now or time.time()
+        size = estimate_size(key, value)
+        with self._lock:
+            old = self.cache.get(key)
+            frequency = old[4] if old is not None else 1
+            if old is not None:
+                self._remove(key)
+            if size > self.max_bytes:
+                # Would evict everything else and still not fit
+                self.metrics["rejected"] += 1
+                return
+            entry = [value, current_time + ttl_seconds, current_time, size, frequency, 0.0, 0]
+            self.cache[key] = entry
+            self.bytes += size
+            if self.group_of is not None:
+                group = self.group_of(key)
+                if group is not None:
+                    self.groups.setdefault(group, set()).add(key)
+            self._push(key, entry)
+            self._evict(keep=key)
+
+    def delete(self, key: str) -> bool:
+        """Delete a key"""
+        with self._lock:
+            if key in self.cache:
+                self._remove(key)
+                return True
+            return False
+
+    def delete_group(self, group: str) -> int:
+        """Delete every key in a group"""
+        with self._lock:
+            keys = list(self.groups.get(group, ()))
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def keys(self) -> List[str]:
+        """Snapshot of current keys"""
+        with self._lock:
+            return list(self.cache.keys())
+
+    def _push(self, key: str, entry: List[Any]):
+        """Recompute an entry's priority; superseded heap items are skipped lazily"""
+        self._seq += 1
+        entry[5] = self._inflation + entry[4] / entry[3]
+        entry[6] = self._seq
+        heapq.heappush(self._heap, (entry[5], entry[6], key))
+        if len(self._heap) > 2 * len(self.cache) + 64:
+            self._heap = [(e[5], e[6], k) for k, e in self.cache.items()]
+            heapq.heapify(self._heap)
+
+    def _evict(self, keep: str):
+        """Evict lowest-priority entries until within byte and entry budgets"""
+        kept = None  # The entry just written is never its own victim
+        while self.bytes > self.max_bytes or (self.max_size is not None and len(self.cache) > self.max_size):
+            if not self._heap:
+                break
+            priority, seq, key = item = heapq.heappop(self._heap)
+            entry = self.cache.get(key)
+            if entry is None or entry[6] != seq:
+                continue
+            if key == keep:
+                kept = item
+                continue
+            self._inflation = priority
+            self.metrics["evicted_bytes"] += entry[3]
+            self._remove(key)
+            self.evictions += 1
+        if kept is not None:
+            heapq.heappush(self._heap, kept)
+
+    def _remove(self, key: str):
+        entry = self.cache.pop(key)
+        self.bytes -= entry[3]
+        if self.group_of is not None:
+            group = self.group_of(key)
+            keys = self.groups.get(group)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.groups[group]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            lookups = self.metrics["hits"] + self.metrics["misses"]
+            return {
+                **self.metrics,
+                "entries": len(self.cache),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "max_size": self.max_size,
+                "evictions": self.evictions,
+                "groups": len(self.groups),
+                "hit_rate_pct": self.metrics["hits"] / lookups * 100 if lookups else 0,
+            }
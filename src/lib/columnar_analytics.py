@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Columnar Analytics - NumPy backend for WalletSummaryAggregator and TradeAnalyticsAggregator
+Trades are loaded once into arrays (epoch seconds, float64 USD values and
+amounts, integer token/DEX codes) and every metric is computed with masks and
+bincount group-bys instead of repeated Python passes over dicts.
+
+Tolerance: USD figures are float64 sums instead of Decimal sums. After the
+aggregators' 2-decimal formatting they agree with the Decimal path to within
+ANALYTICS_TOLERANCE_USD (one cent), with relative error around 1e-12 before
+rounding. Per-token average prices are means rather than running averages
+and match to float rounding. Counts, win rates, hours and DEX/token rankings
+match exactly.
+"""
+
+import os
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any, Tuple
+
+from src.lib.trade_table import TradeTable
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_TOLERANCE_USD = 0.01
+HOUR_BUCKET_SECONDS = 900  # UTC offsets are whole quarter hours
+
+
+def get_analytics_backend() -> str:
+    """Get analytics backend: "python" (Decimal/float loops) or "numpy" (columnar)"""
+    backend = os.getenv("ANALYTICS_BACKEND", "python").lower()
+    if backend == "numpy" and not NUMPY_AVAILABLE:
+        logger.warning("ANALYTICS_BACKEND=numpy but numpy is not installed, using python")
+        return "python"
+    return backend
+
+
+def _factorize(values: List[Any]) -> Tuple["np.ndarray", List[Any]]:
+    """Integer codes plus labels, labels in order of first appearance"""
+    index: Dict[Any, int] = {}
+    codes = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.int64, count=len(values))
+    return codes, list(index)
+
+
+def _first_rank(codes: "np.ndarray", ranks: "np.ndarray", size: int) -> "np.ndarray":
+    """Smallest rank (position in a given ordering) at which each code appears"""
+    first = np.full(size, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(first, codes, ranks)
+    return first
+
+
+def _most_common(codes: "np.ndarray", ranks: "np.ndarray", size: int) -> int:
+    """Code with the highest count; ties go to the code seen first, like max() over an insertion-ordered dict"""
+    counts = np.bincount(codes, minlength=size)
+    candidates = np.flatnonzero(counts == counts.max())
+    first = _first_rank(codes, ranks, size)
+    return int(candidates[np.argmin(first[candidates])])
+
+
+def _local_hours(epochs: "np.ndarray") -> "np.ndarray":
+    """Local-time hour of each epoch, as datetime.fromtimestamp(ts).hour gives
+
+    The local offset is looked up once per quarter-hour bucket rather than per trade.
+    """
+    buckets = np.floor(epochs / HOUR_BUCKET_SECONDS).astype(np.int64)
+    unique, inverse = np.unique(buckets, return_inverse=True)
+    bucket_hours = np.array(
+        [datetime.fromtimestamp(int(b) * HOUR_BUCKET_SECONDS).hour for b in unique], dtype=np.int64
+    )
+    return bucket_hours[inverse]
+
+
+def _table_amounts(units: List[int], decimals) -> "np.ndarray":
+    """float64 token amounts from base units and per-row decimals"""
+    return np.array(units, dtype=np.float64) / np.power(10.0, np.asarray(decimals, dtype=np.float64))
+
+
+def _table_codes(table: TradeTable) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """(is_sell mask, traded token mint IDs, SOL-side amounts) straight from table columns"""
+    in_ids = np.asarray(table.in_mint_ids, dtype=np.int64)
+    out_ids = np.asarray(table.out_mint_ids, dtype=np.int64)
+    is_sell = out_ids == table.sol_id
+    token_ids = np.where(in_ids != table.sol_id, in_ids, out_ids)
+    sol_amounts = np.where(
+        in_ids == table.sol_id,
+        _table_amounts(table.in_amounts, table.in_decimals),
+        np.where(is_sell, _table_amounts(table.out_amounts, table.out_decimals), 0.0),
+    )
+    return is_sell, token_ids, sol_amounts
+
+
+def _symbol_codes(table: TradeTable, token_ids: "np.ndarray") -> Tuple["np.ndarray", List[str]]:
+    """Regroup mint IDs by symbol (the aggregators key tokens by symbol)"""
+    mint_codes, symbol_labels = _factorize(table.mints.symbols)
+    codes = mint_codes[token_ids]
+    # Keep labels in order of first appearance among the trades
+    used, first_idx = np.unique(codes, return_index=True)
+    order = used[np.argsort(first_idx, kind="stable")]
+    remap = np.zeros(len(symbol_labels), dtype=np.int64)
+    remap[order] = np.arange(len(order))
+    return remap[codes], [symbol_labels[c] for c in order]
+
+
+def _optional_floats(values: List[Any]) -> Tuple["np.ndarray", "np.ndarray"]:
+    """float64 values and a validity mask for a column of Optional numbers"""
+    data = np.fromiter((float(v) if v is not None else 0.0 for v in values), dtype=np.float64, count=len(values))
+    valid = np.fromiter((v is not None for v in values), dtype=bool, count=len(values))
+    return data, valid
+
+
+class WalletSummaryArrays:
+    """WalletSummaryAggregator inputs as arrays"""
+
+    def __init__(self, is_buy, is_sell, pnl, values, prices, token_codes, token_labels,
+                 epochs, dex_codes, dex_labels, raw_timestamps):
+        self.is_buy = is_buy
+        self.is_sell = is_sell
+        self.pnl = pnl
+        self.values = values
+        self.prices = prices
+        self.token_codes = token_codes
+        self.token_labels = token_labels
+        self.epochs = epochs
+        self.dex_codes = dex_codes
+        self.dex_labels = dex_labels
+        self.raw_timestamps = raw_timestamps  # Echoed back for first/last trade
+
+    def __len__(self) -> int:
+        return len(self.epochs)
+
+    @classmethod
+    def from_columns(cls, cols) -> "WalletSummaryArrays":
+        """Arrays from wallet_summary_aggregator.SummaryColumns; raises if timestamps are not numeric"""
+        actions = np.array(cols.actions, dtype=object)
+        token_codes, token_labels = _factorize(cols.tokens)
+        dex_codes, dex_labels = _factorize(cols.dexes)
+        return cls(
+            is_buy=actions == "buy",
+            is_sell=actions == "sell",
+            pnl=np.asarray(cols.pnl, dtype=np.float64),
+            values=np.asarray(cols.values, dtype=np.float64),
+            prices=np.asarray(cols.prices, dtype=np.float64),
+            token_codes=token_codes,
+            token_labels=token_labels,
+            epochs=np.asarray(cols.timestamps, dtype=np.float64),
+            dex_codes=dex_codes,
+            dex_labels=dex_labels,
+            raw_timestamps=cols.timestamps,
+        )
+
+    @classmethod
+    def from_table(cls, table: TradeTable) -> "WalletSummaryArrays":
+        """Arrays read directly from TradeTable columns"""
+        is_sell, token_ids, _ = _table_codes(table)
+        token_codes, token_labels = _symbol_codes(table, token_ids)
+        dex_codes, dex_labels = _factorize(table.dexes)
+        values, _ = _optional_floats(table.value_usd)
+        prices, _ = _optional_floats(table.price_usd)
+        return cls(
+            is_buy=~is_sell,
+            is_sell=is_sell,
+            pnl=np.fromiter((float(v) for v in table.pnl_usd), dtype=np.float64, count=len(table)),
+            values=values,
+            prices=prices,
+            token_codes=token_codes,
+            token_labels=token_labels,
+            epochs=np.asarray(table.timestamps, dtype=np.float64),
+            dex_codes=dex_codes,
+            dex_labels=dex_labels,
+            raw_timestamps=table.timestamps,
+        )
+
+
+def summarize_wallet(arrays: WalletSummaryArrays, include_windows: bool, max_tokens: int,
+                     now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Compute every WalletSummaryAggregator section (before size trimming)"""
+    n = len(arrays)
+    order = np.argsort(arrays.epochs, kind="stable")
+    ranks = np.empty(n, dtype=np.int64)
+    ranks[order] = np.arange(n)
+    first_i, last_i = int(order[0]), int(order[-1])
+
+    summary = {
+        "wallet_summary": {
+            "total_trades": n,
+            "first_trade": arrays.raw_timestamps[first_i],
+            "last_trade": arrays.raw_timestamps[last_i],
+            "unique_tokens": len(arrays.token_labels),
+            "unique_dexes": len(arrays.dex_labels),
+        }
+    }
+
+    # P&L and win rate over sell trades
+    sell_pnl = arrays.pnl[arrays.is_sell]
+    gains = sell_pnl[sell_pnl > 0]
+    losses = sell_pnl[sell_pnl < 0]
+    positive_pnl = float(gains.sum())
+    negative_pnl = float(losses.sum())
+    profit_factor = abs(positive_pnl / negative_pnl) if negative_pnl != 0 else float("inf")
+    summary["pnl_analysis"] = {
+        "total_realized_pnl_usd": f"{float(sell_pnl.sum()):.2f}",
+        "total_gains_usd": f"{positive_pnl:.2f}",
+        "total_losses_usd": f"{negative_pnl:.2f}",
+        "profit_factor": "inf" if profit_factor == float("inf") else f"{profit_factor:.2f}",
+        "largest_win_usd": f"{float(gains.max()) if len(gains) else 0:.2f}",
+        "largest_loss_usd": f"{float(losses.min()) if len(losses) else 0:.2f}",
+        "sell_trades_count": len(sell_pnl),
+    }
+
+    if len(sell_pnl):
+        breakeven = len(sell_pnl) - len(gains) - len(losses)
+        summary["win_rate"] = {
+            "overall_win_rate": f"{len(gains) / len(sell_pnl) * 100:.2f}",
+            "winning_trades": len(gains),
+            "losing_trades": len(losses),
+            "breakeven_trades": breakeven,
+        }
+    else:
+        summary["win_rate"] = {
+            "overall_win_rate": "0.00",
+            "winning_trades": 0,
+            "losing_trades": 0,
+            "breakeven_trades": 0,
+        }
+
+    buy_count = int(arrays.is_buy.sum())
+    sell_count = int(arrays.is_sell.sum())
+    summary["trade_volume"] = {
+        "total_volume_usd": f"{float(arrays.values.sum()):.2f}",
+        "buy_volume_usd": f"{float(arrays.values[arrays.is_buy].sum()):.2f}",
+        "sell_volume_usd": f"{float(arrays.values[arrays.is_sell].sum()):.2f}",
+        "buy_count": buy_count,
+        "sell_count": sell_count,
+        "buy_sell_ratio": f"{buy_count/sell_count:.2f}" if sell_count > 0 else "inf",
+    }
+
+    summary["token_breakdown"] = _token_breakdown(arrays, max_tokens)
+
+    if include_windows:
+        now = now or datetime.now()
+        summary["recent_windows"] = {
+            "last_7_days": _summary_window(arrays, int((now - timedelta(days=7)).timestamp())),
+            "last_30_days": _summary_window(arrays, int((now - timedelta(days=30)).timestamp())),
+        }
+
+    hours = _local_hours(arrays.epochs)
+    days_active = max((float(arrays.epochs[last_i]) - float(arrays.epochs[first_i])) / 86400, 1)
+    summary["trading_patterns"] = {
+        "most_active_hour_utc": _most_common(hours, ranks, 24),
+        "avg_trades_per_day": f"{n / days_active:.1f}",
+        "favorite_dex": arrays.dex_labels[_most_common(arrays.dex_codes, ranks, len(arrays.dex_labels))],
+    }
+    return summary
+
+
+def _token_breakdown(arrays: WalletSummaryArrays, max_tokens: int) -> List[Dict[str, Any]]:
+    """Per-token group-by, sorted by absolute realized P&L"""
+    codes = arrays.token_codes
+    size = len(arrays.token_labels)
+
+    def by_token(weights=None, mask=None):
+        if mask is None:
+            return np.bincount(codes, weights=weights, minlength=size)
+        return np.bincount(codes[mask], weights=None if weights is None else weights[mask], minlength=size)
+
+    trades = by_token()
+    buy_count = by_token(mask=arrays.is_buy)
+    sell_count = by_token(mask=arrays.is_sell)
+    volume = by_token(arrays.values)
+    realized = by_token(arrays.pnl, arrays.is_sell)
+    wins = by_token(mask=arrays.is_sell & (arrays.pnl > 0))
+    buy_price_sum = by_token(arrays.prices, arrays.is_buy)
+    sell_price_sum = by_token(arrays.prices, arrays.is_sell)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        win_rate = np.where(sell_count > 0, wins / sell_count * 100, 0.0)
+        avg_buy = np.where(buy_count > 0, buy_price_sum / buy_count, 0.0)
+        avg_sell = np.where(sell_count > 0, sell_price_sum / sell_count, 0.0)
+
+    token_list = []
+    for code, symbol in enumerate(arrays.token_labels):
+        token_list.append({
+            "symbol": symbol,
+            "trades": int(trades[code]),
+            "realized_pnl_usd": f"{float(realized[code]):.2f}",
+            "win_rate": f"{float(win_rate[code]):.1f}",
+            "volume_usd": f"{float(volume[code]):.2f}",
+            "buy_count": int(buy_count[code]),
+            "sell_count": int(sell_count[code]),
+            "avg_buy_price_usd": f"{float(avg_buy[code]):.6f}" if avg_buy[code] > 0 else "0",
+            "avg_sell_price_usd": f"{float(avg_sell[code]):.6f}" if avg_sell[code] > 0 else "0",
+        })
+
+    token_list.sort(key=lambda x: abs(float(x["realized_pnl_usd"])), reverse=True)
+    return token_list[:max_tokens]
+
+
+def _summary_window(arrays: WalletSummaryArrays, since_ts: int) -> Dict[str, Any]:
+    in_window = arrays.epochs >= since_ts
+    return {
+        "trades": int(in_window.sum()),
+        "pnl_usd": f"{float(arrays.pnl[in_window & arrays.is_sell].sum()):.2f}",
+        "volume_usd": f"{float(arrays.values[in_window].sum()):.2f}",
+    }
+
+
+class TradeAnalyticsArrays:
+    """TradeAnalyticsAggregator inputs as arrays"""
+
+    def __init__(self, is_sell, pnl, pnl_valid, values, value_valid, sol_amounts,
+                 token_codes, token_labels, datetimes):
+        self.is_sell = is_sell
+        self.pnl = pnl
+        self.pnl_valid = pnl_valid
+        self.values = values
+        self.value_valid = value_valid
+        self.sol_amounts = sol_amounts
+        self.token_codes = token_codes
+        self.token_labels = token_labels
+        # Parsed datetimes are kept for ISO output; epochs drive the windows
+        self.datetimes = datetimes
+        self.has_time = np.fromiter((dt is not None for dt in datetimes), dtype=bool, count=len(datetimes))
+        # Naive datetimes cannot be compared with the aware "now", so the Decimal path skips them
+        self.aware = np.fromiter((dt is not None and dt.tzinfo is not None for dt in datetimes),
+                                 dtype=bool, count=len(datetimes))
+        self.epochs = np.fromiter((dt.timestamp() if dt is not None else 0.0 for dt in datetimes),
+                                  dtype=np.float64, count=len(datetimes))
+
+    def __len__(self) -> int:
+        return len(self.is_sell)
+
+    @classmethod
+    def from_columns(cls, cols) -> "TradeAnalyticsArrays":
+        """Arrays from trade_analytics_aggregator.AnalyticsColumns"""
+        pnl, pnl_valid = _optional_floats(cols.pnl)
+        values, value_valid = _optional_floats(cols.values)
+        sol_amounts, _ = _optional_floats(cols.sol_amounts)
+        token_codes, token_labels = _factorize(cols.tokens)
+        return cls(
+            is_sell=np.array(cols.actions, dtype=object) == "sell",
+            pnl=pnl,
+            pnl_valid=pnl_valid,
+            values=values,
+            value_valid=value_valid,
+            sol_amounts=sol_amounts,
+            token_codes=token_codes,
+            token_labels=token_labels,
+            datetimes=cols.timestamps,
+        )
+
+    @classmethod
+    def from_table(cls, table: TradeTable) -> "TradeAnalyticsArrays":
+        """Arrays read directly from TradeTable columns"""
+        is_sell, token_ids, sol_amounts = _table_codes(table)
+        token_codes, token_labels = _symbol_codes(table, token_ids)
+        # Zero P&L/value is treated as missing, as in AnalyticsColumns.from_table
+        pnl, pnl_valid = _optional_floats([v or None for v in table.pnl_usd])
+        values, value_valid = _optional_floats([v or None for v in table.value_usd])
+        return cls(
+            is_sell=is_sell,
+            pnl=pnl,
+            pnl_valid=pnl_valid,
+            values=values,
+            value_valid=value_valid,
+            sol_amounts=sol_amounts,
+            token_codes=token_codes,
+            token_labels=token_labels,
+            datetimes=[datetime.fromtimestamp(ts, timezone.utc) for ts in table.timestamps],
+        )
+
+
+def summarize_analytics(arrays: TradeAnalyticsArrays, format_decimal,
+                        now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Compute the TradeAnalyticsAggregator time_window/pnl/volume/top_tokens/recent_windows sections"""
+    n = len(arrays)
+    realized = arrays.is_sell & arrays.pnl_valid
+    sell_pnl = arrays.pnl[realized]
+    wins = int((sell_pnl > 0).sum())
+    losses = int((sell_pnl < 0).sum())
+    total_pnl = float(sell_pnl.sum())
+    max_win = float(sell_pnl.max(initial=0.0))
+    max_loss = float(sell_pnl.min(initial=0.0))
+
+    valid_values = arrays.values[arrays.value_valid]
+    avg_trade_value = float(valid_values.mean()) if len(valid_values) else 0.0
+    realized_pct = total_pnl / (avg_trade_value * 100) * 100 if avg_trade_value > 0 else 0.0
+    total_with_pnl = wins + losses
+
+    time_window = _time_window(arrays)
+    days = time_window.get("days", 1)
+    avg_value_all = float(valid_values.sum()) / n if n > 0 else 0.0
+
+    pnl = {
+        "realized_usd": format_decimal(total_pnl),
+        "realized_pct": format_decimal(realized_pct),
+        "wins": wins,
+        "losses": losses,
+        "win_rate": round(float(wins) / total_with_pnl if total_with_pnl > 0 else 0.0, 3),
+        "max_single_win_usd": format_decimal(max_win) if max_win > 0 else "0",
+        "max_single_loss_usd": format_decimal(max_loss) if max_loss < 0 else "0",
+    }
+    volume = {
+        "total_trades": n,
+        "total_sol_volume": format_decimal(float(arrays.sol_amounts.sum())),
+        "avg_trade_value_usd": format_decimal(avg_value_all),
+        "trades_per_day": round(n / days if days > 0 else 0, 2),
+    }
+
+    # Per-token trades and realized P&L, empty tokens excluded
+    size = len(arrays.token_labels)
+    trades = np.bincount(arrays.token_codes, minlength=size)
+    token_pnl = np.bincount(arrays.token_codes[realized], weights=sell_pnl, minlength=size)
+    token_list = [
+        {"symbol": symbol[:10], "trades": int(trades[code]), "realized_pnl_usd": format_decimal(float(token_pnl[code]))}
+        for code, symbol in enumerate(arrays.token_labels)
+        if symbol
+    ]
+    token_list.sort(key=lambda x: x["trades"], reverse=True)
+
+    now = now or datetime.now(timezone.utc)
+    days_ago = np.floor((now.timestamp() - arrays.epochs) / 86400)
+    in_30d = arrays.aware & (days_ago <= 30)
+    in_7d = in_30d & (days_ago <= 7)
+
+    return {
+        "time_window": time_window,
+        "pnl": pnl,
+        "volume": volume,
+        "top_tokens": token_list[:10],
+        "recent_windows": {
+            "last_30d": _analytics_window(arrays, in_30d, format_decimal),
+            "last_7d": _analytics_window(arrays, in_7d, format_decimal),
+        },
+    }
+
+
+def _time_window(arrays: TradeAnalyticsArrays) -> Dict[str, Any]:
+    if not len(arrays) or not arrays.has_time.any():
+        return {"start": None, "end": None, "days": 0}
+    idx = np.flatnonzero(arrays.has_time)
+    start_dt = arrays.datetimes[int(idx[np.argmin(arrays.epochs[idx])])]
+    end_dt = arrays.datetimes[int(idx[np.argmax(arrays.epochs[idx])])]
+    return {
+        "start": start_dt.isoformat().replace("+00:00", "Z"),
+        "end": end_dt.isoformat().replace("+00:00", "Z"),
+        "days": (end_dt - start_dt).days + 1,
+    }
+
+
+def _analytics_window(arrays: TradeAnalyticsArrays, mask: "np.ndarray", format_decimal) -> Dict[str, Any]:
+    count = int(mask.sum())
+    if not count:
+        return {"pnl_usd": "0", "trades": 0, "win_rate": 0}
+    window_pnl = arrays.pnl[mask & arrays.is_sell & arrays.pnl_valid]
+    wins = int((window_pnl > 0).sum())
+    losses = int((window_pnl < 0).sum())
+    total_with_pnl = wins + losses
+    return {
+        "pnl_usd": format_decimal(float(window_pnl.sum())),
+        "trades": count,
+        "win_rate": round(float(wins) / total_with_pnl if total_with_pnl > 0 else 0.0, 2),
+    }
@@ -13,6 +13,7 @@ from datetime import datetime
 from enum import Enum
 
 from src.lib.position_models import CostBasisMethod
+from src.lib.lot_ledger import LotLedger
 from src.config.feature_flags import get_cost_basis_method
 
 
@@ -66,6 +67,23 @@ class BuyRecord:
             slot=trade.get("slot", 0)
         )
 
+    @classmethod
+    def from_row(cls, row) -> "BuyRecord":
+        """Create BuyRecord from a trade_table.TradeRow (values already Decimal)"""
+        amount = row.amount
+        total_cost = row.value_usd if row.value_usd is not None else Decimal("0")
+        price_per_token = total_cost / amount if amount > 0 else Decimal("0")
+
+        return cls(
+            timestamp=row.timestamp,
+            amount=amount,
+            price_per_token=price_per_token,
+            total_cost_usd=total_cost,
+            remaining_amount=amount,  # Initially all unsold
+            tx_signature=row.signature,
+            slot=row.slot
+        )
+
 
 @dataclass
 class CostBasisResult:
@@ -117,41 +135,23 @@ class CostBasisCalculator:
                 notes=["No buys or invalid sell amount"]
             )
         
-        remaining_to_sell = sell_amount
-        total_cost = Decimal("0")
-        used_buys = []
-        
-        # Process buys in chronological order (FIFO)
-        for buy in sorted(buys, key=lambda b: b.timestamp):
-            if remaining_to_sell <= 0:
-                break
-            
-            # Skip if this buy has no remaining amount
-            if buy.remaining_amount <= 0:
-                continue
-            
-            # Calculate how much from this buy to use
-            amount_from_this_buy = min(buy.remaining_amount, remaining_to_sell)
-            cost_from_this_buy = amount_from_this_buy * buy.price_per_token
-            
-            total_cost += cost_from_this_buy
-            remaining_to_sell -= amount_from_this_buy
-            
-            # Track which buys were used
-            used_buys.append({
-                "tx": buy.tx_signature[:8],
-                "amount": float(amount_from_this_buy),
-                "price": float(buy.price_per_token)
-            })
+        # Buys are already chronological; match against their unsold amounts
+        ledger = LotLedger(CostBasisMethod.FIFO)
+        for buy in buys:
+            if buy.remaining_amount > 0:
+                ledger.buy(buy.remaining_amount, buy.remaining_amount * buy.price_per_token, buy.tx_signature)
+        fill = ledger.sell(sell_amount)
+        total_cost = fill.cost_basis_usd
+        remaining_to_sell = fill.unmatched
         
         # Check if we had enough tokens to sell
         if remaining_to_sell > DUST_THRESHOLD_USD:
             notes = [f"Warning: Insufficient buy history, missing {remaining_to_sell:.6f} tokens"]
         else:
-            notes = [f"Used {len(used_buys)} buy transactions for FIFO"]
+            notes = [f"Used {fill.lots_used} buy transactions for FIFO"]
         
         # Calculate average cost basis
-        actual_sold = sell_amount - remaining_to_sell
+        actual_sold = fill.matched
         cost_basis_per_token = total_cost / actual_sold if actual_sold > 0 else Decimal("0")
         
         return CostBasisResult(
@@ -251,20 +251,12 @@ class CostBasisCalculator:
             total_sold = total_bought - current_balance
             
             if total_sold > 0:
-                # Calculate cost basis of remaining tokens after FIFO sells
-                result = self.calculate_fifo(buys, total_sold)
-                
-                # Remaining cost basis
-                total_cost = sum(buy.total_cost_usd for buy in buys)
-                remaining_cost = total_cost - result.total_cost_basis_usd
-                cost_basis_per_token = remaining_cost / current_balance if current_balance > 0 else Decimal("0")
-                
-                return CostBasisResult(
-                    cost_basis_per_token=cost_basis_per_token.quantize(Decimal("0.00000001"), rounding=ROUND_DOWN),
-                    total_cost_basis_usd=remaining_cost.quantize(Decimal("0.01"), rounding=ROUND_DOWN),
-                    method_used=CostBasisMethod.FIFO,
-                    notes=[f"FIFO basis for {current_balance:.6f} remaining tokens"]
-                )
+                # Replay the sells over the original lots; what is left is the basis
+                ledger = self.new_ledger()
+                for buy in buys:
+                    ledger.buy(buy.amount, buy.total_cost_usd, buy.tx_signature)
+                ledger.sell(total_sold)
+                return self.calculate_for_ledger(ledger, current_balance)
             else:
                 # No sells yet, use weighted average of all buys
                 return self.calculate_weighted_average(buys)
@@ -277,6 +269,89 @@ class CostBasisCalculator:
             )
             return result
     
+    def new_ledger(self) -> LotLedger:
+        """Create an empty lot ledger using this calculator's method"""
+        return LotLedger(self.method)
+    
+    def calculate_for_ledger(self, ledger: LotLedger,
+                             current_balance: Decimal) -> CostBasisResult:
+        """
+        Calculate cost basis for a current position from its open lots
+        
+        Args:
+            ledger: Lot ledger the position's trades were applied to
+            current_balance: Current token balance
+            
+        Returns:
+            CostBasisResult for the position
+        """
+        if not ledger:
+            return CostBasisResult(
+                cost_basis_per_token=Decimal("0"),
+                total_cost_basis_usd=Decimal("0"),
+                method_used=self.method,
+                notes=["Airdrop or no purchase history"]
+            )
+        
+        if current_balance <= 0:
+            return CostBasisResult(
+                cost_basis_per_token=Decimal("0"),
+                total_cost_basis_usd=Decimal("0"),
+                method_used=self.method,
+                notes=["Position closed (zero balance)"]
+            )
+        
+        if current_balance < DUST_THRESHOLD_USD:
+            return CostBasisResult(
+                cost_basis_per_token=Decimal("0"),
+                total_cost_basis_usd=Decimal("0"),
+                method_used=self.method,
+                notes=[f"Dust amount: {current_balance:.8f} tokens"]
+            )
+        
+        cost_basis_per_token = ledger.cost_basis_per_token
+        if ledger.held == current_balance:
+            total_cost = ledger.remaining_cost_usd
+        else:
+            # Balance moved outside the known lots (e.g. transfers); price it at the lot average
+            total_cost = cost_basis_per_token * current_balance
+        
+        return CostBasisResult(
+            cost_basis_per_token=cost_basis_per_token.quantize(Decimal("0.00000001"), rounding=ROUND_DOWN),
+            total_cost_basis_usd=total_cost.quantize(Decimal("0.01"), rounding=ROUND_DOWN),
+            method_used=self.method,
+            notes=[f"{self.method.value} basis for {current_balance:.6f} remaining tokens across {len(ledger)} lots"]
+        )
+    
+    def calculate_sell(self, ledger: LotLedger, sell_amount: Decimal,
+                       sell_price_per_token: Optional[Decimal]) -> CostBasisResult:
+        """
+        Consume a sell from the ledger's open lots
+        
+        Args:
+            ledger: Lot ledger for the token being sold
+            sell_amount: Amount of tokens sold
+            sell_price_per_token: Price per token in USD, or None if unpriced
+            
+        Returns:
+            CostBasisResult for the sold amount; realized P&L is set when priced
+        """
+        fill = ledger.sell(sell_amount)
+        total_cost = fill.cost_basis_usd.quantize(Decimal("0.01"), rounding=ROUND_DOWN)
+        cost_basis_per_token = fill.cost_basis_usd / fill.matched if fill.matched > 0 else Decimal("0")
+        
+        result = CostBasisResult(
+            cost_basis_per_token=cost_basis_per_token.quantize(Decimal("0.00000001"), rounding=ROUND_DOWN),
+            total_cost_basis_usd=total_cost,
+            method_used=self.method,
+            notes=[f"Used {fill.lots_used} lots"]
+        )
+        if sell_price_per_token is not None:
+            result.realized_pnl_usd = (sell_amount * sell_price_per_token - total_cost).quantize(
+                Decimal("0.01"), rounding=ROUND_DOWN
+            )
+        return result
+    
     def calculate_realized_pnl(self, buys: List[BuyRecord], 
                               sell_amount: Decimal,
                               sell_price_per_token: Decimal) -> CostBasisResult:
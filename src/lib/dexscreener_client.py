@@ -15,6 +15,9 @@ from datetime import datetime, timedelta
 import time
 import json
 
+from src.lib.http_session import get_http_session_pool
+from src.lib.rate_scheduler import get_rate_scheduler
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
@@ -23,7 +26,6 @@ DEXSCREENER_BASE_URL = "https://api.dexscreener.com/latest"
 MAX_RETRIES = 3
 RETRY_DELAYS = [0.5, 1, 2]  # Shorter delays as DexScreener is usually fast
 REQUEST_TIMEOUT = 15  # Shorter timeout
-NO_RATE_LIMIT = True  # DexScreener has no documented rate limits
 
 # Special addresses
 USDC_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
@@ -40,19 +42,21 @@ class DexScreenerClient:
     def __init__(self, session: Optional[aiohttp.ClientSession] = None):
         """Initialize with optional session"""
         self.session = session
-        self._owns_session = session is None
+        self._pooled_session = session is None  # Borrow from the shared pool unless given one
+        self.rate_limiter = get_rate_scheduler("dexscreener")
         self.request_count = 0
         
     async def __aenter__(self):
         """Async context manager entry"""
-        if self._owns_session:
-            self.session = aiohttp.ClientSession()
+        if self._pooled_session:
+            self.session = await get_http_session_pool().acquire()
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
-        if self._owns_session and self.session:
-            await self.session.close()
+        if self._pooled_session and self.session:
+            await get_http_session_pool().release(self.session)
+            self.session = None
     
     async def _make_request(
         self,
@@ -68,6 +72,7 @@ class DexScreenerClient:
         last_error = None
         for attempt, delay in enumerate(RETRY_DELAYS):
             try:
+                await self.rate_limiter.acquire()
                 self.request_count += 1
                 
                 async with self.session.get(
@@ -329,20 +334,19 @@ class DexScreenerClient:
         """
         results = {}
         
-        # DexScreener has no rate limits, so we can parallelize
-        tasks = []
-        for token_mint in token_mints:
-            task = self.get_token_price(token_mint, quote_mint)
-            tasks.append((token_mint, task))
+        # Run lookups concurrently; each request still paces itself against the dexscreener budget
+        unique_mints = list(dict.fromkeys(token_mints))
+        outcomes = await asyncio.gather(
+            *(self.get_token_price(token_mint, quote_mint) for token_mint in unique_mints),
+            return_exceptions=True
+        )
         
-        # Execute all tasks in parallel
-        for token_mint, task in tasks:
-            try:
-                result = await task
-                results[token_mint] = result
-            except Exception as e:
-                logger.error(f"Error in batch price fetch for {token_mint}: {e}")
+        for token_mint, outcome in zip(unique_mints, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Error in batch price fetch for {token_mint}: {outcome}")
                 results[token_mint] = None
+            else:
+                results[token_mint] = outcome
         
         return results
     
@@ -351,7 +355,8 @@ class DexScreenerClient:
         return {
             "request_count": self.request_count,
             "base_url": DEXSCREENER_BASE_URL,
-            "rate_limited": not NO_RATE_LIMIT
+            "rate_limited": True,
+            "budget": self.rate_limiter.get_stats()
         }
 
 
@@ -8,6 +8,7 @@ from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from typing import Dict, Optional, List, Tuple, Any
 from collections import defaultdict
+from dataclasses import dataclass
 import time
 
 logger = logging.getLogger(__name__)
@@ -30,6 +31,61 @@ STABLE_COINS = {
 PRICE_CACHE_TTL_HOURS = 6
 
 
+@dataclass
+class SwapPrice:
+    """Best observed price for one mint"""
+    price_usd: Decimal
+    source: str  # helius_swap or helius_transfer
+    timestamp: int
+    slot: int
+    signature: str
+    volume: Decimal
+
+    def rank(self) -> Tuple[int, int, Decimal]:
+        """Newer wins, then swap events over transfer pairing, then larger volume"""
+        return (self.timestamp, 1 if self.source == "helius_swap" else 0, self.volume)
+
+
+class SwapPriceIndex:
+    """mint -> best swap price, built in one pass over a wallet's transactions"""
+
+    def __init__(self):
+        self.entries: Dict[str, SwapPrice] = {}
+        self.transactions_scanned = 0
+        self.candidates = 0
+
+    def offer(self, mint: str, candidate: SwapPrice):
+        """Keep candidate if it ranks above the current entry for mint"""
+        self.candidates += 1
+        current = self.entries.get(mint)
+        if current is None or candidate.rank() > current.rank():
+            self.entries[mint] = candidate
+
+    def get(self, mint: str) -> Optional[SwapPrice]:
+        return self.entries.get(mint)
+
+    def price(self, mint: str) -> Optional[Decimal]:
+        """Best price for mint, stable coins at $1"""
+        if mint in STABLE_COINS:
+            return STABLE_COINS[mint]
+        entry = self.entries.get(mint)
+        return entry.price_usd if entry else None
+
+    def __contains__(self, mint: str) -> bool:
+        return mint in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get index statistics"""
+        return {
+            "mints": len(self.entries),
+            "transactions_scanned": self.transactions_scanned,
+            "candidates": self.candidates,
+        }
+
+
 class HeliusPriceExtractor:
     """Extract token prices from Helius transaction data"""
     
@@ -252,19 +308,96 @@ class HeliusPriceExtractor:
         
         return default_sol_price
         
+    def build_price_index(
+        self,
+        trades: List[Dict[str, Any]],
+        transactions: List[Dict[str, Any]]
+    ) -> SwapPriceIndex:
+        """
+        Index the best swap price for every traded mint in one pass
+        
+        Each transaction is visited once and only priced for the mints its
+        own trades touched, so the cost is O(trades + transactions) rather
+        than O(mints x trades).
+        """
+        mints_by_sig: Dict[str, set] = defaultdict(set)
+        for trade in trades:
+            sig = trade.get("signature")
+            if not sig:
+                continue
+            for key in ("token_in_mint", "token_out_mint"):
+                mint = trade.get(key)
+                if mint and mint != SOL_MINT and mint not in STABLE_COINS:
+                    mints_by_sig[sig].add(mint)
+        
+        index = SwapPriceIndex()
+        for tx in transactions:
+            mints = mints_by_sig.get(tx.get("signature"))
+            if not mints:
+                continue
+            index.transactions_scanned += 1
+            
+            slot = tx.get("slot", 0)
+            unix_ts = int(tx.get("timestamp", time.time()))
+            sol_price_usd = self._get_sol_price_at_slot(slot, datetime.fromtimestamp(unix_ts, tz=timezone.utc))
+            if sol_price_usd is None:
+                continue
+            
+            for mint in mints:
+                candidate = self._price_candidate(tx, mint, sol_price_usd, unix_ts, slot)
+                if candidate:
+                    index.offer(mint, candidate)
+        
+        # Keep the TTL cache warm for lookups outside this index
+        for mint, entry in index.entries.items():
+            self.price_cache[mint] = (entry.price_usd, datetime.fromtimestamp(entry.timestamp, tz=timezone.utc))
+        
+        return index
+    
+    def _price_candidate(
+        self,
+        transaction: Dict[str, Any],
+        token_mint: str,
+        sol_price_usd: Decimal,
+        unix_ts: int,
+        slot: int
+    ) -> Optional[SwapPrice]:
+        """Price one mint from one transaction, swap events first then transfer pairing"""
+        signature = transaction.get("signature", "")
+        swap_data = self._find_best_swap(transaction, token_mint)
+        if swap_data:
+            price = self._calculate_price_from_swap(swap_data, token_mint, sol_price_usd)
+            if price:
+                return SwapPrice(price, "helius_swap", unix_ts, slot, signature, self._get_swap_volume(swap_data))
+        
+        price = self._extract_from_transfers(transaction, token_mint, sol_price_usd)
+        if price:
+            volume = sum(
+                (Decimal(str(t.get("tokenAmount", 0))) for t in transaction.get("tokenTransfers", [])
+                 if t.get("mint") == token_mint),
+                Decimal("0")
+            )
+            return SwapPrice(price, "helius_transfer", unix_ts, slot, signature, volume)
+        
+        return None
+    
     def extract_prices_from_trades(
         self, 
         trades: List[Dict[str, Any]],
-        transactions: List[Dict[str, Any]]
+        transactions: List[Dict[str, Any]],
+        index: Optional[SwapPriceIndex] = None
     ) -> Dict[str, Optional[Decimal]]:
         """
         Extract prices for all unique tokens in trades
         
+        Args:
+            index: Previously built index for these trades (built here if omitted)
+        
         Returns:
             Dict of mint -> price_usd (or None)
         """
-        # Build transaction lookup
-        tx_by_sig = {tx["signature"]: tx for tx in transactions if "signature" in tx}
+        if index is None:
+            index = self.build_price_index(trades, transactions)
         
         # Collect unique mints
         unique_mints = set()
@@ -279,31 +412,20 @@ class HeliusPriceExtractor:
         coverage_stats = {"found": 0, "cached": 0, "missing": 0}
         
         for mint in unique_mints:
-            # Try to find price from any transaction
-            price_found = False
+            price = index.price(mint)
+            if price is not None:
+                prices[mint] = price
+                coverage_stats["found"] += 1
+                continue
             
-            # Check all transactions for this mint
-            for trade in trades:
-                if trade.get("token_in_mint") == mint or trade.get("token_out_mint") == mint:
-                    sig = trade.get("signature")
-                    if sig and sig in tx_by_sig:
-                        tx = tx_by_sig[sig]
-                        result = self.extract_price_from_transaction(tx, mint)
-                        if result:
-                            prices[mint] = result[0]
-                            coverage_stats["found"] += 1
-                            price_found = True
-                            break
-                            
             # Check cache if not found
-            if not price_found:
-                cached = self.get_cached_price(mint)
-                if cached:
-                    prices[mint] = cached[0]
-                    coverage_stats["cached"] += 1
-                else:
-                    prices[mint] = None
-                    coverage_stats["missing"] += 1
+            cached = self.get_cached_price(mint)
+            if cached:
+                prices[mint] = cached[0]
+                coverage_stats["cached"] += 1
+            else:
+                prices[mint] = None
+                coverage_stats["missing"] += 1
                     
         # Log coverage stats
         total = len(unique_mints)
@@ -13,6 +13,9 @@ from decimal import Decimal
 import time
 import json
 
+from src.lib.http_session import get_http_session_pool
+from src.lib.rate_scheduler import get_rate_scheduler
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
@@ -38,19 +41,21 @@ class HeliusSupplyFetcher:
     def __init__(self, session: Optional[aiohttp.ClientSession] = None):
         """Initialize with optional session for connection pooling"""
         self.session = session
-        self._owns_session = session is None
+        self._pooled_session = session is None  # Borrow from the shared pool unless given one
+        self.rate_limiter = get_rate_scheduler("helius")
         self.request_count = 0
         
     async def __aenter__(self):
         """Async context manager entry"""
-        if self._owns_session:
-            self.session = aiohttp.ClientSession()
+        if self._pooled_session:
+            self.session = await get_http_session_pool().acquire()
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
-        if self._owns_session and self.session:
-            await self.session.close()
+        if self._pooled_session and self.session:
+            await get_http_session_pool().release(self.session)
+            self.session = None
     
     def _get_rpc_url(self) -> str:
         """Get RPC URL with API key"""
@@ -76,6 +81,7 @@ class HeliusSupplyFetcher:
         last_error = None
         for attempt, delay in enumerate(RETRY_DELAYS):
             try:
+                await self.rate_limiter.acquire()
                 self.request_count += 1
                 async with self.session.post(
                     url, 
@@ -87,7 +93,7 @@ class HeliusSupplyFetcher:
                         # Rate limited
                         retry_after = int(resp.headers.get("Retry-After", delay))
                         logger.warning(f"Rate limited on attempt {attempt + 1}, waiting {retry_after}s")
-                        await asyncio.sleep(retry_after)
+                        self.rate_limiter.pause(retry_after)
                         continue
                     
                     resp.raise_for_status()
@@ -205,10 +211,6 @@ class HeliusSupplyFetcher:
                     results[(mint, slot)] = None
                 else:
                     results[(mint, slot)] = result
-            
-            # Small delay between batches to avoid rate limiting
-            if i + BATCH_SIZE < len(requests):
-                await asyncio.sleep(0.1)
         
         return results
     
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+HTTP Session Pool - One pooled aiohttp ClientSession per event loop
+Upstream clients (Helius, Birdeye, Jupiter, DexScreener, CoinGecko) borrow the
+loop's session instead of opening their own, so TCP/TLS connections to the
+same few hosts are kept alive and DNS lookups are cached across clients.
+
+Lifecycle:
+- A long-lived loop (ASGI app) pins the session with start() at startup and
+  closes it with close() at shutdown; it then outlives every request.
+- Without a pin the session is reference counted: it is created by the first
+  borrower on the loop and closed when the last one releases it, so
+  short-lived asyncio.run() loops do not leak connections.
+
+aiohttp only speaks HTTP/1.1, so reuse comes from keep-alive rather than
+HTTP/2 multiplexing.
+"""
+
+import os
+import asyncio
+import logging
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+def get_pool_limit() -> int:
+    """Total connections per session"""
+    return int(os.getenv("HTTP_POOL_LIMIT", "100"))
+
+
+def get_pool_limit_per_host() -> int:
+    """Connections per upstream host"""
+    return int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "40"))
+
+
+def get_keepalive_timeout() -> float:
+    """Seconds an idle connection is kept open"""
+    return float(os.getenv("HTTP_KEEPALIVE_SEC", "30"))
+
+
+def get_dns_ttl() -> int:
+    """Seconds a resolved host is cached"""
+    return int(os.getenv("HTTP_DNS_TTL_SEC", "300"))
+
+
+class _LoopSession:
+    """Session and its borrowers for one event loop"""
+
+    __slots__ = ("session", "borrowers", "pins")
+
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session
+        self.borrowers = 0
+        self.pins = 0
+
+
+class HTTPSessionPool:
+    """Registry of pooled ClientSessions keyed by event loop"""
+
+    def __init__(self):
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopSession]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self.metrics = {
+            "sessions_created": 0,
+            "sessions_closed": 0,
+            "acquires": 0,
+            "reuses": 0,
+        }
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=get_pool_limit(),
+            limit_per_host=get_pool_limit_per_host(),
+            keepalive_timeout=get_keepalive_timeout(),
+            ttl_dns_cache=get_dns_ttl(),
+            use_dns_cache=True,
+        )
+        self.metrics["sessions_created"] += 1
+        return aiohttp.ClientSession(connector=connector)
+
+    def _state(self) -> _LoopSession:
+        """Current loop's entry, (re)creating the session if needed"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._loops.get(loop)
+            if state is None:
+                state = _LoopSession(self._create_session())
+                self._loops[loop] = state
+            elif state.session.closed:
+                state.session = self._create_session()
+            return state
+
+    async def acquire(self) -> aiohttp.ClientSession:
+        """Borrow the current loop's session; pair with release()"""
+        state = self._state()
+        self.metrics["acquires"] += 1
+        if state.borrowers or state.pins:
+            self.metrics["reuses"] += 1
+        state.borrowers += 1
+        return state.session
+
+    async def release(self, session: aiohttp.ClientSession):
+        """Return a borrowed session; closes it if nothing else holds it"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._loops.get(loop)
+            if state is None or state.session is not session:
+                return
+            state.borrowers = max(0, state.borrowers - 1)
+            if state.borrowers or state.pins:
+                return
+            del self._loops[loop]
+        await self._close(session)
+
+    async def start(self):
+        """Keep the current loop's session open until close() (app startup)"""
+        state = self._state()
+        state.pins += 1
+
+    async def close(self):
+        """Undo start(); closes the session once no pins or borrowers remain (app shutdown)"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._loops.get(loop)
+            if state is None:
+                return
+            state.pins = max(0, state.pins - 1)
+            if state.pins or state.borrowers:
+                return
+            del self._loops[loop]
+        await self._close(state.session)
+
+    async def _close(self, session: aiohttp.ClientSession):
+        if not session.closed:
+            await session.close()
+        self.metrics["sessions_closed"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool statistics"""
+        with self._lock:
+            open_sessions = len(self._loops)
+            borrowers = sum(state.borrowers for state in self._loops.values())
+        return {
+            **self.metrics,
+            "open_sessions": open_sessions,
+            "borrowers": borrowers,
+            "limit": get_pool_limit(),
+            "limit_per_host": get_pool_limit_per_host(),
+        }
+
+
+# Global instance
+_pool: Optional[HTTPSessionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_http_session_pool() -> HTTPSessionPool:
+    """Get or create the process-wide session pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HTTPSessionPool()
+        return _pool
+
+
+@asynccontextmanager
+async def http_session_scope():
+    """Pin the pooled session for the duration of the block (startup/shutdown pair)"""
+    pool = get_http_session_pool()
+    await pool.start()
+    try:
+        yield pool
+    finally:
+        await pool.close()
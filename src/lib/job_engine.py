@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Job Engine - Bounded worker pool for long wallet analyses
+A large wallet can take longer to fetch than the 120s gunicorn timeout, and
+running it inside the request also ties up the request worker the whole time.
+Long analyses are submitted as jobs instead: the request returns a job id at
+once and the client polls or streams the job until its result is ready.
+
+Each process runs JOB_WORKERS worker threads that claim queued jobs from the
+shared JobStore, so a job submitted through one gunicorn worker may run in
+another, and any worker can answer a poll. A job runs on its worker's own
+event loop with the pooled HTTP session; the handler reports progress through
+a callback that also heartbeats the job. Heartbeats are written off the
+event loop, and a worker that finds it no longer owns its job (requeued after
+a stall, now run elsewhere) cancels the handler. Jobs whose worker dies are
+requeued by the next worker that notices the missing heartbeat.
+
+Handlers are registered per kind:
+
+    async def handler(job: JobRecord, report: Callable[[Dict], None]) -> Any
+
+and return a JSON-serializable result, cached for the kind's result_ttl.
+"""
+
+import os
+import time
+import socket
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, Awaitable, Tuple
+
+from src.lib.job_store import JobRecord, JobStore, get_job_store, get_job_retention
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[JobRecord, Callable[[Dict[str, Any]], None]], Awaitable[Any]]
+
+
+class JobOwnershipLost(Exception):
+    """The job was requeued or finished by someone else while this worker ran it"""
+
+
+def get_job_workers() -> int:
+    """Worker threads per process running jobs"""
+    return int(os.getenv("JOB_WORKERS", "2"))
+
+
+def get_job_timeout() -> float:
+    """Seconds a job may run before it fails"""
+    return float(os.getenv("JOB_TIMEOUT_SEC", "900"))
+
+
+def get_job_heartbeat() -> float:
+    """Seconds between heartbeats of a running job"""
+    return float(os.getenv("JOB_HEARTBEAT_SEC", "10"))
+
+
+def get_job_result_ttl() -> int:
+    """Seconds a completed job's result answers new submits for the same key"""
+    return int(os.getenv("JOB_RESULT_TTL_SEC", "900"))
+
+
+def get_job_poll_interval() -> float:
+    """Seconds an idle worker waits before checking the store for queued jobs"""
+    return float(os.getenv("JOB_POLL_INTERVAL_SEC", "1.0"))
+
+
+class JobEngine:
+    """Run registered job kinds on a bounded pool of worker threads"""
+
+    def __init__(self, store: Optional[JobStore] = None, workers: Optional[int] = None):
+        self._store = store
+        self.workers = workers or get_job_workers()
+        self._handlers: Dict[str, Tuple[JobHandler, int]] = {}
+        self._threads = []
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._start_lock = threading.Lock()
+        self._maintenance_at = 0.0
+        self._running = 0
+        self.metrics = {
+            "jobs_submitted": 0,
+            "jobs_deduplicated": 0,
+            "jobs_completed": 0,
+            "jobs_failed": 0,
+            "jobs_requeued": 0,
+            "jobs_lost": 0,
+            "job_run_ms_total": 0,
+        }
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            self._store = get_job_store()
+        return self._store
+
+    def register(self, kind: str, handler: JobHandler, result_ttl: Optional[int] = None):
+        """Register the coroutine function that runs jobs of a kind"""
+        self._handlers[kind] = (handler, result_ttl if result_ttl is not None else get_job_result_ttl())
+
+    def submit(
+        self,
+        kind: str,
+        wallet: str,
+        params: Optional[Dict[str, Any]] = None,
+        force_refresh: bool = False,
+    ) -> Tuple[JobRecord, bool]:
+        """Queue a job, or return the active or cached job for the same kind and wallet"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job, created = self.store.submit(kind, wallet, params, reuse_result=not force_refresh)
+        if created:
+            self.metrics["jobs_submitted"] += 1
+            self.start()
+            self._wakeup.set()
+        else:
+            self.metrics["jobs_deduplicated"] += 1
+        return job, created
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        # Polls start workers too, so jobs queued before a restart are picked up
+        self.start()
+        return self.store.get(job_id)
+
+    def start(self):
+        """Start the worker threads on first use"""
+        with self._start_lock:
+            if self._threads or self._stopped.is_set():
+                return
+            prefix = f"{socket.gethostname()}:{os.getpid()}"
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._work, args=(f"{prefix}:{i}",), name=f"job-worker-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            logger.info(f"Job engine started {self.workers} workers")
+
+    def stop(self, timeout: float = 5.0):
+        """Stop claiming jobs; running jobs finish or are requeued after their heartbeat lapses"""
+        self._stopped.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _work(self, owner: str):
+        while not self._stopped.is_set():
+            try:
+                self._maintain()
+                job = self.store.claim(owner, list(self._handlers))
+            except Exception as e:
+                logger.error(f"Job worker {owner} could not claim: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(get_job_poll_interval())
+                self._wakeup.clear()
+                continue
+            try:
+                self._run(job, owner)
+            except Exception as e:
+                # Store unreachable while finishing: the job is requeued once its heartbeat lapses
+                logger.error(f"Job worker {owner} could not record job {job.job_id}: {e}")
+
+    def _maintain(self):
+        """Requeue jobs of dead workers and purge old ones, at most once per heartbeat"""
+        now = time.monotonic()
+        if now - self._maintenance_at < get_job_heartbeat():
+            return
+        self._maintenance_at = now
+        requeued = self.store.requeue_stale(get_job_heartbeat() * 3)
+        if requeued:
+            self.metrics["jobs_requeued"] += requeued
+            logger.warning(f"Requeued {requeued} jobs abandoned by their workers")
+        self.store.purge(get_job_retention())
+
+    def _run(self, job: JobRecord, owner: str):
+        """Run one claimed job to completion on a private event loop"""
+        handler, result_ttl = self._handlers[job.kind]
+        start = time.monotonic()
+        self._running += 1
+        logger.info(f"Job {job.job_id} ({job.kind} {job.wallet}) started by {owner}, attempt {job.attempts}")
+        try:
+            result = asyncio.run(self._execute(job, owner, handler))
+        except JobOwnershipLost:
+            # The job's current owner records its outcome
+            self.metrics["jobs_lost"] += 1
+            logger.warning(f"Job {job.job_id} cancelled: {owner} no longer owns it")
+            return
+        except asyncio.TimeoutError:
+            error = f"Job timed out after {get_job_timeout():.0f}s"
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed: {e}")
+            error = str(e)
+        else:
+            error = None
+        finally:
+            self._running -= 1
+
+        elapsed_ms = int((time.monotonic() - start) * 1000)
+        self.metrics["job_run_ms_total"] += elapsed_ms
+        if error is None:
+            self.metrics["jobs_completed"] += 1
+            self.store.finish(job.job_id, owner, result=result, result_ttl=result_ttl)
+        else:
+            self.metrics["jobs_failed"] += 1
+            self.store.finish(job.job_id, owner, error=error)
+        logger.info(f"Job {job.job_id} {'complete' if error is None else 'failed'} in {elapsed_ms}ms")
+
+    async def _execute(self, job: JobRecord, owner: str, handler: JobHandler) -> Any:
+        # Import here to avoid circular import
+        from src.lib.http_session import http_session_scope
+
+        loop = asyncio.get_running_loop()
+        pending: Dict[str, Any] = {}
+        last_write = [0.0]
+        lost = [False]
+        task: Optional[asyncio.Task] = None
+        # One writer thread per job keeps its progress writes in order
+        writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-heartbeat")
+
+        def owned(write: asyncio.Future):
+            # Runs on the loop once a heartbeat write is done
+            # A store error keeps the job running; it is requeued if the outage lasts
+            if write.cancelled() or write.exception() is not None:
+                return
+            if write.result() is False and task is not None and not task.done():
+                lost[0] = True
+                task.cancel()
+
+        def heartbeat_off_loop(progress: Optional[Dict[str, Any]] = None) -> asyncio.Future:
+            write = loop.run_in_executor(writer, self.store.heartbeat, job.job_id, owner, progress)
+            write.add_done_callback(owned)
+            return write
+
+        def report(progress: Dict[str, Any]):
+            # Stage changes are written at once; chatty fetch messages at most twice a second
+            pending.update(progress)
+            now = time.monotonic()
+            if "stage" in progress or now - last_write[0] >= 0.5:
+                last_write[0] = now
+                heartbeat_off_loop(dict(pending))
+                pending.clear()
+
+        async def beat():
+            while True:
+                await asyncio.sleep(get_job_heartbeat())
+                await asyncio.wait({heartbeat_off_loop()})
+
+        heartbeat = asyncio.ensure_future(beat())
+        try:
+            async with http_session_scope():
+                # Created inside the scope so the handler sees the pooled session
+                task = asyncio.ensure_future(handler(job, report))
+                return await asyncio.wait_for(task, get_job_timeout())
+        except asyncio.CancelledError:
+            if lost[0]:
+                raise JobOwnershipLost(job.job_id) from None
+            raise
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+            # Progress lands before the caller records the outcome
+            writer.shutdown(wait=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get engine statistics"""
+        return {
+            **self.metrics,
+            "workers": len(self._threads),
+            "running": self._running,
+            "kinds": sorted(self._handlers),
+            "store": self.store.get_stats(),
+        }
+
+
+# Global instance
+_engine_instance: Optional[JobEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_job_engine() -> JobEngine:
+    """Get or create the process-wide job engine"""
+    global _engine_instance
+    with _engine_lock:
+        if _engine_instance is None:
+            _engine_instance = JobEngine()
+        return _engine_instance
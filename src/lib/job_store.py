@@ -0,0 +1,614 @@
+#!/usr/bin/env python3
+"""
+Job Store - Durable records for background wallet analysis jobs
+Progress tokens used to live in one worker's memory, so a poll routed to
+another gunicorn worker found nothing. Jobs, their progress and their results
+live here instead, where every worker (and host, with Redis) can see them.
+
+A job is keyed by dedup_key (kind + wallet): submitting while a job for the
+key is queued or running returns that job, and a completed job is reused as
+a cached result until result_ttl runs out.
+
+Job lifecycle: queued -> running -> complete | error. A running job whose
+owner stops heartbeating (worker killed, deploy) is put back in the queue.
+
+Backends:
+- SqliteJobStore: one SQLite table in WAL mode (default), shared by all
+  workers on the host
+- RedisJobStore: shared across hosts when REDIS_URL is available
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Iterable, Tuple
+
+try:
+    import redis
+    from redis.exceptions import RedisError, ConnectionError as RedisConnectionError, WatchError
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    redis = None
+    RedisError = Exception
+    RedisConnectionError = Exception
+    WatchError = Exception
+
+logger = logging.getLogger(__name__)
+
+# Constants from environment
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+CACHE_KEY_PREFIX = "job:v1:"  # Version prefix for job keys
+JOB_STORE_VERSION = 1
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def get_job_store_backend() -> str:
+    """Get configured job store backend: 'sqlite' or 'redis'"""
+    return os.getenv("JOB_STORE_BACKEND", "sqlite").lower()
+
+
+def get_job_store_path() -> str:
+    """Get on-disk path of the SQLite job store"""
+    return os.getenv("JOB_STORE_PATH", os.path.join(".jobs", "jobs.db"))
+
+
+def get_job_retention() -> int:
+    """Seconds a finished job stays pollable"""
+    return int(os.getenv("JOB_RETENTION_SEC", str(24 * 3600)))
+
+
+def get_job_max_attempts() -> int:
+    """Runs a job gets before a crashed owner marks it failed"""
+    return int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+
+
+@dataclass
+class JobRecord:
+    """One background job and its progress"""
+
+    job_id: str
+    kind: str
+    wallet: str
+    dedup_key: str
+    status: str = "queued"  # queued, running, complete, error
+    params: Dict[str, Any] = field(default_factory=dict)
+    progress: Dict[str, Any] = field(default_factory=dict)
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    owner: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    expires_at: Optional[float] = None  # Result reuse deadline for complete jobs
+
+    @property
+    def done(self) -> bool:
+        return self.status not in ACTIVE_STATUSES
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        """Convert to API response format"""
+        data = {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "wallet": self.wallet,
+            "status": self.status,
+            "progress": self.progress,
+            "error": self.error,
+            "attempts": self.attempts,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "finished_at": self.finished_at,
+            "age_seconds": int(time.time() - self.created_at),
+        }
+        if include_result and self.status == "complete":
+            data["result"] = self.result
+        return data
+
+    def to_record(self) -> Dict[str, Any]:
+        """Convert to dictionary for storage"""
+        return {"version": JOB_STORE_VERSION, **self.__dict__}
+
+    @classmethod
+    def from_record(cls, data: Dict[str, Any]) -> "JobRecord":
+        """Create from dictionary"""
+        data = dict(data)
+        data.pop("version", None)
+        return cls(**data)
+
+
+def dedup_key_for(kind: str, wallet: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Jobs with equal keys share one run and one cached result"""
+    suffix = json.dumps(params, sort_keys=True) if params else ""
+    return f"{kind}:{wallet}:{suffix}"
+
+
+class JobStore:
+    """Base interface for job persistence"""
+
+    def submit(
+        self,
+        kind: str,
+        wallet: str,
+        params: Optional[Dict[str, Any]] = None,
+        reuse_result: bool = True,
+    ) -> Tuple[JobRecord, bool]:
+        """Queue a job unless an active or cached one exists for its key. Returns (job, created)"""
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        """Load a job, None if unknown or purged"""
+        raise NotImplementedError
+
+    def claim(self, owner: str, kinds: Iterable[str]) -> Optional[JobRecord]:
+        """Move the oldest queued job of the given kinds to running for owner"""
+        raise NotImplementedError
+
+    def heartbeat(self, job_id: str, owner: str, progress: Optional[Dict[str, Any]] = None) -> bool:
+        """Record liveness (and optionally progress); False if owner no longer holds the job
+
+        Store errors are raised rather than returned as False, so a failed
+        write is not mistaken for a lost job.
+        """
+        raise NotImplementedError
+
+    def finish(
+        self,
+        job_id: str,
+        owner: str,
+        result: Optional[Any] = None,
+        error: Optional[str] = None,
+        result_ttl: float = 0,
+    ) -> bool:
+        """Store the outcome of a running job"""
+        raise NotImplementedError
+
+    def requeue_stale(self, stale_after: float) -> int:
+        """Requeue running jobs whose owner stopped heartbeating; returns jobs recovered"""
+        raise NotImplementedError
+
+    def purge(self, older_than: float) -> int:
+        """Drop finished jobs older than older_than seconds"""
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get store statistics"""
+        return dict(getattr(self, "metrics", {}))
+
+    @staticmethod
+    def _reusable(job: Optional[JobRecord], reuse_result: bool, now: float) -> bool:
+        """Whether an existing job for the key answers a new submit"""
+        if job is None:
+            return False
+        if job.status in ACTIVE_STATUSES:
+            return True
+        return reuse_result and job.status == "complete" and (job.expires_at or 0) > now
+
+    @staticmethod
+    def _recover(job: JobRecord, now: float) -> JobRecord:
+        """Return a job abandoned by its owner to the queue, or fail it after max attempts"""
+        job.owner = None
+        job.updated_at = now
+        if job.attempts >= get_job_max_attempts():
+            job.status = "error"
+            job.error = "Job abandoned by its worker"
+            job.finished_at = now
+        else:
+            job.status = "queued"
+        return job
+
+
+class SqliteJobStore(JobStore):
+    """On-disk backend - one SQLite table shared by all workers on the host"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_job_store_path()
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self.metrics = {"submitted": 0, "deduplicated": 0, "claimed": 0, "requeued": 0, "errors": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        """Per-thread connection, opened and migrated on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._init_lock:
+            if not self._initialized:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS jobs ("
+                    " job_id TEXT PRIMARY KEY,"
+                    " kind TEXT NOT NULL,"
+                    " dedup_key TEXT NOT NULL,"
+                    " status TEXT NOT NULL,"
+                    " owner TEXT,"
+                    " created_at REAL NOT NULL,"
+                    " updated_at REAL NOT NULL,"
+                    " finished_at REAL,"
+                    " record TEXT NOT NULL"
+                    ")"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_key ON jobs (dedup_key, created_at)")
+                conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, created_at)")
+                conn.execute(f"PRAGMA user_version={JOB_STORE_VERSION}")
+                self._initialized = True
+        self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _decode(raw: str) -> JobRecord:
+        return JobRecord.from_record(json.loads(raw))
+
+    def _write(self, conn: sqlite3.Connection, job: JobRecord):
+        conn.execute(
+            "INSERT OR REPLACE INTO jobs"
+            " (job_id, kind, dedup_key, status, owner, created_at, updated_at, finished_at, record)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                job.job_id, job.kind, job.dedup_key, job.status, job.owner,
+                job.created_at, job.updated_at, job.finished_at,
+                json.dumps(job.to_record(), default=str),
+            ),
+        )
+
+    def _load(self, conn: sqlite3.Connection, job_id: str) -> Optional[JobRecord]:
+        row = conn.execute("SELECT record FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._decode(row[0]) if row else None
+
+    def submit(
+        self,
+        kind: str,
+        wallet: str,
+        params: Optional[Dict[str, Any]] = None,
+        reuse_result: bool = True,
+    ) -> Tuple[JobRecord, bool]:
+        key = dedup_key_for(kind, wallet, params)
+        now = time.time()
+        conn = self._connect()
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers
+        # submitting the same wallet cannot both see "no job" and insert
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT record FROM jobs WHERE dedup_key = ? ORDER BY created_at DESC LIMIT 1", (key,)
+            ).fetchone()
+            existing = self._decode(row[0]) if row else None
+            if self._reusable(existing, reuse_result, now):
+                self.metrics["deduplicated"] += 1
+                return existing, False
+            job = JobRecord(job_id=uuid.uuid4().hex, kind=kind, wallet=wallet, dedup_key=key, params=params or {})
+            self._write(conn, job)
+        self.metrics["submitted"] += 1
+        return job, True
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        try:
+            return self._load(self._connect(), job_id)
+        except sqlite3.Error as e:
+            self.metrics["errors"] += 1
+            logger.error(f"Job store read failed for {job_id}: {e}")
+            return None
+
+    def claim(self, owner: str, kinds: Iterable[str]) -> Optional[JobRecord]:
+        kinds = list(kinds)
+        if not kinds:
+            return None
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                f"SELECT record FROM jobs WHERE status = 'queued' AND kind IN ({','.join('?' * len(kinds))})"
+                " ORDER BY created_at LIMIT 1",
+                kinds,
+            ).fetchone()
+            if row is None:
+                return None
+            job = self._decode(row[0])
+            job.status = "running"
+            job.owner = owner
+            job.attempts += 1
+            job.updated_at = time.time()
+            self._write(conn, job)
+        self.metrics["claimed"] += 1
+        return job
+
+    def heartbeat(self, job_id: str, owner: str, progress: Optional[Dict[str, Any]] = None) -> bool:
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                job = self._load(conn, job_id)
+                if job is None or job.status != "running" or job.owner != owner:
+                    return False
+                if progress:
+                    job.progress.update(progress)
+                job.updated_at = time.time()
+                self._write(conn, job)
+            return True
+        except sqlite3.Error as e:
+            self.metrics["errors"] += 1
+            logger.error(f"Job heartbeat failed for {job_id}: {e}")
+            raise
+
+    def finish(
+        self,
+        job_id: str,
+        owner: str,
+        result: Optional[Any] = None,
+        error: Optional[str] = None,
+        result_ttl: float = 0,
+    ) -> bool:
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            job = self._load(conn, job_id)
+            if job is None or job.status != "running" or job.owner != owner:
+                return False
+            now = time.time()
+            job.status = "error" if error is not None else "complete"
+            job.result = result if error is None else None
+            job.error = error
+            job.updated_at = job.finished_at = now
+            job.expires_at = now + result_ttl if error is None else None
+            self._write(conn, job)
+        return True
+
+    def requeue_stale(self, stale_after: float) -> int:
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT record FROM jobs WHERE status = 'running' AND updated_at < ?", (now - stale_after,)
+            ).fetchall()
+            for (raw,) in rows:
+                self._write(conn, self._recover(self._decode(raw), now))
+        self.metrics["requeued"] += len(rows)
+        return len(rows)
+
+    def purge(self, older_than: float) -> int:
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status NOT IN ('queued', 'running') AND finished_at < ?",
+                (time.time() - older_than,),
+            )
+        return cursor.rowcount
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class RedisJobStore(JobStore):
+    """Redis backend - jobs shared across gunicorn workers and hosts"""
+
+    def __init__(self, redis_url: str = REDIS_URL):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("redis package is not installed")
+        self.connection_pool = redis.ConnectionPool.from_url(
+            redis_url,
+            decode_responses=True,
+            socket_connect_timeout=5,
+            socket_timeout=5,
+            retry_on_timeout=True,
+            health_check_interval=30
+        )
+        self.redis_client = redis.Redis(connection_pool=self.connection_pool)
+        self.redis_client.ping()
+        # Pop a job id and enter it in the running zset in one step, so a worker
+        # dying before it marks the job running leaves it for requeue_stale
+        self._pop_claim = self.redis_client.register_script(
+            "local job_id = redis.call('LPOP', KEYS[1]) "
+            "if job_id then redis.call('ZADD', KEYS[2], ARGV[1], job_id) end "
+            "return job_id"
+        )
+        self.metrics = {"submitted": 0, "deduplicated": 0, "claimed": 0, "requeued": 0, "errors": 0}
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{CACHE_KEY_PREFIX}job:{job_id}"
+
+    def _dedup_key(self, key: str) -> str:
+        return f"{CACHE_KEY_PREFIX}key:{key}"
+
+    def _queue_key(self, kind: str) -> str:
+        return f"{CACHE_KEY_PREFIX}queue:{kind}"
+
+    _running_key = f"{CACHE_KEY_PREFIX}running"  # zset of job_id by last heartbeat
+
+    def _decode(self, raw: Optional[str]) -> Optional[JobRecord]:
+        return JobRecord.from_record(json.loads(raw)) if raw else None
+
+    def _encode(self, job: JobRecord) -> str:
+        return json.dumps(job.to_record(), default=str)
+
+    def _update(self, job_id: str, change) -> Optional[JobRecord]:
+        """Apply change(job) -> bool under optimistic locking; returns the job if it was written"""
+        key = self._job_key(job_id)
+        while True:
+            try:
+                with self.redis_client.pipeline() as pipe:
+                    pipe.watch(key)
+                    job = self._decode(pipe.get(key))
+                    if job is None or not change(job):
+                        return None
+                    pipe.multi()
+                    pipe.set(key, self._encode(job), ex=get_job_retention() if job.done else None)
+                    if job.status == "running":
+                        pipe.zadd(self._running_key, {job_id: job.updated_at})
+                    else:
+                        pipe.zrem(self._running_key, job_id)
+                    if job.status == "queued":
+                        pipe.rpush(self._queue_key(job.kind), job_id)
+                    pipe.execute()
+                    return job
+            except WatchError:
+                continue
+
+    def submit(
+        self,
+        kind: str,
+        wallet: str,
+        params: Optional[Dict[str, Any]] = None,
+        reuse_result: bool = True,
+    ) -> Tuple[JobRecord, bool]:
+        key = dedup_key_for(kind, wallet, params)
+        pointer = self._dedup_key(key)
+        while True:
+            try:
+                with self.redis_client.pipeline() as pipe:
+                    pipe.watch(pointer)
+                    job_id = pipe.get(pointer)
+                    existing = self._decode(self.redis_client.get(self._job_key(job_id))) if job_id else None
+                    if self._reusable(existing, reuse_result, time.time()):
+                        self.metrics["deduplicated"] += 1
+                        return existing, False
+                    job = JobRecord(job_id=uuid.uuid4().hex, kind=kind, wallet=wallet, dedup_key=key, params=params or {})
+                    pipe.multi()
+                    pipe.set(self._job_key(job.job_id), self._encode(job))
+                    pipe.set(pointer, job.job_id)
+                    pipe.rpush(self._queue_key(kind), job.job_id)
+                    pipe.execute()
+                    self.metrics["submitted"] += 1
+                    return job, True
+            except WatchError:
+                continue
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        try:
+            return self._decode(self.redis_client.get(self._job_key(job_id)))
+        except RedisError as e:
+            self.metrics["errors"] += 1
+            logger.error(f"Redis get error for job {job_id}: {e}")
+            return None
+
+    def claim(self, owner: str, kinds: Iterable[str]) -> Optional[JobRecord]:
+        now = time.time()
+
+        def start(job: JobRecord) -> bool:
+            if job.status != "queued":
+                return False
+            job.status = "running"
+            job.owner = owner
+            job.attempts += 1
+            job.updated_at = now
+            return True
+
+        for kind in kinds:
+            while True:
+                job_id = self._pop_claim(keys=[self._queue_key(kind), self._running_key], args=[now])
+                if job_id is None:
+                    break
+                job = self._update(job_id, start)
+                if job is not None:
+                    self.metrics["claimed"] += 1
+                    return job
+                current = self.get(job_id)
+                if current is None or current.status != "running":
+                    self.redis_client.zrem(self._running_key, job_id)
+        return None
+
+    def heartbeat(self, job_id: str, owner: str, progress: Optional[Dict[str, Any]] = None) -> bool:
+        def beat(job: JobRecord) -> bool:
+            if job.status != "running" or job.owner != owner:
+                return False
+            if progress:
+                job.progress.update(progress)
+            job.updated_at = time.time()
+            return True
+
+        try:
+            return self._update(job_id, beat) is not None
+        except RedisError as e:
+            self.metrics["errors"] += 1
+            logger.error(f"Redis heartbeat error for job {job_id}: {e}")
+            raise
+
+    def finish(
+        self,
+        job_id: str,
+        owner: str,
+        result: Optional[Any] = None,
+        error: Optional[str] = None,
+        result_ttl: float = 0,
+    ) -> bool:
+        def end(job: JobRecord) -> bool:
+            if job.status != "running" or job.owner != owner:
+                return False
+            now = time.time()
+            job.status = "error" if error is not None else "complete"
+            job.result = result if error is None else None
+            job.error = error
+            job.updated_at = job.finished_at = now
+            job.expires_at = now + result_ttl if error is None else None
+            return True
+
+        return self._update(job_id, end) is not None
+
+    def requeue_stale(self, stale_after: float) -> int:
+        now = time.time()
+        recovered = 0
+
+        def recover(job: JobRecord) -> bool:
+            # A queued job in the running zset was popped by a claim that never
+            # marked it running; its zset score is the claim time
+            if job.status == "queued" or (job.status == "running" and job.updated_at < now - stale_after):
+                self._recover(job, now)
+                return True
+            return False
+
+        for job_id in self.redis_client.zrangebyscore(self._running_key, "-inf", now - stale_after):
+            if self._update(job_id, recover) is not None:
+                recovered += 1
+                continue
+            job = self.get(job_id)
+            if job is None or job.status not in ("queued", "running"):
+                self.redis_client.zrem(self._running_key, job_id)
+        self.metrics["requeued"] += recovered
+        return recovered
+
+    def purge(self, older_than: float) -> int:
+        # Finished jobs carry a Redis TTL of JOB_RETENTION_SEC instead
+        return 0
+
+    def close(self):
+        """Close Redis connection pool"""
+        self.connection_pool.disconnect()
+
+
+# Global instance
+_job_store_instance: Optional[JobStore] = None
+_job_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """Get or create global job store, falling back to SQLite if Redis is unavailable"""
+    global _job_store_instance
+    with _job_store_lock:
+        if _job_store_instance is None:
+            if get_job_store_backend() == "redis" and REDIS_AVAILABLE:
+                try:
+                    _job_store_instance = RedisJobStore()
+                    logger.info("Job store using Redis backend")
+                except (RedisError, RedisConnectionError) as e:
+                    logger.warning(f"Redis connection failed, using SQLite job store: {e}")
+            if _job_store_instance is None:
+                _job_store_instance = SqliteJobStore()
+                logger.info(f"Job store using SQLite at {_job_store_instance.path}")
+        return _job_store_instance
@@ -12,9 +12,11 @@ import logging
 from typing import Optional, Dict, Any, List, Tuple
 from decimal import Decimal
 from datetime import datetime
-import time
 import json
 
+from src.lib.http_session import get_http_session_pool
+from src.lib.rate_scheduler import get_rate_scheduler
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
@@ -24,7 +26,6 @@ JUPITER_QUOTE_API = "https://quote-api.jup.ag/v6"
 MAX_RETRIES = 3
 RETRY_DELAYS = [0.5, 1, 2]
 REQUEST_TIMEOUT = 20
-RATE_LIMIT_DELAY = 0.1  # Jupiter is generous with rate limits
 
 # Special addresses
 USDC_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
@@ -46,27 +47,21 @@ class JupiterClient:
     def __init__(self, session: Optional[aiohttp.ClientSession] = None):
         """Initialize with optional session"""
         self.session = session
-        self._owns_session = session is None
-        self._last_request_time = 0
+        self._pooled_session = session is None  # Borrow from the shared pool unless given one
+        self.rate_limiter = get_rate_scheduler("jupiter")
         self.request_count = 0
         
     async def __aenter__(self):
         """Async context manager entry"""
-        if self._owns_session:
-            self.session = aiohttp.ClientSession()
+        if self._pooled_session:
+            self.session = await get_http_session_pool().acquire()
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
-        if self._owns_session and self.session:
-            await self.session.close()
-    
-    async def _rate_limit(self):
-        """Enforce gentle rate limiting"""
-        elapsed = time.time() - self._last_request_time
-        if elapsed < RATE_LIMIT_DELAY:
-            await asyncio.sleep(RATE_LIMIT_DELAY - elapsed)
-        self._last_request_time = time.time()
+        if self._pooled_session and self.session:
+            await get_http_session_pool().release(self.session)
+            self.session = None
     
     async def _make_request(
         self,
@@ -77,11 +72,11 @@ class JupiterClient:
         if not self.session:
             raise RuntimeError("Session not initialized")
         
-        await self._rate_limit()
-        
         last_error = None
         for attempt, delay in enumerate(RETRY_DELAYS):
             try:
+                # Every attempt draws from the shared Jupiter budget
+                await self.rate_limiter.acquire()
                 self.request_count += 1
                 
                 async with self.session.get(
@@ -97,7 +92,7 @@ class JupiterClient:
                         # Rate limited
                         retry_after = int(resp.headers.get("Retry-After", delay))
                         logger.warning(f"Jupiter rate limited, waiting {retry_after}s")
-                        await asyncio.sleep(retry_after)
+                        self.rate_limiter.pause(retry_after)
                         continue
                     
                     resp.raise_for_status()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Lot Ledger - One cost-basis engine for every FIFO / weighted-average consumer
+The fetcher, trade enricher and position builder each used to keep their own
+lot lists, matching sells with list.pop(0) or re-sorting and copying every buy
+record per sell, which is quadratic for tokens with thousands of partial fills.
+
+A LotLedger tracks one token's open lots in a deque. Buys append, sells
+consume from the head, so each lot is visited once when it is fully consumed
+plus once per sell that partially fills it - linear in trade count. Amounts
+and costs are held as integer fixed-point (FIXED_SCALE units per token / USD),
+so partial fills split cost exactly: a lot's cost is never lost or created by
+rounding, only moved between the sold and the remaining part.
+
+Methods:
+- FIFO: sells consume the oldest lots first
+- WEIGHTED_AVG: lots are pooled into one running (amount, cost), so every
+  sell is costed at the current average
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Deque, Dict, List, Optional
+
+from src.lib.position_models import CostBasisMethod
+
+FIXED_DIGITS = 12
+FIXED_SCALE = 10 ** FIXED_DIGITS
+
+
+def to_fixed(value: Decimal) -> int:
+    """Decimal -> fixed-point integer units (truncated past FIXED_DIGITS places)"""
+    return int(Decimal(value).scaleb(FIXED_DIGITS))
+
+
+def from_fixed(units: int) -> Decimal:
+    """Fixed-point integer units -> Decimal"""
+    return Decimal(units).scaleb(-FIXED_DIGITS)
+
+
+@dataclass
+class Lot:
+    """An open lot: fixed-point amount still held and the cost of that amount"""
+    amount: int
+    cost: int
+    ref: Any = None  # Caller's tag, e.g. the buy signature
+
+
+@dataclass
+class Fill:
+    """Result of matching one sell against the ledger"""
+    amount: Decimal  # Amount requested
+    matched: Decimal  # Amount covered by open lots
+    cost_basis_usd: Decimal  # Cost of the matched amount
+    lots_used: int  # Lots drawn from, including a partially filled one
+    balance: Decimal  # Running balance after the sell
+    realized_pnl_usd: Optional[Decimal] = None  # proceeds - cost, when proceeds were given
+
+    @property
+    def unmatched(self) -> Decimal:
+        """Amount sold beyond the known buy history"""
+        return self.amount - self.matched
+
+
+class LotLedger:
+    """Open lots, running balance and realized P&L for one token"""
+
+    def __init__(self, method: CostBasisMethod = CostBasisMethod.FIFO):
+        self.method = method
+        self._lots: Deque[Lot] = deque()
+        self._held = 0  # Sum of open lot amounts
+        self._cost = 0  # Sum of open lot costs
+        self._balance = 0  # Buys minus sells; can go below zero when history is incomplete
+        self._realized = 0
+
+    def buy(self, amount: Decimal, cost_usd: Optional[Decimal], ref: Any = None):
+        """Open a lot of amount tokens that cost cost_usd in total"""
+        units = to_fixed(amount)
+        cost = to_fixed(cost_usd) if cost_usd is not None else 0
+        self._balance += units
+        if units <= 0:
+            return
+        self._held += units
+        self._cost += cost
+        if self.method == CostBasisMethod.WEIGHTED_AVG and self._lots:
+            pool = self._lots[0]
+            pool.amount += units
+            pool.cost += cost
+        else:
+            self._lots.append(Lot(units, cost, ref))
+
+    def sell(self, amount: Decimal, proceeds_usd: Optional[Decimal] = None) -> Fill:
+        """Match a sell against open lots; the part beyond open lots is unmatched"""
+        units = to_fixed(amount)
+        self._balance -= units
+        wanted = max(units, 0)
+        remaining = wanted
+        cost = 0
+        used = 0
+        lots = self._lots
+        while remaining > 0 and lots:
+            lot = lots[0]
+            used += 1
+            if lot.amount <= remaining:
+                cost += lot.cost
+                remaining -= lot.amount
+                lots.popleft()
+            else:
+                part = lot.cost * remaining // lot.amount
+                cost += part
+                lot.amount -= remaining
+                lot.cost -= part
+                remaining = 0
+        matched = wanted - remaining
+        self._held -= matched
+        self._cost -= cost
+
+        realized = None
+        if proceeds_usd is not None:
+            pnl = to_fixed(proceeds_usd) - cost
+            self._realized += pnl
+            realized = from_fixed(pnl)
+        return Fill(
+            amount=from_fixed(units),
+            matched=from_fixed(matched),
+            cost_basis_usd=from_fixed(cost),
+            lots_used=used,
+            balance=from_fixed(self._balance),
+            realized_pnl_usd=realized,
+        )
+
+    def reset(self):
+        """Drop open lots and the balance (position closed); realized P&L is kept"""
+        self._lots.clear()
+        self._held = 0
+        self._cost = 0
+        self._balance = 0
+
+    @property
+    def balance(self) -> Decimal:
+        """Running balance: everything bought minus everything sold"""
+        return from_fixed(self._balance)
+
+    @property
+    def held(self) -> Decimal:
+        """Amount still covered by open lots"""
+        return from_fixed(self._held)
+
+    @property
+    def remaining_cost_usd(self) -> Decimal:
+        """Cost of the amount still held"""
+        return from_fixed(self._cost)
+
+    @property
+    def cost_basis_per_token(self) -> Decimal:
+        """Average cost of the amount still held"""
+        return from_fixed(self._cost) / from_fixed(self._held) if self._held > 0 else Decimal("0")
+
+    @property
+    def realized_pnl_usd(self) -> Decimal:
+        """Realized P&L summed over sells that were given proceeds"""
+        return from_fixed(self._realized)
+
+    def lots(self) -> List[Lot]:
+        """Open lots, oldest first, as Decimal amount / cost"""
+        return [Lot(from_fixed(lot.amount), from_fixed(lot.cost), lot.ref) for lot in self._lots]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Lossless JSON-safe state (fixed-point integers) for checkpoints"""
+        return {
+            "method": self.method.value,
+            "lots": [[lot.amount, lot.cost, lot.ref] for lot in self._lots],
+            "balance": self._balance,
+            "realized": self._realized,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LotLedger":
+        """Restore a ledger written by to_dict"""
+        ledger = cls(CostBasisMethod(data["method"]))
+        for amount, cost, ref in data.get("lots", []):
+            ledger._lots.append(Lot(amount, cost, ref))
+            ledger._held += amount
+            ledger._cost += cost
+        ledger._balance = data.get("balance", 0)
+        ledger._realized = data.get("realized", 0)
+        return ledger
+
+    def __bool__(self) -> bool:
+        return self._held > 0
+
+    def __len__(self) -> int:
+        return len(self._lots)
@@ -10,13 +10,14 @@ import time
 import logging
 from typing import Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
-from collections import OrderedDict
 from dataclasses import dataclass, asdict
 from decimal import Decimal
 import redis
 from redis.connection import ConnectionPool
 from redis.exceptions import RedisError, ConnectionError as RedisConnectionError
 
+from src.lib.byte_budget_cache import ByteBudgetCache
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
@@ -25,6 +26,7 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CACHE_TTL_DAYS = 30
 CACHE_TTL_SECONDS = CACHE_TTL_DAYS * 24 * 60 * 60
 LRU_MAX_SIZE = 1000  # In-memory fallback capacity
+LRU_MAX_BYTES = int(os.getenv("MC_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))  # In-memory fallback budget
 CACHE_KEY_PREFIX = "mc:v1:"  # Version prefix for cache keys
 
 # Market cap confidence levels
@@ -61,37 +63,16 @@ class MarketCapData:
         )
 
 
-class InMemoryLRUCache:
-    """Simple LRU cache for Redis fallback"""
+class InMemoryLRUCache(ByteBudgetCache):
+    """Byte-budgeted GDSF cache for Redis fallback"""
     
-    def __init__(self, max_size: int = LRU_MAX_SIZE):
-        self.cache: OrderedDict[str, Tuple[str, float]] = OrderedDict()
-        self.max_size = max_size
+    def __init__(self, max_size: int = LRU_MAX_SIZE, max_bytes: int = LRU_MAX_BYTES):
+        super().__init__(max_bytes=max_bytes, max_size=max_size)
     
     def get(self, key: str) -> Optional[str]:
         """Get value from cache"""
-        if key not in self.cache:
-            return None
-        
-        # Check TTL
-        value, expiry = self.cache[key]
-        if time.time() > expiry:
-            del self.cache[key]
-            return None
-        
-        # Move to end (most recently used)
-        self.cache.move_to_end(key)
-        return value
-    
-    def set(self, key: str, value: str, ttl_seconds: int):
-        """Set value in cache with TTL"""
-        expiry = time.time() + ttl_seconds
-        self.cache[key] = (value, expiry)
-        self.cache.move_to_end(key)
-        
-        # Evict oldest if over capacity
-        while len(self.cache) > self.max_size:
-            self.cache.popitem(last=False)
+        result = self.get_entry(key)
+        return result[0] if result else None
 
 
 class MarketCapCache:
@@ -250,7 +231,10 @@ class MarketCapCache:
         stats = {
             "backend": "redis" if self.use_redis else "in-memory",
             "lru_size": len(self.lru_cache.cache),
-            "lru_max_size": self.lru_cache.max_size
+            "lru_max_size": self.lru_cache.max_size,
+            "lru_bytes": self.lru_cache.bytes,
+            "lru_max_bytes": self.lru_cache.max_bytes,
+            "lru": self.lru_cache.get_stats()
         }
         
         if self.use_redis and self.redis_client:
@@ -6,7 +6,7 @@ Market Cap Calculator - Orchestrates supply and price data to calculate MC with
 import os
 import asyncio
 import logging
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, Tuple, List, AsyncIterator
 from decimal import Decimal
 from datetime import datetime
 from dataclasses import dataclass
@@ -26,6 +26,14 @@ from .jupiter_client import get_jupiter_price
 USDC_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
 SOL_MINT = "So11111111111111111111111111111111111111112"
 
+BatchRequest = Tuple[str, Optional[int], Optional[int]]  # (token_mint, slot, timestamp)
+
+
+def get_mc_batch_concurrency() -> int:
+    """Max market cap lookups in flight per batch (upstream clients still pace to their rate budget)"""
+    return max(1, int(os.getenv("MC_BATCH_CONCURRENCY", "8")))
+
+
 # Confidence levels
 CONFIDENCE_HIGH = "high"      # Primary sources (Helius + AMM)
 CONFIDENCE_EST = "est"        # Fallback sources (Birdeye, DexScreener)
@@ -76,6 +84,15 @@ class MarketCapCalculator:
             if cached:
                 return cached
         
+        return await self._calculate_uncached(token_mint, slot, timestamp)
+    
+    async def _calculate_uncached(
+        self,
+        token_mint: str,
+        slot: Optional[int],
+        timestamp: Optional[int]
+    ) -> MarketCapResult:
+        """Resolve market cap from upstream sources, caching a found value"""
         # Try primary sources (Helius + AMM)
         result = await self._try_primary_sources(token_mint, slot)
         if result:
@@ -115,19 +132,24 @@ class MarketCapCalculator:
             cached_data = self.cache.get(token_mint, timestamp)
             if cached_data:
                 logger.info(f"Cache hit for {token_mint[:8]}... MC: ${cached_data.value:,.2f}")
-                return MarketCapResult(
-                    value=cached_data.value,
-                    confidence=cached_data.confidence,
-                    source=f"cache_{cached_data.source}" if cached_data.source else "cache",
-                    supply=None,
-                    price=None,
-                    timestamp=cached_data.timestamp
-                )
+                return self._result_from_cache(cached_data)
         except Exception as e:
             logger.error(f"Cache lookup error: {e}")
             
         return None
     
+    @staticmethod
+    def _result_from_cache(cached_data: MarketCapData) -> MarketCapResult:
+        """Convert a cache entry into a result tagged with its cache source"""
+        return MarketCapResult(
+            value=cached_data.value,
+            confidence=cached_data.confidence,
+            source=f"cache_{cached_data.source}" if cached_data.source else "cache",
+            supply=None,
+            price=None,
+            timestamp=cached_data.timestamp
+        )
+    
     async def _try_primary_sources(
         self,
         token_mint: str,
@@ -387,9 +409,77 @@ class MarketCapCalculator:
         except Exception as e:
             logger.error(f"Failed to cache MC: {e}")
     
+    async def iter_batch_market_caps(
+        self,
+        requests: List[BatchRequest],
+        concurrency: Optional[int] = None
+    ) -> AsyncIterator[Tuple[BatchRequest, MarketCapResult]]:
+        """
+        Resolve market caps for many tokens, yielding each result as soon as it is ready
+        
+        Duplicate requests are resolved once. Cache entries are read in a single
+        batch_get and yielded first; misses run concurrently, at most
+        `concurrency` at a time.
+        
+        Args:
+            requests: List of (token_mint, slot, timestamp) tuples
+            concurrency: Max lookups in flight (default MC_BATCH_CONCURRENCY)
+            
+        Yields:
+            ((token_mint, slot, timestamp), MarketCapResult) in completion order
+        """
+        unique = list(dict.fromkeys(requests))
+        misses = unique
+        
+        if self._cache_enabled:
+            timed = [(token_mint, timestamp) for token_mint, _, timestamp in unique if timestamp]
+            cached: Dict[Tuple[str, int], Optional[MarketCapData]] = {}
+            if timed:
+                try:
+                    cached = self.cache.batch_get(timed)
+                except Exception as e:
+                    logger.error(f"Batch cache lookup error: {e}")
+            misses = []
+            for req in unique:
+                cached_data = cached.get((req[0], req[2])) if req[2] else None
+                if cached_data:
+                    yield req, self._result_from_cache(cached_data)
+                else:
+                    misses.append(req)
+        
+        if not misses:
+            return
+        
+        semaphore = asyncio.Semaphore(concurrency or get_mc_batch_concurrency())
+        
+        async def resolve(req: BatchRequest) -> Tuple[BatchRequest, MarketCapResult]:
+            async with semaphore:
+                try:
+                    return req, await self._calculate_uncached(*req)
+                except Exception as e:
+                    logger.error(f"Batch MC error for {req[0]}: {e}")
+                    return req, MarketCapResult(
+                        value=None,
+                        confidence=CONFIDENCE_UNAVAILABLE,
+                        source=None,
+                        supply=None,
+                        price=None,
+                        timestamp=int(datetime.now().timestamp())
+                    )
+        
+        tasks = [asyncio.create_task(resolve(req)) for req in misses]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Consumer stopped early (client disconnect): drop the remaining lookups
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
     async def get_batch_market_caps(
         self,
-        requests: list[Tuple[str, Optional[int], Optional[int]]]
+        requests: List[BatchRequest]
     ) -> Dict[str, MarketCapResult]:
         """
         Get market caps for multiple tokens in batch
@@ -400,26 +490,9 @@ class MarketCapCalculator:
         Returns:
             Dict mapping token_mint to MarketCapResult
         """
-        tasks = []
-        for token_mint, slot, timestamp in requests:
-            task = self.calculate_market_cap(token_mint, slot, timestamp)
-            tasks.append((token_mint, task))
-        
         results = {}
-        for token_mint, task in tasks:
-            try:
-                result = await task
-                results[token_mint] = result
-            except Exception as e:
-                logger.error(f"Batch MC error for {token_mint}: {e}")
-                results[token_mint] = MarketCapResult(
-                    value=None,
-                    confidence=CONFIDENCE_UNAVAILABLE,
-                    source=None,
-                    supply=None,
-                    price=None,
-                    timestamp=int(datetime.now().timestamp())
-                )
+        async for (token_mint, _, _), result in self.iter_batch_market_caps(requests):
+            results[token_mint] = result
         
         return results
 
@@ -454,6 +527,34 @@ async def calculate_market_cap(
     return await calculator.calculate_market_cap(token_mint, slot, timestamp)
 
 
+async def iter_market_caps(
+    requests: List[BatchRequest],
+    use_cache: bool = True,
+    concurrency: Optional[int] = None
+) -> AsyncIterator[Tuple[BatchRequest, MarketCapResult]]:
+    """
+    Resolve market caps for many tokens concurrently, yielding results as they complete
+    
+    Args:
+        requests: List of (token_mint, slot, timestamp) tuples
+        use_cache: Whether to use cache (default True)
+        concurrency: Max lookups in flight (default MC_BATCH_CONCURRENCY)
+        
+    Yields:
+        ((token_mint, slot, timestamp), MarketCapResult)
+    """
+    cache = None
+    if use_cache:
+        try:
+            cache = get_cache()
+        except:
+            logger.warning("Cache not available, proceeding without cache")
+    
+    calculator = MarketCapCalculator(cache)
+    async for item in calculator.iter_batch_market_caps(requests, concurrency):
+        yield item
+
+
 # Example usage
 if __name__ == "__main__":
     async def test_calculator():
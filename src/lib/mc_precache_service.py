@@ -19,6 +19,7 @@ logger = logging.getLogger(__name__)
 from .mc_calculator import MarketCapCalculator, calculate_market_cap
 from .mc_cache import get_cache
 from .jupiter_client import JupiterClient
+from .rate_scheduler import Priority, priority_scope
 
 # Constants
 CACHE_REFRESH_INTERVAL = 300  # 5 minutes
@@ -194,9 +195,10 @@ class PreCacheService:
                 except Exception as e:
                     logger.error(f"Error caching {token[:8]}...: {e}")
         
-        # Process all tokens in parallel
-        tasks = [cache_token(token) for token in tokens]
-        await asyncio.gather(*tasks, return_exceptions=True)
+        # Process all tokens in parallel, behind interactive and warming traffic
+        with priority_scope(Priority.PRECACHE):
+            tasks = [cache_token(token) for token in tokens]
+            await asyncio.gather(*tasks, return_exceptions=True)
     
     async def _trending_token_updater(self):
         """Update list of trending tokens periodically"""
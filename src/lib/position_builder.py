@@ -8,16 +8,18 @@ with accurate cost basis and balance tracking.
 
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Dict, Tuple, Optional, Any
+from typing import List, Dict, Tuple, Optional, Any, Union
 from collections import defaultdict
 from dataclasses import dataclass, field
 import logging
 
 from src.lib.position_models import Position, CostBasisMethod
+from src.lib.lot_ledger import LotLedger
 from src.lib.cost_basis_calculator import (
     CostBasisCalculator, BuyRecord, CostBasisResult, DUST_THRESHOLD_USD
 )
 from src.config.feature_flags import get_cost_basis_method, positions_enabled
+from src.lib.trade_table import TradeTable, TradeRow
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +29,7 @@ SOL_SYMBOL = "SOL"
 ZERO = Decimal("0")
 # WAL-606e: Spam token filter thresholds
 MIN_POOL_SOL = Decimal("0.01")  # Minimum pooled SOL for valid tokens
+CHECKPOINT_VERSION = 1
 
 
 @dataclass
@@ -35,13 +38,19 @@ class TokenTradeGroup:
     token_mint: str
     token_symbol: str
     trades: List[Dict[str, Any]] = field(default_factory=list)
+    rows: List[TradeRow] = field(default_factory=list)  # TradeTable input
     buys: List[BuyRecord] = field(default_factory=list)
+    ledger: Optional[LotLedger] = None  # Open lots, created on first buy/sell
     current_balance: Decimal = ZERO
     total_bought: Decimal = ZERO
     total_sold: Decimal = ZERO
     total_invested_usd: Decimal = ZERO  # WAL-606e: Track total invested
     first_trade_time: Optional[datetime] = None
     last_trade_time: Optional[datetime] = None
+    open_buys: int = 0  # Buys since the position last closed
+    trade_count: int = 0  # Trades applied across all builds
+    decimals: Optional[int] = None
+    last_update_slot: int = 0
     
     def add_trade(self, trade: Dict[str, Any]):
         """Add a trade to this token group"""
@@ -53,10 +62,119 @@ class TokenTradeGroup:
             trade_time = datetime.fromisoformat(trade_time.replace("Z", "+00:00"))
         
         if trade_time:
-            if self.first_trade_time is None or trade_time < self.first_trade_time:
-                self.first_trade_time = trade_time
-            if self.last_trade_time is None or trade_time > self.last_trade_time:
-                self.last_trade_time = trade_time
+            self._update_times(trade_time)
+    
+    def add_row(self, row: TradeRow):
+        """Add a TradeTable row to this token group"""
+        self.rows.append(row)
+        self._update_times(row.timestamp)
+    
+    def _update_times(self, trade_time: datetime):
+        if self.first_trade_time is None or trade_time < self.first_trade_time:
+            self.first_trade_time = trade_time
+        if self.last_trade_time is None or trade_time > self.last_trade_time:
+            self.last_trade_time = trade_time
+    
+    def to_state(self) -> Dict[str, Any]:
+        """Running state without the trades themselves, for checkpoints"""
+        return {
+            "token_mint": self.token_mint,
+            "token_symbol": self.token_symbol,
+            "ledger": self.ledger.to_dict() if self.ledger is not None else None,
+            "current_balance": str(self.current_balance),
+            "total_bought": str(self.total_bought),
+            "total_sold": str(self.total_sold),
+            "total_invested_usd": str(self.total_invested_usd),
+            "first_trade_time": self.first_trade_time.isoformat() if self.first_trade_time else None,
+            "last_trade_time": self.last_trade_time.isoformat() if self.last_trade_time else None,
+            "open_buys": self.open_buys,
+            "trade_count": self.trade_count,
+            "decimals": self.decimals,
+            "last_update_slot": self.last_update_slot,
+        }
+    
+    @classmethod
+    def from_state(cls, data: Dict[str, Any]) -> "TokenTradeGroup":
+        """Restore a group written by to_state"""
+        first, last = data.get("first_trade_time"), data.get("last_trade_time")
+        return cls(
+            token_mint=data["token_mint"],
+            token_symbol=data["token_symbol"],
+            ledger=LotLedger.from_dict(data["ledger"]) if data.get("ledger") else None,
+            current_balance=Decimal(data["current_balance"]),
+            total_bought=Decimal(data["total_bought"]),
+            total_sold=Decimal(data["total_sold"]),
+            total_invested_usd=Decimal(data["total_invested_usd"]),
+            first_trade_time=datetime.fromisoformat(first) if first else None,
+            last_trade_time=datetime.fromisoformat(last) if last else None,
+            open_buys=data.get("open_buys", 0),
+            trade_count=data.get("trade_count", 0),
+            decimals=data.get("decimals"),
+            last_update_slot=data.get("last_update_slot", 0),
+        )
+
+
+@dataclass
+class PositionCheckpoint:
+    """
+    Position builder state for one wallet as of a slot/signature
+    
+    Holds each token's running balances and open lots, not its trades, so
+    apply_trades() only has to replay trades newer than the checkpoint.
+    """
+    wallet: str
+    cost_basis_method: CostBasisMethod
+    slot: int = 0  # Newest slot applied
+    signature: Optional[str] = None  # A signature at that slot
+    slot_signatures: List[str] = field(default_factory=list)  # Every signature applied at slot
+    sol_balance: Decimal = ZERO
+    trade_count: int = 0
+    groups: Dict[str, TokenTradeGroup] = field(default_factory=dict)
+    
+    def is_new(self, slot: int, signature: Optional[str]) -> bool:
+        """True if a trade at slot/signature has not been applied yet"""
+        if slot != self.slot:
+            return slot > self.slot
+        return signature not in self.slot_signatures
+    
+    def advance(self, slot: int, signature: Optional[str]):
+        """Record a trade as applied"""
+        if slot > self.slot:
+            self.slot, self.signature, self.slot_signatures = slot, signature, []
+        if slot == self.slot and signature is not None:
+            self.slot_signatures.append(signature)
+            self.signature = self.signature or signature
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for storage"""
+        return {
+            "version": CHECKPOINT_VERSION,
+            "wallet": self.wallet,
+            "cost_basis_method": self.cost_basis_method.value,
+            "slot": self.slot,
+            "signature": self.signature,
+            "slot_signatures": self.slot_signatures,
+            "sol_balance": str(self.sol_balance),
+            "trade_count": self.trade_count,
+            "groups": [group.to_state() for group in self.groups.values()],
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Optional["PositionCheckpoint"]:
+        """Create from dictionary, None for an unknown version"""
+        if data.get("version") != CHECKPOINT_VERSION:
+            return None
+        groups = [TokenTradeGroup.from_state(g) for g in data.get("groups", [])]
+        return cls(
+            wallet=data["wallet"],
+            cost_basis_method=CostBasisMethod(data["cost_basis_method"]),
+            slot=data.get("slot", 0),
+            signature=data.get("signature"),
+            slot_signatures=list(data.get("slot_signatures", [])),
+            sol_balance=Decimal(data.get("sol_balance", "0")),
+            trade_count=data.get("trade_count", 0),
+            groups={group.token_mint: group for group in groups},
+        )
 
 
 class PositionBuilder:
@@ -84,39 +202,141 @@ class PositionBuilder:
             self.cost_basis_method = cost_basis_method
         
         self.calculator = CostBasisCalculator(self.cost_basis_method)
+        # State as of the newest trade built or applied; see apply_trades()
+        self.checkpoint: Optional[PositionCheckpoint] = None
+    
+    @classmethod
+    def from_checkpoint(cls, checkpoint: Union[PositionCheckpoint, Dict[str, Any]]) -> "PositionBuilder":
+        """
+        Create a builder that continues from a saved checkpoint
+        
+        Args:
+            checkpoint: PositionCheckpoint or its to_dict() form
+            
+        Returns:
+            PositionBuilder using the checkpoint's cost basis method
+        """
+        if isinstance(checkpoint, dict):
+            loaded = PositionCheckpoint.from_dict(checkpoint)
+            if loaded is None:
+                raise ValueError(f"Unsupported position checkpoint version: {checkpoint.get('version')}")
+            checkpoint = loaded
+        builder = cls(checkpoint.cost_basis_method)
+        builder.checkpoint = checkpoint
+        return builder
     
-    def build_positions_from_trades(self, trades: List[Dict[str, Any]], 
+    def build_positions_from_trades(self, trades: Union[List[Dict[str, Any]], TradeTable], 
                                    wallet: str) -> List[Position]:
         """
         Build positions from a list of trades
         
         Args:
-            trades: List of trade dictionaries
+            trades: List of trade dictionaries, or a TradeTable (read directly,
+                    without per-trade dict/Decimal(str()) conversion)
             wallet: Wallet address
             
         Returns:
-            List of Position objects (open positions only)
+            List of Position objects (open positions only); self.checkpoint
+            holds the resulting state for apply_trades()
         """
         if not positions_enabled():
             logger.warning("Position tracking is disabled via feature flag")
             return []
         
         # Group trades by token
-        token_groups = self._group_trades_by_token(trades)
+        if isinstance(trades, TradeTable):
+            token_groups = self._group_rows_by_token(trades)
+            sol_balance = self._table_sol_balance(trades)
+        else:
+            token_groups = self._group_trades_by_token(trades)
+            sol_balance = self._dict_sol_balance(trades)
+        
+        built = {mint: self._build_group(wallet, group) for mint, group in token_groups.items()}
+        positions = self._collect_positions(wallet, token_groups, built, sol_balance)
+        
+        try:
+            applied = self._slot_keys(trades)
+        except ValueError as e:
+            # Without slots there is no cursor to resume from; callers rebuild instead
+            logger.warning(f"Positions not checkpointed: {e}")
+            self.checkpoint = None
+        else:
+            self.checkpoint = PositionCheckpoint(
+                wallet=wallet,
+                cost_basis_method=self.cost_basis_method,
+                sol_balance=sol_balance,
+                groups=token_groups
+            )
+            self._advance_checkpoint(applied)
+        
+        logger.info(f"Built {len(positions)} open positions from {len(trades)} trades")
+        return positions
+    
+    def apply_trades(self, new_trades: Union[List[Dict[str, Any]], TradeTable]) -> List[Position]:
+        """
+        Apply trades newer than the checkpoint and return the updated positions
+        
+        Only tokens the new trades touch are replayed; every other token's
+        position is recreated from its checkpointed balance and open lots.
+        Trades at or before the checkpoint (by slot, then signature) are
+        skipped, so overlapping deltas are safe to pass.
+        
+        Args:
+            new_trades: Trade dictionaries or a TradeTable, e.g. a delta fetch
+            
+        Returns:
+            List of Position objects (open positions only)
+            
+        Raises:
+            ValueError: without a checkpoint, or if a trade has no slot
+        """
+        checkpoint = self.checkpoint
+        if checkpoint is None:
+            raise ValueError("No position checkpoint; build positions or load a checkpoint first")
+        if not positions_enabled():
+            logger.warning("Position tracking is disabled via feature flag")
+            return []
         
-        # Build position for each token
+        groups = checkpoint.groups
+        keys = self._slot_keys(new_trades)
+        indices = [i for i, (slot, signature) in enumerate(keys) if checkpoint.is_new(slot, signature)]
+        if isinstance(new_trades, TradeTable):
+            self._group_rows_by_token(new_trades, indices, groups)
+            checkpoint.sol_balance += self._table_sol_balance(new_trades, indices)
+        else:
+            fresh_trades = [new_trades[i] for i in indices]
+            self._group_trades_by_token(fresh_trades, groups)
+            checkpoint.sol_balance += self._dict_sol_balance(fresh_trades)
+        
+        built = {}
+        touched = 0
+        for mint, group in groups.items():
+            if group.trades or group.rows:
+                built[mint] = self._build_group(checkpoint.wallet, group)
+                touched += 1
+            else:
+                built[mint] = self._create_position(checkpoint.wallet, group)
+        positions = self._collect_positions(checkpoint.wallet, groups, built, checkpoint.sol_balance)
+        self._advance_checkpoint([keys[i] for i in indices])
+        
+        logger.info(
+            f"Applied {len(indices)} new trades to {touched} of {len(groups)} tokens "
+            f"(checkpoint slot {checkpoint.slot})"
+        )
+        return positions
+    
+    def _build_group(self, wallet: str, group: TokenTradeGroup) -> Optional[Position]:
+        if group.rows:
+            return self._build_position_for_rows(wallet, group)
+        return self._build_position_for_token(wallet, group)
+    
+    def _collect_positions(self, wallet: str, groups: Dict[str, TokenTradeGroup],
+                           built: Dict[str, Optional[Position]],
+                           sol_balance: Decimal) -> List[Position]:
+        """SOL position plus open, non-spam token positions"""
         positions = []
         spam_filtered = 0
         
-        # Track SOL balance changes for native position
-        sol_balance = ZERO
-        for trade in trades:
-            # Track SOL balance changes
-            if trade.get("token_in", {}).get("mint") == SOL_MINT:
-                sol_balance -= Decimal(str(trade.get("token_in", {}).get("amount", 0)))
-            if trade.get("token_out", {}).get("mint") == SOL_MINT:
-                sol_balance += Decimal(str(trade.get("token_out", {}).get("amount", 0)))
-        
         # Create SOL position if balance > 0.01
         if sol_balance > Decimal("0.01"):
             sol_position = Position(
@@ -139,16 +359,16 @@ class PositionBuilder:
             positions.append(sol_position)
         
         # Build positions for other tokens
-        raw_positions_count = len(token_groups)
+        raw_positions_count = len(groups)
         logger.info(f"[FILTER-BEFORE] positions={raw_positions_count}")
         
-        for token_mint, group in token_groups.items():
-            position = self._build_position_for_token(wallet, group)
+        for token_mint, group in groups.items():
+            position = built[token_mint]
             if position and not position.is_closed:
                 # WAL-606e: Check if this is a spam token
                 if self._is_spam_token(group):
                     spam_filtered += 1
-                    logger.info(f"[WHY] {group.token_symbol} dropped: spam_token (no_buys={len(group.buys)==0}, invested_usd={float(group.total_invested_usd)})")
+                    logger.info(f"[WHY] {group.token_symbol} dropped: spam_token (no_buys={group.open_buys == 0}, invested_usd={float(group.total_invested_usd)})")
                     continue
                 positions.append(position)
             elif position is None:
@@ -162,9 +382,60 @@ class PositionBuilder:
         sys.stderr.flush()
         
         logger.info(f"[FILTER-AFTER] positions={len(positions)} filtered={spam_filtered}")
-        logger.info(f"Built {len(positions)} open positions from {len(trades)} trades (filtered {spam_filtered} spam tokens)")
         return positions
     
+    @staticmethod
+    def _slot_keys(trades: Union[List[Dict[str, Any]], TradeTable]) -> List[Tuple[int, Optional[str]]]:
+        """(slot, signature) of every trade; the checkpoint cursor needs a slot on each"""
+        if isinstance(trades, TradeTable):
+            keys = list(zip(trades.slots, trades.signatures))
+        else:
+            keys = [(trade.get("slot") or 0, trade.get("signature")) for trade in trades]
+        for slot, signature in keys:
+            if slot <= 0:
+                raise ValueError(f"trade {signature} has no slot")
+        return keys
+    
+    def _advance_checkpoint(self, applied: List[Tuple[int, Optional[str]]]):
+        """Move the checkpoint head past applied (slot, signature) keys and drop trade references"""
+        checkpoint = self.checkpoint
+        for slot, signature in applied:
+            checkpoint.advance(slot, signature)
+        checkpoint.trade_count += len(applied)
+        
+        # The checkpoint keeps running state only, never the trade history
+        for group in checkpoint.groups.values():
+            group.trades = []
+            group.rows = []
+            group.buys = []
+    
+    def _dict_sol_balance(self, trades: List[Dict[str, Any]]) -> Decimal:
+        """Net SOL balance change across trade dicts"""
+        sol_balance = ZERO
+        for trade in trades:
+            if trade.get("token_in", {}).get("mint") == SOL_MINT:
+                sol_balance -= Decimal(str(trade.get("token_in", {}).get("amount", 0)))
+            if trade.get("token_out", {}).get("mint") == SOL_MINT:
+                sol_balance += Decimal(str(trade.get("token_out", {}).get("amount", 0)))
+        return sol_balance
+    
+    def _table_sol_balance(self, table: TradeTable, indices: Optional[List[int]] = None) -> Decimal:
+        """Net SOL balance change, summed in base units per decimals scale"""
+        spent: Dict[int, int] = defaultdict(int)
+        received: Dict[int, int] = defaultdict(int)
+        sol_id = table.sol_id
+        for i in (range(len(table)) if indices is None else indices):
+            if table.in_mint_ids[i] == sol_id:
+                spent[table.in_decimals[i]] += table.in_amounts[i]
+            if table.out_mint_ids[i] == sol_id:
+                received[table.out_decimals[i]] += table.out_amounts[i]
+        sol_balance = ZERO
+        for decimals, units in received.items():
+            sol_balance += Decimal(units).scaleb(-decimals)
+        for decimals, units in spent.items():
+            sol_balance -= Decimal(units).scaleb(-decimals)
+        return sol_balance
+    
     def _is_spam_token(self, group: TokenTradeGroup) -> bool:
         """
         WAL-606e: Check if a token is spam (airdrop with no buys or very low TVL)
@@ -176,24 +447,27 @@ class PositionBuilder:
             True if token should be filtered as spam
         """
         # Check if there are NO buy trades at all (pure airdrop)
-        if not group.buys:
+        if group.open_buys == 0:
             return True
         
         # If we have buy trades, allow it through even if USD values are missing
         # The missing USD values are a data quality issue, not spam
         return False
     
-    def _group_trades_by_token(self, trades: List[Dict[str, Any]]) -> Dict[str, TokenTradeGroup]:
+    def _group_trades_by_token(self, trades: List[Dict[str, Any]],
+                               groups: Optional[Dict[str, TokenTradeGroup]] = None) -> Dict[str, TokenTradeGroup]:
         """
         Group trades by token mint address
         
         Args:
             trades: List of trades
+            groups: Existing groups to add to (checkpoint), or None for new ones
             
         Returns:
             Dictionary mapping token mint to TokenTradeGroup
         """
-        groups: Dict[str, TokenTradeGroup] = {}
+        if groups is None:
+            groups = {}
         
         for trade in trades:
             # Determine which token (not SOL) is involved
@@ -215,6 +489,44 @@ class PositionBuilder:
         
         return groups
     
+    def _group_rows_by_token(self, table: TradeTable, indices: Optional[List[int]] = None,
+                             groups: Optional[Dict[str, TokenTradeGroup]] = None) -> Dict[str, TokenTradeGroup]:
+        """
+        Group TradeTable rows by interned mint ID
+        
+        Args:
+            table: Trade table
+            indices: Rows to group, or None for all
+            groups: Existing groups to add to (checkpoint), or None for new ones
+            
+        Returns:
+            Dictionary mapping token mint to TokenTradeGroup
+        """
+        if groups is None:
+            groups = {}
+        by_id: Dict[int, TokenTradeGroup] = {}
+        
+        for i in (range(len(table)) if indices is None else indices):
+            row = TradeRow(table, i)
+            mint_id = row.token_mint_id
+            if mint_id == table.sol_id:
+                # Skip SOL-only trades (shouldn't happen)
+                continue
+            
+            group = by_id.get(mint_id)
+            if group is None:
+                mint = table.mints.mints[mint_id]
+                group = groups.get(mint)
+                if group is None:
+                    group = groups[mint] = TokenTradeGroup(
+                        token_mint=mint,
+                        token_symbol=table.mints.symbols[mint_id]
+                    )
+                by_id[mint_id] = group
+            group.add_row(row)
+        
+        return groups
+    
     def _extract_token_info(self, trade: Dict[str, Any]) -> Tuple[str, str]:
         """
         Extract the non-SOL token from a trade
@@ -261,18 +573,63 @@ class PositionBuilder:
         for trade in sorted_trades:
             self._process_trade_for_position(trade, group)
         
+        group.trade_count += len(sorted_trades)
+        if sorted_trades:
+            group.last_update_slot = sorted_trades[-1].get("slot", 0)
+        if group.decimals is None:
+            group.decimals = self._get_token_decimals(sorted_trades)
+        position = self._create_position(wallet, group)
+        
+        # Add remaining balance info to last trade
+        if position and sorted_trades:
+            sorted_trades[-1]["remaining_balance"] = group.current_balance
+            sorted_trades[-1]["position_id"] = position.position_id
+        
+        return position
+    
+    def _build_position_for_rows(self, wallet: str,
+                                 group: TokenTradeGroup) -> Optional[Position]:
+        """
+        Build a position for a single token from TradeTable rows
+        
+        Args:
+            wallet: Wallet address
+            group: Token trade group holding rows
+            
+        Returns:
+            Position object or None if position is closed/dust
+        """
+        timestamps = group.rows[0].table.timestamps
+        sorted_rows = sorted(group.rows, key=lambda r: timestamps[r.index])
+        
+        for row in sorted_rows:
+            self._process_row_for_position(row, group)
+        
+        group.trade_count += len(sorted_rows)
+        group.last_update_slot = sorted_rows[-1].slot
+        if group.decimals is None:
+            group.decimals = 9  # Rows carry amount scale, not mint metadata; same default as dict trades
+        position = self._create_position(wallet, group)
+        
+        if position:
+            sorted_rows[-1].remaining_balance = group.current_balance
+            sorted_rows[-1].position_id = position.position_id
+        
+        return position
+    
+    def _create_position(self, wallet: str, group: TokenTradeGroup) -> Optional[Position]:
+        """Create the Position for a processed token group"""
         # Check if position is closed or dust
         if group.current_balance <= 0:
-            logger.debug(f"Position for {group.token_symbol} is closed: balance={group.current_balance}, buys={len(group.buys)}, trades={len(group.trades)}")
+            logger.debug(f"Position for {group.token_symbol} is closed: balance={group.current_balance}, trades={group.trade_count}")
             return None
         
         # Calculate cost basis for remaining balance
-        cost_basis_result = self.calculator.calculate_for_position(
-            group.buys, group.current_balance
+        cost_basis_result = self.calculator.calculate_for_ledger(
+            self._ledger(group), group.current_balance
         )
         
-        # Create position object
-        position = Position(
+        return Position(
             position_id="",  # Will be auto-generated
             wallet=wallet,
             token_mint=group.token_mint,
@@ -283,19 +640,59 @@ class PositionBuilder:
             cost_basis_method=self.cost_basis_method,
             opened_at=group.first_trade_time or datetime.utcnow(),
             last_trade_at=group.last_trade_time or datetime.utcnow(),
-            last_update_slot=sorted_trades[-1].get("slot", 0) if sorted_trades else 0,
+            last_update_slot=group.last_update_slot,
             last_update_time=datetime.utcnow(),
             is_closed=False,
-            trade_count=len(group.trades),
-            decimals=self._get_token_decimals(sorted_trades)
+            trade_count=group.trade_count,
+            decimals=group.decimals if group.decimals is not None else 9
         )
+    
+    def _ledger(self, group: TokenTradeGroup) -> LotLedger:
+        """The group's lot ledger, created with this builder's method"""
+        if group.ledger is None:
+            group.ledger = self.calculator.new_ledger()
+        return group.ledger
+    
+    def _apply_buy(self, group: TokenTradeGroup, amount: Decimal,
+                   value_usd: Optional[Decimal], buy_record: BuyRecord):
+        """Add a buy to the group's balance and cost basis lots"""
+        group.current_balance += amount
+        group.total_bought += amount
+        
+        # WAL-606e: Track invested amount
+        if value_usd is not None:
+            group.total_invested_usd += value_usd
+        
+        group.buys.append(buy_record)
+        group.open_buys += 1
+        self._ledger(group).buy(amount, value_usd, buy_record.tx_signature)
+    
+    def _apply_sell(self, group: TokenTradeGroup, amount: Decimal,
+                    sell_price: Optional[Decimal]) -> Optional[Decimal]:
+        """
+        Remove a sell from the group's balance
         
-        # Add remaining balance info to last trade
-        if sorted_trades:
-            sorted_trades[-1]["remaining_balance"] = group.current_balance
-            sorted_trades[-1]["position_id"] = position.position_id
+        Returns:
+            Realized P&L in USD, or None if there is no cost basis or price
+        """
+        group.current_balance -= amount
+        group.total_sold += amount
+        
+        realized_pnl = None
+        ledger = self._ledger(group)
+        has_cost_basis = bool(ledger)
+        # Consume open lots; realized P&L only if we have cost basis and a price
+        result = self.calculator.calculate_sell(ledger, amount, sell_price)
+        if has_cost_basis and sell_price:
+            realized_pnl = result.realized_pnl_usd
+        
+        # If position is closed, clear buy records for clean slate
+        if group.current_balance <= 0:
+            group.buys = []
+            group.open_buys = 0
+            ledger.reset()
         
-        return position
+        return realized_pnl
     
     def _process_trade_for_position(self, trade: Dict[str, Any], 
                                     group: TokenTradeGroup):
@@ -309,19 +706,13 @@ class PositionBuilder:
         action = trade.get("action", "").lower()
         
         if action == "buy":
-            # Add to position
             amount = Decimal(str(trade.get("amount", 0)))
-            group.current_balance += amount
-            group.total_bought += amount
-            
-            # WAL-606e: Track invested amount
             value_usd = trade.get("value_usd")
-            if value_usd is not None:
-                group.total_invested_usd += Decimal(str(value_usd))
-            
-            # Create buy record for cost basis
-            buy_record = BuyRecord.from_trade(trade)
-            group.buys.append(buy_record)
+            self._apply_buy(
+                group, amount,
+                Decimal(str(value_usd)) if value_usd is not None else None,
+                BuyRecord.from_trade(trade)
+            )
             
             # Update trade with position info
             trade["remaining_balance"] = group.current_balance
@@ -329,34 +720,38 @@ class PositionBuilder:
             trade["position_closed"] = False
             
         elif action == "sell":
-            # Reduce position
             amount = Decimal(str(trade.get("amount", 0)))
-            group.current_balance -= amount
-            group.total_sold += amount
-            
-            # Calculate realized P&L if we have cost basis
-            if group.buys and trade.get("price"):
-                sell_price = Decimal(str(trade["price"]))
-                result = self.calculator.calculate_realized_pnl(
-                    group.buys, amount, sell_price
-                )
-                trade["pnl_usd"] = float(result.realized_pnl_usd)
-                
-                # Update buy records for FIFO
-                if self.cost_basis_method == CostBasisMethod.FIFO:
-                    group.buys = self.calculator.update_buys_after_sell(
-                        group.buys, amount
-                    )
-            
+            sell_price = Decimal(str(trade["price"])) if trade.get("price") else None
+            realized_pnl = self._apply_sell(group, amount, sell_price)
+            if realized_pnl is not None:
+                trade["pnl_usd"] = float(realized_pnl)
             
             # Update trade with position info
             trade["remaining_balance"] = group.current_balance
             trade["cost_basis_method"] = self.cost_basis_method.value
             trade["position_closed"] = group.current_balance <= 0
-            
-            # If position is closed, clear buy records for clean slate
-            if group.current_balance <= 0:
-                group.buys = []
+    
+    def _process_row_for_position(self, row: TradeRow, group: TokenTradeGroup):
+        """
+        Process a single TradeTable row for position tracking
+        
+        Args:
+            row: Trade row (amounts and prices read straight from the columns)
+            group: Token trade group to update
+        """
+        amount = row.amount
+        
+        if row.is_sell:
+            realized_pnl = self._apply_sell(group, amount, row.price_usd)
+            if realized_pnl is not None:
+                row.pnl_usd = realized_pnl
+            row.position_closed = group.current_balance <= 0
+        else:
+            self._apply_buy(group, amount, row.value_usd, BuyRecord.from_row(row))
+            row.position_closed = False
+        
+        row.remaining_balance = group.current_balance
+        row.cost_basis_method = self.cost_basis_method.value
     
     def _get_token_decimals(self, trades: List[Dict[str, Any]]) -> int:
         """
@@ -428,8 +823,8 @@ class PositionBuilder:
             
             # Create snapshot
             if group.current_balance > 0:
-                cost_basis_result = self.calculator.calculate_for_position(
-                    group.buys, group.current_balance
+                cost_basis_result = self.calculator.calculate_for_ledger(
+                    self._ledger(group), group.current_balance
                 )
                 
                 snapshot = {
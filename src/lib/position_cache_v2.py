@@ -2,18 +2,22 @@
 Position Cache Layer V2 - Enhanced with Eviction & Refresh
 WAL-607: Smart cache eviction, lazy refresh, and staleness marking
 
-Provides configurable TTL, LRU eviction, async refresh on stale data,
+Provides configurable TTL, byte-budgeted eviction, async refresh on stale data,
 and Prometheus-ready metrics for monitoring cache performance.
+
+Stale (and nearly stale) hits are still served from cache; the wallet's
+snapshot is rebuilt in the background by the SnapshotRefresher and swapped in.
 """
 
 import os
 import json
 import time
+import random
 import asyncio
 import logging
+import concurrent.futures
 from typing import Optional, Dict, Any, List, Tuple, Set
 from datetime import datetime, timedelta
-from collections import OrderedDict
 from dataclasses import asdict
 from decimal import Decimal
 
@@ -28,6 +32,7 @@ except ImportError:
     RedisError = Exception
     RedisConnectionError = Exception
 
+from src.lib.byte_budget_cache import ByteBudgetCache
 from src.lib.position_models import Position, PositionPnL, PositionSnapshot
 from src.config.feature_flags import positions_enabled
 
@@ -50,84 +55,56 @@ def get_position_cache_max():
     return int(os.getenv("POSITION_CACHE_MAX", "2000"))
 
 
+def get_position_cache_max_bytes():
+    """Get in-memory position cache budget in bytes from environment"""
+    return int(os.getenv("POSITION_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+
+
 def is_position_cache_enabled():
     """Check if position cache is enabled"""
     return os.getenv("POSITION_CACHE_ENABLED", "true").lower() == "true"
 
 
-class InMemoryLRUCache:
-    """LRU cache with eviction tracking and staleness support"""
+def _wallet_of_key(key: str) -> Optional[str]:
+    """Wallet part of a pos:v1:<type>:<wallet>[:<mint>] key"""
+    parts = key.split(":")
+    return parts[3] if len(parts) >= 4 else None
+
+
+class InMemoryLRUCache(ByteBudgetCache):
+    """Byte-budgeted GDSF cache with staleness support and a wallet index"""
     
-    def __init__(self, max_size: Optional[int] = None):
-        self.cache: OrderedDict[str, Tuple[str, float, float]] = OrderedDict()  # value, expiry, created_at
-        self.max_size = max_size or get_position_cache_max()
-        self.evictions = 0
+    def __init__(self, max_size: Optional[int] = None, max_bytes: Optional[int] = None):
+        super().__init__(
+            max_bytes=max_bytes or get_position_cache_max_bytes(),
+            max_size=max_size or get_position_cache_max(),
+            group_of=_wallet_of_key,
+        )
     
     def get(self, key: str, now: Optional[float] = None) -> Optional[Tuple[str, bool]]:
         """Get value with staleness flag"""
-        if key not in self.cache:
-            return None
-        
-        current_time = now or time.time()
-        value, expiry, created_at = self.cache[key]
-        
-        # Check if expired
-        if current_time > expiry:
-            del self.cache[key]
+        result = self.get_entry(key, now=now)
+        if result is None:
             return None
-        
-        # Move to end (most recently used)
-        self.cache.move_to_end(key)
-        
-        # Check staleness
-        age = current_time - created_at
-        is_stale = age > get_position_cache_ttl()
-        
-        return (value, is_stale)
-    
-    def set(self, key: str, value: str, ttl_seconds: int, now: Optional[float] = None):
-        """Set value with TTL"""
-        current_time = now or time.time()
-        expiry = current_time + ttl_seconds
-        self.cache[key] = (value, expiry, current_time)
-        self.cache.move_to_end(key)
-        
-        # Evict oldest if over capacity
-        while len(self.cache) > self.max_size:
-            self.cache.popitem(last=False)
-            self.evictions += 1
-    
-    def delete(self, key: str) -> bool:
-        """Delete a key"""
-        if key in self.cache:
-            del self.cache[key]
-            return True
-        return False
+        value, age = result
+        return (value, age > get_position_cache_ttl())
     
     def delete_pattern(self, pattern: str) -> int:
         """Delete keys matching pattern"""
-        count = 0
-        keys_to_delete = []
-        
-        # Handle wildcard patterns
+        # Wallet patterns (pos:v1:*:<wallet>*) go through the wallet index
         if "*" in pattern:
             parts = pattern.split(":")
             if len(parts) >= 4 and parts[2] == "*":
-                wallet = parts[3].rstrip("*")
-                # Find all keys containing this wallet
-                for k in list(self.cache.keys()):  # Make a copy to avoid modification during iteration
-                    if f":{wallet}:" in k or k.endswith(f":{wallet}"):
-                        keys_to_delete.append(k)
-            else:
-                # Prefix match
-                prefix = pattern.split("*")[0]
-                keys_to_delete = [k for k in self.cache.keys() if k.startswith(prefix)]
+                return self.delete_group(parts[3].rstrip("*"))
+            # Prefix match
+            prefix = pattern.split("*")[0]
         else:
             # Simple prefix match
-            keys_to_delete = [k for k in self.cache.keys() if k.startswith(pattern)]
+            prefix = pattern
         
-        for key in keys_to_delete:
-            if self.delete(key):
+        count = 0
+        for key in self.keys():
+            if key.startswith(prefix) and self.delete(key):
                 count += 1
         return count
 
@@ -139,7 +116,8 @@ class PositionCacheV2:
         self, 
         redis_url: str = REDIS_URL,
         use_redis: bool = True,
-        now_provider: Optional[callable] = None  # For testing
+        now_provider: Optional[callable] = None,  # For testing
+        refresher=None  # SnapshotRefresher; defaults to the process-wide one
     ):
         """Initialize enhanced cache"""
         self.enabled = is_position_cache_enabled()
@@ -152,6 +130,7 @@ class PositionCacheV2:
         self.connection_pool = None
         self.lru_cache = InMemoryLRUCache()
         self.now_provider = now_provider or time.time
+        self._refresher = refresher
         
         # Metrics
         self.metrics = {
@@ -161,11 +140,13 @@ class PositionCacheV2:
             "position_cache_refresh_errors": 0,
             "position_cache_redis_errors": 0,
             "position_cache_stale_serves": 0,
-            "position_cache_refresh_triggers": 0
+            "position_cache_refresh_triggers": 0,
+            "position_cache_refresh_ahead": 0
         }
         
-        # Track refresh tasks
-        self.refresh_tasks: Dict[str, asyncio.Task] = {}
+        # Track refresh tasks (futures on the refresher loop), keyed by what triggered them
+        self.refresh_tasks: Dict[str, concurrent.futures.Future] = {}
+        self._wallet_refreshes: Dict[str, concurrent.futures.Future] = {}
         
         if self.use_redis:
             try:
@@ -208,10 +189,10 @@ class PositionCacheV2:
             return None
             
         cache_key = self._get_cache_key("position", wallet, token_mint)
-        result = self._get_from_cache(cache_key)
+        result = self._get_entry(cache_key, get_position_cache_ttl())
         
         if result:
-            value, is_stale = result
+            value, is_stale, progress = result
             try:
                 position_dict = json.loads(value)
                 position = self._deserialize_position(position_dict)
@@ -220,16 +201,10 @@ class PositionCacheV2:
                 
                 if is_stale:
                     self.metrics["position_cache_stale_serves"] += 1
-                    
-                    # Trigger async refresh if needed
-                    if trigger_refresh:
-                        refresh_key = f"{wallet}:{token_mint}"
-                        if refresh_key not in self.refresh_tasks:
-                            self.metrics["position_cache_refresh_triggers"] += 1
-                            task = asyncio.create_task(
-                                self._refresh_position(wallet, token_mint)
-                            )
-                            self.refresh_tasks[refresh_key] = task
+                
+                # Trigger background refresh if stale or close to it
+                if trigger_refresh:
+                    self._maybe_refresh(f"{wallet}:{token_mint}", wallet, is_stale, progress)
                 
                 return (position, is_stale)
                 
@@ -261,10 +236,10 @@ class PositionCacheV2:
             return None
             
         cache_key = self._get_cache_key("snapshot", wallet)
-        result = self._get_from_cache(cache_key)
+        result = self._get_entry(cache_key, SNAPSHOT_CACHE_TTL)
         
         if result:
-            value, is_stale = result
+            value, is_stale, progress = result
             try:
                 snapshot_dict = json.loads(value)
                 snapshot = self._deserialize_snapshot(snapshot_dict)
@@ -278,14 +253,10 @@ class PositionCacheV2:
                     for pos_pnl in snapshot.positions:
                         if hasattr(pos_pnl, '_stale'):
                             pos_pnl._stale = True
-                    
-                    # Trigger refresh
-                    if trigger_refresh and wallet not in self.refresh_tasks:
-                        self.metrics["position_cache_refresh_triggers"] += 1
-                        task = asyncio.create_task(
-                            self._refresh_portfolio(wallet)
-                        )
-                        self.refresh_tasks[wallet] = task
+                
+                # Trigger background refresh if stale or close to it
+                if trigger_refresh:
+                    self._maybe_refresh(wallet, wallet, is_stale, progress)
                 
                 return (snapshot, is_stale)
                 
@@ -343,6 +314,19 @@ class PositionCacheV2:
     
     def _get_from_cache(self, key: str) -> Optional[Tuple[str, bool]]:
         """Get value with staleness flag from cache"""
+        result = self._get_entry(key, get_position_cache_ttl())
+        if result is None:
+            return None
+        value, is_stale, _ = result
+        return (value, is_stale)
+    
+    def _get_entry(self, key: str, ttl: int) -> Optional[Tuple[str, bool, float]]:
+        """
+        Get value with staleness flag and progress towards staleness
+        
+        Progress is age / stale threshold (1.0 = just turned stale); ttl is the
+        TTL the key was written with, needed to derive age from Redis.
+        """
         now = self.now_provider()
         
         if self.use_redis and self.redis_client:
@@ -351,22 +335,27 @@ class PositionCacheV2:
                 pipeline = self.redis_client.pipeline()
                 pipeline.get(key)
                 pipeline.ttl(key)
-                value, ttl = pipeline.execute()
+                value, remaining = pipeline.execute()
                 
                 if value:
                     # Check if stale based on remaining TTL
-                    is_stale = ttl < (get_position_cache_ttl() / 2)  # Less than half TTL remaining
-                    return (value, is_stale)
+                    stale_below = get_position_cache_ttl() / 2  # Less than half TTL remaining
+                    is_stale = remaining < stale_below
+                    stale_after = max(ttl - stale_below, 1)
+                    return (value, is_stale, (ttl - remaining) / stale_after)
                 return None
             except RedisError as e:
                 logger.error(f"Redis get error for {key}: {e}")
                 self.metrics["position_cache_redis_errors"] += 1
         
         # Fallback to in-memory
-        result = self.lru_cache.get(key, now=now)
-        if result:
-            self.metrics["position_cache_evictions"] = self.lru_cache.evictions
-        return result
+        result = self.lru_cache.get_entry(key, now=now)
+        if result is None:
+            return None
+        self.metrics["position_cache_evictions"] = self.lru_cache.evictions
+        value, age = result
+        stale_after = get_position_cache_ttl()
+        return (value, age > stale_after, age / stale_after if stale_after > 0 else 1.0)
     
     def _set_in_cache(self, key: str, value: str, ttl: int) -> bool:
         """Set value in cache"""
@@ -385,35 +374,93 @@ class PositionCacheV2:
         self.metrics["position_cache_evictions"] = self.lru_cache.evictions
         return True
     
-    async def _refresh_position(self, wallet: str, token_mint: str):
-        """Background refresh of position data"""
-        try:
-            # This would call the actual position calculation service
-            # For now, just log that refresh was triggered
-            logger.info(f"Refreshing position for {wallet}:{token_mint}")
-            
-            # Clean up task reference
-            refresh_key = f"{wallet}:{token_mint}"
-            if refresh_key in self.refresh_tasks:
-                del self.refresh_tasks[refresh_key]
-                
-        except Exception as e:
-            logger.error(f"Error refreshing position: {e}")
-            self.metrics["position_cache_refresh_errors"] += 1
+    @property
+    def refresher(self):
+        """Background snapshot refresher, created on first refresh"""
+        if self._refresher is None:
+            # Import here to avoid circular import
+            from src.lib.snapshot_refresher import get_snapshot_refresher
+            self._refresher = get_snapshot_refresher()
+        return self._refresher
+    
+    def _maybe_refresh(self, refresh_key: str, wallet: str, is_stale: bool, progress: float):
+        """Refresh when stale, or ahead of staleness once past a jittered point"""
+        if not is_stale:
+            # Import here to avoid circular import
+            from src.lib.snapshot_refresher import get_refresh_ahead_fraction, get_refresh_jitter
+            ahead_at = get_refresh_ahead_fraction() * (1 - get_refresh_jitter() * random.random())
+            if progress < ahead_at:
+                return
+        if self._schedule_refresh(refresh_key, wallet) and not is_stale:
+            self.metrics["position_cache_refresh_ahead"] += 1
+    
+    def _schedule_refresh(self, refresh_key: str, wallet: str) -> bool:
+        """Submit a wallet snapshot rebuild unless one is already in flight"""
+        task = self.refresh_tasks.get(refresh_key)
+        if task is not None and not task.done():
+            return False
+        
+        future = self.refresh_wallet(wallet)
+        self.refresh_tasks[refresh_key] = future
+        future.add_done_callback(self._on_refresh_done(refresh_key, self.refresh_tasks))
+        return True
     
-    async def _refresh_portfolio(self, wallet: str):
-        """Background refresh of portfolio data"""
+    def refresh_wallet(self, wallet: str, priority=None) -> concurrent.futures.Future:
+        """Rebuild a wallet's snapshot and positions in the background, joining a rebuild in flight"""
+        # Positions and the snapshot are rebuilt together, so one rebuild per wallet
+        future = self._wallet_refreshes.get(wallet)
+        if future is None or future.done():
+            self.metrics["position_cache_refresh_triggers"] += 1
+            future = self.refresher.submit(self, wallet, priority=priority)
+            self._wallet_refreshes[wallet] = future
+            future.add_done_callback(self._on_refresh_done(wallet, self._wallet_refreshes))
+        return future
+    
+    def snapshot_progress(self, wallet: str) -> Optional[float]:
+        """Cached snapshot's progress towards staleness (see _get_entry), None if not cached; not counted as a read"""
+        if not self.enabled:
+            return None
+        key = self._get_cache_key("snapshot", wallet)
+        
+        if self.use_redis and self.redis_client:
+            try:
+                remaining = self.redis_client.ttl(key)
+                if remaining < 0:  # Missing, or no expiry
+                    return None
+                stale_below = get_position_cache_ttl() / 2
+                return (SNAPSHOT_CACHE_TTL - remaining) / max(SNAPSHOT_CACHE_TTL - stale_below, 1)
+            except RedisError as e:
+                logger.error(f"Redis ttl error for {key}: {e}")
+                self.metrics["position_cache_redis_errors"] += 1
+        
+        age = self.lru_cache.age(key, now=self.now_provider())
+        if age is None:
+            return None
+        stale_after = get_position_cache_ttl()
+        return age / stale_after if stale_after > 0 else 1.0
+    
+    @staticmethod
+    def _on_refresh_done(key: str, tasks: Dict[str, concurrent.futures.Future]):
+        """Done-callback dropping the task reference, on the requesting loop when it is still running"""
         try:
-            # This would call the actual portfolio calculation service
-            logger.info(f"Refreshing portfolio for {wallet}")
-            
-            # Clean up task reference
-            if wallet in self.refresh_tasks:
-                del self.refresh_tasks[wallet]
-                
-        except Exception as e:
-            logger.error(f"Error refreshing portfolio: {e}")
-            self.metrics["position_cache_refresh_errors"] += 1
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        
+        def drop(future):
+            if tasks.get(key) is future:
+                del tasks[key]
+        
+        def callback(future):
+            if loop is not None and not loop.is_closed():
+                try:
+                    loop.call_soon_threadsafe(drop, future)
+                    return
+                except RuntimeError:
+                    pass
+            drop(future)
+        
+        return callback
     
     def _deserialize_position(self, data: Dict[str, Any]) -> Position:
         """Deserialize position from dict"""
@@ -525,15 +572,21 @@ class PositionCacheV2:
             "total_requests": total_requests,
             "lru_size": len(self.lru_cache.cache),
             "lru_max_size": self.lru_cache.max_size,
-            "active_refresh_tasks": len(self.refresh_tasks),
+            "lru_bytes": self.lru_cache.bytes,
+            "lru_max_bytes": self.lru_cache.max_bytes,
+            "lru": self.lru_cache.get_stats(),
+            "active_refresh_tasks": sum(1 for task in self.refresh_tasks.values() if not task.done()),
             "config": {
                 "ttl_seconds": get_position_cache_ttl(),
-                "max_wallets": get_position_cache_max()
+                "max_wallets": get_position_cache_max(),
+                "max_bytes": get_position_cache_max_bytes()
             }
         }
         
         # Add all metrics
         stats.update(self.metrics)
+        if self._refresher is not None:
+            stats["refresher"] = self._refresher.get_stats()
         
         if self.use_redis and self.redis_client:
             try:
@@ -551,9 +604,10 @@ class PositionCacheV2:
     def close(self):
         """Close Redis connection and cancel refresh tasks"""
         # Cancel all refresh tasks
-        for task in self.refresh_tasks.values():
+        for task in list(self.refresh_tasks.values()) + list(self._wallet_refreshes.values()):
             task.cancel()
         self.refresh_tasks.clear()
+        self._wallet_refreshes.clear()
         
         # Close Redis connection
         if self.connection_pool:
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Price Planner - Cover a fetch's historical price needs with the fewest Birdeye calls
+The fetchers used to issue one multi_price request per trade minute, which at
+Birdeye's 1 rps budget means a wallet with 2,000 trade minutes spends over
+half an hour pricing. The planner looks at every (mint, timestamp) need at
+once and picks, per mint, between:
+- multi_price: one call per time bucket, shared by up to 100 mints
+- history_price: one call per mint covering up to PRICE_HISTORY_MAX_POINTS
+  consecutive buckets
+
+Only SOL-quoted trades' SOL leg needs a price (the token price is derived
+from it), so one SOL history series prices all of them. Needs already in the
+price store are skipped. The plan reports its call count against the naive
+per-minute plan so the savings are visible in logs and response metrics.
+"""
+
+import os
+import math
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple, Iterable, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+SOL_MINT = "So11111111111111111111111111111111111111112"
+MULTI_PRICE_MAX_MINTS = 100  # Birdeye multi_price list_address limit
+
+# Birdeye history_price interval types by bucket size in seconds
+HISTORY_TYPES = {
+    60: "1m", 180: "3m", 300: "5m", 900: "15m", 1800: "30m",
+    3600: "1H", 7200: "2H", 14400: "4H", 21600: "6H", 28800: "8H", 43200: "12H", 86400: "1D",
+}
+
+
+def get_price_bucket_sec() -> int:
+    """Get price resolution in seconds; must be a Birdeye history interval"""
+    bucket = int(os.getenv("PRICE_BUCKET_SEC", "60"))
+    if bucket not in HISTORY_TYPES:
+        logger.warning(f"Unsupported PRICE_BUCKET_SEC={bucket}, using 60")
+        return 60
+    return bucket
+
+
+def get_history_max_points() -> int:
+    """Get max buckets a single history_price call may cover"""
+    return int(os.getenv("PRICE_HISTORY_MAX_POINTS", "1000"))
+
+
+def get_price_carry_buckets() -> int:
+    """Get how many buckets a history price may be carried forward over gaps"""
+    return int(os.getenv("PRICE_CARRY_FORWARD_BUCKETS", "5"))
+
+
+def get_price_plan_strategy() -> str:
+    """Get planning strategy: 'auto' (cheapest mix), 'multi' or 'history'"""
+    return os.getenv("PRICE_PLAN_STRATEGY", "auto").lower()
+
+
+def to_bucket(unix_ts: float, resolution: int) -> int:
+    """Floor a unix timestamp to its price bucket"""
+    return int(unix_ts // resolution) * resolution
+
+
+def trade_price_needs(trades: Iterable) -> List[Tuple[str, datetime]]:
+    """(mint, timestamp) pairs a batch of trades needs priced
+
+    SOL-quoted trades only need SOL; token-to-token trades need both legs.
+    """
+    needs = []
+    for trade in trades:
+        if trade.token_in_mint == SOL_MINT or trade.token_out_mint == SOL_MINT:
+            needs.append((SOL_MINT, trade.timestamp))
+        else:
+            needs.append((trade.token_in_mint, trade.timestamp))
+            needs.append((trade.token_out_mint, trade.timestamp))
+    return needs
+
+
+@dataclass
+class MultiPriceCall:
+    """One multi_price request: many mints at one bucket"""
+
+    timestamp: int
+    mints: List[str]
+
+
+@dataclass
+class HistoryCall:
+    """One history_price request: one mint over a window of buckets"""
+
+    mint: str
+    time_from: int
+    time_to: int
+    interval: str
+    buckets: List[int]
+
+
+@dataclass
+class PricePlan:
+    """Calls covering every uncached (mint, bucket) need"""
+
+    resolution: int
+    multi_calls: List[MultiPriceCall] = field(default_factory=list)
+    history_calls: List[HistoryCall] = field(default_factory=list)
+    needs: int = 0
+    cached: int = 0
+    naive_calls: int = 0
+
+    @property
+    def calls(self) -> int:
+        return len(self.multi_calls) + len(self.history_calls)
+
+    def summary(self) -> Dict[str, int]:
+        """Plan size against the naive one-multi_price-per-minute plan"""
+        return {
+            "resolution_sec": self.resolution,
+            "needs": self.needs,
+            "cached": self.cached,
+            "multi_price_calls": len(self.multi_calls),
+            "history_calls": len(self.history_calls),
+            "calls": self.calls,
+            "naive_calls": self.naive_calls,
+            "calls_saved": self.naive_calls - self.calls,
+        }
+
+
+def _history_windows(buckets: List[int], resolution: int, max_points: int) -> List[List[int]]:
+    """Split sorted buckets into runs each coverable by one history call"""
+    windows: List[List[int]] = []
+    span = (max_points - 1) * resolution
+    for bucket in buckets:
+        if windows and bucket - windows[-1][0] <= span:
+            windows[-1].append(bucket)
+        else:
+            windows.append([bucket])
+    return windows
+
+
+def _multi_calls(buckets_by_mint: Dict[str, List[int]]) -> List[MultiPriceCall]:
+    mints_by_bucket: Dict[int, List[str]] = defaultdict(list)
+    for mint, buckets in buckets_by_mint.items():
+        for bucket in buckets:
+            mints_by_bucket[bucket].append(mint)
+    calls = []
+    for bucket in sorted(mints_by_bucket):
+        mints = mints_by_bucket[bucket]
+        for i in range(0, len(mints), MULTI_PRICE_MAX_MINTS):
+            calls.append(MultiPriceCall(bucket, mints[i : i + MULTI_PRICE_MAX_MINTS]))
+    return calls
+
+
+def plan_prices(
+    needs: Iterable[Tuple[str, datetime]],
+    is_known: Callable[[str, int], bool],
+    resolution: Optional[int] = None,
+    max_points: Optional[int] = None,
+    strategy: Optional[str] = None,
+) -> PricePlan:
+    """Build the cheapest plan for needs whose (mint, bucket) is not yet known"""
+    resolution = resolution or get_price_bucket_sec()
+    max_points = max_points or get_history_max_points()
+    strategy = strategy or get_price_plan_strategy()
+    plan = PricePlan(resolution=resolution)
+
+    checked = set()
+    minutes_needed = set()
+    wanted: Dict[str, set] = defaultdict(set)
+    for mint, timestamp in needs:
+        unix_ts = timestamp.timestamp()
+        bucket = to_bucket(unix_ts, resolution)
+        if (mint, bucket) not in checked:
+            checked.add((mint, bucket))
+            if is_known(mint, bucket):
+                plan.cached += 1
+            else:
+                wanted[mint].add(bucket)
+        if bucket in wanted[mint]:
+            minutes_needed.add((mint, to_bucket(unix_ts, 60)))
+
+    buckets_by_mint = {mint: sorted(buckets) for mint, buckets in wanted.items() if buckets}
+    plan.needs = sum(len(b) for b in buckets_by_mint.values())
+    minute_counts = Counter(minute for _, minute in minutes_needed)
+    plan.naive_calls = sum(math.ceil(n / MULTI_PRICE_MAX_MINTS) for n in minute_counts.values())
+    if not buckets_by_mint:
+        return plan
+
+    windows = {m: _history_windows(b, resolution, max_points) for m, b in buckets_by_mint.items()}
+    if strategy == "history":
+        history_mints = set(buckets_by_mint)
+    elif strategy == "multi":
+        history_mints = set()
+    else:
+        # Greedy: move a mint to history calls while that removes more
+        # multi_price buckets (ones no other mint needs) than it adds calls
+        history_mints = set()
+        bucket_users = Counter(b for buckets in buckets_by_mint.values() for b in buckets)
+        while True:
+            best, best_saving = None, 0
+            for mint, buckets in buckets_by_mint.items():
+                if mint in history_mints:
+                    continue
+                saving = sum(1 for b in buckets if bucket_users[b] == 1) - len(windows[mint])
+                if saving > best_saving:
+                    best, best_saving = mint, saving
+            if best is None:
+                break
+            history_mints.add(best)
+            bucket_users.subtract(buckets_by_mint[best])
+
+    interval = HISTORY_TYPES[resolution]
+    for mint in sorted(history_mints):
+        for window in windows[mint]:
+            plan.history_calls.append(HistoryCall(mint, window[0], window[-1], interval, window))
+    plan.multi_calls = _multi_calls({m: b for m, b in buckets_by_mint.items() if m not in history_mints})
+    return plan
+
+
+def series_to_buckets(
+    items: List[Dict], buckets: List[int], resolution: int, max_carry: Optional[int] = None
+) -> Dict[int, Optional[Decimal]]:
+    """Map history_price items onto the requested buckets, carrying the last price forward
+
+    A price is carried forward at most max_carry buckets past its point.
+    Buckets before the first point, past the carry limit, or in an empty
+    series are recorded as misses rather than filled with a price from
+    another time.
+    """
+    max_carry = get_price_carry_buckets() if max_carry is None else max_carry
+    points = sorted(
+        (to_bucket(item["unixTime"], resolution), Decimal(str(item["value"])))
+        for item in items
+        if item and item.get("value") is not None and "unixTime" in item
+    )
+    prices: Dict[int, Optional[Decimal]] = {}
+    i = -1
+    for bucket in sorted(buckets):
+        while i + 1 < len(points) and points[i + 1][0] <= bucket:
+            i += 1
+        if i < 0 or bucket - points[i][0] > max_carry * resolution:
+            prices[bucket] = None
+        else:
+            prices[bucket] = points[i][1]
+    return prices
+
+
+async def execute_plan(
+    plan: PricePlan,
+    price_cache,
+    fetch_multi: Callable[[int, List[str]], Awaitable[Dict[str, Optional[Decimal]]]],
+    fetch_history: Callable[[HistoryCall], Awaitable[Optional[List[Dict]]]],
+    parallelism: int = 3,
+) -> int:
+    """Run a plan's calls and record results in the price cache; returns calls made
+
+    fetch_multi returns {mint: price} (empty on failure); fetch_history returns
+    the raw history items, or None on failure so nothing is recorded.
+    """
+
+    async def run_multi(call: MultiPriceCall):
+        prices = await fetch_multi(call.timestamp, call.mints)
+        price_cache.set_many(datetime.fromtimestamp(call.timestamp), prices)
+
+    async def run_history(call: HistoryCall):
+        items = await fetch_history(call)
+        if items is None:
+            return
+        price_cache.set_series(call.mint, series_to_buckets(items, call.buckets, plan.resolution))
+
+    jobs = [run_history(c) for c in plan.history_calls] + [run_multi(c) for c in plan.multi_calls]
+    for i in range(0, len(jobs), parallelism):
+        results = await asyncio.gather(*jobs[i : i + parallelism], return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Price plan call failed: {result}")
+    return len(jobs)
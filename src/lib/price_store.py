@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Price Store - Persistent historical price time series keyed by (mint, unix_minute)
+Historical prices never change, so each (mint, minute) is fetched from Birdeye
+at most once per deployment and then served from here to every request and
+worker on the host.
+
+Backends:
+- SqlitePriceStore: append-only SQLite table in WAL mode (default). Rows are
+  only ever inserted, never updated; the (mint, minute) primary key is the
+  index for point, range and nearest-neighbour reads. WAL lets gunicorn
+  workers read while another appends.
+- MemoryPriceStore: per-process dict plus sorted minutes per mint (tests,
+  PRICE_STORE_BACKEND=memory)
+
+A stored NULL price records that Birdeye had no price for that minute, so the
+miss is not re-requested either.
+"""
+
+import os
+import time
+import bisect
+import sqlite3
+import logging
+import threading
+from decimal import Decimal
+from typing import Optional, Dict, List, Tuple, Iterable
+
+logger = logging.getLogger(__name__)
+
+PRICE_STORE_VERSION = 1
+
+
+def get_price_store_backend() -> str:
+    """Get configured price store backend: 'sqlite' or 'memory'"""
+    return os.getenv("PRICE_STORE_BACKEND", "sqlite").lower()
+
+
+def get_price_store_path() -> str:
+    """Get on-disk path of the SQLite price store"""
+    return os.getenv("PRICE_STORE_PATH", os.path.join(".price_store", "prices.db"))
+
+
+class PriceStore:
+    """Base interface for historical price persistence"""
+
+    def lookup(self, mint: str, minute: int) -> Tuple[bool, Optional[Decimal]]:
+        """Return (known, price) for one minute; price may be None for a recorded miss"""
+        raise NotImplementedError
+
+    def put_many(self, rows: Iterable[Tuple[str, int, Optional[Decimal]]]) -> int:
+        """Record prices; existing (mint, minute) rows are kept. Returns rows added"""
+        raise NotImplementedError
+
+    def range(self, mint: str, start: int, end: int) -> List[Tuple[int, Optional[Decimal]]]:
+        """All stored (minute, price) rows for mint with start <= minute <= end, oldest first"""
+        raise NotImplementedError
+
+    def put(self, mint: str, minute: int, price: Optional[Decimal]) -> bool:
+        """Record a single price"""
+        return self.put_many([(mint, minute, price)]) == 1
+
+    def nearest(self, mint: str, unix_ts: float, tolerance_sec: int = 300) -> Optional[Tuple[int, Decimal]]:
+        """Closest known non-null (minute, price) within tolerance_sec of unix_ts"""
+        best = None
+        for minute, price in self.range(mint, int(unix_ts - tolerance_sec), int(unix_ts + tolerance_sec)):
+            if price is None:
+                continue
+            if best is None or abs(minute - unix_ts) < abs(best[0] - unix_ts):
+                best = (minute, price)
+        return best
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get store statistics"""
+        return dict(getattr(self, "metrics", {}))
+
+
+class MemoryPriceStore(PriceStore):
+    """In-process backend - dict of prices plus sorted minutes per mint"""
+
+    def __init__(self):
+        self._prices: Dict[Tuple[str, int], Optional[Decimal]] = {}
+        self._minutes: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "writes": 0}
+
+    def lookup(self, mint: str, minute: int) -> Tuple[bool, Optional[Decimal]]:
+        key = (mint, minute)
+        with self._lock:
+            if key in self._prices:
+                self.metrics["hits"] += 1
+                return True, self._prices[key]
+            self.metrics["misses"] += 1
+            return False, None
+
+    def put_many(self, rows: Iterable[Tuple[str, int, Optional[Decimal]]]) -> int:
+        added = 0
+        with self._lock:
+            for mint, minute, price in rows:
+                if (mint, minute) in self._prices:
+                    continue
+                self._prices[(mint, minute)] = price
+                bisect.insort(self._minutes.setdefault(mint, []), minute)
+                added += 1
+            self.metrics["writes"] += added
+        return added
+
+    def range(self, mint: str, start: int, end: int) -> List[Tuple[int, Optional[Decimal]]]:
+        with self._lock:
+            minutes = self._minutes.get(mint, [])
+            lo = bisect.bisect_left(minutes, start)
+            hi = bisect.bisect_right(minutes, end)
+            return [(m, self._prices[(mint, m)]) for m in minutes[lo:hi]]
+
+
+class SqlitePriceStore(PriceStore):
+    """On-disk backend - append-only SQLite table shared by all workers on the host"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_price_store_path()
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self.metrics = {"hits": 0, "misses": 0, "writes": 0, "errors": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        """Per-thread connection, opened and migrated on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._init_lock:
+            if not self._initialized:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS prices ("
+                    " mint TEXT NOT NULL,"
+                    " minute INTEGER NOT NULL,"
+                    " price TEXT,"
+                    " fetched_at INTEGER NOT NULL,"
+                    " PRIMARY KEY (mint, minute)"
+                    ") WITHOUT ROWID"
+                )
+                conn.execute(f"PRAGMA user_version={PRICE_STORE_VERSION}")
+                self._initialized = True
+        self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _decode(raw: Optional[str]) -> Optional[Decimal]:
+        return Decimal(raw) if raw is not None else None
+
+    def lookup(self, mint: str, minute: int) -> Tuple[bool, Optional[Decimal]]:
+        try:
+            row = self._connect().execute(
+                "SELECT price FROM prices WHERE mint = ? AND minute = ?", (mint, minute)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self.metrics["errors"] += 1
+            logger.error(f"Price store read failed for {mint}@{minute}: {e}")
+            return False, None
+        if row is None:
+            self.metrics["misses"] += 1
+            return False, None
+        self.metrics["hits"] += 1
+        return True, self._decode(row[0])
+
+    def put_many(self, rows: Iterable[Tuple[str, int, Optional[Decimal]]]) -> int:
+        now = int(time.time())
+        values = [(mint, minute, str(price) if price is not None else None, now) for mint, minute, price in rows]
+        if not values:
+            return 0
+        try:
+            conn = self._connect()
+            before = conn.total_changes
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT OR IGNORE INTO prices (mint, minute, price, fetched_at) VALUES (?, ?, ?, ?)",
+                    values,
+                )
+            added = conn.total_changes - before
+        except sqlite3.Error as e:
+            self.metrics["errors"] += 1
+            logger.error(f"Price store write of {len(values)} rows failed: {e}")
+            return 0
+        self.metrics["writes"] += added
+        return added
+
+    def range(self, mint: str, start: int, end: int) -> List[Tuple[int, Optional[Decimal]]]:
+        try:
+            rows = self._connect().execute(
+                "SELECT minute, price FROM prices WHERE mint = ? AND minute BETWEEN ? AND ? ORDER BY minute",
+                (mint, start, end),
+            ).fetchall()
+        except sqlite3.Error as e:
+            self.metrics["errors"] += 1
+            logger.error(f"Price store range read failed for {mint}: {e}")
+            return []
+        return [(minute, self._decode(price)) for minute, price in rows]
+
+    def nearest(self, mint: str, unix_ts: float, tolerance_sec: int = 300) -> Optional[Tuple[int, Decimal]]:
+        try:
+            row = self._connect().execute(
+                "SELECT minute, price FROM prices"
+                " WHERE mint = ? AND minute BETWEEN ? AND ? AND price IS NOT NULL"
+                " ORDER BY ABS(minute - ?) LIMIT 1",
+                (mint, int(unix_ts - tolerance_sec), int(unix_ts + tolerance_sec), unix_ts),
+            ).fetchone()
+        except sqlite3.Error as e:
+            self.metrics["errors"] += 1
+            logger.error(f"Price store nearest read failed for {mint}: {e}")
+            return None
+        return (row[0], Decimal(row[1])) if row else None
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# Global instance
+_price_store_instance: Optional[PriceStore] = None
+_price_store_lock = threading.Lock()
+
+
+def get_price_store() -> PriceStore:
+    """Get or create the process-wide price store"""
+    global _price_store_instance
+    with _price_store_lock:
+        if _price_store_instance is None:
+            if get_price_store_backend() == "memory":
+                _price_store_instance = MemoryPriceStore()
+            else:
+                _price_store_instance = SqlitePriceStore()
+                logger.info(f"Price store using SQLite at {_price_store_instance.path}")
+        return _price_store_instance
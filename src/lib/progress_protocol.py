@@ -90,7 +90,7 @@ class ProgressData:
         result = {
             "message": self.message,
             "percentage": round(self.percentage, 1),
-            "step": self.step.value,
+            "step": getattr(self.step, "value", self.step),  # Fetchers may report steps outside ProgressStep
             "timestamp": int(self.timestamp)
         }
         if self.details:
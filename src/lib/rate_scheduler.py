@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Rate Scheduler - Process-wide token buckets, one per upstream provider
+Every client that talks to Helius, Birdeye, Jupiter or DexScreener draws from
+the same budget, so concurrent fetchers and API requests can no longer stack
+their own limiters on top of each other and overrun the provider quota.
+
+Waiters are served by priority class: interactive requests go ahead of cache
+warming, which goes ahead of background precaching. Within a class, waiters
+are served first come first served.
+
+Backends:
+- LocalBucketBackend: bucket state in process memory (default)
+- FileLockBucketBackend: bucket state in a flock()-guarded file, so every
+  gunicorn worker on the host shares one budget (RATE_LIMIT_BACKEND=file)
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import tempfile
+import threading
+import itertools
+from enum import IntEnum
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, Tuple
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Default (requests per second, burst) per provider
+PROVIDER_LIMITS: Dict[str, Tuple[float, int]] = {
+    "helius": (50, 50),  # Paid plan
+    "birdeye": (1, 1),  # Strictly spaced, shared by historical and current price lookups
+    "jupiter": (10, 1),
+    "dexscreener": (5, 10),  # 300 requests/minute
+}
+DEFAULT_LIMIT: Tuple[float, int] = (10, 10)
+MAX_POLL_INTERVAL = 0.05  # Upper bound on how long a queued waiter sleeps between checks
+
+
+class Priority(IntEnum):
+    """Request priority classes - lower values are served first"""
+
+    INTERACTIVE = 0
+    WARMING = 1
+    PRECACHE = 2
+
+
+_current_priority: ContextVar[Priority] = ContextVar("rate_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def priority_scope(priority: Priority):
+    """Run upstream calls made in this context (and tasks it spawns) at the given priority"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def get_current_priority() -> Priority:
+    """Get the priority class of the current context"""
+    return _current_priority.get()
+
+
+def get_rate_limit_backend() -> str:
+    """Get configured bucket backend: 'local' or 'file'"""
+    return os.getenv("RATE_LIMIT_BACKEND", "local").lower()
+
+
+def get_rate_limit_dir() -> str:
+    """Get directory holding shared bucket files for the file backend"""
+    return os.getenv("RATE_LIMIT_DIR", os.path.join(tempfile.gettempdir(), "walletdoctor-ratelimit"))
+
+
+def get_provider_limit(provider: str) -> Tuple[float, int]:
+    """Get (rps, burst) for a provider, overridable via RATE_LIMIT_<PROVIDER>_RPS/_BURST"""
+    rate, burst = PROVIDER_LIMITS.get(provider, DEFAULT_LIMIT)
+    prefix = f"RATE_LIMIT_{provider.upper()}"
+    rate = float(os.getenv(f"{prefix}_RPS", rate))
+    burst = int(os.getenv(f"{prefix}_BURST", burst))
+    return rate, max(1, burst)
+
+
+def _refill(tokens: float, updated: float, now: float, rate: float, burst: int) -> float:
+    """Top up a bucket for the time elapsed since it was last updated"""
+    return min(float(burst), tokens + max(0.0, now - updated) * rate)
+
+
+class LocalBucketBackend:
+    """In-process bucket state, safe across threads and event loops"""
+
+    blocking = False
+
+    def __init__(self, burst: int):
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def try_take(self, rate: float, burst: int, tokens: int = 1) -> float:
+        """Take tokens if available; otherwise return seconds until they will be"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._tokens = _refill(self._tokens, self._updated, now, rate, burst)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / rate
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for the given number of seconds"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class FileLockBucketBackend:
+    """Bucket state in a small JSON file guarded by flock(), shared by all processes on the host"""
+
+    blocking = True  # flock() can wait on another process, so keep it off the event loop
+
+    def __init__(self, provider: str, burst: int, directory: Optional[str] = None):
+        if not FCNTL_AVAILABLE:
+            raise RuntimeError("fcntl is not available on this platform")
+        self.directory = directory or get_rate_limit_dir()
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f"{provider}.bucket")
+        self._burst = burst
+
+    @contextmanager
+    def _locked_state(self):
+        """Yield the shared state dict under an exclusive lock and write it back"""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.read(fd, 4096)
+            try:
+                state = json.loads(raw) if raw else {}
+            except json.JSONDecodeError:
+                state = {}
+            if not state:
+                state = {"tokens": float(self._burst), "updated": time.time(), "paused_until": 0.0}
+            yield state
+            payload = json.dumps(state).encode()
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, payload)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def try_take(self, rate: float, burst: int, tokens: int = 1) -> float:
+        with self._locked_state() as state:
+            now = time.time()
+            if now < state["paused_until"]:
+                return state["paused_until"] - now
+            state["tokens"] = _refill(state["tokens"], state["updated"], now, rate, burst)
+            state["updated"] = now
+            if state["tokens"] >= tokens:
+                state["tokens"] -= tokens
+                return 0.0
+            return (tokens - state["tokens"]) / rate
+
+    def pause(self, seconds: float):
+        with self._locked_state() as state:
+            state["paused_until"] = max(state["paused_until"], time.time() + seconds)
+
+
+class TokenBucketScheduler:
+    """Async token bucket for one provider with priority-ordered waiters"""
+
+    def __init__(self, provider: str, rate: float, burst: int, backend=None):
+        self.provider = provider
+        self.rate = rate
+        self.burst = burst
+        self.backend = backend or LocalBucketBackend(burst)
+        self._lock = threading.Lock()
+        self._tickets = itertools.count()
+        self._queues: Dict[Priority, list] = {p: [] for p in Priority}
+        self._poll_interval = min(1.0 / rate, MAX_POLL_INTERVAL)
+
+        self.metrics = {
+            "granted": 0,
+            "waited": 0,
+            "wait_seconds": 0.0,
+            "pauses": 0,
+            "granted_by_priority": {p.name.lower(): 0 for p in Priority},
+        }
+
+    def _is_next(self, priority: Priority, ticket: int) -> bool:
+        """True when the ticket heads the highest-priority non-empty queue"""
+        with self._lock:
+            for p in Priority:
+                if p == priority:
+                    return self._queues[p][0] == ticket
+                if self._queues[p]:
+                    return False
+        return False
+
+    async def _try_take(self, tokens: int) -> float:
+        """Ask the backend for tokens, in a worker thread if the backend can block"""
+        if getattr(self.backend, "blocking", False):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.backend.try_take, self.rate, self.burst, tokens)
+        return self.backend.try_take(self.rate, self.burst, tokens)
+
+    async def acquire(self, priority: Optional[Priority] = None, tokens: int = 1):
+        """Wait for a token from the provider budget"""
+        priority = get_current_priority() if priority is None else Priority(priority)
+        ticket = next(self._tickets)
+        with self._lock:
+            self._queues[priority].append(ticket)
+
+        start = time.monotonic()
+        try:
+            while True:
+                if self._is_next(priority, ticket):
+                    wait = await self._try_take(tokens)
+                    if wait <= 0:
+                        break
+                    # Re-check priority at least every poll interval so that a
+                    # higher class arriving mid-wait is served first
+                    wait = min(wait, self._poll_interval) if priority != Priority.INTERACTIVE else wait
+                else:
+                    wait = self._poll_interval
+                await asyncio.sleep(wait)
+        finally:
+            with self._lock:
+                self._queues[priority].remove(ticket)
+
+        waited = time.monotonic() - start
+        self.metrics["granted"] += 1
+        self.metrics["granted_by_priority"][priority.name.lower()] += 1
+        if waited > 0.001:
+            self.metrics["waited"] += 1
+            self.metrics["wait_seconds"] += waited
+
+    def pause(self, seconds: float):
+        """Back the whole provider off, e.g. after a 429 with Retry-After"""
+        if seconds <= 0:
+            return
+        self.metrics["pauses"] += 1
+        self.backend.pause(seconds)
+        logger.warning(f"{self.provider} budget paused for {seconds:.1f}s")
+
+    @property
+    def queued(self) -> int:
+        """Number of callers currently waiting for a token"""
+        with self._lock:
+            return sum(len(q) for q in self._queues.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduler statistics"""
+        return {
+            "provider": self.provider,
+            "rate": self.rate,
+            "burst": self.burst,
+            "backend": type(self.backend).__name__,
+            "queued": self.queued,
+            **self.metrics,
+            "wait_seconds": round(self.metrics["wait_seconds"], 3),
+        }
+
+
+# Global registry
+_schedulers: Dict[str, TokenBucketScheduler] = {}
+_registry_lock = threading.Lock()
+
+
+def _create_backend(provider: str, burst: int):
+    """Create the configured backend, falling back to in-process state"""
+    if get_rate_limit_backend() == "file":
+        try:
+            return FileLockBucketBackend(provider, burst)
+        except (RuntimeError, OSError) as e:
+            logger.warning(f"Shared rate limit backend unavailable, using local bucket: {e}")
+    return LocalBucketBackend(burst)
+
+
+def get_rate_scheduler(provider: str) -> TokenBucketScheduler:
+    """Get or create the process-wide scheduler for a provider"""
+    with _registry_lock:
+        scheduler = _schedulers.get(provider)
+        if scheduler is None:
+            rate, burst = get_provider_limit(provider)
+            scheduler = TokenBucketScheduler(provider, rate, burst, _create_backend(provider, burst))
+            _schedulers[provider] = scheduler
+        return scheduler
+
+
+def get_rate_scheduler_stats() -> Dict[str, Any]:
+    """Get statistics for every provider scheduler created so far"""
+    with _registry_lock:
+        return {name: s.get_stats() for name, s in _schedulers.items()}
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Single Flight - Coalesce concurrent identical wallet fetches
+When several requests need the same wallet fetch at once (GPT action retries,
+many users opening one wallet), only the first caller runs it. The others
+attach to the in-flight run and receive their own copy of its result, so the
+upstream quota is spent once.
+
+Within a worker, flights are shared across threads and event loops (Flask's
+run_async gives every request its own loop). Across gunicorn workers on the
+host, the file backend serialises runs per key with flock(): a worker that
+waits on the lock leaves a marker file, and the holder publishes its result
+only when such a marker exists. The last waiter to read the result deletes it,
+and files left behind by crashed workers are swept after SINGLE_FLIGHT_TTL_SEC
+(SINGLE_FLIGHT_BACKEND=file, the default; "local" keeps it in-process, "off"
+disables coalescing).
+
+Published results are tagged JSON, never pickle, and live in a directory
+only the worker's user can write to.
+"""
+
+import os
+import glob
+import json
+import time
+import uuid
+import pickle
+import asyncio
+import hashlib
+import logging
+import tempfile
+import threading
+import concurrent.futures
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional, Dict, Any, Callable, Awaitable, Tuple, TypeVar
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+LOCK_POLL_INTERVAL = 0.1
+SWEEP_INTERVAL = 60.0  # Seconds between sweeps of files left by crashed workers
+
+
+def get_single_flight_backend() -> str:
+    """Get configured backend: 'file' (cross-worker), 'local' or 'off'"""
+    return os.getenv("SINGLE_FLIGHT_BACKEND", "file").lower()
+
+
+def get_single_flight_dir() -> str:
+    """Get directory holding lock and result files for the file backend"""
+    return os.getenv("SINGLE_FLIGHT_DIR", os.path.join(tempfile.gettempdir(), "walletdoctor-singleflight"))
+
+
+def get_single_flight_wait() -> float:
+    """Seconds to wait on another worker's run before fetching anyway"""
+    return float(os.getenv("SINGLE_FLIGHT_WAIT_SEC", "120"))
+
+
+def get_single_flight_ttl() -> float:
+    """Seconds after which lock, marker and result files are considered abandoned"""
+    return float(os.getenv("SINGLE_FLIGHT_TTL_SEC", "600"))
+
+
+def _encode_shared(value: Any) -> Any:
+    """Convert a fetch result to tagged JSON; raises TypeError for anything else"""
+    # Import here to avoid circular import
+    from src.lib.trade_table import TradeTable
+    from src.lib.wallet_sync_store import trade_to_record
+
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Decimal):
+        return {"__decimal__": str(value)}
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, TradeTable):
+        return {"__trade_table__": [trade_to_record(value.to_trade(i)) for i in range(len(value))]}
+    if isinstance(value, tuple):
+        return {"__tuple__": [_encode_shared(item) for item in value]}
+    if isinstance(value, list):
+        return [_encode_shared(item) for item in value]
+    if isinstance(value, dict):
+        if not all(isinstance(k, str) for k in value) or any(k.startswith("__") for k in value):
+            raise TypeError("dict keys must be plain strings")
+        return {k: _encode_shared(v) for k, v in value.items()}
+    raise TypeError(f"{type(value).__name__} is not shareable")
+
+
+def _decode_shared(value: Dict[str, Any]) -> Any:
+    """json object_hook reversing _encode_shared"""
+    if len(value) != 1:
+        return value
+    if "__decimal__" in value:
+        return Decimal(value["__decimal__"])
+    if "__datetime__" in value:
+        return datetime.fromisoformat(value["__datetime__"])
+    if "__tuple__" in value:
+        return tuple(value["__tuple__"])
+    if "__trade_table__" in value:
+        # Import here to avoid circular import
+        from src.lib.trade_table import TradeTable
+        from src.lib.wallet_sync_store import trade_from_record
+
+        return TradeTable.from_trades(trade_from_record(record) for record in value["__trade_table__"])
+    return value
+
+
+class _Flight:
+    """One in-flight run and the callers attached to it"""
+
+    __slots__ = ("future", "followers")
+
+    def __init__(self):
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.followers = 0
+
+
+class FileLockFlightBackend:
+    """Per-key flock() plus a result file published for waiting workers on the host"""
+
+    def __init__(self, directory: Optional[str] = None):
+        if not FCNTL_AVAILABLE:
+            raise RuntimeError("fcntl is not available on this platform")
+        self.directory = directory or get_single_flight_dir()
+        self._ensure_private_dir()
+        self._swept_at = 0.0
+
+    def _ensure_private_dir(self):
+        """Create the directory 0700, refusing one another user owns or can write to"""
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        st = os.lstat(self.directory)
+        if not os.path.isdir(self.directory) or os.path.islink(self.directory) or st.st_uid != os.getuid():
+            raise RuntimeError(f"{self.directory} is not a directory owned by this user")
+        if st.st_mode & 0o077:
+            os.chmod(self.directory, 0o700)
+
+    def _paths(self, key: str) -> Tuple[str, str, str]:
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        base = os.path.join(self.directory, digest)
+        return f"{base}.lock", f"{base}.result", f"{base}.wait."
+
+    @staticmethod
+    def _same_file(fd: int, path: str) -> bool:
+        """Whether fd still is the lock file at path (it is unlinked once nobody waits)"""
+        try:
+            return os.fstat(fd).st_ino == os.stat(path).st_ino
+        except FileNotFoundError:
+            return False
+
+    async def _acquire(self, lock_path: str, wait_path: str) -> Tuple[int, bool]:
+        """Take the lock without blocking the loop; returns (fd, whether we had to wait)"""
+        deadline = time.time() + get_single_flight_wait()
+        waited = False
+        while True:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                while True:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if not waited:
+                            # Tells the holder to publish its result for us
+                            open(wait_path, "w").close()
+                            waited = True
+                        if time.time() >= deadline:
+                            raise TimeoutError("timed out waiting for the in-flight run")
+                        await asyncio.sleep(LOCK_POLL_INTERVAL)
+                if self._same_file(fd, lock_path):
+                    return fd, waited
+            except BaseException:
+                os.close(fd)
+                raise
+            # The previous holder removed the file we locked; lock the current one
+            os.close(fd)
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[T]], on_shared: Callable[[], None]) -> T:
+        self._sweep()
+        lock_path, result_path, wait_prefix = self._paths(key)
+        wait_path = f"{wait_prefix}{os.getpid()}.{uuid.uuid4().hex[:8]}"
+        started = time.time()
+        try:
+            try:
+                fd, waited = await self._acquire(lock_path, wait_path)
+            except TimeoutError:
+                logger.warning(f"Single flight {key}: lock wait timed out, fetching without it")
+                self._remove(wait_path)
+                return await fn()
+            try:
+                if waited:
+                    shared = self._read_result(result_path, started)
+                    self._remove(wait_path)
+                    if shared is not None:
+                        on_shared()
+                        return shared
+                result = await fn()
+                if glob.glob(f"{wait_prefix}*"):
+                    self._write_result(result_path, result)
+                return result
+            finally:
+                if not glob.glob(f"{wait_prefix}*"):
+                    # Nobody else is waiting: the result has been read by everyone who needs it
+                    self._remove(result_path)
+                    self._remove(lock_path)
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+        finally:
+            self._remove(wait_path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def _read_result(self, path: str, not_before: float) -> Optional[Any]:
+        """Result published by the run we waited on, if it finished after we arrived"""
+        try:
+            if os.path.getmtime(path) < not_before:
+                return None
+            with open(path, "r") as f:
+                return json.load(f, object_hook=_decode_shared)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.debug(f"No shared single flight result at {path}: {e}")
+            return None
+
+    def _write_result(self, path: str, result: Any):
+        try:
+            payload = json.dumps(_encode_shared(result), separators=(",", ":"))
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Single flight result not shareable across workers: {e}")
+            return
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def _sweep(self):
+        """Remove files abandoned by crashed workers, at most once per SWEEP_INTERVAL"""
+        now = time.time()
+        if now - self._swept_at < SWEEP_INTERVAL:
+            return
+        self._swept_at = now
+        cutoff = now - get_single_flight_ttl()
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError as e:
+            logger.debug(f"Single flight sweep skipped: {e}")
+            return
+        removed = 0
+        for entry in entries:
+            try:
+                if entry.stat(follow_symlinks=False).st_mtime >= cutoff:
+                    continue
+                if entry.name.endswith(".lock"):
+                    # Only remove a lock nobody holds; acquirers re-check the inode
+                    fd = os.open(entry.path, os.O_RDWR)
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        os.unlink(entry.path)
+                    except BlockingIOError:
+                        continue
+                    finally:
+                        os.close(fd)
+                else:
+                    os.unlink(entry.path)
+                removed += 1
+            except OSError:
+                continue
+        if removed:
+            logger.info(f"Single flight sweep removed {removed} abandoned files")
+
+
+class SingleFlight:
+    """Run at most one coroutine per key at a time; concurrent callers share its result"""
+
+    def __init__(self, backend: Optional[FileLockFlightBackend] = None):
+        self.backend = backend
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.metrics = {
+            "leaders": 0,
+            "followers": 0,
+            "cross_worker_shared": 0,
+            "errors": 0,
+        }
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run fn() for key, or wait for the run already in flight and return a copy of its result"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.metrics["leaders"] += 1
+            else:
+                flight.followers += 1
+                self.metrics["followers"] += 1
+        if not leader:
+            logger.info(f"Single flight {key}: attaching to in-flight run")
+            payload = await asyncio.wrap_future(flight.future)
+            return pickle.loads(payload)
+
+        try:
+            if self.backend is not None:
+                result = await self.backend.run(key, fn, self._count_shared)
+            else:
+                result = await fn()
+        except BaseException as e:
+            self.metrics["errors"] += 1
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.future.set_exception(e if isinstance(e, Exception) else RuntimeError(f"{key} aborted"))
+            raise
+
+        with self._lock:
+            self._flights.pop(key, None)
+            followers = flight.followers
+        if followers:
+            # Followers unpickle their own copy; callers mutate trades (P&L, enrichment)
+            try:
+                flight.future.set_result(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+            except Exception as e:
+                flight.future.set_exception(e)
+        return result
+
+    def _count_shared(self):
+        self.metrics["cross_worker_shared"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics"""
+        with self._lock:
+            in_flight = len(self._flights)
+        return {
+            **self.metrics,
+            "in_flight": in_flight,
+            "backend": "file" if self.backend is not None else "local",
+        }
+
+
+# Global instance
+_single_flight: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+
+def _create_backend() -> Optional[FileLockFlightBackend]:
+    """Create the configured cross-worker backend, falling back to in-process only"""
+    if get_single_flight_backend() == "file":
+        try:
+            return FileLockFlightBackend()
+        except (RuntimeError, OSError) as e:
+            logger.warning(f"Cross-worker single flight unavailable, coalescing in-process only: {e}")
+    return None
+
+
+def get_single_flight() -> SingleFlight:
+    """Get or create the process-wide single flight group"""
+    global _single_flight
+    with _single_flight_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight(_create_backend())
+        return _single_flight
+
+
+async def single_flight(key: str, fn: Callable[[], Awaitable[T]]) -> T:
+    """Coalesce fn() with concurrent calls for the same key (no-op when SINGLE_FLIGHT_BACKEND=off)"""
+    if get_single_flight_backend() == "off":
+        return await fn()
+    return await get_single_flight().do(key, fn)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Snapshot Refresher - Stale-while-revalidate engine for PositionCacheV2
+Flask serves each request on its own short-lived event loop, so a refresh task
+created there dies with the request. The refresher instead owns one daemon
+thread running a long-lived event loop; caches submit wallet refreshes to it
+from any thread or loop and keep serving the cached snapshot meanwhile.
+
+Each refresh rebuilds the snapshot through the same pipeline as a cold
+request (fetch -> PositionBuilder -> UnrealizedPnLCalculator) and swaps it
+into the cache with a single set, so readers see either the old or the new
+snapshot, never a mix. At most SNAPSHOT_REFRESH_CONCURRENCY rebuilds run at
+once; the rest queue. Refresh lag (request to swap) is tracked per refresh.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from typing import Optional, Dict, Any, Callable, Awaitable
+
+from src.lib.rate_scheduler import Priority, get_current_priority, priority_scope
+
+logger = logging.getLogger(__name__)
+
+
+def get_refresh_concurrency() -> int:
+    """Max snapshot rebuilds running at once"""
+    return int(os.getenv("SNAPSHOT_REFRESH_CONCURRENCY", "4"))
+
+
+def get_refresh_ahead_fraction() -> float:
+    """Fraction of the stale threshold after which a hit refreshes ahead of staleness"""
+    return float(os.getenv("SNAPSHOT_REFRESH_AHEAD", "0.8"))
+
+
+def get_refresh_jitter() -> float:
+    """Random fraction taken off the refresh-ahead point so hot wallets do not refresh in lockstep"""
+    return float(os.getenv("SNAPSHOT_REFRESH_JITTER", "0.1"))
+
+
+def get_refresh_timeout() -> float:
+    """Seconds a single rebuild may take before it is abandoned"""
+    return float(os.getenv("SNAPSHOT_REFRESH_TIMEOUT_SEC", "120"))
+
+
+async def build_portfolio_snapshot(wallet: str):
+    """Rebuild a wallet's portfolio snapshot: fetch -> PositionBuilder -> UnrealizedPnLCalculator"""
+    # Import here to avoid circular import
+    from src.lib.blockchain_fetcher_v3_fast import BlockchainFetcherV3Fast
+    from src.lib.position_builder import PositionBuilder
+    from src.lib.position_models import CostBasisMethod, PositionSnapshot
+    from src.lib.single_flight import single_flight
+    from src.lib.trade_table import TradeTable
+    from src.lib.unrealized_pnl_calculator import UnrealizedPnLCalculator
+    from src.config.feature_flags import get_cost_basis_method, should_calculate_unrealized_pnl
+
+    async def fetch():
+        async with BlockchainFetcherV3Fast(skip_pricing=False) as fetcher:
+            result = await fetcher.fetch_wallet_trades(wallet)
+            return result, fetcher.trade_table
+
+    # Same key as the API's cold path, so a refresh and a request never fetch twice
+    result, trade_table = await single_flight(f"v3fast:{wallet}:skip_pricing=False", fetch)
+    trades = result.get("trades", [])
+
+    builder = PositionBuilder(CostBasisMethod(get_cost_basis_method()))
+    positions = builder.build_positions_from_trades(
+        trade_table if isinstance(trade_table, TradeTable) else trades, wallet
+    )
+    if not positions or not should_calculate_unrealized_pnl():
+        return None
+
+    calculator = UnrealizedPnLCalculator()
+    if os.getenv("PRICE_HELIUS_ONLY", "").lower() == "true":
+        calculator.trades = trades
+        calculator.transactions = result.get("transactions", [])
+    position_pnls = await calculator.create_position_pnl_list(positions)
+    return PositionSnapshot.from_positions(wallet, position_pnls)
+
+
+class SnapshotRefresher:
+    """Background snapshot rebuilds on a dedicated event loop thread"""
+
+    def __init__(
+        self,
+        rebuild: Optional[Callable[[str], Awaitable[Any]]] = None,
+        concurrency: Optional[int] = None,
+    ):
+        self.rebuild = rebuild or build_portfolio_snapshot
+        self.concurrency = concurrency or get_refresh_concurrency()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._start_lock = threading.Lock()
+        self._running = 0
+        self.metrics = {
+            "refreshes_submitted": 0,
+            "refreshes_completed": 0,
+            "refreshes_failed": 0,
+            "refreshes_empty": 0,
+            "refresh_lag_ms_last": 0,
+            "refresh_lag_ms_max": 0,
+            "refresh_lag_ms_total": 0,
+        }
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the refresher thread and its loop on first use"""
+        with self._start_lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                started = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(started.set)
+                    loop.run_forever()
+                    loop.close()
+
+                self._thread = threading.Thread(target=run, name="snapshot-refresher", daemon=True)
+                self._thread.start()
+                started.wait()
+                self._loop = loop
+                self._semaphore = None
+                logger.info(f"Snapshot refresher started (concurrency={self.concurrency})")
+            return self._loop
+
+    def submit(self, cache, wallet: str, priority: Optional[Priority] = None) -> concurrent.futures.Future:
+        """Queue a rebuild of wallet's snapshot into cache; safe from any thread"""
+        self.metrics["refreshes_submitted"] += 1
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._refresh(cache, wallet, time.monotonic(), priority), loop)
+
+    async def _refresh(self, cache, wallet: str, requested_at: float, priority: Optional[Priority] = None):
+        if self._semaphore is None:
+            # Created on the refresher loop itself
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            self._running += 1
+            try:
+                with priority_scope(priority if priority is not None else get_current_priority()):
+                    snapshot = await asyncio.wait_for(self.rebuild(wallet), get_refresh_timeout())
+                if snapshot is None:
+                    self.metrics["refreshes_empty"] += 1
+                    logger.info(f"Snapshot refresh for {wallet}: nothing to cache")
+                    return
+                # One set per key: readers get the old snapshot or the new one
+                await cache.set_portfolio_snapshot(snapshot)
+                for position_pnl in snapshot.positions:
+                    await cache.set_position(position_pnl.position)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.metrics["refreshes_failed"] += 1
+                cache.metrics["position_cache_refresh_errors"] += 1
+                logger.error(f"Snapshot refresh for {wallet} failed: {e}")
+                return
+            finally:
+                self._running -= 1
+
+        lag_ms = int((time.monotonic() - requested_at) * 1000)
+        self.metrics["refreshes_completed"] += 1
+        self.metrics["refresh_lag_ms_last"] = lag_ms
+        self.metrics["refresh_lag_ms_max"] = max(self.metrics["refresh_lag_ms_max"], lag_ms)
+        self.metrics["refresh_lag_ms_total"] += lag_ms
+        logger.info(f"Snapshot refreshed for {wallet} in {lag_ms}ms")
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the loop thread; queued refreshes are dropped"""
+        with self._start_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get refresh statistics"""
+        completed = self.metrics["refreshes_completed"]
+        return {
+            **self.metrics,
+            "refresh_lag_ms_avg": self.metrics["refresh_lag_ms_total"] / completed if completed else 0,
+            "running": self._running,
+            "concurrency": self.concurrency,
+            "thread_alive": self._thread is not None and self._thread.is_alive(),
+        }
+
+
+# Global instance
+_refresher_instance: Optional[SnapshotRefresher] = None
+_refresher_lock = threading.Lock()
+
+
+def get_snapshot_refresher() -> SnapshotRefresher:
+    """Get or create the process-wide refresher"""
+    global _refresher_instance
+    with _refresher_lock:
+        if _refresher_instance is None:
+            _refresher_instance = SnapshotRefresher()
+        return _refresher_instance
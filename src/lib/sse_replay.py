@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+SSE Replay - Resumable SSE streams with numbered frames and a replay buffer
+A dropped stream used to cost a full re-fetch: the computation died with the
+connection and the reconnect started from scratch.
+
+Each stream computation now runs once per key (e.g. one per wallet and
+endpoint) in a ReplayStream that owns its producer thread. Frames from the
+SSE transport are numbered "<stream_id>-<n>" (the id is set on the last event
+of the frame, so the browser's Last-Event-ID is the last frame it received)
+and kept in a bounded replay buffer. Any number of clients subscribe:
+
+- a reconnect with Last-Event-ID gets only the frames after that id, then
+  follows the live stream
+- a new request for a key that is still running, or finished less than
+  SSE_REPLAY_TTL_SEC ago, replays it instead of starting another fetch, so
+  reconnect storms cost no extra upstream calls - but only while the stream
+  still has its first frame; once that is gone a new request starts a new
+  computation, so a fresh client never gets a partial trade stream
+
+The buffer holds SSE_REPLAY_MAX_FRAMES frames in memory. Older frames spill
+to a file under SSE_REPLAY_SPILL_DIR when set; otherwise they are dropped,
+and a client that missed them gets a replay_gap event. Without spill, the
+producer waits for connected clients rather than drop frames they have not
+read yet, so a slow client still holds back the computation.
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import tempfile
+import threading
+from collections import deque
+from itertools import count, islice
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from src.lib.sse_transport import SSEFramer, format_event, frame_events
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBE_START_TIMEOUT = 10.0  # Seconds an opened subscription holds its place before it is first read
+
+
+def get_replay_max_frames() -> int:
+    """Frames kept in memory per stream"""
+    return int(os.getenv("SSE_REPLAY_MAX_FRAMES", "256"))
+
+
+def get_replay_ttl() -> int:
+    """Seconds a finished stream stays available for replay"""
+    return int(os.getenv("SSE_REPLAY_TTL_SEC", "60"))
+
+
+def get_replay_spill_dir() -> Optional[str]:
+    """Directory for frames evicted from memory; unset drops them"""
+    return os.getenv("SSE_REPLAY_SPILL_DIR") or None
+
+
+def stamp_frame(frame: str, event_id: str) -> str:
+    """Set the SSE id on the last event of a frame"""
+    body = frame.rstrip("\n")
+    start = body.rfind("\n\n") + 2 if "\n\n" in body else 0
+    return f"{frame[:start]}id: {event_id}\n{frame[start:]}"
+
+
+class ReplayStream:
+    """One stream computation, its numbered frames and its subscribers"""
+
+    def __init__(
+        self,
+        key: str,
+        max_frames: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        stream_id: Optional[str] = None,
+    ):
+        self.key = key
+        self.stream_id = stream_id or uuid.uuid4().hex[:12]
+        self.max_frames = max_frames or get_replay_max_frames()
+        # "" disables spill regardless of SSE_REPLAY_SPILL_DIR
+        self.spill_dir = (spill_dir if spill_dir is not None else get_replay_spill_dir()) or None
+        self.last_id = 0
+        self.done = False
+        self.finished_at: Optional[float] = None
+        self.subscribers = 0
+        self._frames: Deque[Tuple[int, str]] = deque()
+        self._cursors: Dict[int, int] = {}  # Subscriber -> last frame id it was handed
+        self._unstarted: Dict[int, float] = {}  # Subscriber not read yet -> deadline for its hold
+        self._tokens = count()
+        self._spill = None
+        self._spill_index: List[Tuple[int, int]] = []  # (offset, length) of frame i + 1
+        self._cond = threading.Condition()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self.metrics = {"frames": 0, "subscribes": 0, "resumes": 0, "replayed_frames": 0, "gaps": 0}
+
+    def parse_event_id(self, last_event_id: Optional[str]) -> int:
+        """Frame number a Last-Event-ID refers to; 0 when it is not from this stream"""
+        if not last_event_id:
+            return 0
+        stream_id, _, number = last_event_id.strip().rpartition("-")
+        if stream_id != self.stream_id or not number.isdigit():
+            return 0
+        return min(int(number), self.last_id)
+
+    def append(self, frame: str) -> int:
+        """Number and buffer a frame; returns its id"""
+        with self._cond:
+            self._wait_for_room()
+            self.last_id += 1
+            self._frames.append((self.last_id, stamp_frame(frame, f"{self.stream_id}-{self.last_id}")))
+            while len(self._frames) > self.max_frames:
+                self._evict()
+            self.metrics["frames"] += 1
+            self._cond.notify_all()
+            return self.last_id
+
+    def finish(self):
+        """Mark the computation finished; subscribers drain and return"""
+        with self._cond:
+            self.done = True
+            self.finished_at = time.monotonic()
+            self._cond.notify_all()
+
+    def _wait_for_room(self):
+        """Without spill, wait until connected subscribers have read the frame about to be dropped"""
+        while True:
+            self._release_unstarted()
+            if not (
+                self.spill_dir is None
+                and self._cursors
+                and len(self._frames) >= self.max_frames
+                and min(self._cursors.values()) < self._frames[0][0]
+            ):
+                return
+            self._cond.wait(0.25)
+
+    def _release_unstarted(self):
+        """Drop holds of subscriptions that were opened but never read"""
+        now = time.monotonic()
+        for token in [t for t, deadline in self._unstarted.items() if now > deadline]:
+            del self._unstarted[token]
+            self._cursors.pop(token, None)
+            self.subscribers -= 1
+
+    def _has_start(self) -> bool:
+        """Whether the first frame can still be replayed, from memory or spill"""
+        return self.last_id == 0 or bool(self._spill_index) or bool(self._frames and self._frames[0][0] == 1)
+
+    def _evict(self):
+        frame_id, frame = self._frames.popleft()
+        if self.spill_dir is None:
+            return
+        try:
+            if self._spill is None:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                self._spill = tempfile.TemporaryFile(mode="w+b", dir=self.spill_dir)
+            data = frame.encode()
+            self._spill.seek(0, os.SEEK_END)
+            self._spill_index.append((self._spill.tell(), len(data)))
+            self._spill.write(data)
+        except OSError as e:
+            logger.error(f"Replay spill for {self.key} failed, dropping frames: {e}")
+            self.spill_dir = None
+
+    def _frames_after(self, cursor: int) -> Tuple[List[Tuple[int, str]], bool]:
+        """Frames with id > cursor, and whether some were no longer available"""
+        frames = []
+        first_in_memory = self._frames[0][0] if self._frames else self.last_id + 1
+        spilled = len(self._spill_index)
+        if cursor + 1 < first_in_memory and cursor < spilled:
+            self._spill.flush()
+            for frame_id in range(cursor + 1, min(first_in_memory, spilled + 1)):
+                offset, length = self._spill_index[frame_id - 1]
+                self._spill.seek(offset)
+                frames.append((frame_id, self._spill.read(length).decode()))
+        start = frames[-1][0] if frames else cursor
+        gap = start + 1 < first_in_memory
+        frames.extend(islice(self._frames, max(start + 1 - first_in_memory, 0), None))
+        return frames, gap
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Iterator[str]:
+        """Frames after last_event_id, then live frames until the stream finishes
+
+        The subscriber holds its place from this call, so frames it has not
+        read are not dropped while the response is being set up.
+        """
+        with self._cond:
+            return self._open(self.parse_event_id(last_event_id))
+
+    def subscribe_from_start(self) -> Optional[Iterator[str]]:
+        """Every frame from the first, or None if the first frame is no longer available"""
+        with self._cond:
+            return self._open(0) if self._has_start() else None
+
+    def _open(self, cursor: int) -> Iterator[str]:
+        token = next(self._tokens)
+        self._cursors[token] = cursor
+        self._unstarted[token] = time.monotonic() + SUBSCRIBE_START_TIMEOUT
+        self.subscribers += 1
+        self.metrics["subscribes"] += 1
+        if cursor:
+            self.metrics["resumes"] += 1
+        return self._follow(token, cursor, self.last_id)
+
+    def _follow(self, token: int, cursor: int, live_from: int) -> Iterator[str]:
+        with self._cond:
+            if self._unstarted.pop(token, None) is None and token not in self._cursors:
+                # Hold released before the first read; rejoin from the same cursor
+                self._cursors[token] = cursor
+                self.subscribers += 1
+        try:
+            while True:
+                with self._cond:
+                    while self.last_id <= cursor and not self.done:
+                        self._cond.wait(1.0)
+                    frames, gap = self._frames_after(cursor)
+                    if not frames and self.done:
+                        return
+                    if gap:
+                        self.metrics["gaps"] += 1
+                    self.metrics["replayed_frames"] += sum(1 for frame_id, _ in frames if frame_id <= live_from)
+                if gap:
+                    yield format_event("replay_gap", json.dumps({
+                        "missed_from": f"{self.stream_id}-{cursor + 1}",
+                        "resumed_at": f"{self.stream_id}-{frames[0][0]}",
+                    }))
+                for frame_id, frame in frames:
+                    yield frame
+                    cursor = frame_id
+                    with self._cond:
+                        self._cursors[token] = cursor
+                        self._cond.notify_all()
+        finally:
+            with self._cond:
+                if self._cursors.pop(token, None) is not None:
+                    self.subscribers -= 1
+                self._cond.notify_all()
+
+    def start(self, source_factory: Callable[[], AsyncIterator[Union[str, List[Dict[str, Any]]]]]):
+        """Run the computation on its own event loop thread"""
+        loop = asyncio.new_event_loop()
+
+        async def produce():
+            # Import here to avoid circular import
+            from src.lib.http_session import http_session_scope
+
+            try:
+                async with http_session_scope():
+                    framed = frame_events(source_factory(), SSEFramer())
+                    try:
+                        async for frame in framed:
+                            self.append(frame)
+                    finally:
+                        await framed.aclose()
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                logger.error(f"Replay stream {self.key} failed: {e}")
+                self.append(format_event("error", json.dumps({"error": str(e), "code": "STREAM_ERROR"})))
+            finally:
+                self.finish()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self._task)
+            finally:
+                loop.run_until_complete(loop.shutdown_asyncgens())
+                loop.close()
+
+        self._loop = loop
+        self._task = loop.create_task(produce())
+        threading.Thread(target=run, name=f"sse-replay-{self.stream_id}", daemon=True).start()
+
+    def cancel(self):
+        """Stop the computation"""
+        if self._loop is not None and not self._loop.is_closed() and self._task is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._task.cancel)
+            except RuntimeError:
+                pass
+
+    def close(self):
+        """Release the spill file"""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def expired(self, now: float) -> bool:
+        with self._cond:
+            self._release_unstarted()
+        return self.done and self.subscribers == 0 and now - self.finished_at > get_replay_ttl()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get stream statistics"""
+        with self._cond:
+            return {
+                **self.metrics,
+                "stream_id": self.stream_id,
+                "last_id": self.last_id,
+                "buffered_frames": len(self._frames),
+                "spilled_frames": len(self._spill_index),
+                "subscribers": self.subscribers,
+                "done": self.done,
+            }
+
+
+class ReplayRegistry:
+    """Running and recently finished streams by key"""
+
+    def __init__(self):
+        self._streams: Dict[str, ReplayStream] = {}  # Key -> newest stream
+        self._by_id: Dict[str, ReplayStream] = {}  # Every live or cached stream, for resumes
+        self._lock = threading.Lock()
+        self.metrics = {"streams_started": 0, "streams_joined": 0, "streams_superseded": 0}
+
+    def subscribe(
+        self,
+        key: str,
+        source_factory: Callable[[], AsyncIterator[Union[str, List[Dict[str, Any]]]]],
+        last_event_id: Optional[str] = None,
+        stream_id: Optional[str] = None,
+    ) -> Tuple[ReplayStream, Iterator[str]]:
+        """Subscribe to the stream for key, starting one if needed; returns (stream, frames)
+
+        A Last-Event-ID from a stream still held resumes that stream. A new
+        request joins the live or recently finished stream only while its first
+        frame is still available; otherwise it gets a new computation.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for stale_id in [i for i, s in self._by_id.items() if s.expired(now)]:
+                stream = self._by_id.pop(stale_id)
+                if self._streams.get(stream.key) is stream:
+                    del self._streams[stream.key]
+                stream.close()
+
+            resumed = self._by_id.get((last_event_id or "").strip().rpartition("-")[0])
+            if resumed is not None and resumed.key == key and resumed.parse_event_id(last_event_id):
+                self.metrics["streams_joined"] += 1
+                return resumed, resumed.subscribe(last_event_id)
+
+            stream = self._streams.get(key)
+            if stream is not None:
+                frames = stream.subscribe_from_start()
+                if frames is not None:
+                    self.metrics["streams_joined"] += 1
+                    return stream, frames
+                self.metrics["streams_superseded"] += 1
+
+            stream = ReplayStream(key, stream_id=stream_id)
+            self._streams[key] = stream
+            self._by_id[stream.stream_id] = stream
+            self.metrics["streams_started"] += 1
+            frames = stream.subscribe()
+        stream.start(source_factory)
+        logger.info(f"Started replay stream {stream.stream_id} for {key}")
+        return stream, frames
+
+    def get(self, key: str) -> Optional[ReplayStream]:
+        with self._lock:
+            return self._streams.get(key)
+
+    def close(self):
+        """Cancel every stream"""
+        with self._lock:
+            streams = list(self._by_id.values())
+            self._streams.clear()
+            self._by_id.clear()
+        for stream in streams:
+            stream.cancel()
+            stream.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get registry statistics"""
+        with self._lock:
+            streams = list(self._by_id.values())
+        return {
+            **self.metrics,
+            "active_streams": sum(1 for s in streams if not s.done),
+            "cached_streams": sum(1 for s in streams if s.done),
+        }
+
+
+# Global instance
+_registry_instance: Optional[ReplayRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_replay_registry() -> ReplayRegistry:
+    """Get or create the process-wide replay registry"""
+    global _registry_instance
+    with _registry_lock:
+        if _registry_instance is None:
+            _registry_instance = ReplayRegistry()
+        return _registry_instance
+
+
+def last_event_id_from(request) -> Optional[str]:
+    """Last-Event-ID header, or the lastEventId query parameter for clients that cannot set headers"""
+    return request.headers.get("Last-Event-ID") or request.args.get("lastEventId")
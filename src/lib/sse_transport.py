@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+SSE Transport - Batched, backpressure-aware framing for streaming endpoints
+Writing each `event: trade` on its own costs a WSGI write and usually a send
+syscall per trade; pumping the async source one event at a time
+through run_until_complete adds an event loop round trip on top.
+
+SSEFramer coalesces a stream into write-sized frames instead. Every trade is
+still its own `event: trade`, so the wire format clients parse is unchanged;
+only the writes are batched. Control events (progress, complete, ...) pass
+through in order. A frame is written once it reaches SSE_FRAME_MAX_BYTES or
+its oldest byte is SSE_FRAME_MAX_MS old.
+
+frame_events() drives the framer from an async source. The WSGI side (thread,
+buffering, backpressure, reconnects) is sse_replay.ReplayStream.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+def get_frame_max_bytes() -> int:
+    """Max bytes coalesced into one SSE write"""
+    return int(os.getenv("SSE_FRAME_MAX_BYTES", str(64 * 1024)))
+
+
+def get_frame_max_ms() -> int:
+    """Max milliseconds an event waits for its frame to fill"""
+    return int(os.getenv("SSE_FRAME_MAX_MS", "100"))
+
+
+def get_heartbeat_sec() -> float:
+    """Idle seconds before a heartbeat event is written"""
+    return float(os.getenv("SSE_HEARTBEAT_SEC", "15"))
+
+
+def format_event(event_type: str, data_json: str, event_id: Optional[str] = None) -> str:
+    """SSE wire format for one event whose data is already JSON"""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event_type}\ndata: {data_json}\n\n"
+
+
+class SSEFramer:
+    """Coalesce trade and control events into size- and time-bounded frames"""
+
+    def __init__(self, max_bytes: Optional[int] = None, max_delay_ms: Optional[int] = None):
+        self.max_bytes = max_bytes or get_frame_max_bytes()
+        self.max_delay = (max_delay_ms if max_delay_ms is not None else get_frame_max_ms()) / 1000
+        self._parts: List[str] = []  # Formatted events waiting for the frame
+        self._size = 0
+        self._since: Optional[float] = None
+        self.metrics = {"frames": 0, "events": 0, "trades": 0, "bytes": 0}
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._parts)
+
+    def deadline(self) -> Optional[float]:
+        """Monotonic time by which pending data must be written"""
+        return self._since + self.max_delay if self._since is not None else None
+
+    def add_trades(self, trades: List[Dict[str, Any]]) -> List[str]:
+        """Add trades; returns frames that filled up"""
+        frames = []
+        for trade in trades:
+            event = format_event("trade", json.dumps(trade, default=str))
+            if self.pending and self._size + len(event) > self.max_bytes:
+                frames.append(self.flush())
+            self._parts.append(event)
+            self.metrics["events"] += 1
+            self.metrics["trades"] += 1
+            self._grow(len(event))
+        return frames
+
+    def add_event(self, event: str) -> List[str]:
+        """Add a pre-formatted SSE event; returns frames that filled up"""
+        frames = []
+        if self.pending and self._size + len(event) > self.max_bytes:
+            frames.append(self.flush())
+        self._parts.append(event)
+        self.metrics["events"] += 1
+        self._grow(len(event))
+        if self._size >= self.max_bytes:
+            frames.append(self.flush())
+        return frames
+
+    def flush(self) -> Optional[str]:
+        """Frame everything pending"""
+        if not self._parts:
+            return None
+        frame = "".join(self._parts)
+        self._parts = []
+        self._size = 0
+        self._since = None
+        self.metrics["frames"] += 1
+        self.metrics["bytes"] += len(frame)
+        return frame
+
+    def _grow(self, size: int):
+        if self._since is None:
+            self._since = time.monotonic()
+        self._size += size
+
+
+async def frame_events(
+    source: AsyncIterator[Union[str, List[Dict[str, Any]]]],
+    framer: Optional[SSEFramer] = None,
+) -> AsyncIterator[str]:
+    """
+    Frame an async source of SSE items
+
+    The source yields pre-formatted SSE event strings, or lists of trade
+    dicts, each written as an `event: trade`.
+    """
+    framer = framer or SSEFramer()
+    iterator = source.__aiter__()
+    pending = None
+    idle_since = time.monotonic()
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            deadline = framer.deadline()
+            timeout = max(deadline - time.monotonic(), 0) if deadline is not None else \
+                max(idle_since + get_heartbeat_sec() - time.monotonic(), 0)
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                # Frame timer expired, or nothing at all to send for a while
+                if framer.pending:
+                    yield framer.flush()
+                else:
+                    yield format_event("heartbeat", json.dumps({"timestamp": int(time.time())}))
+                idle_since = time.monotonic()
+                continue
+
+            try:
+                item = pending.result()
+            except StopAsyncIteration:
+                pending = None
+                break
+            pending = None
+            frames = framer.add_trades(item) if isinstance(item, list) else framer.add_event(item)
+            for frame in frames:
+                yield frame
+                idle_since = time.monotonic()
+        if framer.pending:
+            yield framer.flush()
+    finally:
+        if pending is not None:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
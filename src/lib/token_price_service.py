@@ -20,6 +20,8 @@ from typing import Optional, Dict, Tuple, List, Any
 from datetime import datetime, timezone
 import os
 
+from src.lib.http_session import get_http_session_pool
+
 logger = logging.getLogger(__name__)
 
 # Cache configuration
@@ -64,13 +66,20 @@ class TokenPriceService:
         
     async def __aenter__(self):
         """Async context manager entry"""
-        self._session = aiohttp.ClientSession()
+        await self._ensure_session()
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
         if self._session:
-            await self._session.close()
+            await get_http_session_pool().release(self._session)
+            self._session = None
+    
+    async def _ensure_session(self) -> aiohttp.ClientSession:
+        """Borrow the shared pooled session if we don't hold one yet"""
+        if not self._session:
+            self._session = await get_http_session_pool().acquire()
+        return self._session
             
     async def get_token_price_usd(
         self, 
@@ -190,8 +199,7 @@ class TokenPriceService:
             if self.api_key:
                 headers["x-cg-pro-api-key"] = self.api_key
             
-            if not self._session:
-                self._session = aiohttp.ClientSession()
+            await self._ensure_session()
                 
             async with self._session.get(url, params=params, headers=headers) as resp:
                 if resp.status == 200:
@@ -221,8 +229,7 @@ class TokenPriceService:
             if self.api_key:
                 headers["x-cg-pro-api-key"] = self.api_key
                 
-            if not self._session:
-                self._session = aiohttp.ClientSession()
+            await self._ensure_session()
                 
             async with self._session.get(url, params=params, headers=headers) as resp:
                 if resp.status == 200:
@@ -251,8 +258,7 @@ class TokenPriceService:
             if self.api_key:
                 headers["x-cg-pro-api-key"] = self.api_key
                 
-            if not self._session:
-                self._session = aiohttp.ClientSession()
+            await self._ensure_session()
                 
             async with self._session.get(url, params=params, headers=headers) as resp:
                 if resp.status == 200:
@@ -305,8 +311,7 @@ class TokenPriceService:
                 if self.api_key:
                     headers["x-cg-pro-api-key"] = self.api_key
                     
-                if not self._session:
-                    self._session = aiohttp.ClientSession()
+                await self._ensure_session()
                     
                 async with self._session.get(url, params=params, headers=headers) as resp:
                     if resp.status == 200:
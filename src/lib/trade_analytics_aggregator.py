@@ -4,19 +4,106 @@ Aggregates enriched trade data into compact analytics summaries
 """
 
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Union
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from collections import defaultdict
+from dataclasses import dataclass, field
 import json
 
+from src.lib.trade_table import TradeTable, from_base_units
+from src.lib.columnar_analytics import get_analytics_backend, TradeAnalyticsArrays, summarize_analytics
+
 logger = logging.getLogger(__name__)
 
 
+def _parse_decimal(value: Any) -> Optional[Decimal]:
+    """Decimal for a P&L/value field; blank or unparseable values are skipped"""
+    if not value or value == "":
+        return None
+    try:
+        return Decimal(value)
+    except:
+        return None
+
+
+def _parse_timestamp(ts_str: Any) -> Optional[datetime]:
+    """Parse an ISO timestamp, tolerating a trailing Z"""
+    if not ts_str:
+        return None
+    try:
+        if ts_str.endswith("Z"):
+            ts_str = ts_str[:-1] + "+00:00"
+        return datetime.fromisoformat(ts_str)
+    except:
+        return None
+
+
+@dataclass
+class AnalyticsColumns:
+    """Per-trade values the analytics are computed from, one list per field"""
+    actions: List[str] = field(default_factory=list)
+    pnl: List[Optional[Decimal]] = field(default_factory=list)
+    values: List[Optional[Decimal]] = field(default_factory=list)
+    sol_amounts: List[Optional[Decimal]] = field(default_factory=list)
+    tokens: List[str] = field(default_factory=list)
+    timestamps: List[Optional[datetime]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+    @classmethod
+    def from_dicts(cls, trades: List[Dict]) -> "AnalyticsColumns":
+        """Columns from enriched Trade.to_dict() trades"""
+        cols = cls()
+        for trade in trades:
+            token_in = trade.get("token_in", {})
+            token_out = trade.get("token_out", {})
+            if token_in.get("symbol") == "So111111":  # SOL
+                sol_amount = Decimal(str(token_in.get("amount", 0)))
+            elif token_out.get("symbol") == "So111111":  # SOL
+                sol_amount = Decimal(str(token_out.get("amount", 0)))
+            else:
+                sol_amount = None
+
+            cols.actions.append(trade.get("action"))
+            cols.pnl.append(_parse_decimal(trade.get("pnl_usd")))
+            cols.values.append(_parse_decimal(trade.get("value_usd")))
+            cols.sol_amounts.append(sol_amount)
+            cols.tokens.append(trade.get("token", ""))
+            cols.timestamps.append(_parse_timestamp(trade.get("timestamp", "")))
+        return cols
+
+    @classmethod
+    def from_table(cls, table: TradeTable) -> "AnalyticsColumns":
+        """Columns read straight from a TradeTable (SOL legs matched by mint ID)"""
+        sol_id = table.sol_id
+        symbols = table.mints.symbols
+        cols = cls()
+        for i in range(len(table)):
+            in_id = table.in_mint_ids[i]
+            out_id = table.out_mint_ids[i]
+            if in_id == sol_id:
+                sol_amount = from_base_units(table.in_amounts[i], table.in_decimals[i])
+            elif out_id == sol_id:
+                sol_amount = from_base_units(table.out_amounts[i], table.out_decimals[i])
+            else:
+                sol_amount = None
+
+            cols.actions.append("sell" if out_id == sol_id else "buy")
+            cols.pnl.append(table.pnl_usd[i] or None)
+            cols.values.append(table.value_usd[i] or None)
+            cols.sol_amounts.append(sol_amount)
+            cols.tokens.append(symbols[in_id if in_id != sol_id else out_id])
+            cols.timestamps.append(datetime.fromtimestamp(table.timestamps[i], timezone.utc))
+        return cols
+
+
 class TradeAnalyticsAggregator:
     """Aggregates trade data into analytics summaries for v0.8.0-summary"""
     
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None):
+        self.backend = backend or get_analytics_backend()
         self.reset_stats()
     
     def reset_stats(self):
@@ -27,12 +114,12 @@ class TradeAnalyticsAggregator:
             "computation_time_ms": 0
         }
     
-    async def aggregate_analytics(self, trades: List[Dict], wallet: str) -> Dict[str, Any]:
+    async def aggregate_analytics(self, trades: Union[List[Dict], TradeTable], wallet: str) -> Dict[str, Any]:
         """
         Aggregate trade data into analytics summary
         
         Args:
-            trades: List of enriched trades (must have price/P&L data)
+            trades: List of enriched trades (must have price/P&L data), or a TradeTable
             wallet: Wallet address
             
         Returns:
@@ -41,12 +128,31 @@ class TradeAnalyticsAggregator:
         import time
         start_time = time.time()
         
-        # Initialize counters
-        pnl_metrics = self._calculate_pnl_metrics(trades)
-        volume_metrics = self._calculate_volume_metrics(trades)
-        token_metrics = self._calculate_token_metrics(trades)
-        time_window = self._calculate_time_window(trades)
-        recent_windows = self._calculate_recent_windows(trades)
+        if self.backend == "numpy":
+            if isinstance(trades, TradeTable):
+                arrays = TradeAnalyticsArrays.from_table(trades)
+            else:
+                arrays = TradeAnalyticsArrays.from_columns(AnalyticsColumns.from_dicts(trades))
+            sections = summarize_analytics(arrays, self._format_decimal)
+            trade_count = len(arrays)
+            pnl_metrics = sections["pnl"]
+            volume_metrics = sections["volume"]
+            token_metrics = sections["top_tokens"]
+            time_window = sections["time_window"]
+            recent_windows = sections["recent_windows"]
+        else:
+            if isinstance(trades, TradeTable):
+                cols = AnalyticsColumns.from_table(trades)
+            else:
+                cols = AnalyticsColumns.from_dicts(trades)
+            trade_count = len(cols)
+            
+            # Initialize counters
+            pnl_metrics = self._calculate_pnl_metrics(cols)
+            volume_metrics = self._calculate_volume_metrics(cols)
+            token_metrics = self._calculate_token_metrics(cols)
+            time_window = self._calculate_time_window(cols)
+            recent_windows = self._calculate_recent_windows(cols)
         
         # Build response
         summary = {
@@ -61,7 +167,7 @@ class TradeAnalyticsAggregator:
         }
         
         # Track stats
-        self.stats["trades_processed"] = len(trades)
+        self.stats["trades_processed"] = trade_count
         self.stats["computation_time_ms"] = int((time.time() - start_time) * 1000)
         
         # Log summary size
@@ -70,14 +176,14 @@ class TradeAnalyticsAggregator:
         logger.info(
             f"Analytics summary generated: "
             f"wallet={wallet[:8]}..., "
-            f"trades={len(trades)}, "
+            f"trades={trade_count}, "
             f"size={summary_size:,} bytes ({summary_size/1024:.1f} KB), "
             f"time={self.stats['computation_time_ms']}ms"
         )
         
         return summary
     
-    def _calculate_pnl_metrics(self, trades: List[Dict]) -> Dict[str, Any]:
+    def _calculate_pnl_metrics(self, cols: AnalyticsColumns) -> Dict[str, Any]:
         """Calculate P&L metrics from trades"""
         total_pnl = Decimal("0")
         wins = 0
@@ -86,25 +192,17 @@ class TradeAnalyticsAggregator:
         max_loss = Decimal("0")
         
         # Only analyze sell trades (where P&L is realized)
-        sell_trades = [t for t in trades if t.get("action") == "sell"]
-        
-        for trade in sell_trades:
-            pnl_str = trade.get("pnl_usd")
-            if not pnl_str or pnl_str == "":
+        for action, pnl in zip(cols.actions, cols.pnl):
+            if action != "sell" or pnl is None:
                 continue
             
-            try:
-                pnl = Decimal(pnl_str)
-                total_pnl += pnl
-                
-                if pnl > 0:
-                    wins += 1
-                    max_win = max(max_win, pnl)
-                elif pnl < 0:
-                    losses += 1
-                    max_loss = min(max_loss, pnl)
-            except:
-                continue
+            total_pnl += pnl
+            if pnl > 0:
+                wins += 1
+                max_win = max(max_win, pnl)
+            elif pnl < 0:
+                losses += 1
+                max_loss = min(max_loss, pnl)
         
         # Calculate win rate
         total_with_pnl = wins + losses
@@ -112,7 +210,7 @@ class TradeAnalyticsAggregator:
         
         # Calculate percentage return (would need initial investment for accuracy)
         # For now, use a simple heuristic based on average trade size
-        avg_trade_value = self._get_avg_trade_value(trades)
+        avg_trade_value = self._get_avg_trade_value(cols)
         if avg_trade_value > 0:
             # Assume ~100 trades worth of capital
             estimated_capital = avg_trade_value * 100
@@ -130,37 +228,18 @@ class TradeAnalyticsAggregator:
             "max_single_loss_usd": self._format_decimal(max_loss) if max_loss < 0 else "0"
         }
     
-    def _calculate_volume_metrics(self, trades: List[Dict]) -> Dict[str, Any]:
+    def _calculate_volume_metrics(self, cols: AnalyticsColumns) -> Dict[str, Any]:
         """Calculate volume metrics from trades"""
-        total_sol_volume = Decimal("0")
-        total_usd_volume = Decimal("0")
-        trade_count = len(trades)
-        
-        for trade in trades:
-            # Calculate SOL volume from token_in/token_out
-            token_in = trade.get("token_in", {})
-            token_out = trade.get("token_out", {})
-            
-            if token_in.get("symbol") == "So111111":  # SOL
-                sol_amount = Decimal(str(token_in.get("amount", 0)))
-                total_sol_volume += sol_amount
-            elif token_out.get("symbol") == "So111111":  # SOL
-                sol_amount = Decimal(str(token_out.get("amount", 0)))
-                total_sol_volume += sol_amount
-            
-            # Add USD volume if available
-            value_usd = trade.get("value_usd")
-            if value_usd and value_usd != "":
-                try:
-                    total_usd_volume += Decimal(value_usd)
-                except:
-                    pass
+        trade_count = len(cols)
+        total_sol_volume = sum((a for a in cols.sol_amounts if a is not None), Decimal("0"))
+        # Add USD volume if available
+        total_usd_volume = sum((v for v in cols.values if v is not None), Decimal("0"))
         
         # Calculate average trade value
         avg_trade_value = total_usd_volume / trade_count if trade_count > 0 else Decimal("0")
         
         # Calculate trades per day
-        time_window = self._calculate_time_window(trades)
+        time_window = self._calculate_time_window(cols)
         days = time_window.get("days", 1)
         trades_per_day = trade_count / days if days > 0 else 0
         
@@ -171,25 +250,19 @@ class TradeAnalyticsAggregator:
             "trades_per_day": round(trades_per_day, 2)
         }
     
-    def _calculate_token_metrics(self, trades: List[Dict]) -> List[Dict[str, Any]]:
+    def _calculate_token_metrics(self, cols: AnalyticsColumns) -> List[Dict[str, Any]]:
         """Calculate per-token metrics"""
         token_stats = defaultdict(lambda: {"trades": 0, "pnl": Decimal("0")})
         
-        for trade in trades:
-            token = trade.get("token", "")
+        for token, action, pnl in zip(cols.tokens, cols.actions, cols.pnl):
             if not token:
                 continue
             
             token_stats[token]["trades"] += 1
             
             # Add P&L if this is a sell trade
-            if trade.get("action") == "sell":
-                pnl_str = trade.get("pnl_usd")
-                if pnl_str and pnl_str != "":
-                    try:
-                        token_stats[token]["pnl"] += Decimal(pnl_str)
-                    except:
-                        pass
+            if action == "sell" and pnl is not None:
+                token_stats[token]["pnl"] += pnl
         
         # Convert to sorted list
         token_list = []
@@ -205,28 +278,16 @@ class TradeAnalyticsAggregator:
         
         return token_list
     
-    def _calculate_time_window(self, trades: List[Dict]) -> Dict[str, Any]:
+    def _calculate_time_window(self, cols: AnalyticsColumns) -> Dict[str, Any]:
         """Calculate time window from first to last trade"""
-        if not trades:
+        if not len(cols):
             return {
                 "start": None,
                 "end": None,
                 "days": 0
             }
         
-        # Parse timestamps
-        timestamps = []
-        for trade in trades:
-            ts_str = trade.get("timestamp", "")
-            if ts_str:
-                try:
-                    # Handle ISO format
-                    if ts_str.endswith("Z"):
-                        ts_str = ts_str[:-1] + "+00:00"
-                    dt = datetime.fromisoformat(ts_str)
-                    timestamps.append(dt)
-                except:
-                    continue
+        timestamps = [dt for dt in cols.timestamps if dt is not None]
         
         if not timestamps:
             return {"start": None, "end": None, "days": 0}
@@ -246,32 +307,26 @@ class TradeAnalyticsAggregator:
             "days": days
         }
     
-    def _calculate_recent_windows(self, trades: List[Dict]) -> Dict[str, Any]:
+    def _calculate_recent_windows(self, cols: AnalyticsColumns) -> Dict[str, Any]:
         """Calculate metrics for recent time windows (30d, 7d)"""
         now = datetime.now(timezone.utc)
         
-        # Filter trades by time windows
+        # Filter trades (by index) into time windows
         trades_30d = []
         trades_7d = []
         
-        for trade in trades:
-            ts_str = trade.get("timestamp", "")
-            if not ts_str:
+        for i, dt in enumerate(cols.timestamps):
+            if dt is None:
                 continue
             
             try:
-                # Parse timestamp
-                if ts_str.endswith("Z"):
-                    ts_str = ts_str[:-1] + "+00:00"
-                dt = datetime.fromisoformat(ts_str)
-                
                 # Check time windows
                 days_ago = (now - dt).days
                 
                 if days_ago <= 30:
-                    trades_30d.append(trade)
+                    trades_30d.append(i)
                     if days_ago <= 7:
-                        trades_7d.append(trade)
+                        trades_7d.append(i)
             except:
                 continue
         
@@ -284,19 +339,14 @@ class TradeAnalyticsAggregator:
             wins = 0
             losses = 0
             
-            for trade in window_trades:
-                if trade.get("action") == "sell":
-                    pnl_str = trade.get("pnl_usd")
-                    if pnl_str and pnl_str != "":
-                        try:
-                            pnl_val = Decimal(pnl_str)
-                            pnl += pnl_val
-                            if pnl_val > 0:
-                                wins += 1
-                            elif pnl_val < 0:
-                                losses += 1
-                        except:
-                            pass
+            for i in window_trades:
+                pnl_val = cols.pnl[i]
+                if cols.actions[i] == "sell" and pnl_val is not None:
+                    pnl += pnl_val
+                    if pnl_val > 0:
+                        wins += 1
+                    elif pnl_val < 0:
+                        losses += 1
             
             total_with_pnl = wins + losses
             win_rate = float(wins) / total_with_pnl if total_with_pnl > 0 else 0.0
@@ -312,21 +362,10 @@ class TradeAnalyticsAggregator:
             "last_7d": calculate_window_metrics(trades_7d)
         }
     
-    def _get_avg_trade_value(self, trades: List[Dict]) -> Decimal:
+    def _get_avg_trade_value(self, cols: AnalyticsColumns) -> Decimal:
         """Get average trade value in USD"""
-        total_value = Decimal("0")
-        count = 0
-        
-        for trade in trades:
-            value_str = trade.get("value_usd")
-            if value_str and value_str != "":
-                try:
-                    total_value += Decimal(value_str)
-                    count += 1
-                except:
-                    pass
-        
-        return total_value / count if count > 0 else Decimal("0")
+        values = [v for v in cols.values if v is not None]
+        return sum(values, Decimal("0")) / len(values) if values else Decimal("0")
     
     def _format_decimal(self, value: Any) -> str:
         """Format decimal values as strings with appropriate precision"""
@@ -4,13 +4,14 @@ Enriches trades with price_sol, price_usd, value_usd, and pnl_usd fields
 """
 
 import logging
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional
 from decimal import Decimal
 from collections import defaultdict
 from datetime import datetime
 import asyncio
 
 from src.lib.blockchain_fetcher_v3 import Trade
+from src.lib.lot_ledger import LotLedger
 from src.lib.sol_price_fetcher import get_sol_price_usd
 
 logger = logging.getLogger(__name__)
@@ -22,8 +23,8 @@ class TradeEnricher:
     """Enriches trades with price and P&L data"""
     
     def __init__(self):
-        # FIFO cost basis tracking: token_mint -> [(amount, cost_per_token)]
-        self.cost_basis: Dict[str, List[Tuple[Decimal, Decimal]]] = defaultdict(list)
+        # FIFO cost basis tracking: token_mint -> open lots
+        self.cost_basis: Dict[str, LotLedger] = defaultdict(LotLedger)
         self.enrichment_stats = {
             "trades_processed": 0,
             "trades_priced": 0,
@@ -169,39 +170,20 @@ class TradeEnricher:
     
     def _add_cost_basis(self, token_mint: str, amount: Decimal, price_per_token: Decimal):
         """Add to cost basis tracking for FIFO"""
-        self.cost_basis[token_mint].append((amount, price_per_token))
+        self.cost_basis[token_mint].buy(amount, amount * price_per_token)
     
     def _calculate_fifo_pnl(self, token_mint: str, sell_amount: Decimal, sell_price_per_token: Decimal) -> Decimal:
         """Calculate P&L using FIFO cost basis"""
-        if token_mint not in self.cost_basis or not self.cost_basis[token_mint]:
+        if not self.cost_basis.get(token_mint):
             # No cost basis, P&L is 0
             return Decimal("0")
         
         total_proceeds = sell_amount * sell_price_per_token
-        total_cost = Decimal("0")
-        remaining_to_sell = sell_amount
-        
-        # Process FIFO queue
-        while remaining_to_sell > 0 and self.cost_basis[token_mint]:
-            buy_amount, buy_price = self.cost_basis[token_mint][0]
-            
-            if buy_amount <= remaining_to_sell:
-                # Use entire buy lot
-                total_cost += buy_amount * buy_price
-                remaining_to_sell -= buy_amount
-                self.cost_basis[token_mint].pop(0)
-            else:
-                # Use partial buy lot
-                total_cost += remaining_to_sell * buy_price
-                # Update remaining amount in the lot
-                self.cost_basis[token_mint][0] = (
-                    buy_amount - remaining_to_sell,
-                    buy_price
-                )
-                remaining_to_sell = 0
+        fill = self.cost_basis[token_mint].sell(sell_amount)
+        total_cost = fill.cost_basis_usd
         
         # If we couldn't match all sells to buys, add remaining at sell price (conservative)
-        if remaining_to_sell > 0:
-            total_cost += remaining_to_sell * sell_price_per_token
+        if fill.unmatched > 0:
+            total_cost += fill.unmatched * sell_price_per_token
         
         return total_proceeds - total_cost 
\ No newline at end of file
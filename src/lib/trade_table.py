@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Trade Table - Compact column-oriented storage for a wallet's trades
+Replaces one Trade object (or nested to_dict() dict) per row with parallel
+columns: mint strings are interned to small integer IDs, token amounts are
+kept as integer base units plus a per-row decimals scale, and timestamps as
+epoch seconds. PositionBuilder and the aggregators read rows through
+TradeRow views instead of re-parsing dicts with Decimal(str(...)).
+"""
+
+import sys
+from array import array
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Tuple
+
+SOL_MINT = "So11111111111111111111111111111111111111112"
+ZERO = Decimal("0")
+
+
+def to_base_units(amount: Optional[Decimal]) -> Tuple[int, int]:
+    """Split a Decimal amount into (integer base units, decimals)
+
+    Amounts parsed from raw token amounts keep the mint's decimals as their
+    exponent, so the split is exact and recovers the on-chain integer.
+    """
+    if amount is None:
+        return 0, 0
+    exponent = amount.as_tuple().exponent
+    decimals = -exponent if isinstance(exponent, int) and exponent < 0 else 0
+    return int(amount.scaleb(decimals)), decimals
+
+
+def from_base_units(units: int, decimals: int) -> Decimal:
+    """Rebuild the exact Decimal amount from base units"""
+    return Decimal(units).scaleb(-decimals)
+
+
+def _to_decimal(value: Any) -> Optional[Decimal]:
+    """Parse an optional numeric value from a trade dict"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, Decimal):
+        return value
+    try:
+        return Decimal(str(value))
+    except (ValueError, InvalidOperation):
+        return None
+
+
+def _to_epoch(value: Any) -> int:
+    """Epoch seconds from a datetime, ISO string or number"""
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, str):
+        return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+    return int(value or 0)
+
+
+class MintRegistry:
+    """Interns mint addresses to integer IDs and keeps one symbol per mint"""
+
+    __slots__ = ("mints", "symbols", "_ids")
+
+    def __init__(self):
+        self.mints: List[str] = []
+        self.symbols: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.mints)
+
+    def intern(self, mint: str, symbol: Optional[str] = None) -> int:
+        """Get the ID for a mint, registering it on first sight"""
+        mint_id = self._ids.get(mint)
+        if mint_id is None:
+            mint_id = len(self.mints)
+            self._ids[mint] = mint_id
+            self.mints.append(sys.intern(mint))
+            self.symbols.append(sys.intern(symbol or mint[:8]))
+        elif symbol and self.symbols[mint_id] == mint[:8] and symbol != mint[:8]:
+            # Upgrade the truncated-mint placeholder once metadata provides a symbol
+            self.symbols[mint_id] = sys.intern(symbol)
+        return mint_id
+
+    def get_id(self, mint: str) -> Optional[int]:
+        return self._ids.get(mint)
+
+
+class TradeRow:
+    """Read-mostly view of one row in a TradeTable
+
+    Exposes the fields PositionBuilder and the aggregators need. The position
+    tracking fields (pnl_usd, remaining_balance, ...) are writable and land
+    back in the table's columns.
+    """
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table: "TradeTable", index: int):
+        self.table = table
+        self.index = index
+
+    @property
+    def signature(self) -> str:
+        return self.table.signatures[self.index]
+
+    @property
+    def slot(self) -> int:
+        return self.table.slots[self.index]
+
+    @property
+    def epoch(self) -> int:
+        return self.table.timestamps[self.index]
+
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.fromtimestamp(self.table.timestamps[self.index])
+
+    @property
+    def token_in_mint(self) -> str:
+        return self.table.mints.mints[self.table.in_mint_ids[self.index]]
+
+    @property
+    def token_out_mint(self) -> str:
+        return self.table.mints.mints[self.table.out_mint_ids[self.index]]
+
+    @property
+    def token_in_symbol(self) -> str:
+        return self.table.mints.symbols[self.table.in_mint_ids[self.index]]
+
+    @property
+    def token_out_symbol(self) -> str:
+        return self.table.mints.symbols[self.table.out_mint_ids[self.index]]
+
+    @property
+    def token_in_amount(self) -> Decimal:
+        return from_base_units(self.table.in_amounts[self.index], self.table.in_decimals[self.index])
+
+    @property
+    def token_out_amount(self) -> Decimal:
+        return from_base_units(self.table.out_amounts[self.index], self.table.out_decimals[self.index])
+
+    @property
+    def is_sell(self) -> bool:
+        return self.table.out_mint_ids[self.index] == self.table.sol_id
+
+    @property
+    def action(self) -> str:
+        """Same buy/sell rule as Trade.to_dict(): selling means receiving SOL"""
+        return "sell" if self.is_sell else "buy"
+
+    @property
+    def token_mint_id(self) -> int:
+        """Mint ID of the traded (non-SOL) token"""
+        table = self.table
+        in_id = table.in_mint_ids[self.index]
+        return in_id if in_id != table.sol_id else table.out_mint_ids[self.index]
+
+    @property
+    def token_mint(self) -> str:
+        return self.table.mints.mints[self.token_mint_id]
+
+    @property
+    def token_symbol(self) -> str:
+        return self.table.mints.symbols[self.token_mint_id]
+
+    @property
+    def amount(self) -> Decimal:
+        """Amount of the traded token, matching to_dict()["amount"] unrounded"""
+        return self.token_in_amount if self.is_sell else self.token_out_amount
+
+    @property
+    def price_usd(self) -> Optional[Decimal]:
+        return self.table.price_usd[self.index]
+
+    @property
+    def value_usd(self) -> Optional[Decimal]:
+        return self.table.value_usd[self.index]
+
+    @property
+    def fees_usd(self) -> Decimal:
+        return self.table.fees_usd[self.index]
+
+    @property
+    def dex(self) -> str:
+        return self.table.dexes[self.index]
+
+    @property
+    def pnl_usd(self) -> Decimal:
+        return self.table.pnl_usd[self.index]
+
+    @pnl_usd.setter
+    def pnl_usd(self, value: Decimal):
+        self.table.pnl_usd[self.index] = value
+
+    @property
+    def remaining_balance(self) -> Optional[Decimal]:
+        return self.table.remaining_balance[self.index]
+
+    @remaining_balance.setter
+    def remaining_balance(self, value: Optional[Decimal]):
+        self.table.remaining_balance[self.index] = value
+
+    @property
+    def cost_basis_method(self) -> Optional[str]:
+        return self.table.cost_basis_method[self.index]
+
+    @cost_basis_method.setter
+    def cost_basis_method(self, value: Optional[str]):
+        self.table.cost_basis_method[self.index] = value
+
+    @property
+    def position_closed(self) -> bool:
+        return bool(self.table.position_closed[self.index])
+
+    @position_closed.setter
+    def position_closed(self, value: bool):
+        self.table.position_closed[self.index] = 1 if value else 0
+
+    @property
+    def position_id(self) -> Optional[str]:
+        return self.table.position_id[self.index]
+
+    @position_id.setter
+    def position_id(self, value: Optional[str]):
+        self.table.position_id[self.index] = value
+
+
+class TradeTable:
+    """Struct-of-arrays trade storage shared by position building and aggregation"""
+
+    def __init__(self, mints: Optional[MintRegistry] = None):
+        self.mints = mints or MintRegistry()
+        self.sol_id = self.mints.intern(SOL_MINT, "SOL")
+
+        self.signatures: List[str] = []
+        self.slots = array("q")
+        self.timestamps = array("q")  # Epoch seconds
+        self.in_mint_ids = array("l")
+        self.out_mint_ids = array("l")
+        # Python ints: base units of 9-decimal tokens overflow int64 past ~9.2B tokens
+        self.in_amounts: List[int] = []
+        self.out_amounts: List[int] = []
+        self.in_decimals = array("B")
+        self.out_decimals = array("B")
+        self.price_usd: List[Optional[Decimal]] = []
+        self.value_usd: List[Optional[Decimal]] = []
+        self.pnl_usd: List[Decimal] = []
+        self.fees_usd: List[Decimal] = []
+        self.dexes: List[str] = []
+        self.tx_types: List[str] = []
+        self.priced = array("B")
+
+        # P6 position tracking fields, filled in by PositionBuilder
+        self.remaining_balance: List[Optional[Decimal]] = []
+        self.cost_basis_method: List[Optional[str]] = []
+        self.position_closed = array("B")
+        self.position_id: List[Optional[str]] = []
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def __iter__(self) -> Iterator[TradeRow]:
+        for i in range(len(self.signatures)):
+            yield TradeRow(self, i)
+
+    def row(self, index: int) -> TradeRow:
+        return TradeRow(self, index)
+
+    def _append(
+        self,
+        signature: str,
+        slot: int,
+        epoch: int,
+        in_mint_id: int,
+        in_amount: Optional[Decimal],
+        out_mint_id: int,
+        out_amount: Optional[Decimal],
+        price_usd: Optional[Decimal],
+        value_usd: Optional[Decimal],
+        pnl_usd: Optional[Decimal],
+        fees_usd: Optional[Decimal],
+        dex: str,
+        tx_type: str,
+        priced: bool,
+    ):
+        in_units, in_decimals = to_base_units(in_amount)
+        out_units, out_decimals = to_base_units(out_amount)
+
+        self.signatures.append(signature)
+        self.slots.append(slot or 0)
+        self.timestamps.append(epoch)
+        self.in_mint_ids.append(in_mint_id)
+        self.out_mint_ids.append(out_mint_id)
+        self.in_amounts.append(in_units)
+        self.out_amounts.append(out_units)
+        self.in_decimals.append(in_decimals)
+        self.out_decimals.append(out_decimals)
+        self.price_usd.append(price_usd)
+        self.value_usd.append(value_usd)
+        self.pnl_usd.append(pnl_usd if pnl_usd is not None else ZERO)
+        self.fees_usd.append(fees_usd if fees_usd is not None else ZERO)
+        self.dexes.append(sys.intern(dex or "UNKNOWN"))
+        self.tx_types.append(sys.intern(tx_type or "swap"))
+        self.priced.append(1 if priced else 0)
+        self.remaining_balance.append(None)
+        self.cost_basis_method.append(None)
+        self.position_closed.append(0)
+        self.position_id.append(None)
+
+    def append_trade(self, trade):
+        """Append a blockchain_fetcher_v3.Trade"""
+        self._append(
+            trade.signature,
+            trade.slot,
+            int(trade.timestamp.timestamp()),
+            self.mints.intern(trade.token_in_mint, trade.token_in_symbol),
+            trade.token_in_amount,
+            self.mints.intern(trade.token_out_mint, trade.token_out_symbol),
+            trade.token_out_amount,
+            trade.price_usd,
+            trade.value_usd,
+            trade.pnl_usd,
+            trade.fees_usd,
+            trade.dex,
+            trade.tx_type,
+            trade.priced,
+        )
+
+    def append_dict(self, trade: Dict[str, Any]):
+        """Append a trade in the Trade.to_dict() shape"""
+        token_in = trade.get("token_in") or {}
+        token_out = trade.get("token_out") or {}
+        self._append(
+            trade.get("signature", ""),
+            trade.get("slot", 0),
+            _to_epoch(trade.get("timestamp")),
+            self.mints.intern(token_in.get("mint", ""), token_in.get("symbol")),
+            _to_decimal(token_in.get("amount")),
+            self.mints.intern(token_out.get("mint", ""), token_out.get("symbol")),
+            _to_decimal(token_out.get("amount")),
+            _to_decimal(trade.get("price")),
+            _to_decimal(trade.get("value_usd")),
+            _to_decimal(trade.get("pnl_usd")),
+            _to_decimal(trade.get("fees_usd")),
+            trade.get("dex"),
+            trade.get("tx_type"),
+            trade.get("priced", False),
+        )
+
+    @classmethod
+    def from_trades(cls, trades: Iterable) -> "TradeTable":
+        """Build a table from Trade objects"""
+        table = cls()
+        for trade in trades:
+            table.append_trade(trade)
+        return table
+
+    @classmethod
+    def from_dicts(cls, trades: Iterable[Dict[str, Any]]) -> "TradeTable":
+        """Build a table from Trade.to_dict() dicts (e.g. a cached API envelope)"""
+        table = cls()
+        for trade in trades:
+            table.append_dict(trade)
+        return table
+
+    def to_trade(self, index: int):
+        """Materialize one row as a Trade"""
+        # Import here to avoid circular import
+        from src.lib.blockchain_fetcher_v3 import Trade
+
+        row = TradeRow(self, index)
+        return Trade(
+            signature=row.signature,
+            slot=row.slot,
+            timestamp=row.timestamp,
+            token_in_mint=row.token_in_mint,
+            token_in_symbol=row.token_in_symbol,
+            token_in_amount=row.token_in_amount,
+            token_out_mint=row.token_out_mint,
+            token_out_symbol=row.token_out_symbol,
+            token_out_amount=row.token_out_amount,
+            price_usd=row.price_usd,
+            value_usd=row.value_usd,
+            pnl_usd=row.pnl_usd,
+            fees_usd=row.fees_usd,
+            dex=row.dex,
+            priced=bool(self.priced[index]),
+            tx_type=self.tx_types[index],
+            remaining_balance=row.remaining_balance,
+            cost_basis_method=row.cost_basis_method,
+            position_closed=row.position_closed,
+            position_id=row.position_id,
+        )
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Render rows in the Trade.to_dict() API shape"""
+        return [self.to_trade(i).to_dict() for i in range(len(self))]
@@ -18,7 +18,7 @@ from src.lib.position_models import Position, PositionPnL, PriceConfidence
 from src.lib.mc_calculator import MarketCapCalculator, MarketCapResult, calculate_market_cap
 from src.lib.mc_calculator import CONFIDENCE_HIGH, CONFIDENCE_EST, CONFIDENCE_UNAVAILABLE
 from src.config.feature_flags import should_calculate_unrealized_pnl, should_use_sol_spot_pricing, should_use_token_pricing
-from src.lib.helius_price_extractor import get_helius_price_extractor
+from src.lib.helius_price_extractor import SwapPriceIndex, get_helius_price_extractor
 from src.lib.sol_price_fetcher import get_sol_price_usd
 from src.lib.token_price_service import TokenPriceService
 
@@ -73,6 +73,7 @@ class UnrealizedPnLCalculator:
         self.helius_extractor = get_helius_price_extractor()
         self.transactions = []  # Will be set by the API
         self.trades = []  # Will be set by the API
+        self.price_index: Optional[SwapPriceIndex] = None  # Built from trades/transactions on first Helius-only lookup
         
     async def calculate_unrealized_pnl(
         self, 
@@ -355,18 +356,19 @@ class UnrealizedPnLCalculator:
         
         # Check if we should use Helius-only pricing
         if os.getenv('PRICE_HELIUS_ONLY', '').lower() == 'true':
-            # Extract all prices at once from transactions
-            start_time = asyncio.get_event_loop().time()
-            helius_prices = self.helius_extractor.extract_prices_from_trades(
-                self.trades, 
-                self.transactions
-            )
-            elapsed = asyncio.get_event_loop().time() - start_time
-            logger.info(f"[PRICE] Helius price extraction completed in {elapsed:.2f}s")
+            # Index all prices in one pass over the transactions, reused by later batches
+            if self.price_index is None:
+                start_time = asyncio.get_event_loop().time()
+                self.price_index = self.helius_extractor.build_price_index(self.trades, self.transactions)
+                elapsed = asyncio.get_event_loop().time() - start_time
+                logger.info(f"[PRICE] Helius price index built in {elapsed:.2f}s: {self.price_index.get_stats()}")
             
             # Process each position with Helius prices
             for position in positions:
-                price = helius_prices.get(position.token_mint)
+                price = self.price_index.price(position.token_mint)
+                if price is None:
+                    cached = self.helius_extractor.get_cached_price(position.token_mint)
+                    price = cached[0] if cached else None
                 if price:
                     # Calculate PnL with Helius price
                     current_value_usd = position.balance * price
@@ -5,25 +5,82 @@ Ensures payload stays under 25KB while providing complete wallet insights.
 """
 
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Union
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 import json
 
+from src.lib.trade_table import TradeTable
+from src.lib.columnar_analytics import get_analytics_backend, WalletSummaryArrays, summarize_wallet
+
 logger = logging.getLogger(__name__)
 
 
+def _as_float(value: Any) -> float:
+    """Float for a numeric trade field; missing/blank values count as 0"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+@dataclass
+class SummaryColumns:
+    """Per-trade values the summary is computed from, one list per field"""
+    actions: List[str] = field(default_factory=list)
+    pnl: List[float] = field(default_factory=list)
+    values: List[float] = field(default_factory=list)
+    prices: List[float] = field(default_factory=list)
+    tokens: List[str] = field(default_factory=list)
+    timestamps: List[Any] = field(default_factory=list)
+    dexes: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+    @classmethod
+    def from_dicts(cls, trades: List[Dict[str, Any]]) -> "SummaryColumns":
+        """Columns from flat enriched trade dicts"""
+        return cls(
+            actions=[t.get('action') for t in trades],
+            pnl=[_as_float(t.get('pnl_usd', 0)) for t in trades],
+            values=[_as_float(t.get('value_usd', 0)) for t in trades],
+            prices=[_as_float(t.get('price_usd', 0)) for t in trades],
+            tokens=[t.get('token_symbol', t.get('token_mint', 'unknown')) for t in trades],
+            timestamps=[t.get('timestamp', 0) for t in trades],
+            dexes=[t.get('dex', 'unknown') for t in trades],
+        )
+
+    @classmethod
+    def from_table(cls, table: TradeTable) -> "SummaryColumns":
+        """Columns read straight from a TradeTable"""
+        sol_id = table.sol_id
+        symbols = table.mints.symbols
+        return cls(
+            actions=["sell" if mint_id == sol_id else "buy" for mint_id in table.out_mint_ids],
+            pnl=[float(v) for v in table.pnl_usd],
+            values=[float(v) if v is not None else 0.0 for v in table.value_usd],
+            prices=[float(v) if v is not None else 0.0 for v in table.price_usd],
+            tokens=[symbols[in_id if in_id != sol_id else out_id]
+                    for in_id, out_id in zip(table.in_mint_ids, table.out_mint_ids)],
+            timestamps=list(table.timestamps),
+            dexes=list(table.dexes),
+        )
+
+
 class WalletSummaryAggregator:
     """Aggregates wallet trade data into a compact summary for ChatGPT."""
     
     MAX_PAYLOAD_SIZE = 25 * 1024  # 25KB limit
     SAFETY_BUFFER = 5 * 1024      # 5KB safety margin
     
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None):
         self.logger = logger
+        self.backend = backend or get_analytics_backend()
     
     def aggregate_wallet_summary(
         self, 
-        trades: List[Dict[str, Any]], 
+        trades: Union[List[Dict[str, Any]], TradeTable], 
         include_windows: bool = True,
         max_tokens: int = 10
     ) -> Dict[str, Any]:
@@ -31,53 +88,63 @@ class WalletSummaryAggregator:
         Aggregate all trades into a compact summary.
         
         Args:
-            trades: List of enriched trade dictionaries
+            trades: List of enriched trade dictionaries, or a TradeTable
             include_windows: Whether to include 7d/30d windows
             max_tokens: Maximum tokens to include in breakdown
             
         Returns:
             Aggregated summary dict under 25KB
         """
-        if not trades:
+        if not len(trades):
             return self._empty_summary()
         
-        # Sort trades by timestamp
-        sorted_trades = sorted(trades, key=lambda x: x.get('timestamp', 0))
+        if self.backend == "numpy":
+            summary = self._aggregate_numpy(trades, include_windows, max_tokens)
+            if summary is not None:
+                return self._trim_if_needed(summary)
+        
+        if isinstance(trades, TradeTable):
+            cols = SummaryColumns.from_table(trades)
+        else:
+            cols = SummaryColumns.from_dicts(trades)
+        
+        # Trade indices sorted by timestamp
+        order = sorted(range(len(cols)), key=cols.timestamps.__getitem__)
         
         # Core aggregations
         summary = {
             "wallet_summary": {
-                "total_trades": len(trades),
-                "first_trade": sorted_trades[0]['timestamp'],
-                "last_trade": sorted_trades[-1]['timestamp'],
-                "unique_tokens": len(set(t.get('token_symbol', t.get('token_mint', '')) for t in trades)),
-                "unique_dexes": len(set(t.get('dex', 'unknown') for t in trades))
+                "total_trades": len(cols),
+                "first_trade": cols.timestamps[order[0]],
+                "last_trade": cols.timestamps[order[-1]],
+                "unique_tokens": len(set(cols.tokens)),
+                "unique_dexes": len(set(cols.dexes))
             }
         }
         
         # P&L Analysis
-        pnl_stats = self._calculate_pnl_stats(trades)
+        pnl_stats = self._calculate_pnl_stats(cols)
         summary["pnl_analysis"] = pnl_stats
         
         # Win Rate
-        win_rate_stats = self._calculate_win_rate(trades)
+        win_rate_stats = self._calculate_win_rate(cols)
         summary["win_rate"] = win_rate_stats
         
         # Trade Volume
-        volume_stats = self._calculate_volume_stats(trades)
+        volume_stats = self._calculate_volume_stats(cols)
         summary["trade_volume"] = volume_stats
         
         # Token Breakdown (Top 10 by absolute P&L)
-        token_breakdown = self._calculate_token_breakdown(trades, max_tokens)
+        token_breakdown = self._calculate_token_breakdown(cols, max_tokens)
         summary["token_breakdown"] = token_breakdown
         
         # Recent Windows (7d/30d)
         if include_windows:
-            window_stats = self._calculate_window_stats(sorted_trades)
+            window_stats = self._calculate_window_stats(cols)
             summary["recent_windows"] = window_stats
         
         # Trading Patterns
-        pattern_stats = self._calculate_trading_patterns(sorted_trades)
+        pattern_stats = self._calculate_trading_patterns(cols, order)
         summary["trading_patterns"] = pattern_stats
         
         # Ensure we're under size limit
@@ -85,13 +152,29 @@ class WalletSummaryAggregator:
         
         return summary
     
-    def _calculate_pnl_stats(self, trades: List[Dict]) -> Dict[str, Any]:
+    def _aggregate_numpy(self, trades, include_windows: bool, max_tokens: int) -> Optional[Dict[str, Any]]:
+        """Columnar NumPy path; None if the trades cannot be loaded as arrays"""
+        try:
+            if isinstance(trades, TradeTable):
+                arrays = WalletSummaryArrays.from_table(trades)
+            else:
+                arrays = WalletSummaryArrays.from_columns(SummaryColumns.from_dicts(trades))
+        except (TypeError, ValueError) as e:
+            self.logger.warning(f"NumPy analytics unavailable for these trades, using python path: {e}")
+            return None
+        return summarize_wallet(arrays, include_windows, max_tokens)
+    
+    def _sell_pnl(self, cols: SummaryColumns) -> List[float]:
+        """P&L of every sell trade"""
+        return [pnl for action, pnl in zip(cols.actions, cols.pnl) if action == 'sell']
+    
+    def _calculate_pnl_stats(self, cols: SummaryColumns) -> Dict[str, Any]:
         """Calculate P&L statistics from all trades."""
-        sell_trades = [t for t in trades if t.get('action') == 'sell']
+        sell_pnl = self._sell_pnl(cols)
         
-        total_pnl = sum(float(t.get('pnl_usd', 0)) for t in sell_trades)
-        positive_pnl = sum(float(t.get('pnl_usd', 0)) for t in sell_trades if float(t.get('pnl_usd', 0)) > 0)
-        negative_pnl = sum(float(t.get('pnl_usd', 0)) for t in sell_trades if float(t.get('pnl_usd', 0)) < 0)
+        total_pnl = sum(sell_pnl)
+        positive_pnl = sum(p for p in sell_pnl if p > 0)
+        negative_pnl = sum(p for p in sell_pnl if p < 0)
         
         # Calculate profit factor
         profit_factor = abs(positive_pnl / negative_pnl) if negative_pnl != 0 else float('inf')
@@ -105,16 +188,16 @@ class WalletSummaryAggregator:
             "total_gains_usd": f"{positive_pnl:.2f}",
             "total_losses_usd": f"{negative_pnl:.2f}",
             "profit_factor": profit_factor_str,
-            "largest_win_usd": f"{max((float(t.get('pnl_usd', 0)) for t in sell_trades if float(t.get('pnl_usd', 0)) > 0), default=0):.2f}",
-            "largest_loss_usd": f"{min((float(t.get('pnl_usd', 0)) for t in sell_trades if float(t.get('pnl_usd', 0)) < 0), default=0):.2f}",
-            "sell_trades_count": len(sell_trades)
+            "largest_win_usd": f"{max((p for p in sell_pnl if p > 0), default=0):.2f}",
+            "largest_loss_usd": f"{min((p for p in sell_pnl if p < 0), default=0):.2f}",
+            "sell_trades_count": len(sell_pnl)
         }
     
-    def _calculate_win_rate(self, trades: List[Dict]) -> Dict[str, Any]:
+    def _calculate_win_rate(self, cols: SummaryColumns) -> Dict[str, Any]:
         """Calculate win rate statistics."""
-        sell_trades = [t for t in trades if t.get('action') == 'sell']
+        sell_pnl = self._sell_pnl(cols)
         
-        if not sell_trades:
+        if not sell_pnl:
             return {
                 "overall_win_rate": "0.00",
                 "winning_trades": 0,
@@ -122,11 +205,11 @@ class WalletSummaryAggregator:
                 "breakeven_trades": 0
             }
         
-        winning = sum(1 for t in sell_trades if float(t.get('pnl_usd', 0)) > 0)
-        losing = sum(1 for t in sell_trades if float(t.get('pnl_usd', 0)) < 0)
-        breakeven = len(sell_trades) - winning - losing
+        winning = sum(1 for p in sell_pnl if p > 0)
+        losing = sum(1 for p in sell_pnl if p < 0)
+        breakeven = len(sell_pnl) - winning - losing
         
-        win_rate = (winning / len(sell_trades) * 100) if sell_trades else 0
+        win_rate = winning / len(sell_pnl) * 100
         
         return {
             "overall_win_rate": f"{win_rate:.2f}",
@@ -135,14 +218,14 @@ class WalletSummaryAggregator:
             "breakeven_trades": breakeven
         }
     
-    def _calculate_volume_stats(self, trades: List[Dict]) -> Dict[str, Any]:
+    def _calculate_volume_stats(self, cols: SummaryColumns) -> Dict[str, Any]:
         """Calculate trading volume statistics."""
-        total_volume_usd = sum(float(t.get('value_usd', 0)) for t in trades)
-        buy_volume_usd = sum(float(t.get('value_usd', 0)) for t in trades if t.get('action') == 'buy')
-        sell_volume_usd = sum(float(t.get('value_usd', 0)) for t in trades if t.get('action') == 'sell')
+        total_volume_usd = sum(cols.values)
+        buy_volume_usd = sum(v for a, v in zip(cols.actions, cols.values) if a == 'buy')
+        sell_volume_usd = sum(v for a, v in zip(cols.actions, cols.values) if a == 'sell')
         
-        buy_count = sum(1 for t in trades if t.get('action') == 'buy')
-        sell_count = sum(1 for t in trades if t.get('action') == 'sell')
+        buy_count = cols.actions.count('buy')
+        sell_count = cols.actions.count('sell')
         
         return {
             "total_volume_usd": f"{total_volume_usd:.2f}",
@@ -153,13 +236,11 @@ class WalletSummaryAggregator:
             "buy_sell_ratio": f"{buy_count/sell_count:.2f}" if sell_count > 0 else "inf"
         }
     
-    def _calculate_token_breakdown(self, trades: List[Dict], max_tokens: int = 10) -> List[Dict[str, Any]]:
+    def _calculate_token_breakdown(self, cols: SummaryColumns, max_tokens: int = 10) -> List[Dict[str, Any]]:
         """Calculate per-token statistics, sorted by absolute P&L."""
         token_stats = {}
         
-        for trade in trades:
-            token = trade.get('token_symbol', trade.get('token_mint', 'unknown'))
-            
+        for token, action, value, price, pnl in zip(cols.tokens, cols.actions, cols.values, cols.prices, cols.pnl):
             if token not in token_stats:
                 token_stats[token] = {
                     'symbol': token,
@@ -178,25 +259,23 @@ class WalletSummaryAggregator:
             
             stats = token_stats[token]
             stats['trades'] += 1
-            stats['volume_usd'] += float(trade.get('value_usd', 0))
+            stats['volume_usd'] += value
             
-            if trade.get('action') == 'buy':
+            if action == 'buy':
                 stats['buy_count'] += 1
-                stats['total_bought'] += float(trade.get('value_usd', 0))
+                stats['total_bought'] += value
                 # Track for average buy price
                 if stats['buy_count'] == 1:
-                    stats['avg_buy_price'] = float(trade.get('price_usd', 0))
+                    stats['avg_buy_price'] = price
                 else:
                     # Weighted average
                     stats['avg_buy_price'] = (
-                        stats['avg_buy_price'] * (stats['buy_count'] - 1) + 
-                        float(trade.get('price_usd', 0))
+                        stats['avg_buy_price'] * (stats['buy_count'] - 1) + price
                     ) / stats['buy_count']
             
-            elif trade.get('action') == 'sell':
+            elif action == 'sell':
                 stats['sell_count'] += 1
-                stats['total_sold'] += float(trade.get('value_usd', 0))
-                pnl = float(trade.get('pnl_usd', 0))
+                stats['total_sold'] += value
                 stats['realized_pnl_usd'] += pnl
                 
                 if pnl > 0:
@@ -206,12 +285,11 @@ class WalletSummaryAggregator:
                 
                 # Track for average sell price
                 if stats['sell_count'] == 1:
-                    stats['avg_sell_price'] = float(trade.get('price_usd', 0))
+                    stats['avg_sell_price'] = price
                 else:
                     # Weighted average
                     stats['avg_sell_price'] = (
-                        stats['avg_sell_price'] * (stats['sell_count'] - 1) + 
-                        float(trade.get('price_usd', 0))
+                        stats['avg_sell_price'] * (stats['sell_count'] - 1) + price
                     ) / stats['sell_count']
         
         # Convert to list and sort by absolute P&L
@@ -237,7 +315,7 @@ class WalletSummaryAggregator:
         # Return top N tokens
         return token_list[:max_tokens]
     
-    def _calculate_window_stats(self, sorted_trades: List[Dict]) -> Dict[str, Any]:
+    def _calculate_window_stats(self, cols: SummaryColumns) -> Dict[str, Any]:
         """Calculate statistics for recent time windows."""
         now = datetime.now()
         seven_days_ago = now - timedelta(days=7)
@@ -247,26 +325,22 @@ class WalletSummaryAggregator:
         seven_days_ts = int(seven_days_ago.timestamp())
         thirty_days_ts = int(thirty_days_ago.timestamp())
         
-        # Filter trades by window
-        trades_7d = [t for t in sorted_trades if t.get('timestamp', 0) >= seven_days_ts]
-        trades_30d = [t for t in sorted_trades if t.get('timestamp', 0) >= thirty_days_ts]
+        def window(since_ts: int) -> Dict[str, Any]:
+            idx = [i for i, ts in enumerate(cols.timestamps) if ts >= since_ts]
+            return {
+                "trades": len(idx),
+                "pnl_usd": f"{sum(cols.pnl[i] for i in idx if cols.actions[i] == 'sell'):.2f}",
+                "volume_usd": f"{sum(cols.values[i] for i in idx):.2f}"
+            }
         
         return {
-            "last_7_days": {
-                "trades": len(trades_7d),
-                "pnl_usd": f"{sum(float(t.get('pnl_usd', 0)) for t in trades_7d if t.get('action') == 'sell'):.2f}",
-                "volume_usd": f"{sum(float(t.get('value_usd', 0)) for t in trades_7d):.2f}"
-            },
-            "last_30_days": {
-                "trades": len(trades_30d),
-                "pnl_usd": f"{sum(float(t.get('pnl_usd', 0)) for t in trades_30d if t.get('action') == 'sell'):.2f}",
-                "volume_usd": f"{sum(float(t.get('value_usd', 0)) for t in trades_30d):.2f}"
-            }
+            "last_7_days": window(seven_days_ts),
+            "last_30_days": window(thirty_days_ts)
         }
     
-    def _calculate_trading_patterns(self, sorted_trades: List[Dict]) -> Dict[str, Any]:
+    def _calculate_trading_patterns(self, cols: SummaryColumns, order: List[int]) -> Dict[str, Any]:
         """Calculate trading pattern statistics."""
-        if not sorted_trades:
+        if not order:
             return {
                 "most_active_hour_utc": "N/A",
                 "avg_trades_per_day": "0",
@@ -275,22 +349,22 @@ class WalletSummaryAggregator:
         
         # Hour analysis
         hour_counts = {}
-        for trade in sorted_trades:
-            hour = datetime.fromtimestamp(trade.get('timestamp', 0)).hour
+        for i in order:
+            hour = datetime.fromtimestamp(cols.timestamps[i]).hour
             hour_counts[hour] = hour_counts.get(hour, 0) + 1
         
         most_active_hour = max(hour_counts.items(), key=lambda x: x[1])[0] if hour_counts else 0
         
         # Trades per day
-        first_ts = sorted_trades[0].get('timestamp', 0)
-        last_ts = sorted_trades[-1].get('timestamp', 0)
+        first_ts = cols.timestamps[order[0]]
+        last_ts = cols.timestamps[order[-1]]
         days_active = max((last_ts - first_ts) / 86400, 1)
-        avg_trades_per_day = len(sorted_trades) / days_active
+        avg_trades_per_day = len(order) / days_active
         
         # Favorite DEX
         dex_counts = {}
-        for trade in sorted_trades:
-            dex = trade.get('dex', 'unknown')
+        for i in order:
+            dex = cols.dexes[i]
             dex_counts[dex] = dex_counts.get(dex, 0) + 1
         
         favorite_dex = max(dex_counts.items(), key=lambda x: x[1])[0] if dex_counts else "unknown"
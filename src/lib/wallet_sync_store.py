@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Wallet Sync Store - Persistent per-wallet incremental sync state
+Records the newest signature/slot seen for a wallet together with the trades
+already parsed, so repeat fetches only page signatures down to the known head.
+
+Backends:
+- LocalWalletSyncStore: one JSON file per wallet on disk (default, no Redis needed)
+- RedisWalletSyncStore: shared across workers when REDIS_URL is available
+"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional, Dict, Any, List
+from dataclasses import dataclass, field
+
+try:
+    import redis
+    from redis.exceptions import RedisError, ConnectionError as RedisConnectionError
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    redis = None
+    RedisError = Exception
+    RedisConnectionError = Exception
+
+logger = logging.getLogger(__name__)
+
+# Constants from environment
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+CACHE_KEY_PREFIX = "sync:v1:"  # Version prefix for sync keys
+SYNC_STATE_VERSION = 1
+
+# Trade fields persisted with Decimal values
+_DECIMAL_FIELDS = ("token_in_amount", "token_out_amount", "price_usd", "value_usd", "pnl_usd", "fees_usd")
+
+
+def get_wallet_sync_dir() -> str:
+    """Get on-disk directory for the local sync backend"""
+    return os.getenv("WALLET_SYNC_DIR", ".wallet_sync")
+
+
+def get_wallet_sync_backend() -> str:
+    """Get configured sync backend: 'local' or 'redis'"""
+    return os.getenv("WALLET_SYNC_BACKEND", "local").lower()
+
+
+def trade_to_record(trade) -> Dict[str, Any]:
+    """Serialize a Trade into a lossless JSON-safe record"""
+    record = {
+        "signature": trade.signature,
+        "slot": trade.slot,
+        "timestamp": trade.timestamp.timestamp(),
+        "token_in_mint": trade.token_in_mint,
+        "token_in_symbol": trade.token_in_symbol,
+        "token_out_mint": trade.token_out_mint,
+        "token_out_symbol": trade.token_out_symbol,
+        "dex": trade.dex,
+        "priced": trade.priced,
+        "tx_type": trade.tx_type,
+    }
+    for name in _DECIMAL_FIELDS:
+        value = getattr(trade, name)
+        record[name] = str(value) if value is not None else None
+    return record
+
+
+def trade_from_record(record: Dict[str, Any]):
+    """Rebuild a Trade from a record written by trade_to_record"""
+    # Import here to avoid circular import
+    from src.lib.blockchain_fetcher_v3 import Trade
+
+    values = {name: Decimal(record[name]) if record.get(name) is not None else None for name in _DECIMAL_FIELDS}
+    return Trade(
+        signature=record["signature"],
+        slot=record["slot"],
+        timestamp=datetime.fromtimestamp(record["timestamp"]),
+        token_in_mint=record["token_in_mint"],
+        token_in_symbol=record["token_in_symbol"],
+        token_in_amount=values["token_in_amount"],
+        token_out_mint=record["token_out_mint"],
+        token_out_symbol=record["token_out_symbol"],
+        token_out_amount=values["token_out_amount"],
+        price_usd=values["price_usd"],
+        value_usd=values["value_usd"],
+        pnl_usd=values["pnl_usd"] if values["pnl_usd"] is not None else Decimal("0"),
+        fees_usd=values["fees_usd"] if values["fees_usd"] is not None else Decimal("0"),
+        dex=record.get("dex", "UNKNOWN"),
+        priced=record.get("priced", False),
+        tx_type=record.get("tx_type", "swap"),
+    )
+
+
+@dataclass
+class WalletSyncState:
+    """Incremental sync checkpoint for one wallet"""
+
+    wallet: str
+    head_signature: Optional[str] = None  # Newest signature already processed
+    head_slot: Optional[int] = None  # Slot of head_signature
+    signature_count: int = 0  # Total signatures walked across all syncs
+    trades: List[Dict[str, Any]] = field(default_factory=list)  # trade_to_record() rows
+    positions: Optional[Dict[str, Any]] = None  # PositionCheckpoint.to_dict(), see PositionBuilder.apply_trades
+    updated_at: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for storage"""
+        return {
+            "version": SYNC_STATE_VERSION,
+            "wallet": self.wallet,
+            "head_signature": self.head_signature,
+            "head_slot": self.head_slot,
+            "signature_count": self.signature_count,
+            "trades": self.trades,
+            "positions": self.positions,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "WalletSyncState":
+        """Create from dictionary"""
+        return cls(
+            wallet=data["wallet"],
+            head_signature=data.get("head_signature"),
+            head_slot=data.get("head_slot"),
+            signature_count=data.get("signature_count", 0),
+            trades=data.get("trades", []),
+            positions=data.get("positions"),
+            updated_at=data.get("updated_at", 0.0),
+        )
+
+
+class WalletSyncStore:
+    """Base interface for wallet sync persistence"""
+
+    def load(self, wallet: str) -> Optional[WalletSyncState]:
+        """Load sync state for a wallet, None if never synced"""
+        raise NotImplementedError
+
+    def save(self, state: WalletSyncState) -> bool:
+        """Persist sync state for a wallet"""
+        raise NotImplementedError
+
+    def delete(self, wallet: str) -> bool:
+        """Drop sync state so the next fetch is a full walk"""
+        raise NotImplementedError
+
+    @staticmethod
+    def _decode(wallet: str, raw: Optional[str]) -> Optional[WalletSyncState]:
+        """Decode a stored payload, discarding unknown versions"""
+        if not raw:
+            return None
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError as e:
+            logger.error(f"Corrupt sync state for {wallet}: {e}")
+            return None
+        if data.get("version") != SYNC_STATE_VERSION or data.get("wallet") != wallet:
+            return None
+        return WalletSyncState.from_dict(data)
+
+
+class LocalWalletSyncStore(WalletSyncStore):
+    """On-disk backend - one JSON file per wallet, replaced atomically"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or get_wallet_sync_dir()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, wallet: str) -> str:
+        return os.path.join(self.directory, f"{wallet}.json")
+
+    def load(self, wallet: str) -> Optional[WalletSyncState]:
+        path = self._path(wallet)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                return self._decode(wallet, f.read())
+        except OSError as e:
+            logger.error(f"Failed to read sync state for {wallet}: {e}")
+            return None
+
+    def save(self, state: WalletSyncState) -> bool:
+        state.updated_at = time.time()
+        # Write to a temp file in the same directory then rename, so readers
+        # in other workers never observe a partially written file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(state.to_dict(), f)
+            os.replace(tmp_path, self._path(state.wallet))
+            return True
+        except OSError as e:
+            logger.error(f"Failed to write sync state for {state.wallet}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    def delete(self, wallet: str) -> bool:
+        path = self._path(wallet)
+        if os.path.exists(path):
+            os.remove(path)
+            return True
+        return False
+
+
+class RedisWalletSyncStore(WalletSyncStore):
+    """Redis backend - shares sync state across gunicorn workers and hosts"""
+
+    def __init__(self, redis_url: str = REDIS_URL):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("redis package is not installed")
+        self.connection_pool = redis.ConnectionPool.from_url(
+            redis_url,
+            decode_responses=True,
+            socket_connect_timeout=5,
+            socket_timeout=5,
+            retry_on_timeout=True,
+            health_check_interval=30
+        )
+        self.redis_client = redis.Redis(connection_pool=self.connection_pool)
+        self.redis_client.ping()
+
+    def _get_key(self, wallet: str) -> str:
+        return f"{CACHE_KEY_PREFIX}{wallet}"
+
+    def load(self, wallet: str) -> Optional[WalletSyncState]:
+        try:
+            return self._decode(wallet, self.redis_client.get(self._get_key(wallet)))
+        except RedisError as e:
+            logger.error(f"Redis get error for sync state {wallet}: {e}")
+            return None
+
+    def save(self, state: WalletSyncState) -> bool:
+        state.updated_at = time.time()
+        try:
+            self.redis_client.set(self._get_key(state.wallet), json.dumps(state.to_dict()))
+            return True
+        except RedisError as e:
+            logger.error(f"Redis set error for sync state {state.wallet}: {e}")
+            return False
+
+    def delete(self, wallet: str) -> bool:
+        try:
+            return bool(self.redis_client.delete(self._get_key(wallet)))
+        except RedisError as e:
+            logger.error(f"Redis delete error for sync state {wallet}: {e}")
+            return False
+
+    def close(self):
+        """Close Redis connection pool"""
+        self.connection_pool.disconnect()
+
+
+# Global instance
+_sync_store_instance: Optional[WalletSyncStore] = None
+
+
+def get_wallet_sync_store() -> WalletSyncStore:
+    """Get or create global sync store, falling back to local disk if Redis is unavailable"""
+    global _sync_store_instance
+    if _sync_store_instance is None:
+        if get_wallet_sync_backend() == "redis" and REDIS_AVAILABLE:
+            try:
+                _sync_store_instance = RedisWalletSyncStore()
+                logger.info("Wallet sync store using Redis backend")
+            except (RedisError, RedisConnectionError) as e:
+                logger.warning(f"Redis connection failed, using local sync store: {e}")
+        if _sync_store_instance is None:
+            _sync_store_instance = LocalWalletSyncStore()
+    return _sync_store_instance
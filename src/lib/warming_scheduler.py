@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Warming Scheduler - Popularity-driven refresh-ahead for hot wallets
+Cache warming used to be a synchronous call for one wallet the caller had to
+name. The scheduler instead learns which wallets are read: every GPT read
+adds 1 to the wallet's score, and scores decay exponentially with a half-life
+of WARMING_HALF_LIFE_SEC, so the score blends frequency and recency.
+
+Every WARMING_TICK_SEC the top WARMING_TOP_N wallets (score at least
+WARMING_MIN_SCORE) are checked per registered kind (positions snapshot,
+analytics summary). An entry that is missing, or past WARMING_REFRESH_AT of
+its way to staleness (POSITION_CACHE_TTL_SEC for snapshots), is rebuilt in
+the background, so reads of popular wallets keep hitting the cache instead of
+reaching Helius.
+
+Warming runs at Priority.WARMING, so interactive requests are served first,
+and is capped at WARMING_BUDGET_SHARE of each provider's rate over a sliding
+WARMING_BUDGET_WINDOW_SEC window; once a provider's share is spent, new
+refreshes wait for the window to move on. At most WARMING_CONCURRENCY
+refreshes are in flight, which bounds how far a window can overshoot.
+
+Metrics: quota_spent counts upstream calls made while warming, per provider;
+hit_rate_gain is the share of reads answered from an entry that warming put
+in the cache, i.e. reads that would otherwise have fetched.
+"""
+
+import os
+import math
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Optional, Dict, Any, Callable, Awaitable, Deque, List, Set, Tuple
+
+from src.lib.rate_scheduler import Priority, get_rate_scheduler_stats, priority_scope
+
+logger = logging.getLogger(__name__)
+
+# Per kind: progress towards staleness (None when not cached) and the rebuild coroutine
+ProgressFn = Callable[[str], Optional[float]]
+RefreshFn = Callable[[str], Awaitable[Any]]
+
+
+def is_warming_enabled() -> bool:
+    """Check if popularity-driven warming is enabled"""
+    return os.getenv("ENABLE_CACHE_WARMING", "false").lower() == "true"
+
+
+def get_warming_top_n() -> int:
+    """Most popular wallets kept warm"""
+    return int(os.getenv("WARMING_TOP_N", "50"))
+
+
+def get_warming_half_life() -> float:
+    """Seconds for a wallet's popularity score to halve"""
+    return float(os.getenv("WARMING_HALF_LIFE_SEC", "3600"))
+
+
+def get_warming_min_score() -> float:
+    """Minimum decayed score for a wallet to be warmed"""
+    return float(os.getenv("WARMING_MIN_SCORE", "2"))
+
+
+def get_warming_refresh_at() -> float:
+    """Progress towards staleness at which a warm entry is rebuilt"""
+    return float(os.getenv("WARMING_REFRESH_AT", "0.9"))
+
+
+def get_warming_budget_share() -> float:
+    """Share of each provider's rate warming may use"""
+    return float(os.getenv("WARMING_BUDGET_SHARE", "0.2"))
+
+
+def get_warming_budget_window() -> float:
+    """Seconds over which the warming budget share is measured"""
+    return float(os.getenv("WARMING_BUDGET_WINDOW_SEC", "60"))
+
+
+def get_warming_tick() -> float:
+    """Seconds between warming passes"""
+    return float(os.getenv("WARMING_TICK_SEC", "10"))
+
+
+def get_warming_concurrency() -> int:
+    """Max refreshes warming runs at once"""
+    return int(os.getenv("WARMING_CONCURRENCY", "2"))
+
+
+def get_warming_retry() -> float:
+    """Seconds before an entry that warming could not cache is tried again"""
+    return float(os.getenv("WARMING_RETRY_SEC", "300"))
+
+
+def get_warming_max_tracked() -> int:
+    """Max wallets whose popularity is tracked; the least popular are forgotten"""
+    return int(os.getenv("WARMING_MAX_TRACKED", "10000"))
+
+
+class WarmingScheduler:
+    """Track wallet popularity and keep the top wallets' cache entries fresh"""
+
+    def __init__(
+        self,
+        top_n: Optional[int] = None,
+        half_life: Optional[float] = None,
+        budget_stats: Optional[Callable[[], Dict[str, Any]]] = None,
+    ):
+        self.top_n = top_n or get_warming_top_n()
+        self.half_life = half_life or get_warming_half_life()
+        self.budget_stats = budget_stats or get_rate_scheduler_stats
+        self._warmers: Dict[str, Tuple[ProgressFn, RefreshFn]] = {}
+        # wallet -> [score, scored_at]; the score is as of scored_at
+        self._scores: Dict[str, List[float]] = {}
+        self._kinds: Dict[str, Set[str]] = {}  # wallet -> kinds it was read as
+        self._warmed: Set[Tuple[str, str]] = set()  # (kind, wallet) last filled by warming
+        self._attempted: Dict[Tuple[str, str], float] = {}  # (kind, wallet) -> last warming start
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._samples: Deque[Tuple[float, Dict[str, int]]] = deque()  # (time, warming grants per provider)
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._ticker = None
+        self.metrics = {
+            "reads": 0,
+            "hits": 0,
+            "warm_hits": 0,
+            "refreshes_started": 0,
+            "refreshes_completed": 0,
+            "refreshes_failed": 0,
+            "budget_deferrals": 0,
+            "ticks": 0,
+        }
+
+    def register(self, kind: str, progress: ProgressFn, refresh: RefreshFn):
+        """Register how to check and rebuild one kind of cache entry"""
+        self._warmers[kind] = (progress, refresh)
+
+    def _decayed(self, entry: List[float], now: float) -> float:
+        return entry[0] * math.pow(2.0, -(now - entry[1]) / self.half_life)
+
+    def record_request(self, wallet: str, kind: str, cache_hit: bool, now: Optional[float] = None):
+        """Count a read of wallet's kind entry towards its popularity"""
+        now = now or time.time()
+        with self._lock:
+            entry = self._scores.get(wallet)
+            if entry is None:
+                self._scores[wallet] = [1.0, now]
+                if len(self._scores) > get_warming_max_tracked():
+                    self._forget(now)
+            else:
+                entry[0] = self._decayed(entry, now) + 1.0
+                entry[1] = now
+            self._kinds.setdefault(wallet, set()).add(kind)
+
+            self.metrics["reads"] += 1
+            if cache_hit:
+                self.metrics["hits"] += 1
+                if (kind, wallet) in self._warmed:
+                    self.metrics["warm_hits"] += 1
+            else:
+                # The request fills the entry itself
+                self._warmed.discard((kind, wallet))
+        if is_warming_enabled():
+            self.start()
+
+    def _forget(self, now: float):
+        """Drop the least popular tenth of tracked wallets (lock held)"""
+        ranked = sorted(self._scores, key=lambda w: self._decayed(self._scores[w], now))
+        for wallet in ranked[:max(len(ranked) // 10, 1)]:
+            del self._scores[wallet]
+            for kind in self._kinds.pop(wallet, ()):
+                self._warmed.discard((kind, wallet))
+                self._attempted.pop((kind, wallet), None)
+
+    def popular_wallets(self, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Top wallets by decayed score, most popular first"""
+        now = now or time.time()
+        min_score = get_warming_min_score()
+        with self._lock:
+            scored = [(wallet, self._decayed(entry, now)) for wallet, entry in self._scores.items()]
+        scored = [item for item in scored if item[1] >= min_score]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:self.top_n]
+
+    @staticmethod
+    def _warming_grants(stats: Dict[str, Any]) -> Dict[str, int]:
+        """Upstream calls granted at warming priority so far, per provider"""
+        return {
+            provider: provider_stats.get("granted_by_priority", {}).get("warming", 0)
+            for provider, provider_stats in stats.items()
+        }
+
+    def _budget_left(self, now: float) -> bool:
+        """Whether every provider has warming budget left in the current window"""
+        stats = self.budget_stats()
+        grants = self._warming_grants(stats)
+        window = get_warming_budget_window()
+        self._samples.append((now, grants))
+        while len(self._samples) > 1 and self._samples[1][0] <= now - window:
+            self._samples.popleft()
+        oldest = self._samples[0][1]
+        share = get_warming_budget_share()
+        for provider, granted in grants.items():
+            allowed = share * stats[provider].get("rate", 0) * window
+            if granted - oldest.get(provider, 0) >= allowed:
+                return False
+        return True
+
+    async def tick(self, now: Optional[float] = None):
+        """One warming pass: queue refreshes for popular entries near staleness"""
+        now = now or time.time()
+        self.metrics["ticks"] += 1
+        refresh_at = get_warming_refresh_at()
+        for wallet, score in self.popular_wallets(now):
+            with self._lock:
+                kinds = sorted(self._kinds.get(wallet, ()))
+            for kind in kinds:
+                if kind not in self._warmers or (kind, wallet) in self._inflight:
+                    continue
+                progress_fn, refresh_fn = self._warmers[kind]
+                try:
+                    progress = progress_fn(wallet)
+                except Exception as e:
+                    logger.warning(f"Warming check for {kind} {wallet} failed: {e}")
+                    continue
+                if progress is not None and progress < refresh_at:
+                    continue
+                if progress is None and now - self._attempted.get((kind, wallet), 0) < get_warming_retry():
+                    # Warmed recently but nothing was cached (e.g. no positions)
+                    continue
+                if len(self._inflight) >= get_warming_concurrency():
+                    return
+                if not self._budget_left(time.time()):
+                    self.metrics["budget_deferrals"] += 1
+                    return
+                self._start_refresh(kind, wallet, refresh_fn)
+
+    def _start_refresh(self, kind: str, wallet: str, refresh_fn: RefreshFn) -> asyncio.Future:
+        key = (kind, wallet)
+        self._attempted[key] = time.time()
+        self.metrics["refreshes_started"] += 1
+        future = asyncio.ensure_future(self._refresh(key, refresh_fn))
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return future
+
+    async def _refresh(self, key: Tuple[str, str], refresh_fn: RefreshFn):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(get_warming_concurrency())
+        kind, wallet = key
+        async with self._semaphore:
+            try:
+                with priority_scope(Priority.WARMING):
+                    await refresh_fn(wallet)
+            except Exception as e:
+                self.metrics["refreshes_failed"] += 1
+                logger.error(f"Warming {kind} for {wallet} failed: {e}")
+                return
+        self.metrics["refreshes_completed"] += 1
+        with self._lock:
+            self._warmed.add(key)
+        logger.info(f"Warmed {kind} for {wallet}")
+
+    def warm_now(self, wallet: str, kinds: Optional[List[str]] = None) -> bool:
+        """Queue an immediate refresh of wallet's entries, outside the popularity ranking"""
+        kinds = [kind for kind in (kinds or list(self._warmers)) if kind in self._warmers]
+        if not kinds:
+            return False
+        loop = self._ensure_loop()
+
+        def start():
+            for kind in kinds:
+                if (kind, wallet) not in self._inflight:
+                    self._start_refresh(kind, wallet, self._warmers[kind][1])
+
+        loop.call_soon_threadsafe(start)
+        return True
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the scheduler thread and its loop on first use"""
+        with self._start_lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                started = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(started.set)
+                    loop.run_forever()
+                    loop.close()
+
+                self._thread = threading.Thread(target=run, name="warming-scheduler", daemon=True)
+                self._thread.start()
+                started.wait()
+                self._loop = loop
+                self._semaphore = None
+                self._ticker = None
+            return self._loop
+
+    def start(self):
+        """Run a warming pass every WARMING_TICK_SEC on the scheduler thread"""
+        loop = self._ensure_loop()
+
+        async def ticker():
+            while True:
+                try:
+                    await self.tick()
+                except Exception as e:
+                    logger.error(f"Warming pass failed: {e}")
+                await asyncio.sleep(get_warming_tick())
+
+        with self._start_lock:
+            if self._ticker is None:
+                self._ticker = asyncio.run_coroutine_threadsafe(ticker(), loop)
+                logger.info(f"Warming scheduler started (top_n={self.top_n}, share={get_warming_budget_share()})")
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the scheduler thread; refreshes in flight are dropped"""
+        with self._start_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = self._ticker = None
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get warming statistics"""
+        reads = self.metrics["reads"]
+        return {
+            **self.metrics,
+            "hit_rate": self.metrics["hits"] / reads if reads else 0.0,
+            "hit_rate_gain": self.metrics["warm_hits"] / reads if reads else 0.0,
+            "quota_spent": self._warming_grants(self.budget_stats()),
+            "tracked_wallets": len(self._scores),
+            "popular_wallets": len(self.popular_wallets()),
+            "inflight": len(self._inflight),
+            "enabled": is_warming_enabled(),
+        }
+
+
+# Global instance
+_scheduler_instance: Optional[WarmingScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_warming_scheduler() -> WarmingScheduler:
+    """Get or create the process-wide warming scheduler"""
+    global _scheduler_instance
+    with _scheduler_lock:
+        if _scheduler_instance is None:
+            _scheduler_instance = WarmingScheduler()
+        return _scheduler_instance
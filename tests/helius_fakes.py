@@ -0,0 +1,106 @@
+"""
+In-process Helius fakes for fetcher unit tests
+
+FakeHeliusSession stands in for the aiohttp session of the fetchers: it serves
+getSignaturesForAddress pages (honouring before/until/limit), /v0/transactions
+batches and /v0/token-metadata from a newest-first list of (signature, slot).
+"""
+
+import asyncio
+import json as jsonlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+WALLET = "3JoVBiQEA2QKsq7TzW5ez5jVRtbbYgTNijoZzp5qgkr2"
+TOKEN_MINT = "TokenMint1111111111111111111111111111111111"
+
+
+def make_swap_tx(signature: str, slot: int) -> dict:
+    """Build a minimal Helius enhanced transaction with events.swap (1 SOL -> slot tokens)"""
+    return {
+        "signature": signature,
+        "slot": slot,
+        "timestamp": 1700000000 + slot,
+        "source": "RAYDIUM",
+        "events": {
+            "swap": {
+                "nativeInput": {"amount": 1_000_000_000},
+                "tokenOutputs": [{
+                    "mint": TOKEN_MINT,
+                    "rawTokenAmount": {"tokenAmount": str(slot * 1_000_000), "decimals": 6},
+                }],
+            }
+        },
+    }
+
+
+class FakeResponse:
+    def __init__(self, payload, status: int = 200, headers: Optional[Dict[str, str]] = None, latency: float = 0.0):
+        self.status = status
+        self.headers = headers or {}
+        self._payload = payload
+        self._latency = latency
+
+    async def json(self):
+        await asyncio.sleep(self._latency)
+        return self._payload
+
+    async def text(self):
+        return jsonlib.dumps(self._payload)
+
+    def raise_for_status(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class FakeHeliusSession:
+    """Serves signature pages, transaction batches and token metadata, logging every call"""
+
+    def __init__(self, history: List[Tuple[str, int]], non_swaps: Iterable[str] = (), page_latency: float = 0.0):
+        self.history = history  # newest first: [(signature, slot)]
+        self.non_swaps = set(non_swaps)  # Signatures served as plain transfers
+        self.page_latency = page_latency
+        self.rpc_calls: List[Dict[str, Any]] = []  # getSignaturesForAddress options
+        self.tx_requested: List[str] = []
+        self.events: List[Tuple[str, Any]] = []  # ("page" | "batch", first signature) / ("metadata", mints)
+        self.pages = 0
+        self.batches = 0
+
+    def post(self, url, params=None, json=None, **kwargs):
+        if json.get("method") == "getSignaturesForAddress":
+            return self._signature_page(json["params"][1])
+
+        if "mintAccounts" in json:
+            self.events.append(("metadata", tuple(sorted(json["mintAccounts"]))))
+            return FakeResponse([{"account": TOKEN_MINT, "symbol": "TKN"}])
+
+        self.batches += 1
+        self.tx_requested.extend(json["transactions"])
+        self.events.append(("batch", json["transactions"][0]))
+        slots = dict(self.history)
+        return FakeResponse([
+            {"signature": sig, "slot": slots[sig], "timestamp": 1700000000 + slots[sig]}
+            if sig in self.non_swaps else make_swap_tx(sig, slots[sig])
+            for sig in json["transactions"]
+        ])
+
+    def _signature_page(self, opts: Dict[str, Any]) -> FakeResponse:
+        self.pages += 1
+        self.rpc_calls.append(dict(opts))
+        rows = self.history
+        if opts.get("before"):
+            rows = rows[[s for s, _ in rows].index(opts["before"]) + 1:]
+        if opts.get("until"):
+            sigs = [s for s, _ in rows]
+            if opts["until"] in sigs:
+                rows = rows[:sigs.index(opts["until"])]
+        rows = rows[:opts["limit"]]
+        if rows:
+            self.events.append(("page", rows[0][0]))
+        return FakeResponse(
+            {"result": [{"signature": s, "slot": slot} for s, slot in rows]}, latency=self.page_latency
+        )
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test suite for the AIMD adaptive concurrency controller
+"""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.lib.adaptive_concurrency import AdaptiveConcurrencyLimiter, RequestOutcome, parse_retry_after
+from src.lib.blockchain_fetcher_v3 import BlockchainFetcherV3, RateLimitedFetcher
+from tests.helius_fakes import FakeResponse
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) == 1.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 1.0
+
+
+def test_additive_increase_on_fast_successes():
+    """A window of successes at baseline latency grows the limit by about one"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=10)
+
+    async def run():
+        for _ in range(4):
+            await limiter.acquire()
+            limiter.release("default", 0.01, RequestOutcome(status=200))
+
+    asyncio.run(run())
+    assert 4.9 < limiter.limit < 5  # Four +1/limit steps
+
+
+def test_slow_responses_hold_limit():
+    """Latency far above baseline stops growth without cutting the limit"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=10)
+
+    async def run():
+        await limiter.acquire()
+        limiter.release("default", 0.01, RequestOutcome(status=200))
+        for _ in range(10):
+            await limiter.acquire()
+            limiter.release("default", 0.5, RequestOutcome(status=200))
+
+    asyncio.run(run())
+    assert 4 <= limiter.limit < 4.3
+
+
+def test_burst_of_429s_decreases_once_per_window():
+    """Concurrent failures from one congestion event only halve the limit once"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=16, max_limit=16)
+
+    async def run():
+        for _ in range(8):
+            await limiter.acquire()
+        for _ in range(8):
+            limiter.release("transactions", 0.2, RequestOutcome(status=429, retry_after=0))
+
+    asyncio.run(run())
+    assert limiter.current_limit == 8
+    assert limiter.metrics["decreases"] == 1
+    assert limiter.metrics["rate_limited"] == 8
+
+
+def test_retry_after_only_delays_its_endpoint():
+    """A 429 on one endpoint does not stall requests to another"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4)
+
+    async def timed_acquire(endpoint):
+        start = time.monotonic()
+        await limiter.acquire(endpoint)
+        limiter.release(endpoint, 0.01)
+        return time.monotonic() - start
+
+    async def run():
+        await limiter.acquire("transactions")
+        limiter.release("transactions", 0.01, RequestOutcome(status=429, retry_after=0.2))
+        return await asyncio.gather(timed_acquire("transactions"), timed_acquire("token-metadata"))
+
+    throttled, other = asyncio.run(run())
+    assert throttled >= 0.18
+    assert other < 0.05
+
+
+def test_waiters_never_exceed_limit():
+    """In-flight requests stay within the current limit"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=3, max_limit=3)
+    peak = 0
+
+    async def worker():
+        nonlocal peak
+        await limiter.acquire()
+        peak = max(peak, limiter.in_flight)
+        await asyncio.sleep(0.01)
+        limiter.release("default", 0.01)
+
+    async def run():
+        await asyncio.gather(*(worker() for _ in range(12)))
+
+    asyncio.run(run())
+    assert peak == 3
+    assert limiter.in_flight == 0
+
+
+class RateLimitedBatchSession:
+    """/v0/transactions returns 429 for the first request, then succeeds"""
+
+    def __init__(self):
+        self.calls = []
+
+    def post(self, url, params=None, json=None, **kwargs):
+        self.calls.append(time.monotonic())
+        if len(self.calls) == 1:
+            return FakeResponse({}, status=429, headers={"Retry-After": "0.1"})
+        return FakeResponse([{"signature": s, "events": {"swap": {}}} for s in json["transactions"]])
+
+
+def test_batch_retry_honours_retry_after_instead_of_fixed_backoff():
+    """A 429 batch retries after Retry-After rather than the old 5s sleep"""
+    session = RateLimitedBatchSession()
+
+    async def run():
+        fetcher = BlockchainFetcherV3(progress_callback=lambda _: None)
+        fetcher.session = session
+        start = time.monotonic()
+        txs = await fetcher._fetch_single_batch(["sig1", "sig2"], 1, 1)
+        return fetcher, txs, time.monotonic() - start
+
+    with patch("src.lib.blockchain_fetcher_v3.HELIUS_KEY", "test-key"):
+        fetcher, txs, elapsed = asyncio.run(run())
+
+    assert len(txs) == 2
+    assert 0.09 <= elapsed < 1.0
+    stats = fetcher.helius_rate_limited_fetcher.stats
+    assert stats["rate_limit_hits"] == 1
+    assert stats["controller"]["by_endpoint"]["transactions"] == {"completed": 2, "rate_limited": 1}
+
+
+def test_request_records_transport_errors():
+    """Exceptions inside a request count as errors and release the slot"""
+    fetcher = RateLimitedFetcher(max_concurrent=4)
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            async with fetcher.request("transactions"):
+                raise RuntimeError("boom")
+
+    asyncio.run(run())
+    assert fetcher.controller.in_flight == 0
+    assert fetcher.controller.metrics["errors"] == 1
@@ -221,7 +221,7 @@ class TestAMMPriceReader:
         """Test async context manager"""
         async with AMMPriceReader() as reader:
             assert reader.session is not None
-            assert reader._owns_session is True
+            assert reader._pooled_session is True
     
     @pytest.mark.asyncio
     async def test_convenience_function(self):
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Tests for the ASGI serving path of the GPT export routes
+Drives the ASGI callable directly with a lifespan and fake receive/send
+"""
+
+import asyncio
+import json
+import threading
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.api.wallet_analytics_asgi import app
+from src.lib.http_session import get_http_session_pool
+from src.lib.position_models import PositionSnapshot
+
+API_KEY = "wd_" + "a" * 32
+WALLET = "34zYDgjy8oinZ5y8gyrcQktzUmSfFLJztTSq5xLUVCya"
+
+
+async def call(path, query=b"", headers=None, method="GET"):
+    """Send one http request through the app and collect (status, headers, json body)"""
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": query,
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": ("127.0.0.1", 5000), "scheme": "http",
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    start, body = sent
+    response_headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    return start["status"], response_headers, json.loads(body["body"])
+
+
+async def serve(*requests):
+    """Run lifespan startup, the given requests on one loop, then shutdown"""
+    messages = asyncio.Queue()
+    for message in ("lifespan.startup", "lifespan.shutdown"):
+        messages.put_nowait({"type": message})
+    replies = []
+    startup_done = asyncio.Event()
+
+    async def receive():
+        message = await messages.get()
+        if message["type"] == "lifespan.shutdown":
+            await responses_done.wait()
+        return message
+
+    async def send(message):
+        replies.append(message["type"])
+        if message["type"] == "lifespan.startup.complete":
+            startup_done.set()
+
+    responses_done = asyncio.Event()
+    lifespan = asyncio.create_task(app({"type": "lifespan"}, receive, send))
+    await startup_done.wait()
+    results = [await call(*r) if isinstance(r, tuple) else await call(r) for r in requests]
+    responses_done.set()
+    await lifespan
+    assert replies == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    return results
+
+
+def test_auth_and_routing():
+    (missing, bad_key, unknown, wrong_method) = asyncio.run(serve(
+        f"/v4/trades/export-gpt/{WALLET}",
+        (f"/v4/trades/export-gpt/{WALLET}", b"", {"X-Api-Key": "nope"}),
+        ("/v4/unknown", b"", {"X-Api-Key": API_KEY}),
+        (f"/v4/trades/export-gpt/{WALLET}", b"", {"X-Api-Key": API_KEY}, "POST"),
+    ))
+    assert missing[0] == 401 and missing[2]["error"] == "API key required"
+    assert bad_key[0] == 401 and bad_key[2]["error"] == "Invalid API key"
+    assert unknown[0] == 404
+    assert wrong_method[0] == 405
+
+
+def test_trades_export_shares_one_session_across_requests():
+    sessions = []
+
+    async def borrow(fetcher):
+        session = await get_http_session_pool().acquire()
+        sessions.append(session)
+        await get_http_session_pool().release(session)
+        return fetcher
+
+    def fake_fetcher(skip_pricing=False):
+        fetcher = AsyncMock()
+        fetcher.fetch_recent_trades.side_effect = lambda wallet, limit: {
+            "signatures": [f"sig{i}" for i in range(10)][:limit],
+            "trades": [{"action": "buy", "amount": i} for i in range(10)][:limit],
+            "history_complete": limit >= 10,
+        }
+
+        async def enter():
+            return await borrow(fetcher)
+
+        ctx = MagicMock()
+        ctx.__aenter__ = AsyncMock(side_effect=enter)
+        ctx.__aexit__ = AsyncMock(return_value=False)
+        return ctx
+
+    with patch("src.api.wallet_analytics_api_v4_gpt.BlockchainFetcherV3Fast", side_effect=fake_fetcher), \
+         patch("src.config.feature_flags.trades_compact", return_value=False):
+        first, second = asyncio.run(serve(
+            (f"/v4/trades/export-gpt/{WALLET}", b"limit=3", {"X-Api-Key": API_KEY}),
+            (f"/v4/trades/export-gpt/{WALLET}", b"", {"X-Api-Key": API_KEY}),
+        ))
+
+    status, headers, body = first
+    assert status == 200
+    assert headers["access-control-allow-origin"] == "*"
+    assert body["wallet"] == WALLET
+    assert body["schema_version"] == "v0.7.0"
+    assert len(body["trades"]) == 3 and len(body["signatures"]) == 3
+    assert (body["limit"], body["history_complete"]) == (3, False)
+    assert second[0] == 200 and len(second[2]["trades"]) == 10
+
+    # Both requests reused the session pinned at startup, which shutdown then closed
+    assert sessions[0] is sessions[1]
+    assert sessions[0].closed
+
+
+def test_positions_and_summary_flags(monkeypatch):
+    monkeypatch.setenv("AGG_SUMMARY", "false")
+    with patch("src.api.wallet_analytics_asgi.positions_enabled", return_value=False):
+        positions, summary, short_wallet = asyncio.run(serve(
+            (f"/v4/positions/export-gpt/{WALLET}", b"", {"X-Api-Key": API_KEY}),
+            (f"/v4/analytics/summary/{WALLET}", b"", {"X-Api-Key": API_KEY}),
+            ("/v4/positions/export-gpt/short", b"", {"X-Api-Key": API_KEY}),
+        ))
+    assert positions[0] == 501 and positions[2]["error"] == "Feature disabled"
+    assert summary[0] == 404
+    assert short_wallet[0] == 400
+
+
+def test_positions_cache_reads_run_off_the_event_loop():
+    """The blocking Redis-backed position cache is called from a worker thread"""
+    threads = []
+    snapshot = PositionSnapshot(
+        wallet=WALLET, timestamp=datetime.now(timezone.utc), positions=[],
+        total_value_usd=Decimal("0"), total_unrealized_pnl_usd=Decimal("0"), total_unrealized_pnl_pct=Decimal("0"),
+    )
+
+    class FakeCache:
+        async def get_portfolio_snapshot(self, wallet):
+            threads.append(threading.current_thread())
+            return snapshot, False
+
+    with patch("src.api.wallet_analytics_asgi.positions_enabled", return_value=True), \
+         patch("src.api.wallet_analytics_api_v4_gpt.get_position_cache_v2", return_value=FakeCache()):
+        (positions,) = asyncio.run(serve((f"/v4/positions/export-gpt/{WALLET}", b"", {"X-Api-Key": API_KEY})))
+
+    assert positions[0] == 200 and positions[2]["wallet"] == WALLET
+    assert threads and threading.main_thread() not in threads
+
+
+def test_summary_awaits_aggregation_and_caches(monkeypatch):
+    monkeypatch.setenv("AGG_SUMMARY", "true")
+    aggregate = AsyncMock(return_value={"wallet": WALLET, "schema_version": "v0.8.0-aggregated"})
+    cached = {}
+    with patch("src.api.wallet_analytics_asgi.fetch_and_aggregate_summary", aggregate), \
+         patch("src.api.wallet_analytics_asgi.get_cached_summary", side_effect=cached.get), \
+         patch("src.api.wallet_analytics_asgi.cache_summary", side_effect=cached.__setitem__):
+        fresh, hit = asyncio.run(serve(
+            (f"/v4/analytics/summary/{WALLET}", b"window=false", {"X-Api-Key": API_KEY}),
+            (f"/v4/analytics/summary/{WALLET}", b"window=false", {"X-Api-Key": API_KEY}),
+        ))
+
+    assert fresh[0] == 200 and "x-payload-size-bytes" in fresh[1]
+    assert hit[0] == 200 and "x-payload-size-bytes" not in hit[1]
+    assert aggregate.await_count == 1
+    assert aggregate.await_args.args == (WALLET, False)
+
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test suite for the byte-budgeted GDSF cache tier
+"""
+
+from src.lib.byte_budget_cache import ByteBudgetCache, estimate_size
+from src.lib.position_cache_v2 import InMemoryLRUCache
+
+NOW = 1_000_000.0
+
+
+def test_budget_is_bytes_and_large_cold_entries_go_first():
+    small = "x" * 100
+    budget = 10 * estimate_size("small0", small) + estimate_size("whale", "x" * 5000)
+    cache = ByteBudgetCache(max_bytes=budget)
+
+    cache.set("whale", "x" * 5000, 300, now=NOW)
+    for i in range(10):
+        cache.set(f"small{i}", small, 300, now=NOW)
+        cache.get_entry(f"small{i}", now=NOW)
+    assert cache.bytes == budget
+
+    # One more small entry must push out the whale, not ten small ones
+    cache.set("small10", small, 300, now=NOW)
+    assert "whale" not in cache.cache
+    assert len(cache.cache) == 11 and cache.bytes <= budget
+    assert cache.get_stats()["evicted_bytes"] == estimate_size("whale", "x" * 5000)
+
+
+def test_entries_larger_than_budget_are_rejected():
+    cache = ByteBudgetCache(max_bytes=1000)
+    cache.set("a", "small", 300, now=NOW)
+    cache.set("b", "x" * 2000, 300, now=NOW)
+    assert "a" in cache.cache and "b" not in cache.cache
+    assert cache.get_stats()["rejected"] == 1
+
+
+def test_wallet_invalidation_uses_index():
+    cache = InMemoryLRUCache(max_size=100)
+    for wallet in ("wallet1", "wallet2"):
+        cache.set(f"pos:v1:snapshot:{wallet}", "{}", 300, now=NOW)
+        for i in range(3):
+            cache.set(f"pos:v1:position:{wallet}:token{i}", "{}", 300, now=NOW)
+
+    assert cache.delete_pattern("pos:v1:*:wallet1*") == 4
+    assert "wallet1" not in cache.groups
+    assert len(cache.cache) == 4 and cache.get("pos:v1:snapshot:wallet2", now=NOW)
+    assert cache.bytes == sum(entry[3] for entry in cache.cache.values())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test suite for the NumPy columnar analytics backend
+Both aggregators must produce the same summaries as the Decimal/float path,
+with USD figures within ANALYTICS_TOLERANCE_USD
+"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from src.lib.blockchain_fetcher_v3 import Trade, SOL_MINT
+from src.lib.columnar_analytics import ANALYTICS_TOLERANCE_USD, get_analytics_backend
+from src.lib.trade_analytics_aggregator import TradeAnalyticsAggregator
+from src.lib.trade_table import TradeTable
+from src.lib.wallet_summary_aggregator import WalletSummaryAggregator
+
+TOKENS = [("BONK", "DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263"),
+          ("WIF", "EKpQGSJtjMFqKZ9KQanSqYXRcF8fBopzLHYxdM65zcjm"),
+          ("POPCAT", "7GCihgDB8fe6KNjn2MYtkzZcRjQy3t9GHdC8uHYmW2hr"),
+          ("MYRO", "HhJpBhRRn4g56VsyLuT8DL5Bv31HkXqsrahTTUCZeZg4")]
+DEXES = ["RAYDIUM", "JUPITER", "METEORA", "ORCA"]
+
+
+def assert_matches(numpy_result, python_result, path="root"):
+    """Equal structure; numeric strings may differ by the documented tolerance"""
+    if isinstance(python_result, dict):
+        assert numpy_result.keys() == python_result.keys(), path
+        for key in python_result:
+            assert_matches(numpy_result[key], python_result[key], f"{path}.{key}")
+    elif isinstance(python_result, list):
+        assert len(numpy_result) == len(python_result), path
+        for i, (a, b) in enumerate(zip(numpy_result, python_result)):
+            assert_matches(a, b, f"{path}[{i}]")
+    elif isinstance(python_result, str) and numpy_result != python_result:
+        try:
+            assert abs(float(numpy_result) - float(python_result)) <= ANALYTICS_TOLERANCE_USD + 1e-9, path
+        except ValueError:
+            pytest.fail(f"{path}: {numpy_result!r} != {python_result!r}")
+    else:
+        assert numpy_result == python_result, path
+
+
+@pytest.fixture
+def flat_trades():
+    """Flat enriched trades as WalletSummaryAggregator consumes them"""
+    rng = random.Random(7)
+    now = int(datetime.now().timestamp())
+    trades = []
+    for i in range(400):
+        symbol, mint = rng.choice(TOKENS)
+        action = rng.choice(["buy", "sell"])
+        trades.append({
+            "timestamp": now - rng.randint(0, 60 * 86400),
+            "action": action,
+            "token_symbol": symbol,
+            "token_mint": mint,
+            "price_usd": f"{rng.uniform(0.00001, 2):.8f}",
+            "value_usd": f"{rng.uniform(1, 5000):.2f}",
+            "pnl_usd": f"{rng.uniform(-500, 500):.2f}" if action == "sell" else "0",
+            "dex": rng.choice(DEXES),
+        })
+    return trades
+
+
+@pytest.fixture
+def table():
+    rng = random.Random(11)
+    now = datetime.now()
+    trades = []
+    for i in range(300):
+        symbol, mint = rng.choice(TOKENS)
+        sol = Decimal(rng.randint(10**6, 5 * 10**9)).scaleb(-9)
+        tokens = Decimal(rng.randint(1, 10**12)).scaleb(-6)
+        sell = rng.random() < 0.5
+        trades.append(Trade(
+            signature=f"sig{i}", slot=i, timestamp=now - timedelta(seconds=rng.randint(0, 45 * 86400)),
+            token_in_mint=mint if sell else SOL_MINT, token_in_symbol=symbol if sell else "SOL",
+            token_in_amount=tokens if sell else sol,
+            token_out_mint=SOL_MINT if sell else mint, token_out_symbol="SOL" if sell else symbol,
+            token_out_amount=sol if sell else tokens,
+            price_usd=Decimal(str(round(rng.uniform(0.0001, 3), 8))),
+            value_usd=Decimal(str(round(rng.uniform(1, 3000), 4))),
+            pnl_usd=Decimal(str(round(rng.uniform(-200, 200), 4))) if sell else Decimal("0"),
+            dex=rng.choice(DEXES),
+        ))
+    return TradeTable.from_trades(trades)
+
+
+def test_backend_getter(monkeypatch):
+    monkeypatch.delenv("ANALYTICS_BACKEND", raising=False)
+    assert get_analytics_backend() == "python"
+    monkeypatch.setenv("ANALYTICS_BACKEND", "numpy")
+    assert get_analytics_backend() == "numpy"
+    assert WalletSummaryAggregator().backend == "numpy"
+
+
+def test_wallet_summary_matches_python_path(flat_trades):
+    python = WalletSummaryAggregator(backend="python").aggregate_wallet_summary(flat_trades, max_tokens=10)
+    numpy_result = WalletSummaryAggregator(backend="numpy").aggregate_wallet_summary(flat_trades, max_tokens=10)
+    numpy_result["meta"].pop("payload_size_bytes")
+    python["meta"].pop("payload_size_bytes")
+    assert_matches(numpy_result, python)
+
+
+def test_wallet_summary_matches_python_path_for_table(table):
+    python = WalletSummaryAggregator(backend="python").aggregate_wallet_summary(table)
+    numpy_result = WalletSummaryAggregator(backend="numpy").aggregate_wallet_summary(table)
+    assert numpy_result["wallet_summary"]["unique_tokens"] == len(TOKENS)
+    numpy_result["meta"].pop("payload_size_bytes")
+    python["meta"].pop("payload_size_bytes")
+    assert_matches(numpy_result, python)
+
+
+def _analytics(backend, trades):
+    result = asyncio.run(TradeAnalyticsAggregator(backend=backend).aggregate_analytics(trades, "wallet"))
+    result.pop("generated_at")
+    return result
+
+
+def test_trade_analytics_matches_decimal_path_for_dicts():
+    rng = random.Random(3)
+    now = datetime.now(timezone.utc)
+    trades = []
+    for i in range(250):
+        symbol, _ = rng.choice(TOKENS)
+        action = rng.choice(["buy", "sell"])
+        trades.append({
+            "timestamp": (now - timedelta(hours=rng.randint(0, 24 * 50))).isoformat().replace("+00:00", "Z"),
+            "action": action,
+            "token": symbol,
+            "token_in": {"symbol": "So111111" if action == "buy" else symbol, "amount": rng.uniform(0.01, 5)},
+            "token_out": {"symbol": symbol if action == "buy" else "So111111", "amount": rng.uniform(0.01, 5)},
+            "value_usd": f"{rng.uniform(1, 900):.4f}",
+            "pnl_usd": f"{rng.uniform(-90, 90):.4f}" if action == "sell" else None,
+        })
+    trades.append({"timestamp": "not-a-time", "action": "sell", "token": "BAD", "pnl_usd": "oops"})
+
+    assert_matches(_analytics("numpy", trades), _analytics("python", trades))
+
+
+def test_trade_analytics_matches_decimal_path_for_table(table):
+    assert_matches(_analytics("numpy", table), _analytics("python", table))
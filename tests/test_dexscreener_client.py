@@ -263,15 +263,16 @@ class TestDexScreenerClient:
     async def test_context_manager(self):
         """Test context manager functionality"""
         with patch('aiohttp.ClientSession') as mock_session_class:
-            mock_session = MagicMock()
+            mock_session = MagicMock(closed=False)
             mock_session.close = AsyncMock()
             mock_session_class.return_value = mock_session
             
             async with DexScreenerClient() as client:
                 assert client.session is mock_session
-                assert client._owns_session is True
+                assert client._pooled_session is True
             
-            # Verify session was closed
+            # Last borrower released the pooled session, so it was closed
+            assert client.session is None
             mock_session.close.assert_called_once()
     
     @pytest.mark.asyncio
@@ -317,7 +318,7 @@ class TestDexScreenerClient:
         stats = client.get_stats()
         assert stats["request_count"] == 5
         assert stats["base_url"] == "https://api.dexscreener.com/latest"
-        assert stats["rate_limited"] is False
+        assert stats["rate_limited"] is True
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test suite for the overlapped fetch pipeline in BlockchainFetcherV3
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from src.lib.blockchain_fetcher_v3 import BlockchainFetcherV3
+from tests.helius_fakes import WALLET, FakeHeliusSession
+
+
+def run_fetch(session, pipelined, skip_pricing=True):
+    async def _run():
+        fetcher = BlockchainFetcherV3(
+            progress_callback=lambda _: None, skip_pricing=skip_pricing, parallel_pages=3, pipelined=pipelined
+        )
+        fetcher.session = session
+        return await fetcher.fetch_wallet_trades(WALLET)
+
+    with patch("src.lib.blockchain_fetcher_v3.HELIUS_KEY", "test-key"), \
+         patch("src.lib.blockchain_fetcher_v3.SIGNATURE_PAGE_LIMIT", 4), \
+         patch("src.lib.blockchain_fetcher_v3.TX_BATCH_SIZE", 2):
+        return asyncio.run(_run())
+
+
+@pytest.fixture
+def history():
+    return [(f"sig{i}", i) for i in range(12, 0, -1)]
+
+
+def test_pipeline_matches_phased_result(history):
+    """Pipelined and phased engines produce the same trades"""
+    phased = run_fetch(FakeHeliusSession(history, page_latency=0.01), pipelined=False)
+    pipelined = run_fetch(FakeHeliusSession(history, page_latency=0.01), pipelined=True)
+
+    assert pipelined["summary"]["total_trades"] == phased["summary"]["total_trades"] == 12
+    assert pipelined["trades"] == phased["trades"]
+    assert all(t["token_out"]["symbol"] == "TKN" for t in pipelined["trades"])
+
+
+def test_transaction_batches_start_before_paging_finishes(history):
+    """The first page's batches are dispatched before the last page is fetched"""
+    session = FakeHeliusSession(history, page_latency=0.01)
+    run_fetch(session, pipelined=True)
+
+    first_batch = session.events.index(("batch", "sig12"))
+    last_page = session.events.index(("page", "sig4"))
+    assert first_batch < last_page
+
+
+def test_metadata_fetched_once_per_new_mint(history):
+    """Later trade chunks reuse symbols resolved for earlier chunks"""
+    session = FakeHeliusSession(history, page_latency=0.01)
+    run_fetch(session, pipelined=True)
+
+    metadata_calls = [e for e in session.events if e[0] == "metadata"]
+    assert len(metadata_calls) == 1
+
+
+def record_priced_windows(history, monkeypatch):
+    """Run a pipelined fetch with pricing stubbed; returns the size of each priced window"""
+    priced_windows = []
+
+    async def fake_prices(self, trades):
+        if trades:
+            priced_windows.append(len(trades))
+        for trade in trades:
+            trade.priced = True
+
+    monkeypatch.setattr(BlockchainFetcherV3, "_fetch_prices_with_cache", fake_prices)
+    result = run_fetch(FakeHeliusSession(history, page_latency=0.01), pipelined=True, skip_pricing=False)
+
+    assert result["summary"]["priced_trades"] == 12
+    return priced_windows
+
+
+def test_pipeline_plans_prices_once_for_the_whole_fetch(history, monkeypatch):
+    """Per-batch plans would each re-request the SOL series; one plan covers every need"""
+    assert record_priced_windows(history, monkeypatch) == [12]
+
+
+def test_pipeline_prices_large_fetches_in_windows(history, monkeypatch):
+    """Trades are priced as windows fill and not re-priced afterwards"""
+    monkeypatch.setattr("src.lib.blockchain_fetcher_v3.FETCH_PIPELINE_PRICE_WINDOW", 5)
+    priced_windows = record_priced_windows(history, monkeypatch)
+
+    assert sum(priced_windows) == 12
+    assert len(priced_windows) > 1
+    assert all(n >= 5 for n in priced_windows[:-1])
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test suite for the streaming trade extraction mode of BlockchainFetcherV3
+"""
+
+import asyncio
+from unittest.mock import patch
+
+from src.lib.blockchain_fetcher_v3 import BlockchainFetcherV3
+from tests.helius_fakes import WALLET, FakeHeliusSession
+
+
+def run_fetch(session, streaming):
+    async def _run():
+        fetcher = BlockchainFetcherV3(
+            progress_callback=lambda _: None, skip_pricing=True, parallel_pages=2, streaming=streaming
+        )
+        fetcher.session = session
+        return await fetcher.fetch_wallet_trades(WALLET)
+
+    with patch("src.lib.blockchain_fetcher_v3.HELIUS_KEY", "test-key"), \
+         patch("src.lib.blockchain_fetcher_v3.SIGNATURE_PAGE_LIMIT", 4), \
+         patch("src.lib.blockchain_fetcher_v3.TX_BATCH_SIZE", 2):
+        return asyncio.run(_run())
+
+
+def test_streaming_mode_matches_phased_result():
+    """Streaming extraction yields the same envelope as the in-memory phased path"""
+    history = [(f"sig{i}", i) for i in range(12, 0, -1)]
+
+    phased = run_fetch(FakeHeliusSession(history), streaming=False)
+    streamed = run_fetch(FakeHeliusSession(history), streaming=True)
+
+    assert streamed["summary"]["total_trades"] == 12
+    assert streamed["trades"] == phased["trades"]
+    assert all(t["token_out"]["symbol"] == "TKN" for t in streamed["trades"])
+
+
+def test_streaming_mode_drops_raw_transactions_per_chunk():
+    """Only one chunk of raw transactions is ever handed to the parser at once"""
+    history = [(f"sig{i}", i) for i in range(12, 0, -1)]
+    parsed_sizes = []
+    original = BlockchainFetcherV3._extract_trades_with_dedup
+
+    async def tracking_extract(self, transactions, wallet):
+        parsed_sizes.append(len(transactions))
+        return await original(self, transactions, wallet)
+
+    with patch.object(BlockchainFetcherV3, "_extract_trades_with_dedup", tracking_extract):
+        result = run_fetch(FakeHeliusSession(history), streaming=True)
+
+    assert result["summary"]["total_trades"] == 12
+    assert max(parsed_sizes) == 2  # One TX_BATCH_SIZE batch at a time
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test suite for the single-pass Helius swap price index
+"""
+
+import asyncio
+from decimal import Decimal
+from unittest.mock import patch
+
+from src.lib.helius_price_extractor import HeliusPriceExtractor, SOL_MINT, USDC_MINT
+from src.lib.position_models import Position
+from src.lib.unrealized_pnl_calculator import UnrealizedPnLCalculator
+
+BONK = "DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263"
+WIF = "EKpQGSJtjMFqKZ9KQanSqYXRcF8fBopzLHYxdM65zcjm"
+
+
+def swap_tx(signature, timestamp, mint, token_amount, sol_amount):
+    """Enhanced transaction buying token_amount of mint for sol_amount SOL"""
+    return {
+        "signature": signature,
+        "slot": timestamp,
+        "timestamp": timestamp,
+        "events": {"swap": {
+            "tokenInputs": [{"mint": SOL_MINT, "tokenAmount": sol_amount}],
+            "tokenOutputs": [{"mint": mint, "tokenAmount": token_amount}],
+        }},
+    }
+
+
+def trade(signature, mint):
+    return {"signature": signature, "token_in_mint": SOL_MINT, "token_out_mint": mint}
+
+
+def test_index_prefers_latest_then_largest_swap():
+    transactions = [
+        swap_tx("old", 1000, BONK, 1000, 1),      # 0.001 SOL
+        swap_tx("new-small", 2000, BONK, 100, 1),  # 0.01 SOL
+        swap_tx("new-big", 2000, BONK, 2000, 40),  # 0.02 SOL, same time, more volume
+        swap_tx("wif", 1500, WIF, 10, 5),
+        swap_tx("unrelated", 3000, BONK, 1, 100),  # not one of the wallet's trades
+    ]
+    trades = [trade(tx["signature"], BONK) for tx in transactions[:3]] + [trade("wif", WIF)]
+
+    extractor = HeliusPriceExtractor()
+    with patch.object(HeliusPriceExtractor, "_find_best_swap", wraps=extractor._find_best_swap) as find:
+        index = extractor.build_price_index(trades, transactions)
+
+    assert find.call_count == 4  # one visit per (transaction, traded mint)
+    assert index.get(BONK).signature == "new-big"
+    assert index.price(BONK) == Decimal("0.02") * Decimal("145.0")
+    assert index.price(WIF) == Decimal("0.5") * Decimal("145.0")
+    assert index.price(USDC_MINT) == Decimal("1.0")
+    assert index.get_stats() == {"mints": 2, "transactions_scanned": 4, "candidates": 4}
+
+    prices = extractor.extract_prices_from_trades(trades, transactions, index=index)
+    assert prices == {BONK: index.price(BONK), WIF: index.price(WIF)}
+
+
+def test_calculator_builds_index_once_across_batches(monkeypatch):
+    monkeypatch.setenv("PRICE_HELIUS_ONLY", "true")
+    transactions = [swap_tx("b1", 1000, BONK, 1000, 1)]
+    calculator = UnrealizedPnLCalculator()
+    calculator.trades = [trade("b1", BONK)]
+    calculator.transactions = transactions
+
+    def position():
+        return Position(position_id="w:bonk:0", wallet="w", token_mint=BONK, token_symbol="BONK", balance=Decimal("10"),
+                        cost_basis=Decimal("0.1"), cost_basis_usd=Decimal("1"))
+
+    with patch("src.lib.unrealized_pnl_calculator.should_calculate_unrealized_pnl", return_value=True), \
+         patch("src.lib.unrealized_pnl_calculator.should_use_sol_spot_pricing", return_value=False), \
+         patch("src.lib.unrealized_pnl_calculator.should_use_token_pricing", return_value=False), \
+         patch.object(HeliusPriceExtractor, "build_price_index", wraps=calculator.helius_extractor.build_price_index) as build:
+        first = asyncio.run(calculator.calculate_batch_unrealized_pnl([position()]))
+        second = asyncio.run(calculator.calculate_batch_unrealized_pnl([position()]))
+
+    assert build.call_count == 1
+    assert first[0].current_price_usd == second[0].current_price_usd == Decimal("0.001") * Decimal("145.0")
+    assert first[0].price_source == "helius_swap"
@@ -287,10 +287,12 @@ class TestHeliusSupplyFetcher:
         """Test async context manager"""
         async with HeliusSupplyFetcher() as fetcher:
             assert fetcher.session is not None
-            assert fetcher._owns_session is True
+            assert fetcher._pooled_session is True
+            session = fetcher.session
         
-        # Session should be closed after exit
-        # (can't easily test this without mocking)
+        # Pooled session is closed once the last borrower releases it
+        assert fetcher.session is None
+        assert session.closed
     
     @pytest.mark.asyncio
     async def test_convenience_function(self, mock_session):
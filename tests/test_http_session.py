@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test suite for the pooled per-event-loop HTTP session registry
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.lib.dexscreener_client import DexScreenerClient
+from src.lib.http_session import HTTPSessionPool, http_session_scope, get_http_session_pool
+from src.lib.jupiter_client import JupiterClient
+
+
+def test_borrowers_share_one_session_and_last_release_closes():
+    async def run():
+        pool = HTTPSessionPool()
+        first = await pool.acquire()
+        second = await pool.acquire()
+        assert first is second
+        connector = first.connector
+        assert connector.limit == 100 and connector.limit_per_host == 40
+
+        await pool.release(first)
+        assert not first.closed  # still borrowed
+        await pool.release(second)
+        assert first.closed
+
+        third = await pool.acquire()
+        assert third is not first
+        await pool.release(third)
+        return pool.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["sessions_created"] == 2
+    assert stats["sessions_closed"] == 2
+    assert stats["reuses"] == 1
+    assert stats["open_sessions"] == 0
+
+
+def test_pinned_session_outlives_borrowers():
+    async def run():
+        pool = HTTPSessionPool()
+        await pool.start()
+        session = await pool.acquire()
+        await pool.release(session)
+        assert not session.closed
+        assert await pool.acquire() is session
+        await pool.release(session)
+        await pool.close()
+        assert session.closed
+
+    asyncio.run(run())
+
+
+def test_each_loop_gets_its_own_session():
+    pool = HTTPSessionPool()
+
+    async def borrow():
+        session = await pool.acquire()
+        await pool.release(session)
+        return session
+
+    assert asyncio.run(borrow()) is not asyncio.run(borrow())
+
+
+def test_clients_borrow_from_pool_instead_of_owning_a_session():
+    async def run():
+        async with http_session_scope():
+            async with JupiterClient() as jupiter, DexScreenerClient() as dex:
+                assert jupiter.session is dex.session
+                shared = jupiter.session
+            assert jupiter.session is None
+            assert not shared.closed
+        assert shared.closed
+
+        # A caller-provided session is used as-is and never closed by the client
+        own = MagicMock(closed=False)
+        own.close = AsyncMock()
+        async with DexScreenerClient(own) as client:
+            assert client.session is own
+        own.close.assert_not_awaited()
+
+    asyncio.run(run())
+
+
+def test_fetcher_borrows_pooled_session():
+    from src.lib.blockchain_fetcher_v3_fast import BlockchainFetcherV3Fast
+
+    async def run():
+        async with http_session_scope() as pool:
+            with patch("src.lib.blockchain_fetcher_v3_fast.HELIUS_KEY", "test-key"):
+                async with BlockchainFetcherV3Fast(skip_pricing=True) as fetcher:
+                    assert fetcher.session is await pool.acquire()
+                    await pool.release(fetcher.session)
+                    assert pool.get_stats()["borrowers"] == 1
+
+    with patch("src.lib.blockchain_fetcher_v3_fast.FastPriceCache"):
+        asyncio.run(run())
+    assert get_http_session_pool().get_stats()["open_sessions"] == 0
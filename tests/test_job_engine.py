@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Test suite for the durable background job store and engine
+"""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from src.lib.job_engine import JobEngine
+from src.lib.job_store import SqliteJobStore
+
+WALLET = "34zYDgjy8oinZ5y8gyrcQktzUmSfFLJztTSq5xLUVCya"
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_store_dedups_by_wallet_and_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    worker_a, worker_b = SqliteJobStore(path), SqliteJobStore(path)
+
+    job, created = worker_a.submit("positions", WALLET)
+    again, created_again = worker_b.submit("positions", WALLET)
+    assert created and not created_again and again.job_id == job.job_id
+
+    # Worker B runs the job; worker A sees its progress and result
+    claimed = worker_b.claim("b:0", ["positions"])
+    assert claimed.job_id == job.job_id and worker_b.claim("b:1", ["positions"]) is None
+    assert worker_b.heartbeat(job.job_id, "b:0", {"stage": "fetching_trades"})
+    assert worker_a.get(job.job_id).progress == {"stage": "fetching_trades"}
+
+    assert worker_b.finish(job.job_id, "b:0", result={"positions": 3}, result_ttl=60)
+    done = worker_a.get(job.job_id)
+    assert done.status == "complete" and done.to_dict()["result"] == {"positions": 3}
+
+    # A completed job is a cached result until its TTL, unless bypassed
+    assert worker_a.submit("positions", WALLET) == (done, False)
+    fresh, created = worker_a.submit("positions", WALLET, reuse_result=False)
+    assert created and fresh.job_id != job.job_id
+
+
+def test_abandoned_jobs_are_requeued_then_failed(tmp_path, monkeypatch):
+    monkeypatch.setenv("JOB_MAX_ATTEMPTS", "2")
+    store = SqliteJobStore(str(tmp_path / "jobs.db"))
+    job, _ = store.submit("summary", WALLET)
+
+    store.claim("dead:0", ["summary"])
+    time.sleep(0.05)
+    assert store.requeue_stale(0.01) == 1
+    assert store.get(job.job_id).status == "queued"
+    # The dead owner can no longer write to it
+    assert not store.finish(job.job_id, "dead:0", result={})
+
+    store.claim("dead:1", ["summary"])
+    time.sleep(0.05)
+    store.requeue_stale(0.01)
+    failed = store.get(job.job_id)
+    assert failed.status == "error" and failed.attempts == 2
+
+
+def test_engine_runs_each_wallet_once_and_reports_progress(tmp_path, monkeypatch):
+    monkeypatch.setenv("JOB_POLL_INTERVAL_SEC", "0.05")
+    runs = []
+    release = threading.Event()
+
+    async def handler(job, report):
+        runs.append(job.wallet)
+        report({"stage": "fetching_trades"})
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+        report({"stage": "done", "trades_found": 42})
+        return {"wallet": job.wallet, "trades": 42}
+
+    engine = JobEngine(store=SqliteJobStore(str(tmp_path / "jobs.db")), workers=2)
+    engine.register("positions", handler)
+    try:
+        job, created = engine.submit("positions", WALLET)
+        assert created
+        assert wait_for(lambda: engine.get(job.job_id).progress.get("stage") == "fetching_trades")
+
+        # Submitting again while it runs joins the running job
+        assert engine.submit("positions", WALLET) == (engine.get(job.job_id), False)
+
+        release.set()
+        assert wait_for(lambda: engine.get(job.job_id).status == "complete")
+        assert engine.get(job.job_id).result == {"wallet": WALLET, "trades": 42}
+        assert runs == [WALLET]
+        assert engine.submit("positions", WALLET)[0].job_id == job.job_id
+        assert engine.get_stats()["jobs_completed"] == 1
+    finally:
+        engine.stop()
+
+
+def test_handler_is_cancelled_when_its_job_is_taken_away(tmp_path, monkeypatch):
+    monkeypatch.setenv("JOB_POLL_INTERVAL_SEC", "0.05")
+    cancelled = threading.Event()
+    stalled = threading.Event()
+
+    async def handler(job, report):
+        if job.attempts > 1:
+            return {"attempt": job.attempts}
+        try:
+            report({"stage": "fetching_trades"})
+            while not stalled.is_set():
+                await asyncio.sleep(0.01)
+            report({"stage": "processing"})
+            await asyncio.sleep(2)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return {"attempt": job.attempts}
+
+    store = SqliteJobStore(str(tmp_path / "jobs.db"))
+    engine = JobEngine(store=store, workers=1)
+    engine.register("summary", handler)
+    try:
+        job, _ = engine.submit("summary", WALLET)
+        assert wait_for(lambda: engine.get(job.job_id).status == "running")
+        time.sleep(0.05)
+        # Another worker decided this one stalled: its next heartbeat fails
+        assert store.requeue_stale(0.01) == 1
+        stalled.set()
+        assert cancelled.wait(1)
+
+        # The requeued job runs again and only that run records a result
+        assert wait_for(lambda: engine.get(job.job_id).status == "complete")
+        assert engine.get(job.job_id).result == {"attempt": 2}
+        assert engine.get_stats()["jobs_lost"] == 1
+    finally:
+        engine.stop()
+
+
+def test_positions_job_respects_feature_flag():
+    """A positions job queued before the flag was turned off does not run"""
+    from src.api.wallet_analytics_api_v4_gpt import run_positions_job
+
+    fetch = patch("src.api.wallet_analytics_api_v4_gpt.get_positions_with_staleness")
+    with patch("src.api.wallet_analytics_api_v4_gpt.positions_enabled", return_value=False), fetch as fetched:
+        with pytest.raises(RuntimeError, match="not enabled"):
+            asyncio.run(run_positions_job(SimpleNamespace(wallet=WALLET, params={}), lambda _: None))
+    fetched.assert_not_called()
+
+
+def test_positions_job_is_shared_across_hosts(tmp_path, monkeypatch):
+    """The serving host only shapes the response links, not the job"""
+    from src.api import wallet_analytics_api_v4_gpt as api
+
+    monkeypatch.setenv("JOB_POLL_INTERVAL_SEC", "0.05")
+
+    async def handler(job, report):
+        return {"positions": [], "price_sources": {"primary": f"{api.DEFAULT_BASE_URL}/v4/prices"}}
+
+    engine = JobEngine(store=SqliteJobStore(str(tmp_path / "jobs.db")), workers=1)
+    engine.register("positions", handler)
+    client = api.app.test_client()
+    headers = {"X-Api-Key": "wd_12345678901234567890123456789012"}
+    with patch.object(api, "job_engine", engine), patch.object(api, "positions_enabled", return_value=True):
+        try:
+            first = client.post("/v4/jobs", json={"wallet": WALLET}, headers=headers, base_url="http://a.example")
+            second = client.post("/v4/jobs", json={"wallet": WALLET}, headers=headers, base_url="http://b.example")
+            job_id = first.get_json()["job_id"]
+            assert second.get_json()["job_id"] == job_id
+
+            assert wait_for(lambda: engine.get(job_id).status == "complete")
+            polled = client.get(f"/v4/jobs/{job_id}", headers=headers, base_url="http://b.example").get_json()
+            assert polled["result"]["price_sources"]["primary"] == "http://b.example/v4/prices"
+        finally:
+            engine.stop()
@@ -288,15 +288,16 @@ class TestJupiterClient:
     async def test_context_manager(self):
         """Test context manager functionality"""
         with patch('aiohttp.ClientSession') as mock_session_class:
-            mock_session = MagicMock()
+            mock_session = MagicMock(closed=False)
             mock_session.close = AsyncMock()
             mock_session_class.return_value = mock_session
             
             async with JupiterClient() as client:
                 assert client.session is mock_session
-                assert client._owns_session is True
+                assert client._pooled_session is True
             
-            # Verify session was closed
+            # Last borrower released the pooled session, so it was closed
+            assert client.session is None
             mock_session.close.assert_called_once()
     
     def test_client_stats(self):
@@ -138,8 +138,11 @@ class TestMarketCapAPI:
             ]
         }
         
-        with patch('src.api.market_cap_api.calculate_market_cap', 
-                  AsyncMock(return_value=mock_market_cap_result)):
+        async def fake_iter_market_caps(requests, use_cache=True):
+            for req in reversed(requests):
+                yield req, mock_market_cap_result
+        
+        with patch('src.api.market_cap_api.iter_market_caps', fake_iter_market_caps):
             with patch('src.api.market_cap_api.get_precache_service', return_value=None):
                 response = client.post(
                     '/v1/market-cap/batch',
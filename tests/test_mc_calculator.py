@@ -34,6 +34,7 @@ class TestMarketCapCalculator:
         """Create a mock cache"""
         cache = MagicMock()
         cache.get = MagicMock(return_value=None)
+        cache.batch_get = MagicMock(return_value={})
         cache.set = MagicMock(return_value=True)
         return cache
     
@@ -261,6 +262,60 @@ class TestMarketCapCalculator:
                         assert results["token3"].value is None
                         assert results["token3"].confidence == CONFIDENCE_UNAVAILABLE
     
+    @pytest.mark.asyncio
+    async def test_batch_resolves_concurrently_with_dedup_and_cache(self, mock_cache):
+        """Cache hits come from one batch_get; misses run concurrently and stream as they finish"""
+        cached = MarketCapData(value=42.0, confidence=CONFIDENCE_HIGH, timestamp=1000, source="helius_raydium")
+        mock_cache.batch_get.return_value = {("cached", 1000): cached, ("slow", 1000): None, ("fast", 1000): None}
+        calculator = MarketCapCalculator(mock_cache)
+        
+        in_flight = 0
+        peak = 0
+        calls = []
+        
+        async def mock_supply(mint, slot):
+            nonlocal in_flight, peak
+            calls.append(mint)
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.2 if mint == "slow" else 0.01)
+            in_flight -= 1
+            return Decimal("1000")
+        
+        with patch('src.lib.mc_calculator.get_token_supply_at_slot', mock_supply), \
+             patch('src.lib.mc_calculator.get_amm_price', AsyncMock(return_value=(Decimal("2"), "orca", Decimal("100000")))):
+            requests = [("slow", None, 1000), ("fast", None, 1000), ("slow", None, 1000), ("cached", None, 1000)]
+            start = asyncio.get_running_loop().time()
+            streamed = [(req[0], result.value) async for req, result in calculator.iter_batch_market_caps(requests)]
+            elapsed = asyncio.get_running_loop().time() - start
+        
+        assert streamed == [("cached", 42.0), ("fast", 2000.0), ("slow", 2000.0)]
+        assert sorted(calls) == ["fast", "slow"]
+        assert peak == 2
+        assert elapsed < 0.35
+        mock_cache.batch_get.assert_called_once()
+        mock_cache.get.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_batch_stream_closed_early_finishes_its_lookups(self, mock_cache):
+        """aclose() cancels the remaining lookups and waits for them before returning"""
+        mock_cache.batch_get.return_value = {}
+        calculator = MarketCapCalculator(mock_cache)
+        
+        async def mock_supply(mint, slot):
+            await asyncio.sleep(0.01 if mint == "fast" else 10)
+            return Decimal("1000")
+        
+        with patch('src.lib.mc_calculator.get_token_supply_at_slot', mock_supply), \
+             patch('src.lib.mc_calculator.get_amm_price', AsyncMock(return_value=(Decimal("2"), "orca", Decimal("100000")))):
+            stream = calculator.iter_batch_market_caps([("fast", None, 1000), ("slow", None, 1000)])
+            req, _ = await stream.__anext__()
+            await stream.aclose()
+        
+        assert req[0] == "fast"
+        pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        assert pending == []
+    
     @pytest.mark.asyncio
     async def test_sol_market_cap(self):
         """Test SOL market cap calculation"""
@@ -106,9 +106,9 @@ def test_blockchain_fetcher_v3():
 
 def test_rate_limiter():
     """Test rate limiter functionality"""
-    from src.lib.blockchain_fetcher_v3 import RateLimiter
+    from src.lib.rate_scheduler import get_rate_scheduler
 
-    limiter = RateLimiter(calls_per_second=10)
+    limiter = get_rate_scheduler("helius")
 
     # Should be able to acquire immediately
     async def test_acquire():
@@ -117,7 +117,7 @@ def test_rate_limiter():
 
     result = asyncio.run(test_acquire())
     assert result
-    print("✓ RateLimiter works")
+    print("✓ Rate scheduler works")
 
 
 def test_price_cache():
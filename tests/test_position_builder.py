@@ -655,6 +655,76 @@ class TestPositionBuilder(unittest.TestCase):
         self.assertEqual(position.balance, Decimal("10000"))
         self.assertEqual(position.decimals, 5)
 
+    def _fetched_trade(self, action: str, token_mint: str, token_symbol: str, amount: str, price: str,
+                       day: int, signature: str, slot: int) -> Dict[str, Any]:
+        """A trade dict in the shape the fetchers return (Trade.to_dict())"""
+        from src.lib.blockchain_fetcher_v3 import Trade
+        
+        value = Decimal(amount) * Decimal(price)
+        token = (token_mint, token_symbol, Decimal(amount))
+        sol = (SOL_MINT, "SOL", value / Decimal("100"))
+        (in_mint, in_symbol, in_amount), (out_mint, out_symbol, out_amount) = (
+            (sol, token) if action == "buy" else (token, sol)
+        )
+        return Trade(
+            signature=signature, slot=slot, timestamp=datetime(2024, 1, day, tzinfo=timezone.utc),
+            token_in_mint=in_mint, token_in_symbol=in_symbol, token_in_amount=in_amount,
+            token_out_mint=out_mint, token_out_symbol=out_symbol, token_out_amount=out_amount,
+            price_usd=Decimal(price), value_usd=value,
+        ).to_dict()
+    
+    def test_apply_trades_matches_full_rebuild(self):
+        """Incremental apply from a saved checkpoint gives the same positions as a rebuild"""
+        history = [
+            self._fetched_trade("buy", BONK_MINT, "BONK", "1000", "0.01", 1, "s1", 100),
+            self._fetched_trade("buy", USDC_MINT, "USDC", "100", "1.0", 2, "s2", 101),
+            self._fetched_trade("buy", BONK_MINT, "BONK", "1000", "0.02", 3, "s3", 102),
+        ]
+        delta = [
+            self._fetched_trade("sell", BONK_MINT, "BONK", "1500", "0.03", 4, "s4", 103),
+            self._fetched_trade("buy", BONK_MINT, "BONK", "200", "0.05", 5, "s5", 103),
+        ]
+        
+        builder = PositionBuilder(CostBasisMethod.FIFO)
+        builder.build_positions_from_trades([dict(t) for t in history], self.wallet)
+        saved = json.loads(json.dumps(builder.checkpoint.to_dict()))
+        self.assertEqual(saved["slot"], 102)
+        self.assertEqual(saved["slot_signatures"], ["s3"])
+        
+        resumed = PositionBuilder.from_checkpoint(saved)
+        # The overlapping s3 was applied already and is skipped
+        incremental = resumed.apply_trades([dict(history[-1])] + delta)
+        full = PositionBuilder(CostBasisMethod.FIFO).build_positions_from_trades(history + delta, self.wallet)
+        
+        def summary(positions):
+            return sorted((p.token_mint, p.balance, p.cost_basis_usd, p.trade_count) for p in positions)
+        
+        self.assertEqual(summary(incremental), summary(full))
+        self.assertEqual(delta[0]["pnl_usd"], 25.0)
+        self.assertEqual(resumed.checkpoint.slot_signatures, ["s4", "s5"])
+        self.assertEqual(resumed.checkpoint.trade_count, 5)
+        # Only lot state is kept, never the trades
+        self.assertEqual(resumed.checkpoint.groups[BONK_MINT].trades, [])
+    
+    def test_trades_without_slot_are_not_checkpointed(self):
+        """A history without slots has no cursor: no checkpoint, and apply refuses it"""
+        trade = self._fetched_trade("buy", BONK_MINT, "BONK", "1000", "0.01", 1, "s1", 100)
+        unslotted = {k: v for k, v in trade.items() if k != "slot"}
+        
+        builder = PositionBuilder(CostBasisMethod.FIFO)
+        positions = builder.build_positions_from_trades([unslotted], self.wallet)
+        self.assertEqual([p.token_mint for p in positions], [BONK_MINT])
+        self.assertIsNone(builder.checkpoint)
+        
+        builder.build_positions_from_trades([trade], self.wallet)
+        with self.assertRaises(ValueError):
+            builder.apply_trades([dict(unslotted, signature="s2")])
+    
+    def test_apply_trades_requires_checkpoint(self):
+        """apply_trades without a build or a loaded checkpoint is an error"""
+        with self.assertRaises(ValueError):
+            PositionBuilder(CostBasisMethod.FIFO).apply_trades([])
+    
     def test_spam_token_filter_airdrop(self):
         """WAL-606e: Test that airdrop tokens (no buys) are filtered"""
         trades = [
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test suite for the range-based Birdeye price planner
+"""
+
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+from src.lib.blockchain_fetcher_v3 import PriceCache
+from src.lib.price_planner import (
+    SOL_MINT, plan_prices, execute_plan, trade_price_needs, series_to_buckets,
+)
+from src.lib.price_store import MemoryPriceStore
+
+START = 1700000040
+BONK = "DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263"
+WIF = "EKpQGSJtjMFqKZ9KQanSqYXRcF8fBopzLHYxdM65zcjm"
+
+
+def at(offset_minutes):
+    return datetime.fromtimestamp(START + offset_minutes * 60)
+
+
+def unknown(mint, bucket):
+    return False
+
+
+def test_sol_quoted_trades_share_one_sol_series():
+    trades = [MagicMock(token_in_mint=SOL_MINT, token_out_mint=f"MINT{i}", timestamp=at(i * 7)) for i in range(2000)]
+    plan = plan_prices(trade_price_needs(trades), unknown, resolution=60, max_points=1000)
+
+    # 2,000 trade minutes over ~9.7 days: naive is one multi_price per minute
+    assert plan.naive_calls == 2000
+    assert plan.multi_calls == []
+    assert [c.mint for c in plan.history_calls] == [SOL_MINT] * 14
+    assert plan.summary()["calls_saved"] == 2000 - 14
+
+
+def test_mints_sharing_minutes_stay_on_multi_price():
+    needs = [(m, at(i)) for i in range(5) for m in (BONK, WIF)]
+    plan = plan_prices(needs, unknown, resolution=60)
+    assert plan.history_calls == []
+    assert [(c.timestamp, sorted(c.mints)) for c in plan.multi_calls] == [
+        (START + i * 60, sorted([BONK, WIF])) for i in range(5)
+    ]
+
+    # A mint alone over many minutes moves to a history call; a one-off stays multi
+    needs = [(BONK, at(i)) for i in range(50)] + [(WIF, at(1000))]
+    plan = plan_prices(needs, unknown, resolution=60)
+    assert [(c.mint, c.time_from, c.time_to) for c in plan.history_calls] == [(BONK, START, START + 49 * 60)]
+    assert [c.mints for c in plan.multi_calls] == [[WIF]]
+
+
+def test_bucket_resolution_and_cached_needs():
+    # START sits 4 minutes into a 5-minute bucket: minutes 0-14 span four buckets
+    known = {(BONK, START - 240)}
+    needs = [(BONK, at(i)) for i in range(15)]
+    plan = plan_prices(needs, lambda mint, bucket: (mint, bucket) in known, resolution=300, strategy="multi")
+
+    assert (plan.cached, plan.needs) == (1, 3)
+    assert [c.timestamp for c in plan.multi_calls] == [START + 60, START + 360, START + 660]
+    assert plan.naive_calls == 14
+
+
+def test_history_series_carries_prices_forward():
+    items = [{"unixTime": START, "value": 1.0}, {"unixTime": START + 180, "value": 2.0}]
+    buckets = [START, START + 60, START + 180, START + 240]
+    assert series_to_buckets(items, buckets, 60) == {
+        START: Decimal("1.0"), START + 60: Decimal("1.0"), START + 180: Decimal("2.0"), START + 240: Decimal("2.0"),
+    }
+    assert series_to_buckets([], buckets, 60) == dict.fromkeys(buckets)
+
+
+def test_history_series_has_no_look_ahead():
+    """Buckets before the first returned point are misses, not the later price"""
+    items = [{"unixTime": START + 120, "value": 3.0}]
+    buckets = [START, START + 60, START + 120]
+    assert series_to_buckets(items, buckets, 60) == {
+        START: None, START + 60: None, START + 120: Decimal("3.0"),
+    }
+
+
+def test_history_series_carry_forward_is_capped():
+    items = [{"unixTime": START, "value": 1.0}]
+    buckets = [START + 60 * n for n in (1, 2, 3)]
+    assert series_to_buckets(items, buckets, 60, max_carry=2) == {
+        START + 60: Decimal("1.0"), START + 120: Decimal("1.0"), START + 180: None,
+    }
+
+
+def test_execute_plan_records_results():
+    needs = [(BONK, at(i)) for i in range(30)] + [(WIF, at(500))]
+    plan = plan_prices(needs, unknown, resolution=60)
+    cache = PriceCache(MemoryPriceStore())
+    history_calls = []
+
+    async def fetch_multi(timestamp, mints):
+        return {mint: Decimal("3") for mint in mints}
+
+    async def fetch_history(call):
+        history_calls.append(call)
+        return [{"unixTime": b, "value": 0.5} for b in call.buckets[::2]]
+
+    calls = asyncio.run(execute_plan(plan, cache, fetch_multi, fetch_history))
+    assert calls == 2 and len(history_calls) == 1
+    assert cache.get(BONK, at(29)) == Decimal("0.5")
+    assert cache.get(WIF, at(500)) == Decimal("3")
+    assert plan_prices(needs, lambda m, b: cache.contains(m, datetime.fromtimestamp(b))).calls == 0
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test suite for the persistent (mint, minute) price store
+"""
+
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.lib.blockchain_fetcher_v3 import PriceCache
+from src.lib.blockchain_fetcher_v3_fast import BlockchainFetcherV3Fast, FastPriceCache
+from src.lib.price_store import MemoryPriceStore, SqlitePriceStore
+
+BONK = "DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263"
+MINUTE = 1700000040
+
+
+def test_sqlite_store_is_append_only_and_shared(tmp_path):
+    path = str(tmp_path / "prices.db")
+    store = SqlitePriceStore(path)
+    assert store.put(BONK, MINUTE, Decimal("0.0000123"))
+    assert store.put(BONK, MINUTE + 60, None)
+    # History never changes: a second write for the same minute is ignored
+    assert not store.put(BONK, MINUTE, Decimal("9"))
+
+    other_worker = SqlitePriceStore(path)
+    assert other_worker.lookup(BONK, MINUTE) == (True, Decimal("0.0000123"))
+    assert other_worker.lookup(BONK, MINUTE + 60) == (True, None)
+    assert other_worker.lookup(BONK, MINUTE + 120) == (False, None)
+    assert other_worker.get_stats()["hits"] == 2
+
+
+def test_range_and_nearest_reads(tmp_path):
+    for store in (MemoryPriceStore(), SqlitePriceStore(str(tmp_path / "prices.db"))):
+        store.put_many([
+            (BONK, MINUTE, Decimal("1")),
+            (BONK, MINUTE + 60, None),
+            (BONK, MINUTE + 300, Decimal("2")),
+            ("OTHER", MINUTE + 60, Decimal("5")),
+        ])
+        assert store.range(BONK, MINUTE, MINUTE + 120) == [(MINUTE, Decimal("1")), (MINUTE + 60, None)]
+        # Recorded misses are skipped; the closest priced minute wins
+        assert store.nearest(BONK, MINUTE + 70, tolerance_sec=300) == (MINUTE, Decimal("1"))
+        assert store.nearest(BONK, MINUTE + 250, tolerance_sec=300) == (MINUTE + 300, Decimal("2"))
+        assert store.nearest(BONK, MINUTE + 1000, tolerance_sec=120) is None
+
+
+def test_price_cache_reads_through_to_store():
+    store = MemoryPriceStore()
+    ts = datetime.fromtimestamp(MINUTE + 12)
+    PriceCache(store).set_many(ts, {BONK: Decimal("0.5"), "DEAD": None})
+
+    cache = PriceCache(store)
+    assert cache.get(BONK, ts) == Decimal("0.5")
+    assert cache.contains("DEAD", ts) and cache.get("DEAD", ts) is None
+    assert not cache.contains(BONK, datetime.fromtimestamp(MINUTE + 60))
+
+
+class FakeBirdeyeResponse:
+    status = 200
+    headers = {}
+
+    def __init__(self, mints):
+        self.mints = mints
+
+    async def json(self):
+        return {"success": True, "data": {m: ({"value": 0.25} if m == BONK else None) for m in self.mints}}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class FakeBirdeyeSession:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        self.calls += 1
+        return FakeBirdeyeResponse(params["list_address"].split(","))
+
+
+def token_swap(ts):
+    return MagicMock(token_in_mint=BONK, token_out_mint="DEAD", timestamp=ts)
+
+
+def test_each_minute_is_fetched_from_birdeye_once():
+    store = MemoryPriceStore()
+    ts = datetime.fromtimestamp(MINUTE)
+
+    async def fetch_once(session):
+        fetcher = BlockchainFetcherV3Fast(progress_callback=lambda _: None, session=session)
+        fetcher.price_cache = FastPriceCache(store)
+        with patch.object(BlockchainFetcherV3Fast, "_apply_cached_prices", AsyncMock()):
+            await fetcher._fetch_prices_batch([token_swap(ts)])
+        return fetcher.price_cache
+
+    first, second = FakeBirdeyeSession(), FakeBirdeyeSession()
+    with patch("src.lib.blockchain_fetcher_v3_fast.HELIUS_KEY", "test-key"), \
+         patch("src.lib.blockchain_fetcher_v3_fast.BIRDEYE_API_KEY", "test-key"):
+        asyncio.run(fetch_once(first))
+        cache = asyncio.run(fetch_once(second))
+
+    assert (first.calls, second.calls) == (1, 0)
+    assert cache.get(BONK, ts) == Decimal("0.25")
+    assert store.lookup("DEAD", MINUTE) == (True, None)
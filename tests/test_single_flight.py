@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Test suite for single-flight coalescing of wallet fetches
+"""
+
+import asyncio
+import json
+import os
+import stat
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from src.lib.blockchain_fetcher_v3 import Trade, SOL_MINT
+from src.lib.single_flight import SingleFlight, FileLockFlightBackend, single_flight
+from src.lib.trade_table import TradeTable
+
+
+def make_trade():
+    return Trade(
+        signature="sig", slot=1, timestamp=datetime.fromtimestamp(1700000000),
+        token_in_mint=SOL_MINT, token_in_symbol="SOL", token_in_amount=Decimal("1.5"),
+        token_out_mint="BONK", token_out_symbol="BONK", token_out_amount=Decimal("1000"),
+        price_usd=Decimal("0.2"), value_usd=Decimal("200"),
+    )
+
+
+def slow_fetch(calls, delay=0.05, result=None):
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return result if result is not None else {"trades": [{"action": "buy", "pnl_usd": 0}]}
+    return fetch
+
+
+def test_concurrent_callers_share_one_run():
+    group = SingleFlight()
+    calls = []
+
+    async def run():
+        return await asyncio.gather(*(group.do("wallet", slow_fetch(calls)) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(r == results[0] for r in results)
+
+    # Every caller gets its own copy to mutate
+    results[1]["trades"][0]["pnl_usd"] = 42
+    assert results[2]["trades"][0]["pnl_usd"] == 0
+    assert group.get_stats()["leaders"] == 1
+    assert group.get_stats()["followers"] == 4
+    assert group.get_stats()["in_flight"] == 0
+
+
+def test_coalesces_across_threads_and_loops():
+    """Flask's run_async gives each request its own loop"""
+    group = SingleFlight()
+    calls = []
+    results = []
+    started = threading.Event()
+
+    async def leader_fetch():
+        started.set()
+        return await slow_fetch(calls, delay=0.2)()
+
+    def leader():
+        results.append(asyncio.run(group.do("wallet", leader_fetch)))
+
+    def follower():
+        started.wait()
+        results.append(asyncio.run(group.do("wallet", slow_fetch(calls))))
+
+    threads = [threading.Thread(target=leader), threading.Thread(target=follower)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results[0] == results[1]
+
+
+def test_errors_reach_followers_and_next_call_retries():
+    group = SingleFlight()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        raise ValueError("helius down")
+
+    async def run():
+        return await asyncio.gather(*(group.do("wallet", failing) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(isinstance(e, ValueError) for e in errors)
+
+    assert asyncio.run(group.do("wallet", slow_fetch(calls))) == {"trades": [{"action": "buy", "pnl_usd": 0}]}
+    assert len(calls) == 2
+
+
+def test_file_backend_shares_result_with_other_worker(tmp_path):
+    """Two groups stand in for two gunicorn workers sharing the lock directory"""
+    worker_a = SingleFlight(FileLockFlightBackend(str(tmp_path)))
+    worker_b = SingleFlight(FileLockFlightBackend(str(tmp_path)))
+    calls_a, calls_b = [], []
+
+    async def run():
+        first = asyncio.create_task(worker_a.do("wallet", slow_fetch(calls_a, delay=0.3, result={"n": 1})))
+        await asyncio.sleep(0.05)
+        second = await worker_b.do("wallet", slow_fetch(calls_b, result={"n": 2}))
+        return await first, second
+
+    first, second = asyncio.run(run())
+    assert (len(calls_a), len(calls_b)) == (1, 0)
+    assert first == second == {"n": 1}
+    assert worker_b.get_stats()["cross_worker_shared"] == 1
+
+    # The last reader removes the shared result and the lock
+    assert list(tmp_path.iterdir()) == []
+
+    # A later, non-overlapping call fetches again instead of reusing the old result
+    assert asyncio.run(worker_b.do("wallet", slow_fetch(calls_b, result={"n": 3}))) == {"n": 3}
+
+
+def test_file_backend_publishes_only_for_waiters(tmp_path):
+    """A run nobody waited on leaves no result file behind"""
+    written = []
+    backend = FileLockFlightBackend(str(tmp_path))
+    original = backend._write_result
+    backend._write_result = lambda path, result: (written.append(path), original(path, result))
+
+    asyncio.run(SingleFlight(backend).do("wallet", slow_fetch([])))
+    assert written == []
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_file_backend_shares_trade_table_as_json(tmp_path):
+    """Fetch results cross workers as tagged JSON, TradeTable included"""
+    trade = make_trade()
+    worker_a = SingleFlight(FileLockFlightBackend(str(tmp_path)))
+    worker_b = SingleFlight(FileLockFlightBackend(str(tmp_path)))
+    published = []
+    original = worker_a.backend._write_result
+
+    def spy(path, result):
+        original(path, result)
+        with open(path) as f:
+            published.append(json.load(f))
+
+    worker_a.backend._write_result = spy
+    result = ({"trades": [trade.to_dict()], "fetched_at": datetime(2024, 1, 1)}, TradeTable.from_trades([trade]))
+
+    async def run():
+        first = asyncio.create_task(worker_a.do("wallet", slow_fetch([], delay=0.3, result=result)))
+        await asyncio.sleep(0.05)
+        second = await worker_b.do("wallet", slow_fetch([]))
+        return await first, second
+
+    (_, leader_table), (envelope, follower_table) = asyncio.run(run())
+    assert published  # Plain JSON on disk, not pickle
+    assert envelope == result[0]
+    assert follower_table.to_dicts() == leader_table.to_dicts()
+    assert follower_table.price_usd == [Decimal("0.2")]
+
+
+def test_file_backend_refuses_foreign_directory(tmp_path, monkeypatch):
+    """A directory planted by another user is not trusted"""
+    shared = tmp_path / "shared"
+    shared.mkdir(mode=0o777)
+    monkeypatch.setattr(os, "getuid", lambda: os.stat(shared).st_uid + 1)
+    with pytest.raises(RuntimeError):
+        FileLockFlightBackend(str(shared))
+
+    monkeypatch.undo()
+    FileLockFlightBackend(str(shared))
+    assert stat.S_IMODE(os.stat(shared).st_mode) == 0o700
+
+
+def test_file_backend_sweeps_abandoned_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("SINGLE_FLIGHT_TTL_SEC", "60")
+    backend = FileLockFlightBackend(str(tmp_path))
+    stale = [tmp_path / "a.lock", tmp_path / "a.result", tmp_path / "a.wait.1.x"]
+    for path in stale:
+        path.write_text("{}")
+        os.utime(path, (time.time() - 120, time.time() - 120))
+    fresh = tmp_path / "b.wait.2.y"
+    fresh.write_text("")
+
+    backend._sweep()
+    assert list(tmp_path.iterdir()) == [fresh]
+
+
+def test_fetch_result_with_trade_table_is_shareable():
+    trade = make_trade()
+    table = TradeTable.from_trades([trade])
+    group = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return {"trades": [trade.to_dict()]}, table
+
+    async def run():
+        return await asyncio.gather(group.do("wallet", fetch), group.do("wallet", fetch))
+
+    (_, leader_table), (_, follower_table) = asyncio.run(run())
+    assert follower_table is not leader_table
+    assert follower_table.to_dicts() == leader_table.to_dicts()
+
+
+def test_off_switch(monkeypatch):
+    monkeypatch.setenv("SINGLE_FLIGHT_BACKEND", "off")
+    calls = []
+
+    async def run():
+        await asyncio.gather(*(single_flight("wallet", slow_fetch(calls)) for _ in range(3)))
+
+    asyncio.run(run())
+    assert len(calls) == 3
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test suite for slot-partitioned parallel signature fetching
+"""
+
+import asyncio
+from unittest.mock import patch
+
+from src.lib.blockchain_fetcher_v3 import BlockchainFetcherV3
+from tests.helius_fakes import WALLET, FakeResponse
+
+
+class FakeSlotRpcSession:
+    """Serves getTransactionsForAddress with slot filters and pagination tokens"""
+
+    def __init__(self, history, page_limit=3, supported=True, rate_limit_first=0):
+        self.history = history  # newest first: [(signature, slot)]
+        self.page_limit = page_limit
+        self.supported = supported
+        self.rate_limit_first = rate_limit_first
+        self.calls = []
+
+    def post(self, url, headers=None, json=None, **kwargs):
+        opts = json["params"][1]
+        self.calls.append(opts)
+        if not self.supported:
+            return FakeResponse({"error": {"code": -32601, "message": "Method not found"}})
+        if self.rate_limit_first > 0:
+            self.rate_limit_first -= 1
+            return FakeResponse({}, status=429, headers={"Retry-After": "0"})
+
+        rows = list(self.history)
+        slot_filter = opts.get("filters", {}).get("slot")
+        if slot_filter:
+            rows = [r for r in rows if slot_filter["gte"] <= r[1] < slot_filter["lt"]]
+        if opts["sortOrder"] == "asc":
+            rows.reverse()
+
+        start = int(opts.get("paginationToken") or 0)
+        limit = min(opts["limit"], self.page_limit)
+        page = rows[start:start + limit]
+        token = str(start + limit) if start + limit < len(rows) else None
+        return FakeResponse({"result": {
+            "data": [{"signature": s, "slot": slot} for s, slot in page],
+            "paginationToken": token,
+        }})
+
+
+def fetch(session, parallel_pages=4):
+    async def _run():
+        fetcher = BlockchainFetcherV3(progress_callback=lambda _: None, parallel_pages=parallel_pages)
+        fetcher.session = session
+        signatures = await fetcher._fetch_signatures_slot_partitioned(WALLET)
+        return fetcher, signatures
+
+    with patch("src.lib.blockchain_fetcher_v3.HELIUS_KEY", "test-key"):
+        return asyncio.run(_run())
+
+
+def test_partition_slot_range_covers_span_without_overlap():
+    """Windows are contiguous, half-open and newest first"""
+    windows = BlockchainFetcherV3._partition_slot_range(100, 199, 4)
+    assert windows == [(175, 200), (150, 175), (125, 150), (100, 125)]
+
+    # Never more windows than slots
+    assert BlockchainFetcherV3._partition_slot_range(10, 11, 40) == [(11, 12), (10, 11)]
+
+
+def test_partitioned_fetch_matches_sequential_order():
+    """Merged result is deduplicated and newest first, including same-slot signatures"""
+    history = [(f"sig{i}", 1000 + i) for i in range(40, 0, -1)]
+    history.insert(5, ("sig35b", 1035))  # Two signatures in one slot
+
+    fetcher, signatures = fetch(FakeSlotRpcSession(history))
+
+    assert signatures == [s for s, _ in history]
+    assert fetcher.metrics.signatures_fetched == len(history)
+    assert fetcher._head == ("sig40", 1040)
+    assert fetcher._fetch_failures == 0
+
+
+def test_partitioned_fetch_retries_rate_limited_window():
+    """A 429 only delays the window that hit it"""
+    history = [(f"sig{i}", i) for i in range(10, 0, -1)]
+    session = FakeSlotRpcSession(history, rate_limit_first=1)
+
+    _, signatures = fetch(session)
+
+    assert signatures == [s for s, _ in history]
+
+
+def test_falls_back_to_sequential_walk_when_unsupported():
+    """RPC providers without slot filters use the before-cursor walk"""
+    session = FakeSlotRpcSession([], supported=False)
+
+    async def sequential(self, wallet, until_sig=None, page_callback=None):
+        return ["seq1", "seq2"]
+
+    with patch.object(BlockchainFetcherV3, "_fetch_swap_signatures", sequential):
+        _, signatures = fetch(session)
+
+    assert signatures == ["seq1", "seq2"]
+
+
+def test_empty_wallet_returns_no_signatures():
+    _, signatures = fetch(FakeSlotRpcSession([]))
+    assert signatures == []
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test suite for stale-while-revalidate snapshot refreshes
+"""
+
+import asyncio
+import threading
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from src.lib.position_cache_v2 import PositionCacheV2
+from src.lib.position_models import PositionSnapshot
+from src.lib.snapshot_refresher import SnapshotRefresher
+
+
+def make_snapshot(wallet, value="0"):
+    return PositionSnapshot(wallet=wallet, timestamp=datetime.now(timezone.utc), positions=[],
+                            total_value_usd=Decimal(value), total_unrealized_pnl_usd=Decimal("0"),
+                            total_unrealized_pnl_pct=Decimal("0"))
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+async def wait_done(futures):
+    await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+
+
+@pytest.mark.asyncio
+async def test_stale_hit_serves_old_snapshot_and_swaps_in_rebuild(monkeypatch):
+    monkeypatch.setenv("POSITION_CACHE_TTL_SEC", "900")
+    clock = Clock()
+    rebuilt = []
+
+    async def rebuild(wallet):
+        rebuilt.append(wallet)
+        await asyncio.sleep(0.05)
+        return make_snapshot(wallet, "42")
+
+    refresher = SnapshotRefresher(rebuild=rebuild, concurrency=2)
+    cache = PositionCacheV2(use_redis=False, now_provider=clock, refresher=refresher)
+    try:
+        await cache.set_portfolio_snapshot(make_snapshot("wallet1"))
+        clock.now += 1000
+
+        snapshot, is_stale = await cache.get_portfolio_snapshot("wallet1")
+        assert is_stale and snapshot.total_value_usd == Decimal("0")
+        # A second stale hit does not queue another rebuild
+        await cache.get_portfolio_snapshot("wallet1")
+        await wait_done([cache.refresh_tasks["wallet1"]])
+
+        snapshot, is_stale = await cache.get_portfolio_snapshot("wallet1", trigger_refresh=False)
+        assert not is_stale and snapshot.total_value_usd == Decimal("42")
+        assert rebuilt == ["wallet1"]
+        stats = refresher.get_stats()
+        assert stats["refreshes_completed"] == 1
+        assert stats["refresh_lag_ms_max"] >= stats["refresh_lag_ms_last"] >= 0
+    finally:
+        cache.close()
+        refresher.stop()
+
+
+@pytest.mark.asyncio
+async def test_refresh_ahead_of_staleness(monkeypatch):
+    monkeypatch.setenv("POSITION_CACHE_TTL_SEC", "900")
+    monkeypatch.setenv("SNAPSHOT_REFRESH_AHEAD", "0.8")
+    monkeypatch.setenv("SNAPSHOT_REFRESH_JITTER", "0")
+    clock = Clock()
+
+    async def rebuild(wallet):
+        return make_snapshot(wallet)
+
+    refresher = SnapshotRefresher(rebuild=rebuild)
+    cache = PositionCacheV2(use_redis=False, now_provider=clock, refresher=refresher)
+    try:
+        await cache.set_portfolio_snapshot(make_snapshot("wallet1"))
+        clock.now += 600
+        await cache.get_portfolio_snapshot("wallet1")
+        assert not cache.refresh_tasks
+
+        clock.now += 150  # 750s of 900s: past the refresh-ahead point, not stale yet
+        _, is_stale = await cache.get_portfolio_snapshot("wallet1")
+        assert not is_stale
+        await wait_done(list(cache.refresh_tasks.values()))
+        assert cache.get_metrics()["position_cache_refresh_ahead"] == 1
+        assert cache.get_metrics()["position_cache_stale_serves"] == 0
+    finally:
+        cache.close()
+        refresher.stop()
+
+
+@pytest.mark.asyncio
+async def test_rebuilds_are_bounded_and_failures_counted(monkeypatch):
+    monkeypatch.setenv("POSITION_CACHE_TTL_SEC", "900")
+    clock = Clock()
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+
+    async def rebuild(wallet):
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.02)
+        with lock:
+            running["now"] -= 1
+        if wallet == "wallet0":
+            raise RuntimeError("helius down")
+        return make_snapshot(wallet)
+
+    refresher = SnapshotRefresher(rebuild=rebuild, concurrency=2)
+    cache = PositionCacheV2(use_redis=False, now_provider=clock, refresher=refresher)
+    try:
+        wallets = [f"wallet{i}" for i in range(6)]
+        for wallet in wallets:
+            await cache.set_portfolio_snapshot(make_snapshot(wallet))
+        clock.now += 1000
+        for wallet in wallets:
+            await cache.get_portfolio_snapshot(wallet)
+        await wait_done(list(cache.refresh_tasks.values()))
+
+        assert running["max"] == 2
+        stats = refresher.get_stats()
+        assert (stats["refreshes_completed"], stats["refreshes_failed"]) == (5, 1)
+        assert cache.get_metrics()["position_cache_refresh_errors"] == 1
+    finally:
+        cache.close()
+        refresher.stop()
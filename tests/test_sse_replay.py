@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test suite for resumable SSE streams and the replay buffer
+"""
+
+import asyncio
+import json
+import threading
+
+from src.lib.sse_replay import ReplayRegistry, ReplayStream
+
+
+def event_ids(frames):
+    return [line[4:] for frame in frames for line in frame.split("\n") if line.startswith("id: ")]
+
+
+def event_data(frames, event_type):
+    out = []
+    for frame in frames:
+        for block in frame.split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.split("\n") if ": " in line)
+            if fields.get("event") == event_type:
+                out.append(json.loads(fields["data"]))
+    return out
+
+
+def test_resume_replays_only_missed_frames():
+    stream = ReplayStream("wallet", max_frames=100, spill_dir="")
+    for i in range(5):
+        stream.append(f"event: progress\ndata: {json.dumps({'i': i})}\n\n")
+    stream.finish()
+
+    first = list(stream.subscribe())
+    assert event_ids(first) == [f"{stream.stream_id}-{n}" for n in range(1, 6)]
+
+    resumed = list(stream.subscribe(f"{stream.stream_id}-3"))
+    assert [d["i"] for d in event_data(resumed, "progress")] == [3, 4]
+    assert stream.get_stats()["resumes"] == 1
+
+    # An id from another stream replays everything
+    assert len(list(stream.subscribe("other-3"))) == 5
+
+
+def test_concurrent_requests_share_one_computation():
+    runs = []
+    release = threading.Event()
+
+    async def source():
+        runs.append(1)
+        yield "event: connected\ndata: {}\n\n"
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+        yield [{"signature": "sig1"}]
+        yield "event: complete\ndata: {}\n\n"
+
+    registry = ReplayRegistry()
+    try:
+        first, first_frames = registry.subscribe("wallet-stream:w1", source)
+        second, second_frames = registry.subscribe("wallet-stream:w1", source)
+        assert first is second
+
+        results = []
+        readers = [
+            threading.Thread(target=lambda frames=frames: results.append(list(frames)))
+            for frames in (first_frames, second_frames)
+        ]
+        for reader in readers:
+            reader.start()
+        release.set()
+        for reader in readers:
+            reader.join(5)
+
+        assert runs == [1]
+        assert len(results) == 2 and results[0] == results[1]
+        assert event_data(results[0], "trade") == [{"signature": "sig1"}]
+        assert registry.get_stats()["streams_joined"] == 1
+    finally:
+        registry.close()
+
+
+def test_evicted_frames_spill_to_disk_or_report_gap(tmp_path):
+    spilled = ReplayStream("spill", max_frames=2, spill_dir=str(tmp_path))
+    dropped = ReplayStream("drop", max_frames=2, spill_dir="")
+    for stream in (spilled, dropped):
+        for i in range(6):
+            stream.append(f"event: progress\ndata: {json.dumps({'i': i})}\n\n")
+        stream.finish()
+
+    assert [d["i"] for d in event_data(list(spilled.subscribe(f"{spilled.stream_id}-1")), "progress")] == [1, 2, 3, 4, 5]
+    assert spilled.get_stats()["spilled_frames"] == 4
+
+    frames = list(dropped.subscribe(f"{dropped.stream_id}-1"))
+    assert event_data(frames, "replay_gap") == [{
+        "missed_from": f"{dropped.stream_id}-2",
+        "resumed_at": f"{dropped.stream_id}-5",
+    }]
+    assert [d["i"] for d in event_data(frames, "progress")] == [4, 5]
+    spilled.close()
+
+
+def test_new_request_never_joins_a_stream_missing_its_start(monkeypatch):
+    """Once frame 1 is dropped, a request without Last-Event-ID gets a new computation"""
+    monkeypatch.setenv("SSE_FRAME_MAX_BYTES", "1")  # One frame per event
+    monkeypatch.setenv("SSE_REPLAY_MAX_FRAMES", "3")
+    monkeypatch.delenv("SSE_REPLAY_SPILL_DIR", raising=False)
+    runs = []
+
+    async def source():
+        runs.append(1)
+        yield "event: connected\ndata: {}\n\n"
+        for i in range(5):
+            yield f"event: progress\ndata: {json.dumps({'i': i})}\n\n"
+
+    registry = ReplayRegistry()
+    try:
+        first, first_frames = registry.subscribe("gpt-export:w1", source)
+        list(first_frames)
+        assert first.get_stats()["buffered_frames"] == 3
+
+        second, second_frames = registry.subscribe("gpt-export:w1", source)
+        frames = list(second_frames)
+        assert second is not first and runs == [1, 1]
+        assert event_data(frames, "replay_gap") == []
+        assert len(event_data(frames, "connected")) == 1
+        assert [d["i"] for d in event_data(frames, "progress")] == [0, 1, 2, 3, 4]
+
+        # A reconnect to the superseded stream still resumes it
+        resumed_stream, resumed = registry.subscribe("gpt-export:w1", source, f"{first.stream_id}-5")
+        assert resumed_stream is first
+        assert [d["i"] for d in event_data(list(resumed), "progress")] == [4]
+        assert registry.get_stats()["streams_superseded"] == 1
+    finally:
+        registry.close()
+
+
+def test_opened_subscription_holds_its_frames_before_first_read():
+    stream = ReplayStream("hold", max_frames=2, spill_dir="")
+    stream.append("event: connected\ndata: {}\n\n")
+    frames = stream.subscribe_from_start()
+
+    def produce():
+        for i in range(3):
+            stream.append(f"event: progress\ndata: {json.dumps({'i': i})}\n\n")
+        stream.finish()
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    producer.join(0.5)
+    assert producer.is_alive()  # Waiting for the unread subscriber, not dropping frame 1
+
+    received = list(frames)
+    producer.join(5)
+    assert len(event_data(received, "connected")) == 1
+    assert [d["i"] for d in event_data(received, "progress")] == [0, 1, 2]
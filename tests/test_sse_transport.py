@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test suite for batched, backpressure-aware SSE framing
+"""
+
+import asyncio
+import json
+import time
+
+from src.lib.sse_transport import SSEFramer, frame_events
+
+
+def parse_events(frames):
+    events = []
+    for frame in frames:
+        for block in frame.split("\n\n"):
+            if not block:
+                continue
+            fields = dict(line.split(": ", 1) for line in block.split("\n"))
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_trades_are_packed_into_size_bounded_frames():
+    framer = SSEFramer(max_bytes=4096, max_delay_ms=100)
+    trades = [{"signature": f"sig{i}", "value_usd": "1.5"} for i in range(500)]
+
+    frames = framer.add_trades(trades)
+    frames += framer.add_event("event: complete\ndata: {}\n\n")
+    frames.append(framer.flush())
+
+    assert 1 < len(frames) < 20
+    assert all(len(frame) <= 4096 for frame in frames)
+    events = parse_events(frames)
+    # Still one event per trade on the wire, only the writes are batched
+    assert [data for name, data in events if name == "trade"] == trades
+    assert events[-1] == ("complete", {})
+
+
+def test_partial_frames_flush_after_max_delay():
+    async def source():
+        yield [{"signature": "first"}]
+        await asyncio.sleep(0.3)
+        yield [{"signature": "second"}]
+
+    async def collect():
+        stamps = []
+        start = time.monotonic()
+        async for frame in frame_events(source(), SSEFramer(max_bytes=65536, max_delay_ms=50)):
+            stamps.append((time.monotonic() - start, frame))
+        return stamps
+
+    stamps = asyncio.run(collect())
+    assert len(stamps) == 2
+    # The first trade did not wait for the second one
+    assert stamps[0][0] < 0.2 and '"first"' in stamps[0][1]
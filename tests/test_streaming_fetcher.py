@@ -231,6 +231,61 @@ def test_streaming_compatibility():
     assert 'batch_size' in init_params  # New parameter for streaming
 
 
+def test_trades_stream_while_signatures_page():
+    """First trades go out after one signature page and one batch, newest first"""
+    from datetime import datetime
+    from decimal import Decimal
+    from unittest.mock import AsyncMock, patch
+    from src.lib.blockchain_fetcher_v3 import Trade
+
+    SOL = "So11111111111111111111111111111111111111112"
+    pages = [list(range(300, 150, -1)), list(range(150, 0, -1))]  # Slots, newest first
+
+    async def run_test():
+        first_trades_seen = asyncio.Event()
+        events = []
+
+        async def fake_page(wallet, page_num, before_sig=None, until_sig=None):
+            if page_num == 2:
+                # The second page only arrives once trades from the first were emitted
+                await asyncio.wait_for(first_trades_seen.wait(), 5)
+            sigs = [f"sig{slot}" for slot in pages[page_num - 1]]
+            return sigs, (sigs[-1] if page_num < len(pages) else None), False, False
+
+        async def fake_batch(batch_sigs, batch_num, total_batches):
+            return [{"signature": sig, "slot": int(sig[3:])} for sig in reversed(batch_sigs)]
+
+        async def fake_extract(transactions, wallet):
+            return [
+                Trade(signature=tx["signature"], slot=tx["slot"], timestamp=datetime.fromtimestamp(1700000000 + tx["slot"]),
+                      token_in_mint=SOL, token_in_symbol="SOL", token_in_amount=Decimal("1"),
+                      token_out_mint="BONK", token_out_symbol="BONK", token_out_amount=Decimal("1000"),
+                      price_usd=None, value_usd=Decimal("100"))
+                for tx in transactions
+            ]
+
+        fetcher = BlockchainFetcherV3Stream(skip_pricing=True, batch_size=40)
+        with patch("src.lib.blockchain_fetcher_v3_stream.HELIUS_KEY", "test-key"), \
+             patch.object(fetcher, "_fetch_single_page", fake_page), \
+             patch.object(fetcher, "_fetch_single_batch", fake_batch), \
+             patch.object(fetcher, "_extract_trades_with_dedup", fake_extract), \
+             patch.object(fetcher, "_fetch_token_metadata", AsyncMock()):
+            async for event in fetcher.fetch_wallet_trades_stream("wallet"):
+                events.append(event)
+                if event["type"] == STREAM_EVENT_TRADES:
+                    first_trades_seen.set()
+        return events
+
+    events = asyncio.run(run_test())
+    slots = [int(t["signature"][3:]) for e in events if e["type"] == STREAM_EVENT_TRADES for t in e["data"]["trades"]]
+    assert slots == list(range(300, 0, -1))
+    assert all(len(e["data"]["trades"]) <= 40 for e in events if e["type"] == STREAM_EVENT_TRADES)
+    complete = events[-1]
+    assert complete["type"] == STREAM_EVENT_COMPLETE
+    assert complete["data"]["summary"]["total_trades"] == 300
+    assert complete["data"]["timing"]["first_trade"] < complete["data"]["timing"]["fetch_signatures"]
+
+
 if __name__ == "__main__":
     # Run tests - require HELIUS_KEY from environment
     if not os.getenv("HELIUS_KEY"):
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test suite for the columnar TradeTable
+Covers base-unit storage, mint interning and parity of PositionBuilder and the
+aggregators between TradeTable input and the existing dict input
+"""
+
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+
+from src.lib.blockchain_fetcher_v3 import Trade, SOL_MINT
+from src.lib.position_builder import PositionBuilder
+from src.lib.position_models import CostBasisMethod
+from src.lib.trade_analytics_aggregator import TradeAnalyticsAggregator
+from src.lib.trade_table import TradeTable, to_base_units, from_base_units
+from src.lib.wallet_summary_aggregator import WalletSummaryAggregator
+
+BONK = "DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263"
+WIF = "EKpQGSJtjMFqKZ9KQanSqYXRcF8fBopzLHYxdM65zcjm"
+
+
+def swap(i, mint, symbol, action, amount, sol, value, price):
+    """SOL <-> token trade; amounts/prices within to_dict() rounding so both paths agree"""
+    sol_side = (SOL_MINT, "SOL", Decimal(sol))
+    token_side = (mint, symbol, Decimal(amount))
+    token_in, token_out = (sol_side, token_side) if action == "buy" else (token_side, sol_side)
+    return Trade(
+        signature=f"sig{i}", slot=100 + i, timestamp=datetime.fromtimestamp(1700000000 + i * 3600),
+        token_in_mint=token_in[0], token_in_symbol=token_in[1], token_in_amount=token_in[2],
+        token_out_mint=token_out[0], token_out_symbol=token_out[1], token_out_amount=token_out[2],
+        price_usd=Decimal(price), value_usd=Decimal(value), dex="RAYDIUM", priced=True,
+    )
+
+
+@pytest.fixture
+def trades():
+    return [
+        swap(0, BONK, "BONK", "buy", "1000.000000", "1.000000000", "100.0000", "0.1000"),
+        swap(1, WIF, "WIF", "buy", "50.500000", "0.500000000", "50.0000", "0.9901"),
+        swap(2, BONK, "BONK", "buy", "500.000000", "0.600000000", "75.0000", "0.1500"),
+        swap(3, BONK, "BONK", "sell", "700.000000", "0.900000000", "140.0000", "0.2000"),
+        swap(4, WIF, "WIF", "sell", "50.500000", "0.400000000", "40.0000", "0.7921"),
+    ]
+
+
+def test_base_units_round_trip_exactly():
+    assert to_base_units(Decimal("1.500000")) == (1500000, 6)
+    assert to_base_units(Decimal("42")) == (42, 0)
+    assert from_base_units(1500000, 6) == Decimal("1.500000")
+    assert str(from_base_units(*to_base_units(Decimal("0.000000001")))) == "1E-9"
+
+
+def test_table_interns_mints_and_matches_to_dict(trades):
+    table = TradeTable.from_trades(trades)
+
+    assert len(table) == 5
+    assert len(table.mints) == 3  # SOL, BONK, WIF
+    assert table.row(3).action == "sell"
+    assert table.row(3).token_symbol == "BONK"
+    assert table.row(3).amount == Decimal("700.000000")
+    assert table.to_dicts() == [t.to_dict() for t in trades]
+
+    # Round trip through the API dict shape keeps the same columns
+    reloaded = TradeTable.from_dicts(table.to_dicts())
+    assert [r.amount for r in reloaded] == [r.amount for r in table]
+    assert list(reloaded.timestamps) == list(table.timestamps)
+
+
+def test_trade_is_slotted(trades):
+    assert not hasattr(trades[0], "__dict__")
+
+
+@pytest.mark.parametrize("method", [CostBasisMethod.FIFO, CostBasisMethod.WEIGHTED_AVG])
+def test_position_builder_table_matches_dicts(trades, method):
+    """Reading columns directly builds the same positions as the dict path"""
+    with patch("src.lib.position_builder.positions_enabled", return_value=True):
+        from_dicts = PositionBuilder(method).build_positions_from_trades(
+            [t.to_dict() for t in trades], "wallet"
+        )
+        table = TradeTable.from_trades(trades)
+        from_table = PositionBuilder(method).build_positions_from_trades(table, "wallet")
+
+    def key(positions):
+        return sorted(
+            (p.token_mint, p.balance, p.cost_basis, p.cost_basis_usd, p.trade_count)
+            for p in positions
+        )
+
+    assert key(from_table) == key(from_dicts)
+    assert [p.token_symbol for p in from_table] == ["BONK"]  # WIF closed, SOL net negative
+    # to_dict() drops the slot; the table keeps it
+    assert [p.last_update_slot for p in from_table if p.token_symbol == "BONK"] == [103]
+
+    # Realized P&L and position fields land back in the columns
+    sell = table.row(3)
+    assert sell.pnl_usd != 0
+    assert sell.remaining_balance == Decimal("800.000000")
+    assert sell.cost_basis_method == method.value
+    assert table.row(4).position_closed
+
+
+def test_aggregators_accept_table(trades):
+    table = TradeTable.from_trades(trades)
+    table.pnl_usd[3] = Decimal("50")
+    table.pnl_usd[4] = Decimal("-10")
+
+    summary = WalletSummaryAggregator().aggregate_wallet_summary(table, include_windows=False)
+    assert summary["wallet_summary"]["total_trades"] == 5
+    assert summary["wallet_summary"]["unique_tokens"] == 2
+    assert summary["pnl_analysis"]["total_realized_pnl_usd"] == "40.00"
+    assert summary["trade_volume"]["buy_count"] == 3
+    assert summary["trade_volume"]["total_volume_usd"] == "405.00"
+
+    analytics = asyncio.run(TradeAnalyticsAggregator().aggregate_analytics(table, "wallet"))
+    assert analytics["pnl"]["realized_usd"] == "40"
+    assert (analytics["pnl"]["wins"], analytics["pnl"]["losses"]) == (1, 1)
+    assert analytics["volume"]["total_sol_volume"] == "3.40"
+    assert analytics["time_window"]["days"] == 1
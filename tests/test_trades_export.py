@@ -103,6 +103,27 @@ class TestTradesExport(unittest.TestCase):
         self.assertIn("error", data)
         self.assertIn("Internal server error", data["error"])
 
+    @patch('src.api.wallet_analytics_api_v4_gpt.run_async')
+    def test_trades_export_reports_window(self, mock_run_async):
+        """limit and history_complete tell clients whether older trades exist"""
+        mock_run_async.return_value = {
+            "signatures": ["sig1"],
+            "trades": [{"action": "sell", "amount": 100, "pnl_usd": None}],
+            "history_complete": False,
+        }
+        
+        with patch('src.config.feature_flags.trades_compact', return_value=False):
+            response = self.app.get(
+                f"/v4/trades/export-gpt/{self.test_wallet}?limit=1",
+                headers={"X-Api-Key": self.valid_api_key}
+            )
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data["limit"], 1)
+        self.assertIs(data["history_complete"], False)
+        self.assertIsNone(data["trades"][0]["pnl_usd"])
+
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test suite for the bounded newest-first fetch in BlockchainFetcherV3Fast
+"""
+
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+
+from src.lib.blockchain_fetcher_v3_fast import BlockchainFetcherV3Fast
+from src.lib.blockchain_fetcher_v3 import Trade, SOL_MINT
+from tests.helius_fakes import WALLET, TOKEN_MINT, FakeHeliusSession, FakeResponse
+
+
+def run_bounded(session, limit):
+    async def _run():
+        fetcher = BlockchainFetcherV3Fast(progress_callback=lambda _: None, skip_pricing=True, session=session)
+        async with fetcher:
+            return await fetcher.fetch_recent_trades(WALLET, limit), fetcher.trade_table
+
+    with patch("src.lib.blockchain_fetcher_v3_fast.HELIUS_KEY", "test-key"), \
+         patch("src.lib.blockchain_fetcher_v3_fast.SIGNATURE_PAGE_LIMIT", 10), \
+         patch("src.lib.blockchain_fetcher_v3_fast.TX_BATCH_SIZE", 2), \
+         patch("src.lib.blockchain_fetcher_v3_fast.BOUNDED_WAVE_BATCHES", 2), \
+         patch("src.lib.blockchain_fetcher_v3_fast.FastPriceCache"):
+        return asyncio.run(_run())
+
+
+def test_stops_once_limit_swaps_are_parsed():
+    session = FakeHeliusSession([(f"sig{i}", i) for i in range(300, 0, -1)])
+    result, table = run_bounded(session, limit=5)
+
+    # Two waves of 4 signatures cover 5 trades: one page, four batches, not 300 signatures
+    assert (session.pages, session.batches) == (1, 4)
+    assert result["summary"]["metrics"]["signatures_fetched"] == 8
+    assert [t["signature"] for t in result["trades"]] == ["sig296", "sig297", "sig298", "sig299", "sig300"]
+    assert result["signatures"] == [t["signature"] for t in result["trades"]]
+    assert result["limit"] == 5
+    assert result["history_complete"] is False
+    assert len(table) == 5
+
+
+def test_pages_past_non_swaps_until_enough_trades():
+    history = [(f"sig{i}", i) for i in range(25, 0, -1)]
+    non_swaps = {f"sig{i}" for i in range(25, 14, -1)}  # newest 11 are transfers
+    session = FakeHeliusSession(history, non_swaps)
+    result, _ = run_bounded(session, limit=3)
+
+    assert session.pages == 2
+    assert [t["signature"] for t in result["trades"]] == ["sig12", "sig13", "sig14"]
+
+
+def test_short_history_is_complete():
+    session = FakeHeliusSession([(f"sig{i}", i) for i in range(3, 0, -1)])
+    result, _ = run_bounded(session, limit=100)
+
+    assert session.pages == 1
+    assert len(result["trades"]) == 3
+    assert result["history_complete"] is True
+
+
+def test_rpc_error_on_first_page_is_not_a_complete_history():
+    """A failed first page returns no signatures but must not read as an empty wallet"""
+
+    class FailingPages(FakeHeliusSession):
+        def post(self, url, params=None, json=None, **kwargs):
+            if json.get("method") == "getSignaturesForAddress":
+                self.pages += 1
+                return FakeResponse({"error": {"message": "Node is behind"}})
+            return super().post(url, params=params, json=json, **kwargs)
+
+    session = FailingPages([(f"sig{i}", i) for i in range(3, 0, -1)])
+    result, _ = run_bounded(session, limit=10)
+
+    assert result["trades"] == []
+    assert result["history_complete"] is False
+
+
+def test_dropped_batch_is_not_a_complete_history():
+    class FailingBatches(FakeHeliusSession):
+        def post(self, url, params=None, json=None, **kwargs):
+            if "transactions" in json and json["transactions"][0] == "sig3":
+                raise ConnectionError("connection reset")
+            return super().post(url, params=params, json=json, **kwargs)
+
+    session = FailingBatches([(f"sig{i}", i) for i in range(3, 0, -1)])
+    result, _ = run_bounded(session, limit=10)
+
+    assert [t["signature"] for t in result["trades"]] == ["sig1"]
+    assert result["history_complete"] is False
+
+
+class SellingSession(FakeHeliusSession):
+    """Serves sig3 as a sell of the tokens bought by the older signatures"""
+
+    def post(self, url, params=None, json=None, **kwargs):
+        response = super().post(url, params=params, json=json, **kwargs)
+        if "transactions" in json:
+            for tx in response._payload:
+                if tx["signature"] == "sig3":
+                    tx["events"]["swap"] = {
+                        "tokenInputs": [{"mint": TOKEN_MINT, "rawTokenAmount": {"tokenAmount": "1000000", "decimals": 6}}],
+                        "nativeOutput": {"amount": 2_000_000_000},
+                    }
+        return response
+
+
+def test_sell_whose_buy_is_outside_the_window_has_no_pnl():
+    """The newest sell is matched against buys older than limit=1, so its P&L is unknown"""
+    history = [(f"sig{i}", i) for i in range(3, 0, -1)]
+    windowed, _ = run_bounded(SellingSession(history), limit=1)
+    full, _ = run_bounded(SellingSession(history), limit=10)
+
+    assert [(t["action"], t["pnl_usd"]) for t in windowed["trades"]] == [("sell", None)]
+    assert windowed["history_complete"] is False
+    assert [t["pnl_usd"] for t in full["trades"] if t["action"] == "sell"] == [0.0]
+
+
+def test_partial_history_pnl_ignores_unmatched_sells():
+    def trade(signature, minute, sell, value):
+        token_leg = (TOKEN_MINT, "TKN", Decimal("10"))
+        sol_leg = (SOL_MINT, "SOL", Decimal("1"))
+        token_in, token_out = (token_leg, sol_leg) if sell else (sol_leg, token_leg)
+        return Trade(
+            signature, minute, datetime(2024, 1, 1, 0, minute), *token_in, *token_out,
+            price_usd=None, value_usd=Decimal(value),
+        )
+
+    with patch("src.lib.blockchain_fetcher_v3_fast.HELIUS_KEY", "test-key"), \
+         patch("src.lib.blockchain_fetcher_v3_fast.FastPriceCache"):
+        fetcher = BlockchainFetcherV3Fast(progress_callback=lambda _: None, skip_pricing=True, session=object())
+        window = fetcher._calculate_pnl(
+            [trade("old-sell", 1, True, "500"), trade("buy", 2, False, "100"), trade("sell", 3, True, "150")],
+            partial_history=True,
+        )
+        result = fetcher._create_response_envelope(WALLET, window, 0.0)
+
+    assert [t.pnl_usd for t in window] == [None, Decimal("0"), Decimal("50")]
+    assert result["summary"]["total_pnl_usd"] == 50.0
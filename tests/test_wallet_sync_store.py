@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test suite for incremental wallet sync
+Covers the local on-disk store and BlockchainFetcherV3 delta fetching
+"""
+
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.lib.blockchain_fetcher_v3 import BlockchainFetcherV3, Trade, SOL_MINT
+from src.lib.wallet_sync_store import (
+    LocalWalletSyncStore, WalletSyncState, trade_to_record, trade_from_record
+)
+from tests.helius_fakes import WALLET, TOKEN_MINT, FakeHeliusSession, FakeResponse
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalWalletSyncStore(directory=str(tmp_path))
+
+
+def run_fetch(session, store):
+    async def _run():
+        fetcher = BlockchainFetcherV3(progress_callback=lambda _: None, skip_pricing=True, sync_store=store)
+        fetcher.session = session
+        with patch.object(fetcher, "_fetch_token_metadata", AsyncMock()):
+            return await fetcher.fetch_wallet_trades(WALLET)
+
+    with patch("src.lib.blockchain_fetcher_v3.HELIUS_KEY", "test-key"):
+        return asyncio.run(_run())
+
+
+def test_trade_record_roundtrip():
+    """Trades survive serialization without precision loss"""
+    trade = Trade(
+        signature="sig1", slot=42, timestamp=datetime.fromtimestamp(1700000000),
+        token_in_mint=SOL_MINT, token_in_symbol="SOL", token_in_amount=Decimal("1.123456789"),
+        token_out_mint=TOKEN_MINT, token_out_symbol="TKN", token_out_amount=Decimal("5"),
+        price_usd=Decimal("0.0123"), value_usd=None, priced=True, dex="RAYDIUM",
+    )
+    restored = trade_from_record(trade_to_record(trade))
+    assert restored == trade
+
+
+def test_local_store_roundtrip_and_delete(store):
+    """State is persisted to disk and can be dropped"""
+    assert store.load(WALLET) is None
+
+    state = WalletSyncState(wallet=WALLET, head_signature="sig9", head_slot=900, signature_count=9)
+    assert store.save(state)
+
+    loaded = store.load(WALLET)
+    assert loaded.head_signature == "sig9"
+    assert loaded.head_slot == 900
+    assert loaded.updated_at > 0
+
+    assert store.delete(WALLET)
+    assert store.load(WALLET) is None
+
+
+def test_local_store_ignores_corrupt_file(store, tmp_path):
+    """A corrupt file behaves like a missing checkpoint"""
+    (tmp_path / f"{WALLET}.json").write_text("{not json")
+    assert store.load(WALLET) is None
+
+
+def test_repeat_fetch_only_walks_new_signatures(store):
+    """Second fetch stops at the stored head and only downloads new transactions"""
+    session = FakeHeliusSession([(f"sig{i}", i) for i in range(5, 0, -1)])
+
+    first = run_fetch(session, store)
+    assert first["summary"]["total_trades"] == 5
+    assert first["sync"]["incremental"] is False
+    assert store.load(WALLET).head_signature == "sig5"
+    assert store.load(WALLET).head_slot == 5
+
+    # Two new transactions land on top of the known head
+    session.history = [("sig7", 7), ("sig6", 6)] + session.history
+    session.rpc_calls.clear()
+    session.tx_requested.clear()
+
+    second = run_fetch(session, store)
+
+    assert session.tx_requested == ["sig7", "sig6"]
+    assert all(call.get("until") == "sig5" for call in session.rpc_calls)
+    assert len(session.rpc_calls) == 1  # Short page reached the head
+    assert second["sync"] == {
+        "incremental": True, "new_signatures": 2, "new_trades": 2, "head_signature": "sig7",
+        "positions_incremental": False,
+    }
+    assert second["summary"]["total_trades"] == 7
+    assert {t["signature"] for t in second["trades"]} == {f"sig{i}" for i in range(1, 8)}
+    assert store.load(WALLET).head_signature == "sig7"
+
+
+def test_head_not_advanced_after_dropped_batch(store):
+    """A failed transaction batch must not move the head past unfetched trades"""
+    session = FakeHeliusSession([("sig2", 2), ("sig1", 1)])
+    store.save(WalletSyncState(wallet=WALLET, head_signature="sig1", head_slot=1))
+
+    async def failing_batch(self, batch_sigs, batch_num, total_batches):
+        self._fetch_failures += 1
+        return []
+
+    with patch.object(BlockchainFetcherV3, "_fetch_single_batch", failing_batch):
+        run_fetch(session, store)
+
+    assert store.load(WALLET).head_signature == "sig1"
+
+
+def test_head_not_advanced_after_rpc_error(store):
+    """An RPC error ends the signature walk early, so the head must stay put"""
+
+    class FailingSecondPage(FakeHeliusSession):
+        def post(self, url, params=None, json=None, **kwargs):
+            if json.get("method") == "getSignaturesForAddress" and json["params"][1].get("before"):
+                return FakeResponse({"error": {"message": "Node is behind"}})
+            return super().post(url, params=params, json=json, **kwargs)
+
+    session = FailingSecondPage([(f"sig{i}", i) for i in range(4, 0, -1)])
+    with patch("src.lib.blockchain_fetcher_v3.SIGNATURE_PAGE_LIMIT", 2):
+        run_fetch(session, store)
+
+    assert store.load(WALLET) is None
+
+
+def test_repeat_fetch_applies_new_trades_to_stored_positions(store):
+    """Positions resume from the checkpoint saved with the head and match a full rebuild"""
+    session = FakeHeliusSession([(f"sig{i}", i) for i in range(5, 0, -1)])
+    with patch("src.config.feature_flags.positions_enabled", return_value=True), \
+            patch("src.lib.position_builder.positions_enabled", return_value=True):
+        first = run_fetch(session, store)
+        assert first["sync"]["positions_incremental"] is False
+        assert store.load(WALLET).positions["slot"] == 5
+
+        session.history = [("sig7", 7), ("sig6", 6)] + session.history
+        second = run_fetch(session, store)
+        assert second["sync"]["positions_incremental"] is True
+
+        rebuilt_store = LocalWalletSyncStore(directory=str(store.directory) + "-rebuilt")
+        run_fetch(session, rebuilt_store)
+
+    saved, rebuilt = store.load(WALLET).positions, rebuilt_store.load(WALLET).positions
+    assert saved["slot"] == 7 and saved["trade_count"] == 7
+    assert saved["groups"] == rebuilt["groups"]
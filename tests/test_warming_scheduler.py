@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test suite for the popularity-driven warming scheduler
+"""
+
+import asyncio
+
+from src.lib.warming_scheduler import WarmingScheduler
+
+NOW = 1_000_000.0
+HOUR = 3600.0
+
+
+def budget(grants=0, rate=10.0):
+    return lambda: {"helius": {"rate": rate, "granted_by_priority": {"warming": grants}}}
+
+
+def run_tick(scheduler, now):
+    async def tick():
+        await scheduler.tick(now)
+        await asyncio.gather(*list(scheduler._inflight.values()))
+
+    asyncio.run(tick())
+
+
+def test_popularity_decays_with_half_life(monkeypatch):
+    monkeypatch.setenv("WARMING_MIN_SCORE", "2")
+    scheduler = WarmingScheduler(top_n=2, half_life=HOUR, budget_stats=budget())
+
+    for _ in range(8):
+        scheduler.record_request("old", "positions", cache_hit=True, now=NOW - 3 * HOUR)
+    for _ in range(3):
+        scheduler.record_request("recent", "positions", cache_hit=True, now=NOW)
+    scheduler.record_request("once", "positions", cache_hit=False, now=NOW)
+
+    # 8 reads three half-lives ago are worth 1 now, below the minimum score
+    ranked = scheduler.popular_wallets(now=NOW)
+    assert [wallet for wallet, _ in ranked] == ["recent"]
+    assert abs(ranked[0][1] - 3.0) < 1e-9
+
+    scheduler.record_request("old", "positions", cache_hit=True, now=NOW)
+    assert [wallet for wallet, _ in scheduler.popular_wallets(now=NOW)] == ["recent", "old"]
+
+
+def test_tick_refreshes_popular_entries_near_staleness(monkeypatch):
+    monkeypatch.setenv("WARMING_REFRESH_AT", "0.9")
+    progress = {"fresh": 0.5, "due": 0.95, "missing": None}
+    refreshed = []
+
+    async def refresh(wallet):
+        refreshed.append(wallet)
+        progress[wallet] = 0.0
+
+    scheduler = WarmingScheduler(top_n=10, half_life=HOUR, budget_stats=budget())
+    scheduler.register("positions", progress.get, refresh)
+    for wallet in ("fresh", "due", "missing"):
+        for _ in range(3):
+            scheduler.record_request(wallet, "positions", cache_hit=progress[wallet] is not None, now=NOW)
+
+    run_tick(scheduler, NOW)
+    assert sorted(refreshed) == ["due", "missing"]
+
+    # Reads now hit entries that warming filled
+    scheduler.record_request("missing", "positions", cache_hit=True, now=NOW)
+    scheduler.record_request("fresh", "positions", cache_hit=True, now=NOW)
+    stats = scheduler.get_stats()
+    assert stats["warm_hits"] == 1 and stats["reads"] == 11
+    assert stats["hit_rate_gain"] == 1 / 11
+    assert stats["refreshes_completed"] == 2
+
+
+def test_warming_stays_within_budget_share(monkeypatch):
+    monkeypatch.setenv("WARMING_BUDGET_SHARE", "0.1")
+    monkeypatch.setenv("WARMING_BUDGET_WINDOW_SEC", "60")
+    grants = {"n": 0}
+    refreshed = []
+
+    async def refresh(wallet):
+        refreshed.append(wallet)
+        grants["n"] += 30  # Each rebuild costs 30 Helius calls
+
+    stats = lambda: {"helius": {"rate": 10.0, "granted_by_priority": {"warming": grants["n"]}}}
+    scheduler = WarmingScheduler(top_n=10, half_life=HOUR, budget_stats=stats)
+    scheduler.register("positions", lambda wallet: None, refresh)
+    for i in range(5):
+        for _ in range(3):
+            scheduler.record_request(f"wallet{i}", "positions", cache_hit=False, now=NOW)
+
+    # 10% of 10 rps over 60s allows 60 warming calls per window: two rebuilds
+    async def ticks():
+        for _ in range(3):
+            await scheduler.tick(NOW)
+            await asyncio.gather(*list(scheduler._inflight.values()))
+
+    asyncio.run(ticks())
+    assert len(refreshed) == 2
+    assert scheduler.get_stats()["budget_deferrals"] >= 1
+    assert scheduler.get_stats()["quota_spent"] == {"helius": 60}